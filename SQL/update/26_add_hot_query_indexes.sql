@@ -0,0 +1,226 @@
+-- ==========================================================================================================
+-- 为高频查询的进度表和遥测表添加复合索引
+-- ==========================================================================================================
+-- 文件: 26_add_hot_query_indexes.sql
+-- 版本: 1.0.0
+-- 创建日期: 2026-10-19
+-- 兼容版本: MySQL 5.7-8.0
+-- 说明:
+--   1. pbl_task_progress: (user_id, task_id)、(task_id, status)
+--   2. pbl_video_play_progress: (session_id)、(resource_id, user_id, updated_at)
+--   3. pbl_video_watch_records: (resource_id, user_id)
+--   4. pbl_learning_progress: (user_id, unit_id, resource_id, status)、(user_id, unit_id, task_id, status)
+--   5. pbl_class_members: (class_id, is_active)
+--   6. 本脚本支持重复执行，不使用存储过程
+--
+-- 关于 submission IS NOT NULL：
+--   submission 是 JSON 字段，MySQL 5.7 无法直接为其建索引。该条件在代码中总是与 task_id 或 user_id
+--   一起出现，由上面的复合索引先缩小扫描范围，再对少量行做过滤。
+--
+-- 索引与 app/models/pbl.py 中各模型的 __table_args__ 保持一致，
+-- 执行后可运行 backend/check_query_plans.py 检查热点查询是否仍会全表扫描。
+-- ==========================================================================================================
+
+SET NAMES utf8mb4 COLLATE utf8mb4_unicode_ci;
+
+-- ==========================================================================================================
+-- 1. pbl_task_progress
+-- ==========================================================================================================
+
+-- 学生维度：按学生查询其在某些任务上的进度（班级进度、学生详情、我的作业）
+SET @index_exists = (
+    SELECT COUNT(*)
+    FROM information_schema.STATISTICS
+    WHERE TABLE_SCHEMA = DATABASE()
+    AND TABLE_NAME = 'pbl_task_progress'
+    AND INDEX_NAME = 'idx_user_task'
+);
+
+SET @sql = IF(@index_exists = 0,
+    'ALTER TABLE `pbl_task_progress` ADD KEY `idx_user_task` (`user_id`, `task_id`)',
+    'SELECT ''idx_user_task 索引已存在，跳过'' AS result'
+);
+
+PREPARE stmt FROM @sql;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+-- 任务维度：统计某个作业的提交数、待批改数
+SET @index_exists = (
+    SELECT COUNT(*)
+    FROM information_schema.STATISTICS
+    WHERE TABLE_SCHEMA = DATABASE()
+    AND TABLE_NAME = 'pbl_task_progress'
+    AND INDEX_NAME = 'idx_task_status'
+);
+
+SET @sql = IF(@index_exists = 0,
+    'ALTER TABLE `pbl_task_progress` ADD KEY `idx_task_status` (`task_id`, `status`)',
+    'SELECT ''idx_task_status 索引已存在，跳过'' AS result'
+);
+
+PREPARE stmt FROM @sql;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+SELECT '✓ pbl_task_progress 索引处理完成' AS '';
+
+-- ==========================================================================================================
+-- 2. pbl_video_play_progress
+-- ==========================================================================================================
+
+-- 播放心跳按 session_id 定位会话
+SET @index_exists = (
+    SELECT COUNT(*)
+    FROM information_schema.STATISTICS
+    WHERE TABLE_SCHEMA = DATABASE()
+    AND TABLE_NAME = 'pbl_video_play_progress'
+    AND INDEX_NAME = 'idx_session_id'
+);
+
+SET @sql = IF(@index_exists = 0,
+    'ALTER TABLE `pbl_video_play_progress` ADD KEY `idx_session_id` (`session_id`)',
+    'SELECT ''idx_session_id 索引已存在，跳过'' AS result'
+);
+
+PREPARE stmt FROM @sql;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+-- 断点续看：按资源+用户取最近一次会话（ORDER BY updated_at DESC LIMIT 1）
+SET @index_exists = (
+    SELECT COUNT(*)
+    FROM information_schema.STATISTICS
+    WHERE TABLE_SCHEMA = DATABASE()
+    AND TABLE_NAME = 'pbl_video_play_progress'
+    AND INDEX_NAME = 'idx_resource_user_updated'
+);
+
+SET @sql = IF(@index_exists = 0,
+    'ALTER TABLE `pbl_video_play_progress` ADD KEY `idx_resource_user_updated` (`resource_id`, `user_id`, `updated_at`)',
+    'SELECT ''idx_resource_user_updated 索引已存在，跳过'' AS result'
+);
+
+PREPARE stmt FROM @sql;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+SELECT '✓ pbl_video_play_progress 索引处理完成' AS '';
+
+-- ==========================================================================================================
+-- 3. pbl_video_watch_records
+-- ==========================================================================================================
+
+SET @index_exists = (
+    SELECT COUNT(*)
+    FROM information_schema.STATISTICS
+    WHERE TABLE_SCHEMA = DATABASE()
+    AND TABLE_NAME = 'pbl_video_watch_records'
+    AND INDEX_NAME = 'idx_resource_user'
+);
+
+SET @sql = IF(@index_exists = 0,
+    'ALTER TABLE `pbl_video_watch_records` ADD KEY `idx_resource_user` (`resource_id`, `user_id`)',
+    'SELECT ''idx_resource_user 索引已存在，跳过'' AS result'
+);
+
+PREPARE stmt FROM @sql;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+SELECT '✓ pbl_video_watch_records 索引处理完成' AS '';
+
+-- ==========================================================================================================
+-- 4. pbl_learning_progress
+-- ==========================================================================================================
+
+-- 单元内资源完成情况
+SET @index_exists = (
+    SELECT COUNT(*)
+    FROM information_schema.STATISTICS
+    WHERE TABLE_SCHEMA = DATABASE()
+    AND TABLE_NAME = 'pbl_learning_progress'
+    AND INDEX_NAME = 'idx_user_unit_resource_status'
+);
+
+SET @sql = IF(@index_exists = 0,
+    'ALTER TABLE `pbl_learning_progress` ADD KEY `idx_user_unit_resource_status` (`user_id`, `unit_id`, `resource_id`, `status`)',
+    'SELECT ''idx_user_unit_resource_status 索引已存在，跳过'' AS result'
+);
+
+PREPARE stmt FROM @sql;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+-- 单元内任务完成情况
+SET @index_exists = (
+    SELECT COUNT(*)
+    FROM information_schema.STATISTICS
+    WHERE TABLE_SCHEMA = DATABASE()
+    AND TABLE_NAME = 'pbl_learning_progress'
+    AND INDEX_NAME = 'idx_user_unit_task_status'
+);
+
+SET @sql = IF(@index_exists = 0,
+    'ALTER TABLE `pbl_learning_progress` ADD KEY `idx_user_unit_task_status` (`user_id`, `unit_id`, `task_id`, `status`)',
+    'SELECT ''idx_user_unit_task_status 索引已存在，跳过'' AS result'
+);
+
+PREPARE stmt FROM @sql;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+SELECT '✓ pbl_learning_progress 索引处理完成' AS '';
+
+-- ==========================================================================================================
+-- 5. pbl_class_members
+-- ==========================================================================================================
+
+SET @index_exists = (
+    SELECT COUNT(*)
+    FROM information_schema.STATISTICS
+    WHERE TABLE_SCHEMA = DATABASE()
+    AND TABLE_NAME = 'pbl_class_members'
+    AND INDEX_NAME = 'idx_class_active'
+);
+
+SET @sql = IF(@index_exists = 0,
+    'ALTER TABLE `pbl_class_members` ADD KEY `idx_class_active` (`class_id`, `is_active`)',
+    'SELECT ''idx_class_active 索引已存在，跳过'' AS result'
+);
+
+PREPARE stmt FROM @sql;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+SELECT '✓ pbl_class_members 索引处理完成' AS '';
+
+-- ==========================================================================================================
+-- 6. 验证脚本执行结果
+-- ==========================================================================================================
+
+SELECT
+    TABLE_NAME AS '表名',
+    INDEX_NAME AS '索引名',
+    GROUP_CONCAT(COLUMN_NAME ORDER BY SEQ_IN_INDEX) AS '索引列'
+FROM information_schema.STATISTICS
+WHERE TABLE_SCHEMA = DATABASE()
+    AND INDEX_NAME IN (
+        'idx_user_task', 'idx_task_status',
+        'idx_session_id', 'idx_resource_user_updated',
+        'idx_resource_user',
+        'idx_user_unit_resource_status', 'idx_user_unit_task_status',
+        'idx_class_active'
+    )
+    AND TABLE_NAME IN (
+        'pbl_task_progress', 'pbl_video_play_progress', 'pbl_video_watch_records',
+        'pbl_learning_progress', 'pbl_class_members'
+    )
+GROUP BY TABLE_NAME, INDEX_NAME
+ORDER BY TABLE_NAME, INDEX_NAME;
+
+SELECT '✓ 脚本执行完成！' AS result;
+
+-- ==========================================================================================================
+-- 执行完成
+-- ==========================================================================================================
@@ -0,0 +1,151 @@
+-- ==========================================================================================================
+-- 伦理活动讨论/反思、社会实践活动照片拆分为子表
+-- ==========================================================================================================
+-- 文件: 27_add_activity_child_tables.sql
+-- 版本: 1.0.0
+-- 创建日期: 2026-10-19
+-- 兼容版本: MySQL 5.7-8.0
+-- 说明:
+--   1. 新建 pbl_ethics_discussion_records（伦理活动讨论记录）
+--   2. 新建 pbl_ethics_reflections（伦理活动反思）
+--   3. 新建 pbl_social_activity_photos（社会实践活动照片）
+--   4. 将 pbl_ethics_activities.discussion_records / reflections、pbl_social_activities.photos
+--      中已有的 JSON 数组逐条拆分写入子表
+--   5. 本脚本支持重复执行：已经有子表记录的活动不会重复拆分
+--
+-- 原 JSON 字段保留不删除（便于回滚），代码不再读写这些字段。
+-- 拆分使用数字序列 + JSON_EXTRACT 实现，兼容 MySQL 5.7（不依赖 8.0 的 JSON_TABLE），
+-- 单个活动最多拆分 1000 条记录。
+-- ==========================================================================================================
+
+SET NAMES utf8mb4 COLLATE utf8mb4_unicode_ci;
+
+-- ==========================================================================================================
+-- 1. 创建子表
+-- ==========================================================================================================
+
+CREATE TABLE IF NOT EXISTS `pbl_ethics_discussion_records` (
+  `id` BIGINT(20) NOT NULL AUTO_INCREMENT COMMENT '记录ID',
+  `activity_id` BIGINT(20) NOT NULL COMMENT '伦理活动ID',
+  `student_id` INT(11) DEFAULT NULL COMMENT '学生ID',
+  `student_name` VARCHAR(100) DEFAULT NULL COMMENT '学生姓名（冗余字段）',
+  `viewpoint` TEXT COMMENT '观点内容',
+  `created_at` DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP COMMENT '提交时间',
+  PRIMARY KEY (`id`),
+  KEY `idx_ethics_discussion_activity` (`activity_id`, `id`),
+  CONSTRAINT `fk_ethics_discussion_activity` FOREIGN KEY (`activity_id`)
+    REFERENCES `pbl_ethics_activities` (`id`) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='PBL伦理活动讨论记录表';
+
+CREATE TABLE IF NOT EXISTS `pbl_ethics_reflections` (
+  `id` BIGINT(20) NOT NULL AUTO_INCREMENT COMMENT '记录ID',
+  `activity_id` BIGINT(20) NOT NULL COMMENT '伦理活动ID',
+  `student_id` INT(11) DEFAULT NULL COMMENT '学生ID',
+  `student_name` VARCHAR(100) DEFAULT NULL COMMENT '学生姓名（冗余字段）',
+  `content` TEXT COMMENT '反思内容',
+  `insights` JSON DEFAULT NULL COMMENT '收获要点',
+  `created_at` DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP COMMENT '提交时间',
+  PRIMARY KEY (`id`),
+  KEY `idx_ethics_reflection_activity` (`activity_id`, `id`),
+  CONSTRAINT `fk_ethics_reflection_activity` FOREIGN KEY (`activity_id`)
+    REFERENCES `pbl_ethics_activities` (`id`) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='PBL伦理活动反思表';
+
+CREATE TABLE IF NOT EXISTS `pbl_social_activity_photos` (
+  `id` BIGINT(20) NOT NULL AUTO_INCREMENT COMMENT '照片ID',
+  `activity_id` BIGINT(20) NOT NULL COMMENT '社会实践活动ID',
+  `photo_url` VARCHAR(500) NOT NULL COMMENT '照片地址',
+  `uploaded_by` INT(11) DEFAULT NULL COMMENT '上传者ID',
+  `created_at` DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP COMMENT '上传时间',
+  PRIMARY KEY (`id`),
+  KEY `idx_social_activity_photo_activity` (`activity_id`, `id`),
+  CONSTRAINT `fk_social_activity_photo_activity` FOREIGN KEY (`activity_id`)
+    REFERENCES `pbl_social_activities` (`id`) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='PBL社会实践活动照片表';
+
+SELECT '✓ 子表创建完成' AS '';
+
+-- ==========================================================================================================
+-- 2. 拆分已有 JSON 数组
+-- ==========================================================================================================
+
+-- 数字序列 0-999，用于按下标展开 JSON 数组
+DROP TEMPORARY TABLE IF EXISTS temp_seq;
+CREATE TEMPORARY TABLE temp_seq (n INT NOT NULL PRIMARY KEY);
+INSERT INTO temp_seq (n)
+SELECT d1.d + d2.d * 10 + d3.d * 100
+FROM (SELECT 0 d UNION ALL SELECT 1 UNION ALL SELECT 2 UNION ALL SELECT 3 UNION ALL SELECT 4
+      UNION ALL SELECT 5 UNION ALL SELECT 6 UNION ALL SELECT 7 UNION ALL SELECT 8 UNION ALL SELECT 9) d1
+CROSS JOIN (SELECT 0 d UNION ALL SELECT 1 UNION ALL SELECT 2 UNION ALL SELECT 3 UNION ALL SELECT 4
+      UNION ALL SELECT 5 UNION ALL SELECT 6 UNION ALL SELECT 7 UNION ALL SELECT 8 UNION ALL SELECT 9) d2
+CROSS JOIN (SELECT 0 d UNION ALL SELECT 1 UNION ALL SELECT 2 UNION ALL SELECT 3 UNION ALL SELECT 4
+      UNION ALL SELECT 5 UNION ALL SELECT 6 UNION ALL SELECT 7 UNION ALL SELECT 8 UNION ALL SELECT 9) d3;
+
+-- 讨论记录：{"student_id", "student_name", "viewpoint", "time"}
+INSERT INTO `pbl_ethics_discussion_records` (`activity_id`, `student_id`, `student_name`, `viewpoint`, `created_at`)
+SELECT
+    a.id,
+    CAST(JSON_UNQUOTE(JSON_EXTRACT(a.discussion_records, CONCAT('$[', s.n, '].student_id'))) AS UNSIGNED),
+    JSON_UNQUOTE(JSON_EXTRACT(a.discussion_records, CONCAT('$[', s.n, '].student_name'))),
+    JSON_UNQUOTE(JSON_EXTRACT(a.discussion_records, CONCAT('$[', s.n, '].viewpoint'))),
+    COALESCE(
+        STR_TO_DATE(LEFT(JSON_UNQUOTE(JSON_EXTRACT(a.discussion_records, CONCAT('$[', s.n, '].time'))), 19), '%Y-%m-%dT%H:%i:%s'),
+        a.updated_at
+    )
+FROM `pbl_ethics_activities` a
+JOIN temp_seq s ON s.n < JSON_LENGTH(a.discussion_records)
+WHERE JSON_TYPE(a.discussion_records) = 'ARRAY'
+  AND NOT EXISTS (SELECT 1 FROM `pbl_ethics_discussion_records` r WHERE r.activity_id = a.id)
+ORDER BY a.id, s.n;
+
+SELECT CONCAT('✓ 讨论记录拆分完成，共 ', ROW_COUNT(), ' 条') AS '';
+
+-- 反思：{"student_id", "student_name", "content", "insights"}（旧数据没有时间，使用活动更新时间）
+INSERT INTO `pbl_ethics_reflections` (`activity_id`, `student_id`, `student_name`, `content`, `insights`, `created_at`)
+SELECT
+    a.id,
+    CAST(JSON_UNQUOTE(JSON_EXTRACT(a.reflections, CONCAT('$[', s.n, '].student_id'))) AS UNSIGNED),
+    JSON_UNQUOTE(JSON_EXTRACT(a.reflections, CONCAT('$[', s.n, '].student_name'))),
+    JSON_UNQUOTE(JSON_EXTRACT(a.reflections, CONCAT('$[', s.n, '].content'))),
+    JSON_EXTRACT(a.reflections, CONCAT('$[', s.n, '].insights')),
+    a.updated_at
+FROM `pbl_ethics_activities` a
+JOIN temp_seq s ON s.n < JSON_LENGTH(a.reflections)
+WHERE JSON_TYPE(a.reflections) = 'ARRAY'
+  AND NOT EXISTS (SELECT 1 FROM `pbl_ethics_reflections` r WHERE r.activity_id = a.id)
+ORDER BY a.id, s.n;
+
+SELECT CONCAT('✓ 反思拆分完成，共 ', ROW_COUNT(), ' 条') AS '';
+
+-- 活动照片：字符串数组
+INSERT INTO `pbl_social_activity_photos` (`activity_id`, `photo_url`, `uploaded_by`, `created_at`)
+SELECT
+    a.id,
+    JSON_UNQUOTE(JSON_EXTRACT(a.photos, CONCAT('$[', s.n, ']'))),
+    NULL,
+    a.updated_at
+FROM `pbl_social_activities` a
+JOIN temp_seq s ON s.n < JSON_LENGTH(a.photos)
+WHERE JSON_TYPE(a.photos) = 'ARRAY'
+  AND NOT EXISTS (SELECT 1 FROM `pbl_social_activity_photos` p WHERE p.activity_id = a.id)
+ORDER BY a.id, s.n;
+
+SELECT CONCAT('✓ 活动照片拆分完成，共 ', ROW_COUNT(), ' 条') AS '';
+
+DROP TEMPORARY TABLE IF EXISTS temp_seq;
+
+-- ==========================================================================================================
+-- 3. 验证脚本执行结果
+-- ==========================================================================================================
+
+SELECT 'pbl_ethics_discussion_records' AS '表名', COUNT(*) AS '记录数' FROM `pbl_ethics_discussion_records`
+UNION ALL
+SELECT 'pbl_ethics_reflections', COUNT(*) FROM `pbl_ethics_reflections`
+UNION ALL
+SELECT 'pbl_social_activity_photos', COUNT(*) FROM `pbl_social_activity_photos`;
+
+SELECT '✓ 脚本执行完成！' AS result;
+
+-- ==========================================================================================================
+-- 执行完成
+-- ==========================================================================================================
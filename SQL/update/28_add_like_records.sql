@@ -0,0 +1,47 @@
+-- ==========================================================================================================
+-- 点赞去重表
+-- ==========================================================================================================
+-- 文件: 28_add_like_records.sql
+-- 版本: 1.0.0
+-- 创建日期: 2026-10-19
+-- 兼容版本: MySQL 5.7-8.0
+-- 说明:
+--   1. 新建 pbl_like_records，记录用户对伦理案例、项目成果等的点赞
+--   2. (target_type, target_id, user_id) 唯一，同一用户对同一对象只计一次赞
+--
+-- 点赞数（like_count）仍保存在原表中，由计数服务批量执行 UPDATE x = x + delta 累加，
+-- 历史点赞没有用户信息，不做回填。
+-- ==========================================================================================================
+
+SET NAMES utf8mb4 COLLATE utf8mb4_unicode_ci;
+
+CREATE TABLE IF NOT EXISTS `pbl_like_records` (
+  `id` BIGINT(20) NOT NULL AUTO_INCREMENT COMMENT '记录ID',
+  `target_type` VARCHAR(50) NOT NULL COMMENT '点赞对象类型（对象所在表名，如 pbl_ethics_cases）',
+  `target_id` BIGINT(20) NOT NULL COMMENT '点赞对象ID',
+  `user_id` INT(11) NOT NULL COMMENT '点赞用户ID',
+  `created_at` DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP COMMENT '点赞时间',
+  PRIMARY KEY (`id`),
+  UNIQUE KEY `uk_target_user` (`target_type`, `target_id`, `user_id`),
+  KEY `idx_user_id` (`user_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='PBL点赞记录表';
+
+SELECT '✓ pbl_like_records 创建完成' AS '';
+
+-- ==========================================================================================================
+-- 验证脚本执行结果
+-- ==========================================================================================================
+
+SELECT
+    INDEX_NAME AS '索引名',
+    GROUP_CONCAT(COLUMN_NAME ORDER BY SEQ_IN_INDEX) AS '字段',
+    IF(NON_UNIQUE = 0, '唯一', '普通') AS '类型'
+FROM information_schema.STATISTICS
+WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'pbl_like_records'
+GROUP BY INDEX_NAME, NON_UNIQUE;
+
+SELECT '✓ 脚本执行完成！' AS result;
+
+-- ==========================================================================================================
+-- 执行完成
+-- ==========================================================================================================
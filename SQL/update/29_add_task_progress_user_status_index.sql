@@ -0,0 +1,54 @@
+-- ==========================================================================================================
+-- 为“我提交的任务”列表添加复合索引
+-- ==========================================================================================================
+-- 文件: 29_add_task_progress_user_status_index.sql
+-- 版本: 1.0.0
+-- 创建日期: 2026-10-19
+-- 兼容版本: MySQL 5.7-8.0
+-- 说明:
+--   1. pbl_task_progress: (user_id, status, updated_at)
+--      学生端 /student/my-tasks 按学生 + 状态过滤、按 updated_at 倒序游标分页，
+--      InnoDB 二级索引自带主键 id，(updated_at, id) 的翻页条件可以直接在索引上定位
+--   2. 本脚本支持重复执行，不使用存储过程
+--
+-- 索引与 app/models/pbl.py 中 PBLTaskProgress 的 __table_args__ 保持一致。
+-- ==========================================================================================================
+
+SET NAMES utf8mb4 COLLATE utf8mb4_unicode_ci;
+
+SET @index_exists = (
+    SELECT COUNT(*)
+    FROM information_schema.STATISTICS
+    WHERE TABLE_SCHEMA = DATABASE()
+    AND TABLE_NAME = 'pbl_task_progress'
+    AND INDEX_NAME = 'idx_user_status_updated'
+);
+
+SET @sql = IF(@index_exists = 0,
+    'ALTER TABLE `pbl_task_progress` ADD KEY `idx_user_status_updated` (`user_id`, `status`, `updated_at`)',
+    'SELECT ''idx_user_status_updated 索引已存在，跳过'' AS result'
+);
+
+PREPARE stmt FROM @sql;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+-- ==========================================================================================================
+-- 验证脚本执行结果
+-- ==========================================================================================================
+
+SELECT
+    TABLE_NAME AS '表名',
+    INDEX_NAME AS '索引名',
+    GROUP_CONCAT(COLUMN_NAME ORDER BY SEQ_IN_INDEX) AS '索引列'
+FROM information_schema.STATISTICS
+WHERE TABLE_SCHEMA = DATABASE()
+    AND TABLE_NAME = 'pbl_task_progress'
+    AND INDEX_NAME = 'idx_user_status_updated'
+GROUP BY TABLE_NAME, INDEX_NAME;
+
+SELECT '✓ 脚本执行完成！' AS result;
+
+-- ==========================================================================================================
+-- 执行完成
+-- ==========================================================================================================
@@ -0,0 +1,63 @@
+-- ==========================================================================================================
+-- 后台任务表
+-- ==========================================================================================================
+-- 文件: 30_add_background_jobs.sql
+-- 版本: 1.0.0
+-- 创建日期: 2026-10-19
+-- 兼容版本: MySQL 5.7-8.0
+-- 说明:
+--   1. 新建 pbl_background_jobs，记录批量导入、导出、批量授权等后台任务的状态、进度和结果文件
+--   2. (creator_id, idempotency_key) 唯一，同一管理员重复提交相同幂等键时返回已有任务
+--   3. (status, id) 索引供 worker 按提交顺序领取待执行任务
+--
+-- 结果文件保存在 JOB_STORAGE_DIR 目录下，表中只记录相对路径。
+-- ==========================================================================================================
+
+SET NAMES utf8mb4 COLLATE utf8mb4_unicode_ci;
+
+CREATE TABLE IF NOT EXISTS `pbl_background_jobs` (
+  `id` BIGINT(20) NOT NULL AUTO_INCREMENT COMMENT '任务ID',
+  `uuid` VARCHAR(36) NOT NULL COMMENT '任务UUID',
+  `job_type` VARCHAR(50) NOT NULL COMMENT '任务类型',
+  `status` VARCHAR(20) NOT NULL DEFAULT 'pending' COMMENT '状态：pending/running/succeeded/failed',
+  `progress` INT(11) NOT NULL DEFAULT 0 COMMENT '进度（0-100）',
+  `message` VARCHAR(500) DEFAULT NULL COMMENT '当前进度说明或失败原因',
+  `params` JSON DEFAULT NULL COMMENT '任务参数',
+  `result` JSON DEFAULT NULL COMMENT '任务结果摘要',
+  `result_path` VARCHAR(500) DEFAULT NULL COMMENT '结果文件路径（相对任务存储目录）',
+  `result_filename` VARCHAR(255) DEFAULT NULL COMMENT '结果文件下载名称',
+  `idempotency_key` VARCHAR(100) DEFAULT NULL COMMENT '幂等键（同一创建者内唯一）',
+  `creator_id` INT(11) NOT NULL COMMENT '创建者ID',
+  `school_id` INT(11) DEFAULT NULL COMMENT '所属学校ID',
+  `attempts` INT(11) NOT NULL DEFAULT 0 COMMENT '已执行次数',
+  `worker_id` VARCHAR(100) DEFAULT NULL COMMENT '执行的 worker',
+  `created_at` DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
+  `started_at` DATETIME DEFAULT NULL COMMENT '开始执行时间',
+  `heartbeat_at` DATETIME DEFAULT NULL COMMENT '最近一次进度更新时间',
+  `finished_at` DATETIME DEFAULT NULL COMMENT '结束时间',
+  PRIMARY KEY (`id`),
+  UNIQUE KEY `uk_uuid` (`uuid`),
+  UNIQUE KEY `uk_creator_idempotency` (`creator_id`, `idempotency_key`),
+  KEY `idx_status_id` (`status`, `id`),
+  KEY `idx_creator_created` (`creator_id`, `created_at`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='PBL后台任务表';
+
+SELECT '✓ pbl_background_jobs 创建完成' AS '';
+
+-- ==========================================================================================================
+-- 验证脚本执行结果
+-- ==========================================================================================================
+
+SELECT
+    INDEX_NAME AS '索引名',
+    GROUP_CONCAT(COLUMN_NAME ORDER BY SEQ_IN_INDEX) AS '字段',
+    IF(NON_UNIQUE = 0, '唯一', '普通') AS '类型'
+FROM information_schema.STATISTICS
+WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'pbl_background_jobs'
+GROUP BY INDEX_NAME, NON_UNIQUE;
+
+SELECT '✓ 脚本执行完成！' AS result;
+
+-- ==========================================================================================================
+-- 执行完成
+-- ==========================================================================================================
@@ -0,0 +1,133 @@
+-- ==========================================================================================================
+-- 评价维度得分表
+-- ==========================================================================================================
+-- 文件: 31_add_assessment_dimension_scores.sql
+-- 版本: 1.0.0
+-- 创建日期: 2026-10-19
+-- 兼容版本: MySQL 5.7-8.0
+-- 说明:
+--   1. 新建 pbl_assessment_dimension_scores，pbl_assessments.dimensions 中的每个维度保存一行，
+--      冗余学生、评价对象所属课程、评价人角色和评价时间，学生/班级/课程的维度统计直接 GROUP BY
+--   2. 将已有评价的 dimensions JSON 数组逐条拆分写入新表
+--   3. 本脚本支持重复执行：已经有维度得分的评价不会重复拆分
+--
+-- dimensions 仍是评价的原始数据，代码在创建/修改评价时同步重写维度得分。
+-- 维度名称取 dimension（前端格式），为空时取 name（早期格式）；没有 score 按 0 计，score 不是数字的维度跳过。
+-- 拆分使用数字序列 + JSON_EXTRACT 实现，兼容 MySQL 5.7（不依赖 8.0 的 JSON_TABLE），
+-- 单个评价最多拆分 100 个维度。
+-- ==========================================================================================================
+
+SET NAMES utf8mb4 COLLATE utf8mb4_unicode_ci;
+
+-- ==========================================================================================================
+-- 1. 创建表
+-- ==========================================================================================================
+
+CREATE TABLE IF NOT EXISTS `pbl_assessment_dimension_scores` (
+  `id` BIGINT(20) NOT NULL AUTO_INCREMENT COMMENT '记录ID',
+  `assessment_id` BIGINT(20) NOT NULL COMMENT '评价ID',
+  `student_id` INT(11) NOT NULL COMMENT '被评价学生ID（冗余字段）',
+  `course_id` BIGINT(20) DEFAULT NULL COMMENT '评价对象所属课程ID（冗余字段，评价对象为学生时为空）',
+  `assessor_role` ENUM('teacher','student','expert','self') NOT NULL COMMENT '评价人角色（冗余字段）',
+  `dimension` VARCHAR(100) NOT NULL COMMENT '维度名称',
+  `score` DECIMAL(6,2) NOT NULL COMMENT '维度得分',
+  `weight` DECIMAL(6,4) DEFAULT NULL COMMENT '维度权重',
+  `assessed_at` DATETIME NOT NULL COMMENT '评价时间（冗余字段）',
+  PRIMARY KEY (`id`),
+  KEY `idx_assessment_id` (`assessment_id`),
+  KEY `idx_student_dimension` (`student_id`, `dimension`),
+  KEY `idx_course_dimension` (`course_id`, `dimension`),
+  CONSTRAINT `fk_dimension_score_assessment` FOREIGN KEY (`assessment_id`)
+    REFERENCES `pbl_assessments` (`id`) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='PBL评价维度得分表';
+
+SELECT '✓ pbl_assessment_dimension_scores 创建完成' AS '';
+
+-- ==========================================================================================================
+-- 2. 拆分已有评价的 dimensions
+-- ==========================================================================================================
+
+-- 数字序列 0-99，用于按下标展开 JSON 数组
+DROP TEMPORARY TABLE IF EXISTS temp_seq;
+CREATE TEMPORARY TABLE temp_seq (n INT NOT NULL PRIMARY KEY);
+INSERT INTO temp_seq (n)
+SELECT d1.d + d2.d * 10
+FROM (SELECT 0 d UNION ALL SELECT 1 UNION ALL SELECT 2 UNION ALL SELECT 3 UNION ALL SELECT 4
+      UNION ALL SELECT 5 UNION ALL SELECT 6 UNION ALL SELECT 7 UNION ALL SELECT 8 UNION ALL SELECT 9) d1
+CROSS JOIN (SELECT 0 d UNION ALL SELECT 1 UNION ALL SELECT 2 UNION ALL SELECT 3 UNION ALL SELECT 4
+      UNION ALL SELECT 5 UNION ALL SELECT 6 UNION ALL SELECT 7 UNION ALL SELECT 8 UNION ALL SELECT 9) d2;
+
+-- 每个维度的原始值（名称、得分、权重）
+DROP TEMPORARY TABLE IF EXISTS temp_dimensions;
+CREATE TEMPORARY TABLE temp_dimensions AS
+SELECT
+    a.id AS assessment_id,
+    s.n,
+    COALESCE(
+        NULLIF(TRIM(IF(JSON_TYPE(JSON_EXTRACT(a.dimensions, CONCAT('$[', s.n, '].dimension'))) = 'STRING',
+            JSON_UNQUOTE(JSON_EXTRACT(a.dimensions, CONCAT('$[', s.n, '].dimension'))), NULL)), ''),
+        NULLIF(TRIM(IF(JSON_TYPE(JSON_EXTRACT(a.dimensions, CONCAT('$[', s.n, '].name'))) = 'STRING',
+            JSON_UNQUOTE(JSON_EXTRACT(a.dimensions, CONCAT('$[', s.n, '].name'))), NULL)), '')
+    ) AS dimension,
+    JSON_EXTRACT(a.dimensions, CONCAT('$[', s.n, '].score')) AS score_json,
+    JSON_EXTRACT(a.dimensions, CONCAT('$[', s.n, '].weight')) AS weight_json
+FROM `pbl_assessments` a
+JOIN temp_seq s ON s.n < JSON_LENGTH(a.dimensions)
+WHERE JSON_TYPE(a.dimensions) = 'ARRAY'
+  AND NOT EXISTS (SELECT 1 FROM `pbl_assessment_dimension_scores` d WHERE d.assessment_id = a.id);
+
+-- 评价对象所属课程：任务 -> 单元 -> 课程，项目 -> 课程，成果 -> 项目 -> 课程
+INSERT INTO `pbl_assessment_dimension_scores`
+    (`assessment_id`, `student_id`, `course_id`, `assessor_role`, `dimension`, `score`, `weight`, `assessed_at`)
+SELECT
+    a.id,
+    a.student_id,
+    CASE a.target_type
+        WHEN 'task' THEN u.course_id
+        WHEN 'project' THEN p.course_id
+        WHEN 'output' THEN op.course_id
+    END,
+    a.assessor_role,
+    LEFT(t.dimension, 100),
+    CASE
+        WHEN t.score_json IS NULL THEN 0
+        ELSE CAST(JSON_UNQUOTE(t.score_json) AS DECIMAL(6,2))
+    END,
+    IF(JSON_TYPE(t.weight_json) IN ('INTEGER', 'UNSIGNED INTEGER', 'DOUBLE', 'DECIMAL')
+        OR (JSON_TYPE(t.weight_json) = 'STRING' AND JSON_UNQUOTE(t.weight_json) REGEXP '^-?[0-9]+(\\.[0-9]+)?$'),
+        CAST(JSON_UNQUOTE(t.weight_json) AS DECIMAL(6,4)), NULL),
+    a.created_at
+FROM temp_dimensions t
+JOIN `pbl_assessments` a ON a.id = t.assessment_id
+LEFT JOIN `pbl_tasks` tk ON a.target_type = 'task' AND tk.id = a.target_id
+LEFT JOIN `pbl_units` u ON u.id = tk.unit_id
+LEFT JOIN `pbl_projects` p ON a.target_type = 'project' AND p.id = a.target_id
+LEFT JOIN `pbl_project_outputs` o ON a.target_type = 'output' AND o.id = a.target_id
+LEFT JOIN `pbl_projects` op ON op.id = o.project_id
+WHERE t.dimension IS NOT NULL
+  AND (
+    t.score_json IS NULL
+    OR JSON_TYPE(t.score_json) IN ('INTEGER', 'UNSIGNED INTEGER', 'DOUBLE', 'DECIMAL')
+    OR (JSON_TYPE(t.score_json) = 'STRING' AND JSON_UNQUOTE(t.score_json) REGEXP '^-?[0-9]+(\\.[0-9]+)?$')
+  )
+ORDER BY t.assessment_id, t.n;
+
+SELECT CONCAT('✓ 维度得分拆分完成，共 ', ROW_COUNT(), ' 条') AS '';
+
+DROP TEMPORARY TABLE IF EXISTS temp_dimensions;
+DROP TEMPORARY TABLE IF EXISTS temp_seq;
+
+-- ==========================================================================================================
+-- 3. 验证脚本执行结果
+-- ==========================================================================================================
+
+SELECT
+    (SELECT COUNT(*) FROM `pbl_assessments`) AS '评价数',
+    (SELECT COUNT(DISTINCT assessment_id) FROM `pbl_assessment_dimension_scores`) AS '有维度得分的评价数',
+    (SELECT COUNT(*) FROM `pbl_assessment_dimension_scores`) AS '维度得分记录数';
+
+SELECT '✓ 脚本执行完成！' AS result;
+
+-- ==========================================================================================================
+-- 执行完成
+-- ==========================================================================================================
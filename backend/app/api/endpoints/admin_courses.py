@@ -7,6 +7,11 @@ from ...db.session import SessionLocal
 from ...core.response import success_response, error_response
 from ...core.deps import get_db, get_current_admin
 from ...models.admin import Admin
+from ...services.identity_service import invalidate_identity
+from ...services.course_structure_service import (
+    invalidate_course_structure, invalidate_course_structure_for_units
+)
+from ...services.class_access_service import invalidate_class_access
 from ...models.pbl import (
     PBLCourse, PBLUnit, PBLResource, PBLTask, 
     PBLCourseTemplate, PBLUnitTemplate, PBLResourceTemplate, PBLTaskTemplate
@@ -69,7 +74,10 @@ def create_course(
     db.add(new_course)
     db.commit()
     db.refresh(new_course)
-    
+    # 与从模板创建课程一致：课程归属班级时失效班级快照
+    if new_course.class_id:
+        invalidate_class_access(class_id=new_course.class_id)
+
     return success_response(data=serialize_course(new_course), message="课程创建成功")
 
 @router.get("/templates")
@@ -307,12 +315,15 @@ def update_course(
             status_code=status.HTTP_404_NOT_FOUND
         )
     
-    # 更新字段
+    # 更新字段（课程可能改到其他班级，原班级和新班级都要失效）
+    old_class_id = course.class_id
     for field, value in course_data.dict(exclude_unset=True).items():
         setattr(course, field, value)
     
     db.commit()
     db.refresh(course)
+    for class_id in {old_class_id, course.class_id} - {None}:
+        invalidate_class_access(class_id=class_id)
     
     return success_response(data=serialize_course(course), message="课程更新成功")
 
@@ -331,8 +342,17 @@ def delete_course(
             status_code=status.HTTP_404_NOT_FOUND
         )
     
+    course_id = course.id
+    class_id = course.class_id
     db.delete(course)
     db.commit()
+    invalidate_course_structure(course_id)
+    if class_id:
+        invalidate_class_access(class_id=class_id)
+    # 课程下的单元、资源、任务随课程一起删除，整体失效
+    invalidate_identity(PBLCourse, course_uuid)
+    for model in (PBLUnit, PBLResource, PBLTask):
+        invalidate_identity(model)
     
     return success_response(message="课程删除成功")
 
@@ -434,6 +454,9 @@ def update_course_status(
     course.status = new_status
     db.commit()
     db.refresh(course)
+    # 班级快照缓存了已发布课程
+    if course.class_id:
+        invalidate_class_access(class_id=course.class_id)
     
     return success_response(data=serialize_course(course), message="课程状态更新成功")
 
@@ -928,6 +951,7 @@ def create_course_unit(
     db.add(new_unit)
     db.commit()
     db.refresh(new_unit)
+    invalidate_course_structure(course.id)
     
     unit_result = Unit.model_validate(new_unit).model_dump(mode='json')
     return success_response(data=unit_result, message="单元创建成功")
@@ -951,13 +975,15 @@ def update_course_unit(
             status_code=status.HTTP_404_NOT_FOUND
         )
     
-    # 更新字段
+    # 更新字段（顺序或所属课程变化都会影响课程结构）
+    original_course_id = unit.course_id
     update_dict = unit_data.dict(exclude_unset=True)
     for field, value in update_dict.items():
         setattr(unit, field, value)
     
     db.commit()
     db.refresh(unit)
+    invalidate_course_structure(original_course_id, unit.course_id)
     
     unit_result = Unit.model_validate(unit).model_dump(mode='json')
     return success_response(data=unit_result, message="单元更新成功")
@@ -984,8 +1010,13 @@ def delete_course_unit(
     db.query(PBLResource).filter(PBLResource.unit_id == unit.id).delete()
     db.query(PBLTask).filter(PBLTask.unit_id == unit.id).delete()
     
+    course_id = unit.course_id
     db.delete(unit)
     db.commit()
+    invalidate_course_structure(course_id)
+    invalidate_identity(PBLUnit, unit_uuid)
+    invalidate_identity(PBLResource)
+    invalidate_identity(PBLTask)
     
     return success_response(message="单元删除成功")
 
@@ -1090,6 +1121,7 @@ def delete_course_resource(
     
     db.delete(resource)
     db.commit()
+    invalidate_identity(PBLResource, resource_uuid)
     
     return success_response(message="资源删除成功")
 
@@ -1184,6 +1216,7 @@ def create_course_task(
     db.add(new_task)
     db.commit()
     db.refresh(new_task)
+    invalidate_course_structure(unit.course_id)
     
     task_result = Task.model_validate(new_task).model_dump(mode='json')
     return success_response(data=task_result, message="任务创建成功")
@@ -1208,13 +1241,15 @@ def update_course_task(
             status_code=status.HTTP_404_NOT_FOUND
         )
     
-    # 更新字段
+    # 更新字段（顺序或所属单元变化都会影响课程结构）
+    original_unit_id = task.unit_id
     update_dict = task_data.dict(exclude_unset=True)
     for field, value in update_dict.items():
         setattr(task, field, value)
     
     db.commit()
     db.refresh(task)
+    invalidate_course_structure_for_units(db, original_unit_id, task.unit_id)
     
     task_result = Task.model_validate(task).model_dump(mode='json')
     return success_response(data=task_result, message="任务更新成功")
@@ -1238,7 +1273,10 @@ def delete_course_task(
             status_code=status.HTTP_404_NOT_FOUND
         )
     
+    unit_id = task.unit_id
     db.delete(task)
     db.commit()
+    invalidate_identity(PBLTask, task_uuid)
+    invalidate_course_structure_for_units(db, unit_id)
     
     return success_response(message="任务删除成功")
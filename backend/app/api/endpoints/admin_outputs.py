@@ -9,7 +9,9 @@ from datetime import datetime
 
 from app.core.deps import get_db, get_current_admin
 from app.models.pbl import PBLProjectOutput, PBLProject
+from app.models.projections import summary_options
 from app.models.admin import User
+from app.services.portfolio_service import portfolio_refresher
 from pydantic import BaseModel, Field
 
 router = APIRouter(prefix="/admin/outputs", tags=["管理员-成果管理"])
@@ -80,6 +82,8 @@ async def get_outputs(
         PBLProject, PBLProjectOutput.project_id == PBLProject.id
     ).outerjoin(
         User, PBLProjectOutput.user_id == User.id
+    ).options(
+        *summary_options(PBLProjectOutput)
     )
     
     # 应用筛选条件
@@ -267,8 +271,10 @@ async def delete_output(
     
     # TODO: 删除关联的文件
     
+    user_id, created_at = output.user_id, output.created_at
     db.delete(output)
     db.commit()
+    portfolio_refresher.mark(user_id, created_at)
     
     return {
         "message": "成果删除成功",
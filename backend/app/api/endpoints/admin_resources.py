@@ -10,6 +10,7 @@ from ...core.response import success_response, error_response
 from ...core.deps import get_db, get_current_admin
 from ...models.admin import Admin
 from ...models.pbl import PBLResource, PBLUnit
+from ...services.identity_service import invalidate_identity
 from ...schemas.pbl import ResourceCreate, ResourceUpdate, Resource
 
 router = APIRouter()
@@ -240,7 +241,9 @@ def delete_resource(
             except Exception:
                 pass  # 忽略删除文件时的错误
     
+    resource_uuid = resource.uuid
     db.delete(resource)
     db.commit()
+    invalidate_identity(PBLResource, resource_uuid)
     
     return success_response(message="资料删除成功")
@@ -7,6 +7,11 @@ from ...core.response import success_response, error_response
 from ...core.deps import get_db, get_current_admin
 from ...models.admin import Admin
 from ...models.pbl import PBLTask, PBLUnit, PBLTaskProgress
+from ...services.identity_service import invalidate_identity
+from ...services.course_structure_service import (
+    invalidate_course_structure, invalidate_course_structure_for_units
+)
+from ...services.portfolio_service import portfolio_refresher
 from ...schemas.pbl import TaskCreate, TaskUpdate, Task
 
 router = APIRouter()
@@ -77,6 +82,7 @@ def create_task(
     db.add(new_task)
     db.commit()
     db.refresh(new_task)
+    invalidate_course_structure(unit.course_id)
     
     return success_response(data=serialize_task(new_task), message="任务创建成功")
 
@@ -113,12 +119,14 @@ def update_task(
             status_code=status.HTTP_404_NOT_FOUND
         )
     
-    # 更新字段
+    # 更新字段（顺序或所属单元变化都会影响课程结构）
+    original_unit_id = task.unit_id
     for field, value in task_data.dict(exclude_unset=True).items():
         setattr(task, field, value)
     
     db.commit()
     db.refresh(task)
+    invalidate_course_structure_for_units(db, original_unit_id, task.unit_id)
     
     return success_response(data=serialize_task(task), message="任务更新成功")
 
@@ -137,8 +145,11 @@ def delete_task(
             status_code=status.HTTP_404_NOT_FOUND
         )
     
+    unit_id = task.unit_id
     db.delete(task)
     db.commit()
+    invalidate_identity(PBLTask, task_uuid)
+    invalidate_course_structure_for_units(db, unit_id)
     
     return success_response(message="任务删除成功")
 
@@ -215,6 +226,7 @@ def grade_task(
         )
     
     # 更新评分
+    previous_graded_at = progress.graded_at
     progress.score = score
     progress.feedback = feedback
     progress.graded_by = current_admin.id
@@ -225,6 +237,11 @@ def grade_task(
     db.commit()
     db.refresh(progress)
     
+    # 刷新学生成长档案
+    portfolio_refresher.mark(progress.user_id, progress.graded_at)
+    if previous_graded_at:
+        portfolio_refresher.mark(progress.user_id, previous_graded_at)
+    
     return success_response(
         data={
             'id': progress.id,
@@ -6,7 +6,9 @@ from ...db.session import SessionLocal
 from ...core.response import success_response, error_response
 from ...core.deps import get_db, get_current_admin
 from ...models.admin import Admin
-from ...models.pbl import PBLUnit, PBLCourse
+from ...models.pbl import PBLUnit, PBLCourse, PBLResource, PBLTask
+from ...services.identity_service import invalidate_identity
+from ...services.course_structure_service import invalidate_course_structure
 from ...schemas.pbl import UnitCreate, UnitUpdate, Unit
 
 router = APIRouter()
@@ -66,6 +68,7 @@ def create_unit(
     db.add(new_unit)
     db.commit()
     db.refresh(new_unit)
+    invalidate_course_structure(course.id)
     
     return success_response(data=serialize_unit(new_unit), message="学习单元创建成功")
 
@@ -102,12 +105,14 @@ def update_unit(
             status_code=status.HTTP_404_NOT_FOUND
         )
     
-    # 更新字段
+    # 更新字段（顺序或所属课程变化都会影响课程结构）
+    original_course_id = unit.course_id
     for field, value in unit_data.dict(exclude_unset=True).items():
         setattr(unit, field, value)
     
     db.commit()
     db.refresh(unit)
+    invalidate_course_structure(original_course_id, unit.course_id)
     
     return success_response(data=serialize_unit(unit), message="学习单元更新成功")
 
@@ -126,8 +131,13 @@ def delete_unit(
             status_code=status.HTTP_404_NOT_FOUND
         )
     
+    course_id = unit.course_id
     db.delete(unit)
     db.commit()
+    invalidate_identity(PBLUnit, unit_uuid)
+    invalidate_course_structure(course_id)
+    invalidate_identity(PBLResource)
+    invalidate_identity(PBLTask)
     
     return success_response(message="学习单元删除成功")
 
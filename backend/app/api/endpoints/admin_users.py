@@ -1,20 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Query
 from sqlalchemy.orm import Session
 from typing import List, Optional
-import csv
-import io
 from datetime import datetime
 from app.utils.timezone import get_beijing_time_naive
 
 from ...db.session import SessionLocal
 from ...core.response import success_response, error_response
-from ...core.deps import get_db, get_current_admin
+from ...core.deps import get_db, get_current_admin, get_idempotency_key
 from ...core.security import get_password_hash
 from ...models.admin import Admin, User
 from ...models.school import School
-from ...models.pbl import PBLClass
 from ...schemas.user import UserCreate, UserResponse, UserUpdate, ResetPasswordRequest
 from ...core.logging_config import get_logger
+from ...services.student_search_service import invalidate_school_students
+from ...services.user_import_service import decode_csv, import_students, import_teachers
+from ...services.job_service import submit_job, job_submitted_response
 
 router = APIRouter()
 logger = get_logger(__name__)
@@ -231,6 +231,8 @@ def create_user(
     db.add(new_user)
     db.commit()
     db.refresh(new_user)
+    if new_user.role == 'student' and new_user.school_id:
+        invalidate_school_students(new_user.school_id)
     
     logger.info(f"创建用户成功 - 用户名: {username}, ID: {new_user.id}, 操作者: {current_admin.username}")
     
@@ -273,6 +275,7 @@ def update_user(
             )
     
     # 更新字段
+    original_school_id = user.school_id
     update_data = user_data.dict(exclude_unset=True)
     for field, value in update_data.items():
         if field == 'password' and value:
@@ -283,6 +286,11 @@ def update_user(
     db.commit()
     db.refresh(user)
     
+    # 姓名、学号、学校变化都会影响“可添加学生”搜索
+    for changed_school_id in {original_school_id, user.school_id}:
+        if changed_school_id:
+            invalidate_school_students(changed_school_id)
+    
     logger.info(f"更新用户成功 - 用户名: {user.username}, ID: {user.id}, 操作者: {current_admin.username}")
     
     user_response = UserResponse.model_validate(user)
@@ -334,6 +342,8 @@ def delete_user(
     user.deleted_at = get_beijing_time_naive()
     user.is_active = False
     db.commit()
+    if user.school_id:
+        invalidate_school_students(user.school_id)
     
     logger.info(f"删除用户成功 - 用户名: {user.username}, ID: {user.id}, 操作者: {current_admin.username}")
     
@@ -453,6 +463,8 @@ def reset_user_password(
 async def batch_import_students(
     file: UploadFile = File(...),
     school_id: Optional[int] = None,
+    background: bool = Query(False, description="是否作为后台任务执行（立即返回任务ID）"),
+    idempotency_key: Optional[str] = Depends(get_idempotency_key),
     db: Session = Depends(get_db),
     current_admin: Admin = Depends(get_current_admin)
 ):
@@ -508,122 +520,35 @@ async def batch_import_students(
             status_code=status.HTTP_400_BAD_REQUEST
         )
     
+    # 读取CSV文件
+    contents = await file.read()
+    decoded = decode_csv(contents)
+    if decoded is None:
+        return error_response(
+            message="无法识别文件编码，请确保CSV文件使用UTF-8或GBK编码",
+            code=400,
+            status_code=status.HTTP_400_BAD_REQUEST
+        )
+    
+    # 后台执行：保存文件后立即返回任务ID，由 worker 逐行导入
+    if background:
+        job, created = submit_job(
+            db, 'import_students', current_admin,
+            params={'school_id': target_school_id, 'filename': file.filename},
+            idempotency_key=idempotency_key,
+            school_id=target_school_id,
+            upload=(contents, '.csv')
+        )
+        return job_submitted_response(job, created)
+    
     try:
-        # 读取CSV文件
-        contents = await file.read()
-        
-        # 尝试多种编码格式解码
-        decoded = None
-        encodings = ['utf-8-sig', 'utf-8', 'gbk', 'gb2312', 'gb18030']
-        for encoding in encodings:
-            try:
-                decoded = contents.decode(encoding)
-                break
-            except (UnicodeDecodeError, LookupError):
-                continue
-        
-        if decoded is None:
-            return error_response(
-                message="无法识别文件编码，请确保CSV文件使用UTF-8或GBK编码",
-                code=400,
-                status_code=status.HTTP_400_BAD_REQUEST
-            )
-        
-        csv_reader = csv.DictReader(io.StringIO(decoded))
-        
-        success_count = 0
-        error_list = []
-        
-        # 获取该学校的所有班级，用于名称查找
-        classes_dict = {}
-        classes = db.query(PBLClass).filter(
-            PBLClass.school_id == target_school_id,
-            PBLClass.is_active == 1
-        ).all()
-        for cls in classes:
-            classes_dict[cls.name] = cls.id
-        
-        for row_num, row in enumerate(csv_reader, start=2):  # 从第2行开始（第1行是标题）
-            try:
-                # 验证必填字段
-                if not row.get('student_number') or not row.get('name') or not row.get('gender'):
-                    error_list.append({
-                        'row': row_num,
-                        'error': '缺少必填字段（student_number, name, gender）'
-                    })
-                    continue
-                
-                # 自动生成用户名：学号 + 学校编码
-                username = f"{row['student_number']}@{school.school_code}"
-                
-                # 检查用户名是否已存在
-                if db.query(User).filter(User.username == username).first():
-                    error_list.append({
-                        'row': row_num,
-                        'student_number': row['student_number'],
-                        'error': '该学号在本校已存在'
-                    })
-                    continue
-                
-                # 转换性别：男->male, 女->female
-                gender_map = {
-                    '男': 'male',
-                    '女': 'female',
-                    'male': 'male',
-                    'female': 'female'
-                }
-                gender = gender_map.get(row.get('gender', '').strip())
-                if not gender:
-                    error_list.append({
-                        'row': row_num,
-                        'error': '性别格式错误，请填写"男"或"女"'
-                    })
-                    continue
-                
-                # 处理班级：如果提供了班级名称，查找对应的班级ID
-                # 如果班级名称为空，则不分配班级但允许导入
-                class_id = None
-                if row.get('class_name'):
-                    class_name = row['class_name'].strip()
-                    if class_name:  # 班级名称不为空
-                        if class_name in classes_dict:
-                            class_id = classes_dict[class_name]
-                        else:
-                            # 班级不存在，给出警告但不阻止导入
-                            error_list.append({
-                                'row': row_num,
-                                'warning': f'班级"{class_name}"不存在，已导入但未分配班级'
-                            })
-                
-                # 生成默认密码（如果没有提供）
-                password = row.get('password') or '123456'
-                
-                # 创建学生用户（不收集电话和邮箱）
-                new_student = User(
-                    username=username,
-                    name=row['name'],
-                    student_number=row['student_number'],
-                    class_id=class_id,
-                    gender=gender,
-                    password_hash=get_password_hash(password),
-                    role='student',
-                    school_id=target_school_id,
-                    school_name=school.school_name,
-                    is_active=True,
-                    need_change_password=True  # 首次登录需要修改密码
-                )
-                
-                db.add(new_student)
-                success_count += 1
-                
-            except Exception as e:
-                error_list.append({
-                    'row': row_num,
-                    'error': str(e)
-                })
+        result = import_students(db, school, decoded)
+        success_count = result['success_count']
+        error_list = result['errors']
         
         # 提交所有成功的记录
         db.commit()
+        invalidate_school_students(target_school_id)
         
         logger.info(f"批量导入学生完成 - 成功: {success_count}, 失败: {len(error_list)}, 操作者: {current_admin.username}")
         
@@ -648,6 +573,8 @@ async def batch_import_students(
 async def batch_import_teachers(
     file: UploadFile = File(...),
     school_id: Optional[int] = None,
+    background: bool = Query(False, description="是否作为后台任务执行（立即返回任务ID）"),
+    idempotency_key: Optional[str] = Depends(get_idempotency_key),
     db: Session = Depends(get_db),
     current_admin: Admin = Depends(get_current_admin)
 ):
@@ -703,83 +630,33 @@ async def batch_import_teachers(
             status_code=status.HTTP_400_BAD_REQUEST
         )
     
+    # 读取CSV文件
+    contents = await file.read()
+    decoded = decode_csv(contents)
+    if decoded is None:
+        return error_response(
+            message="无法识别文件编码，请确保CSV文件使用UTF-8或GBK编码",
+            code=400,
+            status_code=status.HTTP_400_BAD_REQUEST
+        )
+    
+    # 后台执行：保存文件后立即返回任务ID，由 worker 逐行导入
+    if background:
+        job, created = submit_job(
+            db, 'import_teachers', current_admin,
+            params={'school_id': target_school_id, 'filename': file.filename},
+            idempotency_key=idempotency_key,
+            school_id=target_school_id,
+            upload=(contents, '.csv')
+        )
+        return job_submitted_response(job, created)
+    
     try:
-        # 读取CSV文件
-        contents = await file.read()
-        
-        # 尝试多种编码格式解码
-        decoded = None
-        encodings = ['utf-8-sig', 'utf-8', 'gbk', 'gb2312', 'gb18030']
-        for encoding in encodings:
-            try:
-                decoded = contents.decode(encoding)
-                break
-            except (UnicodeDecodeError, LookupError):
-                continue
-        
-        if decoded is None:
-            return error_response(
-                message="无法识别文件编码，请确保CSV文件使用UTF-8或GBK编码",
-                code=400,
-                status_code=status.HTTP_400_BAD_REQUEST
-            )
-        
-        csv_reader = csv.DictReader(io.StringIO(decoded))
-        
-        success_count = 0
-        error_list = []
-        
-        for row_num, row in enumerate(csv_reader, start=2):
-            try:
-                # 验证必填字段
-                if not row.get('teacher_number') or not row.get('name') or not row.get('gender'):
-                    error_list.append({
-                        'row': row_num,
-                        'error': '缺少必填字段（teacher_number, name, gender）'
-                    })
-                    continue
-                
-                # 自动生成用户名：工号 + 学校编码
-                username = f"{row['teacher_number']}@{school.school_code}"
-                
-                # 检查用户名是否已存在
-                if db.query(User).filter(User.username == username).first():
-                    error_list.append({
-                        'row': row_num,
-                        'teacher_number': row['teacher_number'],
-                        'error': '该工号在本校已存在'
-                    })
-                    continue
-                
-                # 生成默认密码
-                password = row.get('password') or '123456'
-                
-                # 创建教师用户
-                new_teacher = User(
-                    username=username,
-                    name=row['name'],
-                    teacher_number=row['teacher_number'],
-                    subject=row.get('subject'),
-                    gender=row.get('gender'),
-                    phone=row.get('phone'),
-                    email=row.get('email') if row.get('email') else None,
-                    password_hash=get_password_hash(password),
-                    role='teacher',
-                    school_id=target_school_id,
-                    school_name=school.school_name,
-                    is_active=True,
-                    need_change_password=True
-                )
-                
-                db.add(new_teacher)
-                success_count += 1
-                
-            except Exception as e:
-                error_list.append({
-                    'row': row_num,
-                    'error': str(e)
-                })
+        result = import_teachers(db, school, decoded)
+        success_count = result['success_count']
+        error_list = result['errors']
         
+        # 提交所有成功的记录
         db.commit()
         
         logger.info(f"批量导入教师完成 - 成功: {success_count}, 失败: {len(error_list)}, 操作者: {current_admin.username}")
@@ -788,7 +665,7 @@ async def batch_import_teachers(
             data={
                 'success_count': success_count,
                 'error_count': len(error_list),
-                'errors': error_list[:10]
+                'errors': error_list[:10]  # 只返回前10个错误
             },
             message=f"导入完成：成功 {success_count} 条，失败 {len(error_list)} 条"
         )
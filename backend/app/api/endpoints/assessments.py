@@ -6,9 +6,12 @@ from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 
-from app.core.deps import get_db, get_current_user
-from app.models.pbl import PBLAssessment
+from app.core.deps import get_db, get_current_user, get_current_admin
+from app.models.pbl import PBLAssessment, PBLAssessmentDimensionScore, PBLClass, PBLCourse
 from app.models.admin import User
+from app.services.portfolio_service import portfolio_refresher
+from app.services.assessment_dimension_service import sync_dimension_scores, dimension_stats
+from app.services.class_access_service import get_class_snapshot, resolve_access
 
 router = APIRouter()
 
@@ -111,8 +114,11 @@ async def create_assessment(
     )
     
     db.add(new_assessment)
+    db.flush()
+    sync_dimension_scores(db, new_assessment)
     db.commit()
     db.refresh(new_assessment)
+    portfolio_refresher.mark(new_assessment.student_id, new_assessment.created_at)
     
     return {
         "id": new_assessment.id,
@@ -197,6 +203,7 @@ async def update_assessment(
             weight = dim.get("weight", 0)
             total_score += score * weight
         assessment.total_score = total_score
+        sync_dimension_scores(db, assessment)
     
     if "comments" in assessment_data:
         assessment.comments = assessment_data["comments"]
@@ -211,6 +218,7 @@ async def update_assessment(
     
     db.commit()
     db.refresh(assessment)
+    portfolio_refresher.mark(assessment.student_id, assessment.created_at)
     
     return {
         "id": assessment.id,
@@ -238,8 +246,10 @@ async def delete_assessment(
     if assessment.assessor_id != current_user.id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="无权限删除此评价")
     
+    student_id, created_at = assessment.student_id, assessment.created_at
     db.delete(assessment)
     db.commit()
+    portfolio_refresher.mark(student_id, created_at)
     
     return {"message": "删除成功"}
 
@@ -253,39 +263,62 @@ async def get_student_assessment_stats(
     """
     获取学生评价统计
     """
-    assessments = db.query(PBLAssessment).filter(PBLAssessment.student_id == student_id).all()
+    # 总分统计（与原逻辑一致，平均分不计入总分为空或为 0 的评价）
+    total_assessments, avg_score = db.query(
+        func.count(PBLAssessment.id),
+        func.avg(func.nullif(PBLAssessment.total_score, 0))
+    ).filter(
+        PBLAssessment.student_id == student_id
+    ).one()
     
-    total_assessments = len(assessments)
+    # 各维度平均分（维度得分表上按维度分组）
+    dimensions = dimension_stats(db, PBLAssessmentDimensionScore.student_id == student_id)
     
-    # 计算平均分
-    scores = [float(a.total_score) for a in assessments if a.total_score]
-    avg_score = sum(scores) / len(scores) if scores else 0
+    return {
+        "total_assessments": total_assessments,
+        "avg_score": round(float(avg_score), 2) if avg_score is not None else 0,
+        "dimension_scores": {item["dimension"]: item["avg_score"] for item in dimensions},
+        "dimensions": dimensions
+    }
+
+
+@router.get("/courses/{course_uuid}/assessment-dimension-stats")
+async def get_course_assessment_dimension_stats(
+    course_uuid: str,
+    assessor_role: Optional[str] = None,
+    by_student: bool = False,
+    db: Session = Depends(get_db),
+    current_admin = Depends(get_current_admin)
+):
+    """
+    获取课程评价维度统计（评价对象为课程内的任务、项目、成果）
     
-    # 统计各维度平均分
-    dimension_scores = {}
-    dimension_counts = {}
+    by_student=true 时按学生 + 维度分组
+    权限：与班级统计接口一致，平台管理员可查看所有课程，学校管理员、教师只能查看本校课程
+    """
+    course = db.query(PBLCourse.id, PBLCourse.school_id, PBLClass.uuid.label('class_uuid')).outerjoin(
+        PBLClass, PBLClass.id == PBLCourse.class_id
+    ).filter(PBLCourse.uuid == course_uuid).first()
     
-    for assessment in assessments:
-        if assessment.dimensions:
-            for dim in assessment.dimensions:
-                dim_name = dim.get("name")
-                dim_score = dim.get("score", 0)
-                
-                if dim_name:
-                    if dim_name not in dimension_scores:
-                        dimension_scores[dim_name] = 0
-                        dimension_counts[dim_name] = 0
-                    
-                    dimension_scores[dim_name] += dim_score
-                    dimension_counts[dim_name] += 1
+    if not course:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="课程不存在")
     
-    # 计算各维度平均分
-    for dim_name in dimension_scores:
-        if dimension_counts[dim_name] > 0:
-            dimension_scores[dim_name] = round(dimension_scores[dim_name] / dimension_counts[dim_name], 2)
+    # 班级课程按班级快照判断权限，未关联班级的课程按课程所属学校判断
+    snapshot = get_class_snapshot(db, course.class_uuid) if course.class_uuid else None
+    if snapshot is not None:
+        allowed = resolve_access(snapshot, current_admin) is not None
+    else:
+        allowed = current_admin.role == 'platform_admin' or (
+            current_admin.school_id is not None and current_admin.school_id == course.school_id
+        )
+    if not allowed:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="无权限查看该课程")
+    
+    filters = [PBLAssessmentDimensionScore.course_id == course.id]
+    if assessor_role:
+        filters.append(PBLAssessmentDimensionScore.assessor_role == assessor_role)
     
     return {
-        "total_assessments": total_assessments,
-        "avg_score": round(avg_score, 2),
-        "dimension_scores": dimension_scores
+        "course_uuid": course_uuid,
+        "items": dimension_stats(db, *filters, by_student=by_student)
     }
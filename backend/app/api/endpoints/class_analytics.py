@@ -2,7 +2,8 @@
 班级数据分析和可视化API
 提供各种统计图表和数据分析功能
 """
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import func, and_, or_, case
 from typing import List, Optional, Dict
@@ -12,13 +13,17 @@ from collections import defaultdict
 
 from ...db.session import SessionLocal
 from ...core.response import success_response, error_response
-from ...core.deps import get_db, get_current_admin
-from ...models.admin import Admin, User
+from ...core.config import settings
+from ...core.deps import get_db, get_class_context
+from ...models.admin import User
 from ...models.pbl import (
-    PBLClass, PBLClassMember, PBLCourse, PBLUnit, PBLTask,
-    PBLTaskProgress, PBLProjectOutput
+    PBLClassMember, PBLUnit, PBLTask,
+    PBLTaskProgress, PBLProjectOutput, PBLAssessmentDimensionScore
 )
 from ...core.logging_config import get_logger
+from ...services.class_access_service import ClassContext
+from ...services.class_event_service import get_broker, sse_stream
+from ...services.assessment_dimension_service import dimension_stats
 
 router = APIRouter()
 logger = get_logger(__name__)
@@ -30,35 +35,15 @@ logger = get_logger(__name__)
 def get_class_analytics_overview(
     class_uuid: str,
     db: Session = Depends(get_db),
-    current_admin: Admin = Depends(get_current_admin)
+    context: ClassContext = Depends(get_class_context)
 ):
     """获取班级整体统计概览"""
-    pbl_class = db.query(PBLClass).filter(PBLClass.uuid == class_uuid).first()
-    if not pbl_class:
-        return error_response(
-            message="班级不存在",
-            code=404,
-            status_code=status.HTTP_404_NOT_FOUND
-        )
-    
-    # 权限检查
-    if current_admin.role != 'platform_admin':
-        if pbl_class.school_id != current_admin.school_id:
-            return error_response(
-                message="无权限查看该班级",
-                code=403,
-                status_code=status.HTTP_403_FORBIDDEN
-            )
-    
-    # 获取班级课程
-    courses = db.query(PBLCourse).filter(
-        PBLCourse.class_id == pbl_class.id,
-        PBLCourse.status == 'published'
-    ).all()
+    # 班级已发布课程（权限依赖中已缓存）
+    courses = context.course_ids
     
     if not courses:
         return success_response(data={
-            'total_students': pbl_class.current_members,
+            'total_students': context.get_class(db).current_members,
             'total_courses': 0,
             'total_tasks': 0,
             'total_submissions': 0,
@@ -67,7 +52,7 @@ def get_class_analytics_overview(
             'inactive_students': 0
         })
     
-    course_ids = [c.id for c in courses]
+    course_ids = list(courses)
     
     # 统计总任务数
     total_tasks = db.query(func.count(PBLTask.id)).join(
@@ -88,7 +73,7 @@ def get_class_analytics_overview(
     
     # 计算平均完成率
     members = db.query(PBLClassMember).filter(
-        PBLClassMember.class_id == pbl_class.id,
+        PBLClassMember.class_id == context.class_id,
         PBLClassMember.is_active == 1
     ).all()
     
@@ -148,31 +133,11 @@ def get_class_analytics_overview(
 def get_progress_distribution(
     class_uuid: str,
     db: Session = Depends(get_db),
-    current_admin: Admin = Depends(get_current_admin)
+    context: ClassContext = Depends(get_class_context)
 ):
     """获取学生进度分布（用于饼图/柱状图）"""
-    pbl_class = db.query(PBLClass).filter(PBLClass.uuid == class_uuid).first()
-    if not pbl_class:
-        return error_response(
-            message="班级不存在",
-            code=404,
-            status_code=status.HTTP_404_NOT_FOUND
-        )
-    
-    # 权限检查
-    if current_admin.role != 'platform_admin':
-        if pbl_class.school_id != current_admin.school_id:
-            return error_response(
-                message="无权限查看该班级",
-                code=403,
-                status_code=status.HTTP_403_FORBIDDEN
-            )
-    
-    # 获取班级课程
-    courses = db.query(PBLCourse).filter(
-        PBLCourse.class_id == pbl_class.id,
-        PBLCourse.status == 'published'
-    ).all()
+    # 班级已发布课程（权限依赖中已缓存）
+    courses = context.course_ids
     
     if not courses:
         return success_response(data={
@@ -180,7 +145,7 @@ def get_progress_distribution(
             'counts': []
         })
     
-    course_ids = [c.id for c in courses]
+    course_ids = list(courses)
     
     # 统计总任务数
     total_tasks = db.query(func.count(PBLTask.id)).join(
@@ -197,7 +162,7 @@ def get_progress_distribution(
     
     # 获取所有学生
     members = db.query(PBLClassMember).filter(
-        PBLClassMember.class_id == pbl_class.id,
+        PBLClassMember.class_id == context.class_id,
         PBLClassMember.is_active == 1
     ).all()
     
@@ -248,31 +213,11 @@ def get_completion_trend(
     class_uuid: str,
     days: int = 30,
     db: Session = Depends(get_db),
-    current_admin: Admin = Depends(get_current_admin)
+    context: ClassContext = Depends(get_class_context)
 ):
     """获取任务完成趋势（用于折线图）"""
-    pbl_class = db.query(PBLClass).filter(PBLClass.uuid == class_uuid).first()
-    if not pbl_class:
-        return error_response(
-            message="班级不存在",
-            code=404,
-            status_code=status.HTTP_404_NOT_FOUND
-        )
-    
-    # 权限检查
-    if current_admin.role != 'platform_admin':
-        if pbl_class.school_id != current_admin.school_id:
-            return error_response(
-                message="无权限查看该班级",
-                code=403,
-                status_code=status.HTTP_403_FORBIDDEN
-            )
-    
-    # 获取班级课程
-    courses = db.query(PBLCourse).filter(
-        PBLCourse.class_id == pbl_class.id,
-        PBLCourse.status == 'published'
-    ).all()
+    # 班级已发布课程（权限依赖中已缓存）
+    courses = context.course_ids
     
     if not courses:
         return success_response(data={
@@ -281,7 +226,7 @@ def get_completion_trend(
             'completions': []
         })
     
-    course_ids = [c.id for c in courses]
+    course_ids = list(courses)
     
     # 计算日期范围
     end_date = get_beijing_time_naive()
@@ -337,31 +282,11 @@ def get_completion_trend(
 def get_score_distribution(
     class_uuid: str,
     db: Session = Depends(get_db),
-    current_admin: Admin = Depends(get_current_admin)
+    context: ClassContext = Depends(get_class_context)
 ):
     """获取成绩分布（用于柱状图）"""
-    pbl_class = db.query(PBLClass).filter(PBLClass.uuid == class_uuid).first()
-    if not pbl_class:
-        return error_response(
-            message="班级不存在",
-            code=404,
-            status_code=status.HTTP_404_NOT_FOUND
-        )
-    
-    # 权限检查
-    if current_admin.role != 'platform_admin':
-        if pbl_class.school_id != current_admin.school_id:
-            return error_response(
-                message="无权限查看该班级",
-                code=403,
-                status_code=status.HTTP_403_FORBIDDEN
-            )
-    
-    # 获取班级课程
-    courses = db.query(PBLCourse).filter(
-        PBLCourse.class_id == pbl_class.id,
-        PBLCourse.status == 'published'
-    ).all()
+    # 班级已发布课程（权限依赖中已缓存）
+    courses = context.course_ids
     
     if not courses:
         return success_response(data={
@@ -369,11 +294,11 @@ def get_score_distribution(
             'counts': []
         })
     
-    course_ids = [c.id for c in courses]
+    course_ids = list(courses)
     
     # 获取所有学生的平均分
     members = db.query(PBLClassMember).filter(
-        PBLClassMember.class_id == pbl_class.id,
+        PBLClassMember.class_id == context.class_id,
         PBLClassMember.is_active == 1
     ).all()
     
@@ -424,31 +349,11 @@ def get_score_distribution(
 def get_task_type_stats(
     class_uuid: str,
     db: Session = Depends(get_db),
-    current_admin: Admin = Depends(get_current_admin)
+    context: ClassContext = Depends(get_class_context)
 ):
     """获取任务类型统计（用于饼图）"""
-    pbl_class = db.query(PBLClass).filter(PBLClass.uuid == class_uuid).first()
-    if not pbl_class:
-        return error_response(
-            message="班级不存在",
-            code=404,
-            status_code=status.HTTP_404_NOT_FOUND
-        )
-    
-    # 权限检查
-    if current_admin.role != 'platform_admin':
-        if pbl_class.school_id != current_admin.school_id:
-            return error_response(
-                message="无权限查看该班级",
-                code=403,
-                status_code=status.HTTP_403_FORBIDDEN
-            )
-    
-    # 获取班级课程
-    courses = db.query(PBLCourse).filter(
-        PBLCourse.class_id == pbl_class.id,
-        PBLCourse.status == 'published'
-    ).all()
+    # 班级已发布课程（权限依赖中已缓存）
+    courses = context.course_ids
     
     if not courses:
         return success_response(data={
@@ -456,7 +361,7 @@ def get_task_type_stats(
             'counts': []
         })
     
-    course_ids = [c.id for c in courses]
+    course_ids = list(courses)
     
     # 统计各类型任务的完成情况
     task_stats = db.query(
@@ -496,42 +401,22 @@ def get_student_activity_ranking(
     class_uuid: str,
     limit: int = 10,
     db: Session = Depends(get_db),
-    current_admin: Admin = Depends(get_current_admin)
+    context: ClassContext = Depends(get_class_context)
 ):
     """获取学生活跃度排行（用于排行榜）"""
-    pbl_class = db.query(PBLClass).filter(PBLClass.uuid == class_uuid).first()
-    if not pbl_class:
-        return error_response(
-            message="班级不存在",
-            code=404,
-            status_code=status.HTTP_404_NOT_FOUND
-        )
-    
-    # 权限检查
-    if current_admin.role != 'platform_admin':
-        if pbl_class.school_id != current_admin.school_id:
-            return error_response(
-                message="无权限查看该班级",
-                code=403,
-                status_code=status.HTTP_403_FORBIDDEN
-            )
-    
-    # 获取班级课程
-    courses = db.query(PBLCourse).filter(
-        PBLCourse.class_id == pbl_class.id,
-        PBLCourse.status == 'published'
-    ).all()
+    # 班级已发布课程（权限依赖中已缓存）
+    courses = context.course_ids
     
     if not courses:
         return success_response(data=[])
     
-    course_ids = [c.id for c in courses]
+    course_ids = list(courses)
     
     # 获取所有学生
     members = db.query(PBLClassMember, User).join(
         User, PBLClassMember.student_id == User.id
     ).filter(
-        PBLClassMember.class_id == pbl_class.id,
+        PBLClassMember.class_id == context.class_id,
         PBLClassMember.is_active == 1
     ).all()
     
@@ -597,31 +482,11 @@ def get_student_activity_ranking(
 def get_submission_time_analysis(
     class_uuid: str,
     db: Session = Depends(get_db),
-    current_admin: Admin = Depends(get_current_admin)
+    context: ClassContext = Depends(get_class_context)
 ):
     """获取作业提交时间分析（用于热力图/时间分布图）"""
-    pbl_class = db.query(PBLClass).filter(PBLClass.uuid == class_uuid).first()
-    if not pbl_class:
-        return error_response(
-            message="班级不存在",
-            code=404,
-            status_code=status.HTTP_404_NOT_FOUND
-        )
-    
-    # 权限检查
-    if current_admin.role != 'platform_admin':
-        if pbl_class.school_id != current_admin.school_id:
-            return error_response(
-                message="无权限查看该班级",
-                code=403,
-                status_code=status.HTTP_403_FORBIDDEN
-            )
-    
-    # 获取班级课程
-    courses = db.query(PBLCourse).filter(
-        PBLCourse.class_id == pbl_class.id,
-        PBLCourse.status == 'published'
-    ).all()
+    # 班级已发布课程（权限依赖中已缓存）
+    courses = context.course_ids
     
     if not courses:
         return success_response(data={
@@ -629,13 +494,13 @@ def get_submission_time_analysis(
             'counts': []
         })
     
-    course_ids = [c.id for c in courses]
+    course_ids = list(courses)
     
     # 按小时统计提交分布
     hour_distribution = {str(i): 0 for i in range(24)}
     
-    # 获取所有提交记录
-    submissions = db.query(PBLTaskProgress).join(
+    # 获取所有提交时间（只取 updated_at，不加载提交内容）
+    submissions = db.query(PBLTaskProgress.updated_at).join(
         PBLTask, PBLTaskProgress.task_id == PBLTask.id
     ).join(
         PBLUnit, PBLTask.unit_id == PBLUnit.id
@@ -653,3 +518,84 @@ def get_submission_time_analysis(
         'hours': list(hour_distribution.keys()),
         'counts': list(hour_distribution.values())
     })
+
+
+# ===== 评价维度统计 =====
+
+@router.get("/classes/{class_uuid}/analytics/assessment-dimensions")
+def get_assessment_dimension_stats(
+    class_uuid: str,
+    assessor_role: Optional[str] = None,
+    by_student: bool = False,
+    db: Session = Depends(get_db),
+    context: ClassContext = Depends(get_class_context)
+):
+    """获取班级评价维度统计（用于雷达图；by_student=true 时按学生 + 维度分组）"""
+    Score = PBLAssessmentDimensionScore
+    member_ids = db.query(PBLClassMember.student_id).filter(
+        PBLClassMember.class_id == context.class_id,
+        PBLClassMember.is_active == 1
+    )
+    
+    # 只统计本班课程内的评价，以及直接评价学生（不属于任何课程）的评价
+    course_filter = Score.course_id.is_(None)
+    if context.course_ids:
+        course_filter = or_(course_filter, Score.course_id.in_(list(context.course_ids)))
+    
+    filters = [Score.student_id.in_(member_ids), course_filter]
+    if assessor_role:
+        filters.append(Score.assessor_role == assessor_role)
+    
+    return success_response(data={
+        'items': dimension_stats(db, *filters, by_student=by_student)
+    })
+
+
+# ===== 实时事件推送 =====
+
+@router.get("/classes/{class_uuid}/live")
+async def stream_class_events(
+    class_uuid: str,
+    request: Request,
+    last_event_id: Optional[str] = Header(None, alias='Last-Event-ID'),
+    db: Session = Depends(get_db),
+    context: ClassContext = Depends(get_class_context)
+):
+    """
+    班级实时事件（SSE）
+
+    看板打开时先加载上面的统计接口，再连接本接口，按事件增量更新：
+      - task_submitted：学生提交或重新提交作业
+      - homework_reviewed：教师批阅作业
+      - video_completed：学生看完视频
+      - resync：漏掉了事件（断线太久、服务重启），需要重新加载统计数据
+    断线重连时浏览器自动带上 Last-Event-ID，补发期间的事件。
+    """
+    broker = get_broker()
+    if not broker.enabled:
+        return error_response(
+            message="实时推送未开启",
+            code=503,
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+    
+    # 长连接期间不占用数据库连接
+    db.close()
+    
+    subscription = broker.subscribe(context.class_id, last_event_id)
+    logger.debug(f"看板连接实时事件 - 班级: {class_uuid}, 用户: {context.admin.username}")
+    
+    return StreamingResponse(
+        sse_stream(
+            subscription,
+            request.is_disconnected,
+            heartbeat=settings.class_events_heartbeat,
+            hello={'class_uuid': class_uuid, 'class_name': context.class_name}
+        ),
+        media_type='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            # 关闭 Nginx 代理缓冲，事件立即送达
+            'X-Accel-Buffering': 'no'
+        }
+    )
@@ -1,22 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Body
+from fastapi import APIRouter, Depends, HTTPException, status, Body, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, or_
+from sqlalchemy import func, and_, exists
 from typing import List, Optional
 from datetime import datetime
+from collections import defaultdict
 from pydantic import BaseModel
 from app.utils.timezone import get_beijing_time_naive
 
 from ...db.session import SessionLocal
 from ...core.response import success_response, error_response
-from ...core.deps import get_db, get_current_admin
+from ...core.deps import get_db, get_current_admin, get_class_context
 from ...models.admin import Admin, User
 from ...models.pbl import (
     PBLClass, PBLGroup, PBLGroupMember, PBLClassMember,
     PBLClassTeacher, PBLClassCourse, PBLCourse,
     PBLLearningProgress,
-    PBLTaskProgress, PBLTask, PBLUnit
+    PBLTaskProgress
 )
 from ...core.logging_config import get_logger
+from ...utils.bulk import bulk_upsert
+from ...utils.pagination import decode_cursor
+from ...services.student_search_service import search_school_students, paginate_students
+from ...services.course_structure_service import get_course_structures
+from ...services.class_access_service import ClassContext, invalidate_class_access
 
 router = APIRouter()
 logger = get_logger(__name__)
@@ -232,30 +238,12 @@ def create_class(
 def get_class_students(
     class_id: str,
     db: Session = Depends(get_db),
-    current_admin: Admin = Depends(get_current_admin)
+    context: ClassContext = Depends(get_class_context)
 ):
     """获取班级学生列表"""
-    # 根据UUID查询班级
-    pbl_class = db.query(PBLClass).filter(PBLClass.uuid == class_id).first()
-    if not pbl_class:
-        return error_response(
-            message="班级不存在",
-            code=404,
-            status_code=status.HTTP_404_NOT_FOUND
-        )
-    
-    # 权限检查（学校管理员只能查看本校班级）
-    if current_admin.role != 'platform_admin':
-        if pbl_class.school_id != current_admin.school_id:
-            return error_response(
-                message="无权限查看该班级",
-                code=403,
-                status_code=status.HTTP_403_FORBIDDEN
-            )
-    
     # 查询班级中的学生
     students = db.query(User).filter(
-        User.class_id == pbl_class.id,
+        User.class_id == context.class_id,
         User.role == 'student',
         User.deleted_at == None
     ).all()
@@ -315,28 +303,36 @@ def add_students_to_class(
                 status_code=status.HTTP_403_FORBIDDEN
             )
     
-    success_count = 0
+    # 一次查询取出所有学生，权限检查：学校管理员只能操作本校学生
+    student_schools = dict(db.query(User.id, User.school_id).filter(
+        User.id.in_(set(student_ids)),
+        User.role == 'student'
+    ).all())
+    
+    results = []
+    valid_ids = set()
     for student_id in student_ids:
-        student = db.query(User).filter(
-            User.id == student_id,
-            User.role == 'student'
-        ).first()
-        
-        if student:
-            # 权限检查：学校管理员只能操作本校学生
-            if current_admin.role == 'school_admin':
-                if student.school_id != current_admin.school_id:
-                    continue
-            
-            student.class_id = pbl_class.id
-            success_count += 1
+        if student_id not in student_schools:
+            results.append({'student_id': student_id, 'status': 'not_found'})
+        elif current_admin.role == 'school_admin' and student_schools[student_id] != current_admin.school_id:
+            results.append({'student_id': student_id, 'status': 'forbidden'})
+        else:
+            results.append({'student_id': student_id, 'status': 'updated'})
+            valid_ids.add(student_id)
+    
+    # 一条 UPDATE 批量设置班级
+    if valid_ids:
+        db.query(User).filter(User.id.in_(valid_ids)).update(
+            {User.class_id: pbl_class.id}, synchronize_session=False
+        )
+    success_count = len(valid_ids)
     
     db.commit()
     
     logger.info(f"添加学生到班级 - 班级UUID: {class_id}, 成功: {success_count}, 操作者: {current_admin.username}")
     
     return success_response(
-        data={'added_count': success_count},
+        data={'added_count': success_count, 'results': results},
         message=f"成功添加 {success_count} 名学生到班级"
     )
 
@@ -484,10 +480,17 @@ def get_group_members(
 def get_available_students_for_group(
     group_id: str,
     keyword: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=100),
     db: Session = Depends(get_db),
     current_admin: Admin = Depends(get_current_admin)
 ):
-    """获取小组可添加的学生列表（班级中未分组的学生）"""
+    """
+    获取小组可添加的学生列表（班级中未分组的学生）
+
+    用 NOT EXISTS 排除小组成员，按 (学号, ID) 游标分页；
+    关键词搜索走进程内的学生搜索索引（姓名、拼音首字母、学号）。
+    """
     # 权限检查
     if current_admin.role not in ['platform_admin', 'school_admin', 'teacher']:
         return error_response(
@@ -507,13 +510,24 @@ def get_available_students_for_group(
     
     # 必须有班级ID
     if not group.class_id:
-        return success_response(data=[])
+        return success_response(data={'items': [], 'next_cursor': None, 'has_more': False})
     
-    # 查询该班级的所有学生
+    try:
+        after = decode_cursor(cursor, parse=str)
+    except ValueError as e:
+        return error_response(message=str(e), code=400, status_code=status.HTTP_400_BAD_REQUEST)
+    
+    # 该班级的学生中，排除已在小组中的（NOT EXISTS 反连接，走 uk_group_user）
+    in_group = exists().where(
+        PBLGroupMember.group_id == group.id,
+        PBLGroupMember.user_id == User.id,
+        PBLGroupMember.is_active == True
+    )
     query = db.query(User).filter(
         User.class_id == group.class_id,
         User.role == 'student',
-        User.deleted_at == None
+        User.deleted_at == None,
+        ~in_group
     )
     
     # 权限检查：学校管理员只能看本校学生
@@ -521,38 +535,26 @@ def get_available_students_for_group(
         query = query.filter(User.school_id == current_admin.school_id)
     
     # 关键词搜索
-    if keyword:
-        keyword_pattern = f"%{keyword}%"
-        query = query.filter(
-            or_(
-                User.name.like(keyword_pattern),
-                User.real_name.like(keyword_pattern),
-                User.student_number.like(keyword_pattern)
-            )
-        )
-    
-    class_students = query.all()
-    
-    # 获取已经在小组中的学生ID列表
-    grouped_student_ids = db.query(PBLGroupMember.user_id).filter(
-        PBLGroupMember.group_id == group.id,
-        PBLGroupMember.is_active == True
-    ).all()
-    grouped_student_ids = [sid[0] for sid in grouped_student_ids]
-    
-    # 过滤出未分组的学生
-    result = []
-    for student in class_students:
-        if student.id not in grouped_student_ids:
-            result.append({
-                'id': student.id,
-                'username': student.username,
-                'name': student.name or student.real_name,
-                'student_number': student.student_number,
-                'gender': student.gender
-            })
-    
-    return success_response(data=result)
+    candidates = None
+    if keyword and keyword.strip():
+        school_id = db.query(PBLClass.school_id).filter(PBLClass.id == group.class_id).scalar()
+        candidates = search_school_students(db, school_id, keyword) if school_id else []
+    
+    students, next_cursor = paginate_students(query, after, limit, candidates)
+    
+    items = [{
+        'id': student.id,
+        'username': student.username,
+        'name': student.name or student.real_name,
+        'student_number': student.student_number,
+        'gender': student.gender
+    } for student in students]
+    
+    return success_response(data={
+        'items': items,
+        'next_cursor': next_cursor,
+        'has_more': next_cursor is not None
+    })
 
 @router.post("/groups/{group_id}/add-members")
 def add_members_to_group(
@@ -579,47 +581,56 @@ def add_members_to_group(
             status_code=status.HTTP_404_NOT_FOUND
         )
     
-    success_count = 0
+    # 一次查询取出所有学生，权限检查：学校管理员只能操作本校学生
+    student_schools = dict(db.query(User.id, User.school_id).filter(
+        User.id.in_(set(student_ids)),
+        User.role == 'student'
+    ).all())
+    
+    rows = []
     for student_id in student_ids:
-        student = db.query(User).filter(
-            User.id == student_id,
-            User.role == 'student'
-        ).first()
-        
-        if not student:
+        if student_id not in student_schools:
             continue
-        
-        # 权限检查
-        if current_admin.role == 'school_admin':
-            if student.school_id != current_admin.school_id:
-                continue
-        
-        # 检查是否已经在小组中
-        existing_member = db.query(PBLGroupMember).filter(
-            PBLGroupMember.group_id == group.id,
-            PBLGroupMember.user_id == student_id,
-            PBLGroupMember.is_active == True
-        ).first()
-        
-        if existing_member:
+        if current_admin.role == 'school_admin' and student_schools[student_id] != current_admin.school_id:
             continue
-        
-        # 添加成员
-        member = PBLGroupMember(
-            group_id=group.id,
-            user_id=student_id,
-            role='member',
-            is_active=True
-        )
-        db.add(member)
-        success_count += 1
+        rows.append({
+            'group_id': group.id,
+            'user_id': student_id,
+            'role': 'member',
+            'is_active': 1,
+            'joined_at': get_beijing_time_naive()
+        })
+    
+    # 预取已有成员 + 多行插入；之前退出小组的成员（is_active=0）重新激活
+    upsert_result = bulk_upsert(
+        db, PBLGroupMember, rows,
+        key_columns=('group_id', 'user_id'),
+        update_columns=('is_active', 'role', 'joined_at'),
+        fetch_columns=('is_active',),
+        needs_update=lambda member: not member.is_active
+    )
+    success_count = upsert_result.inserted + upsert_result.updated
     
     db.commit()
     
+    # 按传入顺序返回每个学生的处理结果
+    statuses = {}
+    for (_, user_id), item_status in upsert_result.items:
+        statuses.setdefault(user_id, item_status)
+    results = []
+    for student_id in student_ids:
+        if student_id not in student_schools:
+            item_status = 'not_found'
+        elif student_id not in statuses:
+            item_status = 'forbidden'
+        else:
+            item_status = statuses[student_id]
+        results.append({'student_id': student_id, 'status': item_status})
+    
     logger.info(f"添加成员到小组 - 小组UUID: {group_id}, 成功: {success_count}, 操作者: {current_admin.username}")
     
     return success_response(
-        data={'added_count': success_count},
+        data={'added_count': success_count, 'results': results},
         message=f"成功添加 {success_count} 名成员到小组"
     )
 
@@ -715,30 +726,12 @@ def delete_group(
 def get_class_teachers(
     class_id: str,
     db: Session = Depends(get_db),
-    current_admin: Admin = Depends(get_current_admin)
+    context: ClassContext = Depends(get_class_context)
 ):
     """获取班级教师列表"""
-    # 根据UUID查询班级
-    pbl_class = db.query(PBLClass).filter(PBLClass.uuid == class_id).first()
-    if not pbl_class:
-        return error_response(
-            message="班级不存在",
-            code=404,
-            status_code=status.HTTP_404_NOT_FOUND
-        )
-    
-    # 权限检查（学校管理员只能查看本校班级）
-    if current_admin.role != 'platform_admin':
-        if pbl_class.school_id != current_admin.school_id:
-            return error_response(
-                message="无权限查看该班级",
-                code=403,
-                status_code=status.HTTP_403_FORBIDDEN
-            )
-    
     # 查询班级教师
     class_teachers = db.query(PBLClassTeacher).filter(
-        PBLClassTeacher.class_id == pbl_class.id
+        PBLClassTeacher.class_id == context.class_id
     ).all()
     
     result = []
@@ -839,6 +832,7 @@ def assign_teacher_to_class(
     )
     db.add(class_teacher)
     db.commit()
+    invalidate_class_access(class_uuid=class_id)
     db.refresh(class_teacher)
     
     logger.info(f"为班级分配教师 - 班级UUID: {class_id}, 教师ID: {teacher_id}, 操作者: {current_admin.username}")
@@ -880,6 +874,15 @@ def remove_teacher_from_class(
             status_code=status.HTTP_404_NOT_FOUND
         )
     
+    # 权限检查（学校管理员只能操作本校班级）
+    if current_admin.role == 'school_admin':
+        if pbl_class.school_id != current_admin.school_id:
+            return error_response(
+                message="无权限操作该班级",
+                code=403,
+                status_code=status.HTTP_403_FORBIDDEN
+            )
+    
     # 查找班级教师记录
     class_teacher = db.query(PBLClassTeacher).filter(
         PBLClassTeacher.class_id == pbl_class.id,
@@ -900,6 +903,7 @@ def remove_teacher_from_class(
     # 删除关联记录
     db.delete(class_teacher)
     db.commit()
+    invalidate_class_access(class_uuid=class_id)
     
     logger.info(f"从班级移除教师 - 班级UUID: {class_id}, 教师ID: {teacher_id}, 操作者: {current_admin.username}")
     
@@ -912,30 +916,12 @@ def remove_teacher_from_class(
 def get_class_courses(
     class_id: str,
     db: Session = Depends(get_db),
-    current_admin: Admin = Depends(get_current_admin)
+    context: ClassContext = Depends(get_class_context)
 ):
     """获取班级课程列表"""
-    # 根据UUID查询班级
-    pbl_class = db.query(PBLClass).filter(PBLClass.uuid == class_id).first()
-    if not pbl_class:
-        return error_response(
-            message="班级不存在",
-            code=404,
-            status_code=status.HTTP_404_NOT_FOUND
-        )
-    
-    # 权限检查
-    if current_admin.role != 'platform_admin':
-        if pbl_class.school_id != current_admin.school_id:
-            return error_response(
-                message="无权限查看该班级",
-                code=403,
-                status_code=status.HTTP_403_FORBIDDEN
-            )
-    
     # 查询班级课程
     class_courses = db.query(PBLClassCourse).filter(
-        PBLClassCourse.class_id == pbl_class.id
+        PBLClassCourse.class_id == context.class_id
     ).all()
     
     result = []
@@ -944,7 +930,7 @@ def get_class_courses(
         if course:
             # 统计班级成员数（所有班级成员自动拥有课程访问权限）
             enrolled_count = db.query(PBLClassMember).filter(
-                PBLClassMember.class_id == pbl_class.id,
+                PBLClassMember.class_id == context.class_id,
                 PBLClassMember.is_active == 1
             ).count()
 
@@ -1089,6 +1075,15 @@ def remove_course_from_class(
             status_code=status.HTTP_404_NOT_FOUND
         )
     
+    # 权限检查（学校管理员只能操作本校班级）
+    if current_admin.role == 'school_admin':
+        if pbl_class.school_id != current_admin.school_id:
+            return error_response(
+                message="无权限操作该班级",
+                code=403,
+                status_code=status.HTTP_403_FORBIDDEN
+            )
+    
     # 查找班级课程记录
     class_course = db.query(PBLClassCourse).filter(
         PBLClassCourse.uuid == course_uuid,
@@ -1120,30 +1115,12 @@ def get_class_learning_progress(
     class_id: str,
     course_id: Optional[int] = None,
     db: Session = Depends(get_db),
-    current_admin: Admin = Depends(get_current_admin)
+    context: ClassContext = Depends(get_class_context)
 ):
     """查看班级学生的课程学习进度"""
-    # 根据UUID查询班级
-    pbl_class = db.query(PBLClass).filter(PBLClass.uuid == class_id).first()
-    if not pbl_class:
-        return error_response(
-            message="班级不存在",
-            code=404,
-            status_code=status.HTTP_404_NOT_FOUND
-        )
-    
-    # 权限检查
-    if current_admin.role != 'platform_admin':
-        if pbl_class.school_id != current_admin.school_id:
-            return error_response(
-                message="无权限查看该班级",
-                code=403,
-                status_code=status.HTTP_403_FORBIDDEN
-            )
-    
     # 查询班级所有学生
     students = db.query(User).filter(
-        User.class_id == pbl_class.id,
+        User.class_id == context.class_id,
         User.role == 'student',
         User.deleted_at == None
     ).all()
@@ -1155,13 +1132,61 @@ def get_class_learning_progress(
     else:
         # 否则查询班级所有分配的课程
         class_course_ids = db.query(PBLClassCourse.course_id).filter(
-            PBLClassCourse.class_id == pbl_class.id
+            PBLClassCourse.class_id == context.class_id
         ).all()
         course_ids = [cc[0] for cc in class_course_ids]
         courses_query = courses_query.filter(PBLCourse.id.in_(course_ids))
     
     courses = courses_query.all()
     
+    # 课程结构（单元数、任务数、任务ID）取自快照缓存，多个课程一条查询构建
+    structures = get_course_structures(db, [course.id for course in courses])
+    task_course = {
+        task_id: course_id
+        for course_id, structure in structures.items()
+        for task_id in structure.task_ids
+    }
+    student_ids = [student.id for student in students]
+    
+    # 已完成单元数：按 (学生, 课程) 分组统计
+    completed_units_map = {}
+    # 任务提交数与分数：一次查询取出，内存中按 (学生, 课程) 汇总
+    completed_tasks_map = defaultdict(int)
+    scores_map = defaultdict(list)
+    if student_ids and courses:
+        completed_units_map = {
+            (row.user_id, row.course_id): row.completed_units
+            for row in db.query(
+                PBLLearningProgress.user_id,
+                PBLLearningProgress.course_id,
+                func.count(PBLLearningProgress.id).label('completed_units')
+            ).filter(
+                PBLLearningProgress.user_id.in_(student_ids),
+                PBLLearningProgress.course_id.in_([course.id for course in courses]),
+                PBLLearningProgress.progress_type == 'unit_complete',
+                PBLLearningProgress.status == 'completed'
+            ).group_by(
+                PBLLearningProgress.user_id,
+                PBLLearningProgress.course_id
+            ).all()
+        }
+        
+        if task_course:
+            for row in db.query(
+                PBLTaskProgress.user_id,
+                PBLTaskProgress.task_id,
+                PBLTaskProgress.submission.isnot(None).label('submitted'),
+                PBLTaskProgress.score
+            ).filter(
+                PBLTaskProgress.user_id.in_(student_ids),
+                PBLTaskProgress.task_id.in_(list(task_course))
+            ):
+                key = (row.user_id, task_course[row.task_id])
+                if row.submitted:  # 只要提交了就算完成
+                    completed_tasks_map[key] += 1
+                if row.score is not None:
+                    scores_map[key].append(row.score)
+    
     result = []
     for student in students:
         student_data = {
@@ -1172,38 +1197,16 @@ def get_class_learning_progress(
         }
         
         for course in courses:
-            # 统计课程单元数
-            total_units = db.query(PBLUnit).filter(
-                PBLUnit.course_id == course.id
-            ).count()
-            
-            # 统计已完成单元数
-            completed_units = db.query(PBLLearningProgress).filter(
-                PBLLearningProgress.user_id == student.id,
-                PBLLearningProgress.course_id == course.id,
-                PBLLearningProgress.progress_type == 'unit_complete',
-                PBLLearningProgress.status == 'completed'
-            ).count()
-            
-            # 统计任务完成情况
-            total_tasks = db.query(PBLTask).join(PBLUnit).filter(
-                PBLUnit.course_id == course.id
-            ).count()
-            
-            completed_tasks = db.query(PBLTaskProgress).join(PBLTask).join(PBLUnit).filter(
-                PBLUnit.course_id == course.id,
-                PBLTaskProgress.user_id == student.id,
-                PBLTaskProgress.submission.isnot(None)  # 只要提交了就算完成
-            ).count()
+            structure = structures[course.id]
+            key = (student.id, course.id)
+            total_units = structure.total_units
+            completed_units = completed_units_map.get(key, 0)
+            total_tasks = structure.total_tasks
+            completed_tasks = completed_tasks_map.get(key, 0)
             
             # 计算平均分
-            avg_score_result = db.query(func.avg(PBLTaskProgress.score)).join(PBLTask).join(PBLUnit).filter(
-                PBLUnit.course_id == course.id,
-                PBLTaskProgress.user_id == student.id,
-                PBLTaskProgress.score != None
-            ).scalar()
-            
-            avg_score = float(avg_score_result) if avg_score_result else None
+            scores = scores_map.get(key)
+            avg_score = float(sum(scores) / len(scores)) if scores else None
             
             # 计算课程进度（基于完成的单元数）
             course_progress_percent = int((completed_units / total_units * 100)) if total_units > 0 else 0
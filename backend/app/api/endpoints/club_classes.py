@@ -7,25 +7,42 @@
 """
 from fastapi import APIRouter, Depends, HTTPException, status, Query, Body
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, or_, case, select
-from typing import List, Optional, Dict
+from sqlalchemy import func, and_, or_, case, select, exists
+from typing import List, Optional, Dict, Tuple
+from collections import defaultdict
 from datetime import datetime
 from app.utils.timezone import get_beijing_time_naive
 from pydantic import BaseModel
 
 from ...db.session import SessionLocal
 from ...core.response import success_response, error_response
-from ...core.deps import get_db, get_current_admin
+from ...core.deps import (
+    get_db, get_current_admin, get_class_context, get_managed_class_context, get_idempotency_key
+)
 from ...core.security import get_password_hash
 from ...models.admin import Admin, User
 from ...models.pbl import (
     PBLClass, PBLClassMember, PBLCourse, PBLCourseTemplate, PBLClassCourse,
-    PBLUnit, PBLResource, PBLTask,
+    PBLUnit, PBLTask,
     PBLClassTeacher, PBLTaskProgress, PBLProjectOutput,
-    PBLUnitTemplate, PBLResourceTemplate, PBLTaskTemplate
+    PBLFeedbackTemplate
 )
 from ...core.logging_config import get_logger
 from ...models.school import School
+from ...models.projections import summary_options
+from ...utils.bulk import bulk_upsert
+from ...utils.pagination import decode_cursor
+from ...services.feedback_template_service import (
+    get_school_feedback_templates, invalidate_school_feedback_templates
+)
+from ...services.student_search_service import search_school_students, paginate_students
+from ...services.course_structure_service import CourseStructure, get_course_structure
+from ...services.progress_matrix import ProgressMatrix
+from ...services.class_access_service import ClassContext, invalidate_class_access
+from ...services.template_service import instantiate_template_for_class
+from ...services.job_service import submit_job, job_submitted_response
+from ...services.class_event_service import publish_class_event, EVENT_HOMEWORK_REVIEWED
+from ...services.portfolio_service import portfolio_refresher
 
 router = APIRouter()
 logger = get_logger(__name__)
@@ -59,6 +76,10 @@ class CourseCreateFromTemplate(BaseModel):
     title: Optional[str] = None
     auto_enroll: bool = True
 
+class CourseBatchCreateFromTemplate(BaseModel):
+    template_id: int
+    class_ids: List[int]
+
 class TeacherAdd(BaseModel):
     teacher_ids: List[int]
     role: str = 'assistant'  # main, assistant
@@ -72,6 +93,16 @@ class TaskReview(BaseModel):
     feedback: Optional[str] = None
     status: str = 'review'  # review, completed
 
+class FeedbackTemplateCreate(BaseModel):
+    category: str = 'general'  # general, excellent, good, pass, fail
+    title: str
+    content: str
+
+class FeedbackTemplateUpdate(BaseModel):
+    category: Optional[str] = None
+    title: Optional[str] = None
+    content: Optional[str] = None
+
 class StudentPasswordReset(BaseModel):
     """重置学生密码请求"""
     student_id: int
@@ -294,25 +325,10 @@ def create_class(
 def get_class_detail(
     class_uuid: str,
     db: Session = Depends(get_db),
-    current_admin: Admin = Depends(get_current_admin)
+    context: ClassContext = Depends(get_class_context)
 ):
     """获取班级详情（优化版）"""
-    pbl_class = db.query(PBLClass).filter(PBLClass.uuid == class_uuid).first()
-    if not pbl_class:
-        return error_response(
-            message="班级不存在",
-            code=404,
-            status_code=status.HTTP_404_NOT_FOUND
-        )
-    
-    # 权限检查
-    if current_admin.role != 'platform_admin':
-        if pbl_class.school_id != current_admin.school_id:
-            return error_response(
-                message="无权限查看该班级",
-                code=403,
-                status_code=status.HTTP_403_FORBIDDEN
-            )
+    pbl_class = context.get_class(db)
     
     # 获取班级成员
     members = db.query(PBLClassMember, User).join(
@@ -410,6 +426,7 @@ def update_class(
         pbl_class.is_open = 1 if class_data.is_open else 0
     
     db.commit()
+    invalidate_class_access(class_uuid=class_uuid)
     db.refresh(pbl_class)
     
     logger.info(f"更新班级 - UUID: {class_uuid}, 操作者: {current_admin.username}")
@@ -451,6 +468,7 @@ def delete_class(
     # 软删除
     pbl_class.is_active = 0
     db.commit()
+    invalidate_class_access(class_uuid=class_uuid)
     
     logger.info(f"删除班级 - UUID: {class_uuid}, 操作者: {current_admin.username}")
     
@@ -462,125 +480,72 @@ def delete_class(
 @router.get("/classes/{class_uuid}/available-students")
 def get_available_students(
     class_uuid: str,
-    search: Optional[str] = Query(None, description="搜索关键词（姓名或学号）"),
+    search: Optional[str] = Query(None, description="搜索关键词（姓名、拼音首字母或学号）"),
+    cursor: Optional[str] = Query(None, description="分页游标（上一页返回的 next_cursor）"),
+    limit: int = Query(50, ge=1, le=100),
     db: Session = Depends(get_db),
-    current_admin: Admin = Depends(get_current_admin)
+    context: ClassContext = Depends(get_managed_class_context)
 ):
-    """获取可添加到班级的学生列表（学校学生中未在该班级的学生）"""
-    pbl_class = db.query(PBLClass).filter(PBLClass.uuid == class_uuid).first()
-    if not pbl_class:
-        return error_response(
-            message="班级不存在",
-            code=404,
-            status_code=status.HTTP_404_NOT_FOUND
-        )
-    
-    # 权限检查
-    if current_admin.role == 'teacher':
-        # 教师需要是该班级的授课教师
-        is_class_teacher = db.query(PBLClassTeacher).filter(
-            PBLClassTeacher.class_id == pbl_class.id,
-            PBLClassTeacher.teacher_id == current_admin.id
-        ).first()
-        
-        if not is_class_teacher:
-            return error_response(
-                message="无权限操作该班级",
-                code=403,
-                status_code=status.HTTP_403_FORBIDDEN
-            )
-    elif current_admin.role == 'school_admin':
-        # 学校管理员只能操作本校班级
-        if pbl_class.school_id != current_admin.school_id:
-            return error_response(
-                message="无权限查看该班级",
-                code=403,
-                status_code=status.HTTP_403_FORBIDDEN
-            )
-    elif current_admin.role != 'platform_admin':
-        # 其他角色无权限
-        return error_response(
-            message="无权限操作",
-            code=403,
-            status_code=status.HTTP_403_FORBIDDEN
-        )
-    
-    # 获取已在班级中的学生ID列表
-    existing_member_ids = db.query(PBLClassMember.student_id).filter(
-        PBLClassMember.class_id == pbl_class.id,
+    """
+    获取可添加到班级的学生列表（学校学生中未在该班级的学生）
+
+    用 NOT EXISTS 排除班级成员，按 (学号, ID) 游标分页；
+    搜索走进程内的学生搜索索引，命中的学生再交给同一条 SQL 过滤。
+    """
+    try:
+        after = decode_cursor(cursor, parse=str)
+    except ValueError as e:
+        return error_response(message=str(e), code=400, status_code=status.HTTP_400_BAD_REQUEST)
+    
+    # 学校的学生中，排除已在班级中的（NOT EXISTS 反连接，走 uk_class_student_active）
+    is_member = exists().where(
+        PBLClassMember.class_id == context.class_id,
+        PBLClassMember.student_id == User.id,
         PBLClassMember.is_active == 1
-    ).all()
-    existing_member_ids = [row[0] for row in existing_member_ids]
-    
-    # 查询学校的所有学生（排除已在班级中的）
+    )
     query = db.query(User).filter(
-        User.school_id == pbl_class.school_id,
+        User.school_id == context.school_id,
         User.role == 'student',
         User.is_active == True,
-        User.deleted_at == None
+        User.deleted_at == None,
+        ~is_member
     )
     
-    # 排除已在班级中的学生
-    if existing_member_ids:
-        query = query.filter(User.id.notin_(existing_member_ids))
-    
-    # 支持搜索
-    if search:
-        query = query.filter(
-            or_(
-                User.name.like(f'%{search}%'),
-                User.real_name.like(f'%{search}%'),
-                User.student_number.like(f'%{search}%')
-            )
-        )
+    candidates = None
+    if search and search.strip():
+        candidates = search_school_students(db, context.school_id, search)
     
-    # 按学号排序
-    students = query.order_by(User.student_number).limit(100).all()
+    students, next_cursor = paginate_students(query, after, limit, candidates)
     
-    result = []
-    for student in students:
-        result.append({
-            'id': student.id,
-            'name': student.name or student.real_name,
-            'student_number': student.student_number,
-            'gender': student.gender,
-            'class_name': student.class_name if hasattr(student, 'class_name') else None
-        })
+    items = [{
+        'id': student.id,
+        'name': student.name or student.real_name,
+        'student_number': student.student_number,
+        'gender': student.gender,
+        'class_name': student.class_name if hasattr(student, 'class_name') else None
+    } for student in students]
     
-    return success_response(data=result)
+    return success_response(data={
+        'items': items,
+        'next_cursor': next_cursor,
+        'has_more': next_cursor is not None
+    })
 
 
 @router.get("/classes/{class_uuid}/members")
 def get_class_members(
     class_uuid: str,
     db: Session = Depends(get_db),
-    current_admin: Admin = Depends(get_current_admin)
+    context: ClassContext = Depends(get_class_context)
 ):
     """获取班级成员列表"""
-    pbl_class = db.query(PBLClass).filter(PBLClass.uuid == class_uuid).first()
-    if not pbl_class:
-        return error_response(
-            message="班级不存在",
-            code=404,
-            status_code=status.HTTP_404_NOT_FOUND
-        )
-
-    # 权限检查
-    if current_admin.role != 'platform_admin':
-        if pbl_class.school_id != current_admin.school_id:
-            return error_response(
-                message="无权限查看该班级",
-                code=403,
-                status_code=status.HTTP_403_FORBIDDEN
-            )
-
     # 查询成员（关联School表获取school_code）
     members = db.query(PBLClassMember, User, School).join(
         User, PBLClassMember.student_id == User.id
     ).join(
         School, User.school_id == School.id
     ).filter(
-        PBLClassMember.class_id == pbl_class.id,
+        PBLClassMember.class_id == context.class_id,
         PBLClassMember.is_active == 1
     ).all()
 
@@ -635,57 +600,62 @@ def add_members_to_class(
                 status_code=status.HTTP_403_FORBIDDEN
             )
     
-    added_count = 0
     auto_enrolled_courses = []
+    student_ids = member_data.student_ids
     
-    for student_id in member_data.student_ids:
-        # 检查学生是否存在
-        student = db.query(User).filter(
-            User.id == student_id,
-            User.role == 'student'
-        ).first()
-        
-        if not student:
-            continue
-        
-        # 权限检查：学校管理员只能操作本校学生
-        if current_admin.role == 'school_admin':
-            if student.school_id != current_admin.school_id:
-                continue
-        
-        # 检查是否已在班级中
-        existing = db.query(PBLClassMember).filter(
-            PBLClassMember.class_id == pbl_class.id,
-            PBLClassMember.student_id == student_id,
-            PBLClassMember.is_active == 1
-        ).first()
-        
-        if existing:
-            continue
-        
-        # 添加到班级
-        member = PBLClassMember(
-            class_id=pbl_class.id,
-            student_id=student_id,
-            role=member_data.role,
-            is_active=1
+    # 一次查询取出所有学生，权限检查：学校管理员只能操作本校学生
+    student_schools = dict(db.query(User.id, User.school_id).filter(
+        User.id.in_(set(student_ids)),
+        User.role == 'student'
+    ).all())
+    
+    rows = [{
+        'class_id': pbl_class.id,
+        'student_id': student_id,
+        'role': member_data.role,
+        'is_active': 1
+    } for student_id in student_ids
+        if student_id in student_schools
+        and (current_admin.role != 'school_admin' or student_schools[student_id] == current_admin.school_id)]
+    
+    # 预取已在班级中的成员 + 多行插入，SQL 条数不随学生数增长
+    upsert_result = bulk_upsert(
+        db, PBLClassMember, rows,
+        key_columns=('class_id', 'student_id', 'is_active')
+    )
+    added_count = upsert_result.inserted
+    
+    # 更新班级成员数（数据库端累加）
+    # 注意：班级成员自动拥有班级课程的访问权限，无需创建选课记录
+    if added_count:
+        db.query(PBLClass).filter(PBLClass.id == pbl_class.id).update(
+            {PBLClass.current_members: func.coalesce(PBLClass.current_members, 0) + added_count},
+            synchronize_session=False
         )
-        db.add(member)
-        added_count += 1
-        
-        # 更新班级成员数
-        pbl_class.current_members = (pbl_class.current_members or 0) + 1
-        
-        # 注意：班级成员自动拥有班级课程的访问权限，无需创建选课记录
     
     db.commit()
     
+    # 按传入顺序返回每个学生的处理结果
+    statuses = {}
+    for (_, student_id, _), item_status in upsert_result.items:
+        statuses.setdefault(student_id, item_status)
+    results = []
+    for student_id in student_ids:
+        if student_id not in student_schools:
+            item_status = 'not_found'
+        elif student_id not in statuses:
+            item_status = 'forbidden'
+        else:
+            item_status = statuses[student_id]
+        results.append({'student_id': student_id, 'status': item_status})
+    
     logger.info(f"添加成员到班级 - 班级UUID: {class_uuid}, 成功: {added_count}, 自动选课: {len(auto_enrolled_courses)}")
     
     return success_response(
         data={
             'added_count': added_count,
-            'auto_enrolled_courses': auto_enrolled_courses
+            'auto_enrolled_courses': auto_enrolled_courses,
+            'results': results
         },
         message=f"成功添加 {added_count} 名成员到班级"
     )
@@ -821,54 +791,16 @@ def reset_member_password(
     class_uuid: str,
     student_id: int,
     db: Session = Depends(get_db),
-    current_admin: Admin = Depends(get_current_admin)
+    current_admin: Admin = Depends(get_current_admin),
+    context: ClassContext = Depends(get_managed_class_context)
 ):
     """重置班级成员密码（教师专用）
     
     将学生密码重置为默认密码（Aa123456），并标记为需要强制修改密码
     """
-    # 查找班级
-    pbl_class = db.query(PBLClass).filter(PBLClass.uuid == class_uuid).first()
-    if not pbl_class:
-        return error_response(
-            message="班级不存在",
-            code=404,
-            status_code=status.HTTP_404_NOT_FOUND
-        )
-    
-    # 权限检查：教师、学校管理员、平台管理员
-    if current_admin.role == 'teacher':
-        # 教师需要是该班级的授课教师
-        is_class_teacher = db.query(PBLClassTeacher).filter(
-            PBLClassTeacher.class_id == pbl_class.id,
-            PBLClassTeacher.teacher_id == current_admin.id
-        ).first()
-        
-        if not is_class_teacher:
-            return error_response(
-                message="无权限操作该班级",
-                code=403,
-                status_code=status.HTTP_403_FORBIDDEN
-            )
-    elif current_admin.role == 'school_admin':
-        # 学校管理员只能操作本校班级
-        if pbl_class.school_id != current_admin.school_id:
-            return error_response(
-                message="无权限操作该班级",
-                code=403,
-                status_code=status.HTTP_403_FORBIDDEN
-            )
-    elif current_admin.role != 'platform_admin':
-        # 其他角色无权限
-        return error_response(
-            message="无权限操作",
-            code=403,
-            status_code=status.HTTP_403_FORBIDDEN
-        )
-    
     # 检查学生是否在班级中
     member = db.query(PBLClassMember).filter(
-        PBLClassMember.class_id == pbl_class.id,
+        PBLClassMember.class_id == context.class_id,
         PBLClassMember.student_id == student_id,
         PBLClassMember.is_active == 1
     ).first()
@@ -1005,96 +937,10 @@ def create_course_from_template(
                 status_code=status.HTTP_403_FORBIDDEN
             )
     
-    # 创建课程
-    course_title = course_data.title if course_data.title else f"{pbl_class.name}{template.title}"
-    
-    new_course = PBLCourse(
-        template_id=template.id,
-        template_version=template.version,
-        is_customized=0,
-        sync_with_template=1,
-        class_id=pbl_class.id,
-        class_name=pbl_class.name,
-        title=course_title,
-        description=template.description,
-        cover_image=template.cover_image,
-        duration=template.duration,
-        difficulty=template.difficulty,
-        status='published',
-        creator_id=current_admin.id,
-        school_id=pbl_class.school_id
+    # 创建课程，从模板复制单元、资源、任务
+    new_course, counts = instantiate_template_for_class(
+        db, template, pbl_class, current_admin.id, title=course_data.title
     )
-    db.add(new_course)
-    db.flush()
-    
-    # 从模板复制单元、资源、任务
-    units_count = 0
-    resources_count = 0
-    tasks_count = 0
-    
-    # 查询模板的所有单元（包括关联的资源和任务）
-    template_units = db.query(PBLUnitTemplate).filter(
-        PBLUnitTemplate.course_template_id == template.id
-    ).order_by(PBLUnitTemplate.order).all()
-    
-    # 复制单元、资源、任务
-    for template_unit in template_units:
-        # 创建单元副本，默认状态为 'locked'（关闭）
-        new_unit = PBLUnit(
-            course_id=new_course.id,
-            title=template_unit.title,
-            description=template_unit.description,
-            order=template_unit.order,
-            status='locked',  # 默认关闭
-            learning_guide=template_unit.learning_objectives  # 复制学习目标作为学习指南
-        )
-        db.add(new_unit)
-        db.flush()  # 获取新单元的ID
-        units_count += 1
-        
-        # 复制资源
-        template_resources = db.query(PBLResourceTemplate).filter(
-            PBLResourceTemplate.unit_template_id == template_unit.id
-        ).order_by(PBLResourceTemplate.order).all()
-        
-        for template_resource in template_resources:
-            new_resource = PBLResource(
-                unit_id=new_unit.id,
-                type=template_resource.type,
-                title=template_resource.title,
-                description=template_resource.description,
-                url=template_resource.url,
-                content=template_resource.content,
-                duration=template_resource.duration,
-                order=template_resource.order,
-                video_id=template_resource.video_id,
-                video_cover_url=template_resource.video_cover_url,
-                max_views=template_resource.default_max_views
-            )
-            db.add(new_resource)
-            resources_count += 1
-        
-        # 复制任务
-        template_tasks = db.query(PBLTaskTemplate).filter(
-            PBLTaskTemplate.unit_template_id == template_unit.id
-        ).order_by(PBLTaskTemplate.order).all()
-        
-        for template_task in template_tasks:
-            new_task = PBLTask(
-                unit_id=new_unit.id,
-                title=template_task.title,
-                description=template_task.description,
-                type=template_task.type,
-                difficulty=template_task.difficulty,
-                estimated_time=template_task.estimated_time,
-                order=template_task.order,
-                requirements=template_task.requirements,
-                prerequisites=template_task.prerequisites,
-                is_required=1,  # 默认必做
-                publish_status='draft'  # 默认草稿状态
-            )
-            db.add(new_task)
-            tasks_count += 1
     
     # 注意：班级成员自动拥有班级课程的访问权限，无需创建选课记录
     # 统计班级成员数量
@@ -1105,11 +951,10 @@ def create_course_from_template(
             PBLClassMember.is_active == 1
         ).count()
     
-    # 更新模板使用次数
-    template.usage_count += 1
-    
     db.commit()
     db.refresh(new_course)
+    # 班级快照缓存了已发布课程
+    invalidate_class_access(class_id=pbl_class.id)
     
     logger.info(f"基于模板创建课程 - 模板ID: {template.id}, 班级ID: {pbl_class.id}, 课程ID: {new_course.id}")
     
@@ -1120,15 +965,71 @@ def create_course_from_template(
             'title': new_course.title,
             'class_name': pbl_class.name,
             'template_title': template.title,
-            'units_count': units_count,
-            'resources_count': resources_count,
-            'tasks_count': tasks_count,
+            'units_count': counts['units_count'],
+            'resources_count': counts['resources_count'],
+            'tasks_count': counts['tasks_count'],
             'enrolled_students': enrolled_count
         },
         message="课程创建成功"
     )
 
 
+@router.post("/courses/create-from-template/batch")
+def batch_create_courses_from_template(
+    course_data: CourseBatchCreateFromTemplate,
+    idempotency_key: Optional[str] = Depends(get_idempotency_key),
+    db: Session = Depends(get_db),
+    current_admin: Admin = Depends(get_current_admin)
+):
+    """基于模板为多个班级创建课程（后台任务，立即返回任务ID）"""
+    if current_admin.role not in ['platform_admin', 'school_admin']:
+        return error_response(
+            message="无权限操作",
+            code=403,
+            status_code=status.HTTP_403_FORBIDDEN
+        )
+    
+    class_ids = list(dict.fromkeys(course_data.class_ids))
+    if not class_ids:
+        return error_response(message="请选择班级", code=400, status_code=status.HTTP_400_BAD_REQUEST)
+    
+    template = db.query(PBLCourseTemplate.id).filter(PBLCourseTemplate.id == course_data.template_id).first()
+    if not template:
+        return error_response(
+            message="课程模板不存在",
+            code=404,
+            status_code=status.HTTP_404_NOT_FOUND
+        )
+    
+    # 提交前检查班级是否存在及学校权限，worker 中不再重复判断
+    class_schools = dict(
+        db.query(PBLClass.id, PBLClass.school_id).filter(PBLClass.id.in_(class_ids)).all()
+    )
+    missing = [class_id for class_id in class_ids if class_id not in class_schools]
+    if missing:
+        return error_response(
+            message=f"班级不存在: {', '.join(str(class_id) for class_id in missing)}",
+            code=404,
+            status_code=status.HTTP_404_NOT_FOUND
+        )
+    if current_admin.role == 'school_admin' and any(
+        school_id != current_admin.school_id for school_id in class_schools.values()
+    ):
+        return error_response(
+            message="无权限操作该班级",
+            code=403,
+            status_code=status.HTTP_403_FORBIDDEN
+        )
+    
+    job, created = submit_job(
+        db, 'template_instantiate', current_admin,
+        params={'template_id': course_data.template_id, 'class_ids': class_ids},
+        idempotency_key=idempotency_key,
+        school_id=current_admin.school_id if current_admin.role == 'school_admin' else None
+    )
+    return job_submitted_response(job, created)
+
+
 # ===== 为课程的班级成员批量选课 =====
 
 @router.post("/courses/{course_id}/enroll-class-members")
@@ -1193,31 +1094,14 @@ def enroll_class_members_to_course(
 def get_class_teachers(
     class_uuid: str,
     db: Session = Depends(get_db),
-    current_admin: Admin = Depends(get_current_admin)
+    context: ClassContext = Depends(get_class_context)
 ):
     """获取班级教师列表"""
-    pbl_class = db.query(PBLClass).filter(PBLClass.uuid == class_uuid).first()
-    if not pbl_class:
-        return error_response(
-            message="班级不存在",
-            code=404,
-            status_code=status.HTTP_404_NOT_FOUND
-        )
-    
-    # 权限检查
-    if current_admin.role != 'platform_admin':
-        if pbl_class.school_id != current_admin.school_id:
-            return error_response(
-                message="无权限查看该班级",
-                code=403,
-                status_code=status.HTTP_403_FORBIDDEN
-            )
-    
     # 查询教师
     teachers = db.query(PBLClassTeacher, User).join(
         User, PBLClassTeacher.teacher_id == User.id
     ).filter(
-        PBLClassTeacher.class_id == pbl_class.id
+        PBLClassTeacher.class_id == context.class_id
     ).all()
     
     result = []
@@ -1302,6 +1186,7 @@ def add_teachers_to_class(
         added_count += 1
     
     db.commit()
+    invalidate_class_access(class_uuid=class_uuid)
     
     logger.info(f"添加教师到班级 - 班级UUID: {class_uuid}, 成功: {added_count}")
     
@@ -1359,6 +1244,7 @@ def remove_teacher_from_class(
     # 删除
     db.delete(teacher_rel)
     db.commit()
+    invalidate_class_access(class_uuid=class_uuid)
     
     logger.info(f"从班级移除教师 - 班级UUID: {class_uuid}, 教师ID: {teacher_id}")
     
@@ -1429,11 +1315,61 @@ def update_teacher_role(
 
 # ===== 学习进度 =====
 
+def _collect_course_progress(
+    db: Session,
+    structure: CourseStructure,
+    student_ids: List[int]
+) -> Tuple[ProgressMatrix, Dict[int, Dict]]:
+    """
+    批量统计学生在课程中的进度（基于课程结构快照，固定 2 次查询）
+
+    Returns:
+        (学生 × 单元 完成矩阵, {学生ID: {'submissions_count': 提交作业数, 'last_active': 最后活跃时间}})
+    """
+    matrix = ProgressMatrix.from_structure(structure, student_ids)
+    stats = {student_id: {'submissions_count': 0, 'last_active': None} for student_id in student_ids}
+    if not student_ids or not structure.task_ids:
+        return matrix, stats
+    
+    # 1. 每个学生每个单元的已完成任务数，装入矩阵后向量化判断单元完成情况
+    matrix.add_counts(db.query(
+        PBLTaskProgress.user_id,
+        PBLTask.unit_id,
+        func.count(func.distinct(PBLTaskProgress.task_id))
+    ).join(
+        PBLTask, PBLTask.id == PBLTaskProgress.task_id
+    ).filter(
+        PBLTaskProgress.task_id.in_(structure.task_ids),
+        PBLTaskProgress.user_id.in_(student_ids),
+        PBLTaskProgress.status == 'completed'
+    ).group_by(
+        PBLTaskProgress.user_id,
+        PBLTask.unit_id
+    ).all())
+    
+    # 2. 提交作业数和最后活跃时间
+    rows = db.query(
+        PBLTaskProgress.user_id,
+        func.sum(case((PBLTaskProgress.submission.isnot(None), 1), else_=0)).label('submissions_count'),
+        func.max(PBLTaskProgress.updated_at).label('last_active')
+    ).filter(
+        PBLTaskProgress.task_id.in_(structure.task_ids),
+        PBLTaskProgress.user_id.in_(student_ids)
+    ).group_by(
+        PBLTaskProgress.user_id
+    ).all()
+    for row in rows:
+        stats[row.user_id]['submissions_count'] = int(row.submissions_count or 0)
+        stats[row.user_id]['last_active'] = row.last_active
+    
+    return matrix, stats
+
+
 @router.get("/classes/{class_uuid}/progress/overview")
 def get_class_progress_overview(
     class_uuid: str,
     db: Session = Depends(get_db),
-    current_admin: Admin = Depends(get_current_admin)
+    context: ClassContext = Depends(get_class_context)
 ):
     """获取班级学习进度概览（仅统计数据，不返回详细列表）
     
@@ -1445,28 +1381,8 @@ def get_class_progress_overview(
     
     响应速度：< 100ms
     """
-    pbl_class = db.query(PBLClass).filter(PBLClass.uuid == class_uuid).first()
-    if not pbl_class:
-        return error_response(
-            message="班级不存在",
-            code=404,
-            status_code=status.HTTP_404_NOT_FOUND
-        )
-    
-    # 权限检查
-    if current_admin.role != 'platform_admin':
-        if pbl_class.school_id != current_admin.school_id:
-            return error_response(
-                message="无权限查看该班级",
-                code=403,
-                status_code=status.HTTP_403_FORBIDDEN
-            )
-    
-    # 获取班级的课程
-    courses = db.query(PBLCourse).filter(
-        PBLCourse.class_id == pbl_class.id,
-        PBLCourse.status == 'published'
-    ).all()
+    # 班级已发布课程（权限依赖中已缓存）
+    courses = context.course_ids
     
     if not courses:
         return success_response(data={
@@ -1479,11 +1395,11 @@ def get_class_progress_overview(
             'total_submissions': 0
         })
     
-    course = courses[0]
+    course_id = courses[0]
     
     # 获取班级成员数
     total_students = db.query(func.count(PBLClassMember.id)).filter(
-        PBLClassMember.class_id == pbl_class.id,
+        PBLClassMember.class_id == context.class_id,
         PBLClassMember.is_active == 1
     ).scalar() or 0
     
@@ -1500,14 +1416,13 @@ def get_class_progress_overview(
     
     # 获取学生ID列表
     student_ids = [row[0] for row in db.query(PBLClassMember.student_id).filter(
-        PBLClassMember.class_id == pbl_class.id,
+        PBLClassMember.class_id == context.class_id,
         PBLClassMember.is_active == 1
     ).all()]
     
-    # 获取总单元数
-    total_units = db.query(func.count(PBLUnit.id)).filter(
-        PBLUnit.course_id == course.id
-    ).scalar() or 0
+    # 课程结构走快照缓存
+    structure = get_course_structure(db, course_id)
+    total_units = structure.total_units
     
     if total_units == 0:
         return success_response(data={
@@ -1520,93 +1435,24 @@ def get_class_progress_overview(
             'total_submissions': 0
         })
     
-    # 批量统计每个学生的完成单元数
-    from sqlalchemy import literal
-    
-    # 子查询：每个单元的任务数
-    unit_task_count = db.query(
-        PBLTask.unit_id,
-        func.count(PBLTask.id).label('task_count')
-    ).filter(
-        PBLTask.unit_id.in_(
-            db.query(PBLUnit.id).filter(PBLUnit.course_id == course.id)
-        )
-    ).group_by(PBLTask.unit_id).subquery()
-    
-    # 子查询：每个学生每个单元的完成任务数
-    student_unit_completed = db.query(
-        PBLTaskProgress.user_id,
-        PBLTask.unit_id,
-        func.sum(case((PBLTaskProgress.status == 'completed', 1), else_=0)).label('completed_count')
-    ).join(
-        PBLTask, PBLTaskProgress.task_id == PBLTask.id
-    ).filter(
-        PBLTask.unit_id.in_(
-            db.query(PBLUnit.id).filter(PBLUnit.course_id == course.id)
-        ),
-        PBLTaskProgress.user_id.in_(student_ids)
-    ).group_by(
-        PBLTaskProgress.user_id,
-        PBLTask.unit_id
-    ).subquery()
-    
-    # 计算每个学生完成的单元数（完成单元=该单元所有任务都完成）
-    student_completed_units = db.query(
-        student_unit_completed.c.user_id,
-        func.sum(
-            case((student_unit_completed.c.completed_count >= unit_task_count.c.task_count, 1), else_=0)
-        ).label('completed_units')
-    ).outerjoin(
-        unit_task_count,
-        student_unit_completed.c.unit_id == unit_task_count.c.unit_id
-    ).group_by(
-        student_unit_completed.c.user_id
-    ).all()
-    
-    # 构建学生完成单元字典
-    student_completion_dict = {row.user_id: row.completed_units for row in student_completed_units}
-    
-    # 统计各状态人数
-    completed_count = 0
-    in_progress_count = 0
-    not_started_count = 0
-    total_completion_rate = 0
-    
-    for student_id in student_ids:
-        completed_units = student_completion_dict.get(student_id, 0)
-        completion_rate = (completed_units / total_units * 100) if total_units > 0 else 0
-        total_completion_rate += completion_rate
-        
-        if completion_rate == 100:
-            completed_count += 1
-        elif completion_rate > 0:
-            in_progress_count += 1
-        else:
-            not_started_count += 1
-    
-    avg_completion_rate = int(total_completion_rate / total_students) if total_students > 0 else 0
+    # 批量统计完成情况，各状态人数和平均完成率在矩阵上向量化计算
+    matrix, stats = _collect_course_progress(db, structure, student_ids)
+    summary = matrix.summary()
     
     # 统计总提交作业数
-    total_submissions = db.query(func.count(PBLTaskProgress.id)).join(
-        PBLTask, PBLTaskProgress.task_id == PBLTask.id
-    ).join(
-        PBLUnit, PBLTask.unit_id == PBLUnit.id
-    ).filter(
-        PBLUnit.course_id == course.id,
-        PBLTaskProgress.user_id.in_(student_ids),
-        PBLTaskProgress.submission.isnot(None)
-    ).scalar() or 0
+    total_submissions = sum(item['submissions_count'] for item in stats.values())
     
     avg_learning_hours = int((total_submissions * 2) / total_students) if total_students > 0 else 0
     
     return success_response(data={
         'total_students': total_students,
-        'avg_completion_rate': avg_completion_rate,
-        'completed_count': completed_count,
-        'in_progress_count': in_progress_count,
-        'not_started_count': not_started_count,
+        'avg_completion_rate': summary['avg_completion_rate'],
+        'completed_count': summary['completed_count'],
+        'in_progress_count': summary['in_progress_count'],
+        'not_started_count': summary['not_started_count'],
         'avg_learning_hours': avg_learning_hours,
-        'total_submissions': total_submissions
+        'total_submissions': total_submissions,
+        'rate_distribution': summary['rate_distribution']
     })
 
 
@@ -1618,7 +1464,7 @@ def get_class_progress(
     status: Optional[str] = Query(None, description="状态筛选: not_started, in_progress, completed"),
     search: Optional[str] = Query(None, description="搜索关键词（姓名或学号）"),
     db: Session = Depends(get_db),
-    current_admin: Admin = Depends(get_current_admin)
+    context: ClassContext = Depends(get_class_context)
 ):
     """获取班级学习进度列表（支持分页和筛选）
     
@@ -1630,28 +1476,8 @@ def get_class_progress(
     
     响应速度：< 500ms（每页20条数据）
     """
-    pbl_class = db.query(PBLClass).filter(PBLClass.uuid == class_uuid).first()
-    if not pbl_class:
-        return error_response(
-            message="班级不存在",
-            code=404,
-            status_code=status.HTTP_404_NOT_FOUND
-        )
-    
-    # 权限检查
-    if current_admin.role != 'platform_admin':
-        if pbl_class.school_id != current_admin.school_id:
-            return error_response(
-                message="无权限查看该班级",
-                code=403,
-                status_code=status.HTTP_403_FORBIDDEN
-            )
-    
-    # 获取班级的课程
-    courses = db.query(PBLCourse).filter(
-        PBLCourse.class_id == pbl_class.id,
-        PBLCourse.status == 'published'
-    ).all()
+    # 班级已发布课程（权限依赖中已缓存）
+    courses = context.course_ids
     
     if not courses:
         return success_response(data={
@@ -1662,13 +1488,13 @@ def get_class_progress(
             'total_pages': 0
         })
     
-    course = courses[0]
+    course_id = courses[0]
     
     # 构建班级成员查询（支持搜索）
     members_query = db.query(PBLClassMember, User).join(
         User, PBLClassMember.student_id == User.id
     ).filter(
-        PBLClassMember.class_id == pbl_class.id,
+        PBLClassMember.class_id == context.class_id,
         PBLClassMember.is_active == 1
     )
     
@@ -1698,153 +1524,27 @@ def get_class_progress(
     all_members = members_query.all()
     all_student_ids = [member.student_id for member, _ in all_members]
     
-    # === 优化策略：使用批量查询 ===
-    
-    # 1. 获取课程的总单元数（1次查询）
-    total_units = db.query(func.count(PBLUnit.id)).filter(
-        PBLUnit.course_id == course.id
-    ).scalar() or 0
-    
-    # 2. 批量获取每个单元的任务ID列表（1次查询）
-    unit_tasks = db.query(
-        PBLUnit.id.label('unit_id'),
-        func.group_concat(PBLTask.id).label('task_ids'),
-        func.count(PBLTask.id).label('task_count')
-    ).outerjoin(
-        PBLTask, PBLTask.unit_id == PBLUnit.id
-    ).filter(
-        PBLUnit.course_id == course.id
-    ).group_by(
-        PBLUnit.id
-    ).all()
-    
-    # 构建单元->任务映射
-    unit_task_map = {}
-    for row in unit_tasks:
-        task_ids = []
-        if row.task_ids:
-            task_ids = [int(tid) for tid in row.task_ids.split(',')]
-        unit_task_map[row.unit_id] = {
-            'task_ids': task_ids,
-            'task_count': row.task_count
-        }
-    
-    # 3. 批量获取所有学生的任务完成情况（1次查询）
-    task_progress_query = db.query(
-        PBLTaskProgress.user_id,
-        PBLTask.unit_id,
-        func.count(PBLTaskProgress.id).label('total_progress'),
-        func.sum(
-            case((PBLTaskProgress.status == 'completed', 1), else_=0)
-        ).label('completed_count')
-    ).join(
-        PBLTask, PBLTaskProgress.task_id == PBLTask.id
-    ).join(
-        PBLUnit, PBLTask.unit_id == PBLUnit.id
-    ).filter(
-        PBLUnit.course_id == course.id,
-        PBLTaskProgress.user_id.in_(all_student_ids)
-    ).group_by(
-        PBLTaskProgress.user_id,
-        PBLTask.unit_id
-    ).all()
-    
-    # 构建学生单元完成情况字典
-    student_unit_progress = {}
-    for row in task_progress_query:
-        user_id = row.user_id
-        unit_id = row.unit_id
-        
-        if user_id not in student_unit_progress:
-            student_unit_progress[user_id] = {}
-        
-        student_unit_progress[user_id][unit_id] = {
-            'completed_count': row.completed_count,
-            'total_progress': row.total_progress
-        }
-    
-    # 4. 批量获取提交作业数（1次查询）
-    submissions_query = db.query(
-        PBLTaskProgress.user_id,
-        func.count(PBLTaskProgress.id).label('submissions_count')
-    ).join(
-        PBLTask, PBLTaskProgress.task_id == PBLTask.id
-    ).join(
-        PBLUnit, PBLTask.unit_id == PBLUnit.id
-    ).filter(
-        PBLUnit.course_id == course.id,
-        PBLTaskProgress.user_id.in_(all_student_ids),
-        PBLTaskProgress.submission.isnot(None)
-    ).group_by(
-        PBLTaskProgress.user_id
-    ).all()
-    
-    submissions_dict = {row.user_id: row.submissions_count for row in submissions_query}
-    
-    # 5. 批量获取最后活跃时间（1次查询）
-    last_active_query = db.query(
-        PBLTaskProgress.user_id,
-        func.max(PBLTaskProgress.updated_at).label('last_active')
-    ).join(
-        PBLTask, PBLTaskProgress.task_id == PBLTask.id
-    ).join(
-        PBLUnit, PBLTask.unit_id == PBLUnit.id
-    ).filter(
-        PBLUnit.course_id == course.id,
-        PBLTaskProgress.user_id.in_(all_student_ids)
-    ).group_by(
-        PBLTaskProgress.user_id
-    ).all()
-    
-    last_active_dict = {row.user_id: row.last_active for row in last_active_query}
+    # === 优化策略：课程结构走快照缓存，学生进度批量查询 ===
+    structure = get_course_structure(db, course_id)
+    total_units = structure.total_units
+    matrix, stats = _collect_course_progress(db, structure, all_student_ids)
+    # 完成单元数、完成率、学习状态在矩阵上向量化计算
+    student_rows = matrix.student_rows()
 
-    # === 组装结果数据并应用状态筛选（内存计算） ===
+    # === 组装结果数据并应用状态筛选 ===
     all_results = []
     for member, user in all_members:
         student_id = member.student_id
-        
-        # 计算完成的单元数
-        completed_units = 0
-        student_progress = student_unit_progress.get(student_id, {})
-        
-        for unit_id, unit_info in unit_task_map.items():
-            task_count = unit_info['task_count']
-            if task_count == 0:
-                continue
-            
-            # 获取该学生该单元的进度
-            unit_progress = student_progress.get(unit_id, {})
-            completed_count = unit_progress.get('completed_count', 0)
-            
-            # 如果该单元的所有任务都完成，则单元完成
-            if completed_count >= task_count:
-                completed_units += 1
-        
-        # 计算完成率
-        completion_rate = 0
-        if total_units > 0:
-            completion_rate = int((completed_units / total_units) * 100)
-        
-        # 计算学习状态
-        learning_status = 'not_started'
-        if completion_rate == 100:
-            learning_status = 'completed'
-        elif completion_rate > 0:
-            learning_status = 'in_progress'
+        student_progress = stats[student_id]
+        completed_units, completion_rate, learning_status = student_rows[student_id]
         
         # 状态筛选
         if status and learning_status != status:
             continue
         
-        # 获取提交作业数
-        submissions_count = submissions_dict.get(student_id, 0)
-        
-        # 获取最后活跃时间
-        last_active = None
-        if student_id in last_active_dict:
-            last_active = last_active_dict[student_id].isoformat()
-        elif student_id in enrollments_dict:
-            last_active = enrollments_dict[student_id].updated_at.isoformat()
+        # 获取提交作业数和最后活跃时间
+        submissions_count = student_progress['submissions_count']
+        last_active = student_progress['last_active'].isoformat() if student_progress['last_active'] else None
         
         # 简化学习时长计算
         learning_hours = submissions_count * 2  # 简单估算：每个作业2小时
@@ -1879,12 +1579,155 @@ def get_class_progress(
     })
 
 
+# 批量查询学生进度详情的最大学生数（教师逐个批阅时预取前后学生）
+MAX_PREFETCH_STUDENTS = 20
+
+
+def _load_course_units(db: Session, course_id: int) -> List[Dict]:
+    """一条查询取出课程的全部单元及任务（按单元顺序、任务顺序）"""
+    rows = db.query(
+        PBLUnit.id, PBLUnit.title, PBLUnit.description,
+        PBLTask.id, PBLTask.title, PBLTask.type, PBLTask.is_required
+    ).outerjoin(
+        PBLTask, PBLTask.unit_id == PBLUnit.id
+    ).filter(
+        PBLUnit.course_id == course_id
+    ).order_by(
+        PBLUnit.order, PBLUnit.id, PBLTask.order, PBLTask.id
+    ).all()
+    
+    units = []
+    for unit_id, unit_title, unit_description, task_id, task_title, task_type, is_required in rows:
+        if not units or units[-1]['unit_id'] != unit_id:
+            units.append({'unit_id': unit_id, 'unit_title': unit_title, 'unit_description': unit_description, 'tasks': []})
+        if task_id is not None:
+            units[-1]['tasks'].append((task_id, task_title, task_type, is_required))
+    return units
+
+
+def _build_student_progress_details(db: Session, context: ClassContext, student_ids: List[int]) -> Dict[int, Dict]:
+    """
+    生成一批学生的学习进度详情
+    
+    班级成员 + 学生信息、课程结构（单元 + 任务）、这批学生在课程任务上的进度各一条查询，
+    查询条数与学生数、单元数无关；课程ID取自班级权限依赖中缓存的已发布课程。
+    
+    Returns:
+        {学生ID: 进度详情}，不在班级中的学生不包含在结果中
+    """
+    students = db.query(
+        User.id, User.name, User.real_name, User.student_number
+    ).join(
+        PBLClassMember, PBLClassMember.student_id == User.id
+    ).filter(
+        PBLClassMember.class_id == context.class_id,
+        PBLClassMember.student_id.in_(student_ids),
+        PBLClassMember.is_active == 1
+    ).all()
+    if not students:
+        return {}
+    
+    student_info = {
+        s.id: {'id': s.id, 'name': s.name or s.real_name, 'student_number': s.student_number}
+        for s in students
+    }
+    
+    if not context.course_ids:
+        return {
+            student_id: {
+                'student': info,
+                'overall': {
+                    'completion_rate': 0,
+                    'completed_units': 0,
+                    'total_units': 0,
+                    'learning_hours': 0,
+                    'submissions_count': 0
+                },
+                'units': []
+            }
+            for student_id, info in student_info.items()
+        }
+    
+    units = _load_course_units(db, context.course_ids[0])
+    task_ids = [task[0] for unit in units for task in unit['tasks']]
+    
+    # 进度记录：{学生ID: {任务ID: (状态, 成绩, 提交时间)}}，只取统计需要的列，不加载提交内容
+    progress_by_student: Dict[int, Dict] = defaultdict(dict)
+    submissions_by_student: Dict[int, int] = defaultdict(int)
+    if task_ids:
+        progress_rows = db.query(
+            PBLTaskProgress.user_id, PBLTaskProgress.task_id, PBLTaskProgress.status,
+            PBLTaskProgress.score, PBLTaskProgress.updated_at,
+            PBLTaskProgress.submission.isnot(None)
+        ).filter(
+            PBLTaskProgress.user_id.in_(list(student_info)),
+            PBLTaskProgress.task_id.in_(task_ids)
+        ).all()
+        for user_id, task_id, task_status, score, updated_at, has_submission in progress_rows:
+            progress_by_student[user_id][task_id] = (task_status, score, updated_at)
+            if has_submission:
+                submissions_by_student[user_id] += 1
+    
+    details = {}
+    for student_id, info in student_info.items():
+        progress_dict = progress_by_student.get(student_id, {})
+        completed_units = 0
+        units_detail = []
+        for unit in units:
+            task_progress_list = []
+            for task_id, task_title, task_type, is_required in unit['tasks']:
+                progress = progress_dict.get(task_id)
+                task_progress_list.append({
+                    'task_id': task_id,
+                    'task_title': task_title,
+                    'task_type': task_type,
+                    'is_required': is_required == 1,
+                    'status': progress[0] if progress else 'not_started',
+                    'score': progress[1] if progress else None,
+                    'submission_time': progress[2].isoformat() if progress and progress[2] else None
+                })
+            
+            # 判断单元是否完成
+            completed_tasks = len([tp for tp in task_progress_list if tp['status'] == 'completed'])
+            total_tasks = len(task_progress_list)
+            unit_completed = completed_tasks == total_tasks and total_tasks > 0
+            
+            if unit_completed:
+                completed_units += 1
+            
+            units_detail.append({
+                'unit_id': unit['unit_id'],
+                'unit_title': unit['unit_title'],
+                'unit_description': unit['unit_description'],
+                'completed_tasks': completed_tasks,
+                'total_tasks': total_tasks,
+                'completion_rate': int(completed_tasks / total_tasks * 100) if total_tasks > 0 else 0,
+                'is_completed': unit_completed,
+                'tasks': task_progress_list
+            })
+        
+        total_units = len(units)
+        total_submissions = submissions_by_student.get(student_id, 0)
+        details[student_id] = {
+            'student': info,
+            'overall': {
+                'completion_rate': int(completed_units / total_units * 100) if total_units > 0 else 0,
+                'completed_units': completed_units,
+                'total_units': total_units,
+                'learning_hours': total_submissions * 2,
+                'submissions_count': total_submissions
+            },
+            'units': units_detail
+        }
+    return details
+
+
 @router.get("/classes/{class_uuid}/students/{student_id}/progress")
 def get_student_progress(
     class_uuid: str,
     student_id: int,
     db: Session = Depends(get_db),
-    current_admin: Admin = Depends(get_current_admin)
+    context: ClassContext = Depends(get_class_context)
 ):
     """获取单个学生的学习进度详情
     
@@ -1893,153 +1736,47 @@ def get_student_progress(
     - 每个单元的完成情况
     - 每个任务的完成状态和成绩
     
-    响应速度：< 200ms
+    固定 3 条查询（成员信息、课程结构、任务进度），与单元数无关
     """
-    pbl_class = db.query(PBLClass).filter(PBLClass.uuid == class_uuid).first()
-    if not pbl_class:
-        return error_response(
-            message="班级不存在",
-            code=404,
-            status_code=status.HTTP_404_NOT_FOUND
-        )
-    
-    # 权限检查
-    if current_admin.role != 'platform_admin':
-        if pbl_class.school_id != current_admin.school_id:
-            return error_response(
-                message="无权限查看该班级",
-                code=403,
-                status_code=status.HTTP_403_FORBIDDEN
-            )
-    
-    # 检查学生是否在班级中
-    member = db.query(PBLClassMember).filter(
-        PBLClassMember.class_id == pbl_class.id,
-        PBLClassMember.student_id == student_id,
-        PBLClassMember.is_active == 1
-    ).first()
+    details = _build_student_progress_details(db, context, [student_id])
     
-    if not member:
+    if student_id not in details:
         return error_response(
             message="学生不在该班级中",
             code=404,
             status_code=status.HTTP_404_NOT_FOUND
         )
     
-    # 获取学生信息
-    user = db.query(User).filter(User.id == student_id).first()
-    
-    # 获取班级课程
-    courses = db.query(PBLCourse).filter(
-        PBLCourse.class_id == pbl_class.id,
-        PBLCourse.status == 'published'
-    ).all()
-    
-    if not courses:
-        return success_response(data={
-            'student': {
-                'id': user.id,
-                'name': user.name or user.real_name,
-                'student_number': user.student_number
-            },
-            'overall': {
-                'completion_rate': 0,
-                'completed_units': 0,
-                'total_units': 0,
-                'learning_hours': 0,
-                'submissions_count': 0
-            },
-            'units': []
-        })
-    
-    course = courses[0]
-    
-    # 获取所有单元及其任务
-    units_with_tasks = db.query(PBLUnit).filter(
-        PBLUnit.course_id == course.id
-    ).order_by(PBLUnit.order).all()
-    
-    total_units = len(units_with_tasks)
-    completed_units = 0
-    units_detail = []
+    return success_response(data=details[student_id])
+
+
+@router.get("/classes/{class_uuid}/students/progress/batch")
+def get_students_progress_batch(
+    class_uuid: str,
+    student_ids: List[int] = Query(..., description="学生ID，可重复指定，如 ?student_ids=1&student_ids=2"),
+    db: Session = Depends(get_db),
+    context: ClassContext = Depends(get_class_context)
+):
+    """批量获取学生的学习进度详情
     
-    for unit in units_with_tasks:
-        # 获取单元的所有任务
-        tasks = db.query(PBLTask).filter(
-            PBLTask.unit_id == unit.id
-        ).order_by(PBLTask.order).all()
-        
-        # 获取该学生在这些任务上的进度
-        task_ids = [t.id for t in tasks]
-        task_progress_list = []
-        
-        if task_ids:
-            progress_records = db.query(PBLTaskProgress).filter(
-                PBLTaskProgress.task_id.in_(task_ids),
-                PBLTaskProgress.user_id == student_id
-            ).all()
-            
-            progress_dict = {p.task_id: p for p in progress_records}
-            
-            for task in tasks:
-                progress = progress_dict.get(task.id)
-                task_progress_list.append({
-                    'task_id': task.id,
-                    'task_title': task.title,
-                    'task_type': task.type,
-                    'is_required': task.is_required == 1,
-                    'status': progress.status if progress else 'not_started',
-                    'score': progress.score if progress else None,
-                    'submission_time': progress.updated_at.isoformat() if progress and progress.updated_at else None
-                })
-        
-        # 判断单元是否完成
-        completed_tasks = len([tp for tp in task_progress_list if tp['status'] == 'completed'])
-        total_tasks = len(tasks)
-        unit_completed = completed_tasks == total_tasks and total_tasks > 0
-        
-        if unit_completed:
-            completed_units += 1
-        
-        units_detail.append({
-            'unit_id': unit.id,
-            'unit_title': unit.title,
-            'unit_description': unit.description,
-            'completed_tasks': completed_tasks,
-            'total_tasks': total_tasks,
-            'completion_rate': int(completed_tasks / total_tasks * 100) if total_tasks > 0 else 0,
-            'is_completed': unit_completed,
-            'tasks': task_progress_list
-        })
+    教师逐个查看/批阅学生时，前端在请求当前学生的同时带上前后几个学生，
+    一次返回，切换学生时不再发请求。查询条数与单个学生相同。
     
-    # 统计总体信息
-    total_submissions = db.query(func.count(PBLTaskProgress.id)).join(
-        PBLTask, PBLTaskProgress.task_id == PBLTask.id
-    ).join(
-        PBLUnit, PBLTask.unit_id == PBLUnit.id
-    ).filter(
-        PBLUnit.course_id == course.id,
-        PBLTaskProgress.user_id == student_id,
-        PBLTaskProgress.submission.isnot(None)
-    ).scalar() or 0
+    返回的 items 按传入顺序排列，不在班级中的学生放在 missing_student_ids 中
+    """
+    student_ids = list(dict.fromkeys(student_ids))
+    if len(student_ids) > MAX_PREFETCH_STUDENTS:
+        return error_response(
+            message=f"一次最多查询 {MAX_PREFETCH_STUDENTS} 名学生",
+            code=400,
+            status_code=status.HTTP_400_BAD_REQUEST
+        )
     
-    completion_rate = int(completed_units / total_units * 100) if total_units > 0 else 0
-    learning_hours = total_submissions * 2
+    details = _build_student_progress_details(db, context, student_ids)
     
     return success_response(data={
-        'student': {
-            'id': user.id,
-            'name': user.name or user.real_name,
-            'student_number': user.student_number
-        },
-        'overall': {
-            'completion_rate': completion_rate,
-            'completed_units': completed_units,
-            'total_units': total_units,
-            'learning_hours': learning_hours,
-            'submissions_count': total_submissions
-        },
-        'units': units_detail
+        'items': [details[student_id] for student_id in student_ids if student_id in details],
+        'missing_student_ids': [student_id for student_id in student_ids if student_id not in details]
     })
 
 
@@ -2047,7 +1784,7 @@ def get_student_progress(
 def get_class_progress_by_units(
     class_uuid: str,
     db: Session = Depends(get_db),
-    current_admin: Admin = Depends(get_current_admin)
+    context: ClassContext = Depends(get_class_context)
 ):
     """获取班级的单元列表（极简版，无统计）
     
@@ -2056,50 +1793,21 @@ def get_class_progress_by_units(
     - 响应速度：< 50ms
     - 点击单元时再查询该单元详情
     """
-    pbl_class = db.query(PBLClass).filter(PBLClass.uuid == class_uuid).first()
-    if not pbl_class:
-        return error_response(
-            message="班级不存在",
-            code=404,
-            status_code=status.HTTP_404_NOT_FOUND
-        )
-    
-    # 权限检查
-    if current_admin.role != 'platform_admin':
-        if pbl_class.school_id != current_admin.school_id:
-            return error_response(
-                message="无权限查看该班级",
-                code=403,
-                status_code=status.HTTP_403_FORBIDDEN
-            )
-    
-    # 获取班级的课程
-    courses = db.query(PBLCourse).filter(
-        PBLCourse.class_id == pbl_class.id,
-        PBLCourse.status == 'published'
-    ).all()
+    # 班级已发布课程（权限依赖中已缓存）
+    courses = context.course_ids
     
     if not courses:
         return success_response(data=[])
     
-    course = courses[0]  # 假设一个班级对应一个主课程
+    course_id = courses[0]  # 假设一个班级对应一个主课程
     
     # 获取课程的所有单元（只查询基本信息）
     units = db.query(PBLUnit).filter(
-        PBLUnit.course_id == course.id
+        PBLUnit.course_id == course_id
     ).order_by(PBLUnit.order).all()
     
-    # 批量获取每个单元的任务数（1次查询）
-    unit_task_counts = db.query(
-        PBLTask.unit_id,
-        func.count(PBLTask.id).label('task_count')
-    ).filter(
-        PBLTask.unit_id.in_([u.id for u in units])
-    ).group_by(
-        PBLTask.unit_id
-    ).all()
-    
-    task_count_dict = {row.unit_id: row.task_count for row in unit_task_counts}
+    # 每个单元的任务数取自课程结构快照
+    structure = get_course_structure(db, course_id)
     
     # 构建单元列表（无统计）
     unit_list = []
@@ -2110,10 +1818,10 @@ def get_class_progress_by_units(
             'title': unit.title,
             'description': unit.description,
             'order': unit.order,
-            'task_count': task_count_dict.get(unit.id, 0)
+            'task_count': structure.task_count(unit.id)
         })
     
-    logger.info(f"获取单元列表 - 班级: {class_uuid}, 单元数: {len(unit_list)}, 查询次数: 3次")
+    logger.info(f"获取单元列表 - 班级: {class_uuid}, 单元数: {len(unit_list)}")
     return success_response(data=unit_list)
 
 
@@ -2123,7 +1831,7 @@ def get_unit_progress_detail(
     unit_id: int,
     search: Optional[str] = Query(None, description="搜索关键词（姓名或学号）"),
     db: Session = Depends(get_db),
-    current_admin: Admin = Depends(get_current_admin)
+    context: ClassContext = Depends(get_class_context)
 ):
     """获取指定单元的学生学习进度详情（极简优化版）
     
@@ -2134,23 +1842,6 @@ def get_unit_progress_detail(
     
     响应速度：< 300ms
     """
-    pbl_class = db.query(PBLClass).filter(PBLClass.uuid == class_uuid).first()
-    if not pbl_class:
-        return error_response(
-            message="班级不存在",
-            code=404,
-            status_code=status.HTTP_404_NOT_FOUND
-        )
-    
-    # 权限检查
-    if current_admin.role != 'platform_admin':
-        if pbl_class.school_id != current_admin.school_id:
-            return error_response(
-                message="无权限查看该班级",
-                code=403,
-                status_code=status.HTTP_403_FORBIDDEN
-            )
-    
     # 获取单元信息
     unit = db.query(PBLUnit).filter(PBLUnit.id == unit_id).first()
     if not unit:
@@ -2183,7 +1874,7 @@ def get_unit_progress_detail(
     members_query = db.query(PBLClassMember, User).join(
         User, PBLClassMember.student_id == User.id
     ).filter(
-        PBLClassMember.class_id == pbl_class.id,
+        PBLClassMember.class_id == context.class_id,
         PBLClassMember.is_active == 1
     )
     
@@ -2303,49 +1994,82 @@ def get_unit_progress_detail(
     })
 
 
+# 导出格式
+EXPORT_FORMATS = ('csv', 'xlsx')
+
+
+def _export_file_response(export_format: str, filename_prefix: str, data: List[Dict], csv_exporter, xlsx_exporter):
+    """按导出格式返回文件：CSV 一次返回，XLSX 逐行流式输出"""
+    from fastapi.responses import Response, StreamingResponse
+    from urllib.parse import quote
+    from ...utils.export import generate_export_filename
+    
+    filename = generate_export_filename(filename_prefix, extension=export_format)
+    # 文件名含班级名、任务名等中文，响应头只能是 latin-1，按 RFC 5987 编码
+    headers = {
+        'Content-Disposition': f"attachment; filename*=UTF-8''{quote(filename)}"
+    }
+
+    if export_format == 'xlsx':
+        return StreamingResponse(
+            xlsx_exporter(data),
+            media_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+            headers=headers
+        )
+
+    # 返回 CSV 文件
+    return Response(
+        content=csv_exporter(data).encode('utf-8-sig'),  # 使用 BOM 以支持 Excel 正确显示中文
+        media_type='text/csv',
+        headers=headers
+    )
+
+
+def _submit_export_job(db: Session, context: ClassContext, job_type: str, params: Dict, idempotency_key: Optional[str]):
+    """导出提交为后台任务，结果文件通过任务下载接口获取"""
+    job, created = submit_job(
+        db, job_type, context.admin,
+        params=params,
+        idempotency_key=idempotency_key,
+        school_id=context.school_id
+    )
+    return job_submitted_response(job, created)
+
+
+def _invalid_export_format():
+    return error_response(
+        message=f"不支持的导出格式，可选：{'、'.join(EXPORT_FORMATS)}",
+        code=400,
+        status_code=status.HTTP_400_BAD_REQUEST
+    )
+
+
 @router.get("/classes/{class_uuid}/progress/export")
 def export_class_progress(
     class_uuid: str,
+    export_format: str = Query('csv', alias='format', description="导出格式：csv 或 xlsx"),
+    background: bool = Query(False, description="是否作为后台任务执行（立即返回任务ID，完成后下载）"),
+    idempotency_key: Optional[str] = Depends(get_idempotency_key),
     db: Session = Depends(get_db),
-    current_admin: Admin = Depends(get_current_admin)
+    context: ClassContext = Depends(get_class_context)
 ):
-    """导出班级学习进度报表"""
-    from fastapi.responses import Response
-    from ...utils.export import export_progress_to_csv, generate_export_filename
+    """导出班级学习进度报表（CSV 或 XLSX）"""
+    from ...utils.export import export_progress_to_csv, export_progress_to_xlsx
     
-    pbl_class = db.query(PBLClass).filter(PBLClass.uuid == class_uuid).first()
-    if not pbl_class:
-        return error_response(
-            message="班级不存在",
-            code=404,
-            status_code=status.HTTP_404_NOT_FOUND
-        )
+    if export_format not in EXPORT_FORMATS:
+        return _invalid_export_format()
     
-    # 权限检查
-    if current_admin.role != 'platform_admin':
-        if pbl_class.school_id != current_admin.school_id:
-            return error_response(
-                message="无权限操作",
-                code=403,
-                status_code=status.HTTP_403_FORBIDDEN
-            )
+    if background:
+        return _submit_export_job(
+            db, context, 'class_progress_export', {'class_uuid': class_uuid, 'format': export_format}, idempotency_key
+        )
     
     # 获取进度数据（内部调用）
     progress_data = _get_class_progress_data(class_uuid, db)
     
-    # 导出为 CSV
-    csv_content = export_progress_to_csv(progress_data)
-    
-    # 生成文件名
-    filename = generate_export_filename(f'{pbl_class.name}_progress')
-    
-    # 返回 CSV 文件
-    return Response(
-        content=csv_content.encode('utf-8-sig'),  # 使用 BOM 以支持 Excel 正确显示中文
-        media_type='text/csv',
-        headers={
-            'Content-Disposition': f'attachment; filename="{filename}"'
-        }
+    return _export_file_response(
+        export_format, f'{context.class_name}_progress', progress_data,
+        export_progress_to_csv, export_progress_to_xlsx
     )
 
 
@@ -2375,74 +2099,18 @@ def _get_class_progress_data(class_uuid: str, db: Session) -> List[Dict]:
     result = []
     course = courses[0]  # 假设一个班级对应一个主课程
     
-    # 统计单元数量
-    total_units = db.query(func.count(PBLUnit.id)).filter(
-        PBLUnit.course_id == course.id
-    ).scalar() or 0
+    # 课程结构走快照缓存，学生进度批量查询（不再逐学生、逐任务查询）
+    structure = get_course_structure(db, course.id)
+    total_units = structure.total_units
+    matrix, stats = _collect_course_progress(db, structure, [member.student_id for member, _ in members])
+    student_rows = matrix.student_rows()
     
     for member, user in members:
-        # 统计已完成单元
-        completed_units = 0
-        if total_units > 0:
-            units = db.query(PBLUnit).filter(PBLUnit.course_id == course.id).all()
-            for unit in units:
-                tasks = db.query(PBLTask).filter(PBLTask.unit_id == unit.id).all()
-                if not tasks:
-                    continue
-                
-                all_completed = True
-                for task in tasks:
-                    task_progress = db.query(PBLTaskProgress).filter(
-                        PBLTaskProgress.task_id == task.id,
-                        PBLTaskProgress.user_id == member.student_id
-                    ).first()
-                    if not task_progress or task_progress.status != 'completed':
-                        all_completed = False
-                        break
-                
-                if all_completed:
-                    completed_units += 1
-        
-        # 计算完成率
-        completion_rate = 0
-        if total_units > 0:
-            completion_rate = int((completed_units / total_units) * 100)
-        
-        # 计算学习状态
-        learning_status = 'not_started'
-        if completion_rate == 100:
-            learning_status = 'completed'
-        elif completion_rate > 0:
-            learning_status = 'in_progress'
+        student_progress = stats[member.student_id]
+        completed_units, completion_rate, learning_status = student_rows[member.student_id]
         
-        # 统计提交作业数
-        submissions_count = db.query(func.count(PBLTaskProgress.id)).filter(
-            PBLTaskProgress.user_id == member.student_id,
-            PBLTaskProgress.submission.isnot(None)
-        ).join(
-            PBLTask, PBLTaskProgress.task_id == PBLTask.id
-        ).join(
-            PBLUnit, PBLTask.unit_id == PBLUnit.id
-        ).filter(
-            PBLUnit.course_id == course.id
-        ).scalar() or 0
-        
-        # 获取最后活跃时间
-        last_progress = db.query(PBLTaskProgress).filter(
-            PBLTaskProgress.user_id == member.student_id
-        ).join(
-            PBLTask, PBLTaskProgress.task_id == PBLTask.id
-        ).join(
-            PBLUnit, PBLTask.unit_id == PBLUnit.id
-        ).filter(
-            PBLUnit.course_id == course.id
-        ).order_by(PBLTaskProgress.updated_at.desc()).first()
-        
-        last_active = None
-        if last_progress:
-            last_active = last_progress.updated_at.isoformat()
-        elif enrollment:
-            last_active = enrollment.updated_at.isoformat()
+        submissions_count = student_progress['submissions_count']
+        last_active = student_progress['last_active'].isoformat() if student_progress['last_active'] else None
         
         learning_hours = submissions_count * 2  # 简单估算
         
@@ -2468,29 +2136,12 @@ def _get_class_progress_data(class_uuid: str, db: Session) -> List[Dict]:
 def get_class_homework(
     class_uuid: str,
     db: Session = Depends(get_db),
-    current_admin: Admin = Depends(get_current_admin)
+    context: ClassContext = Depends(get_class_context)
 ):
     """获取班级作业列表（学生提交情况）"""
-    pbl_class = db.query(PBLClass).filter(PBLClass.uuid == class_uuid).first()
-    if not pbl_class:
-        return error_response(
-            message="班级不存在",
-            code=404,
-            status_code=status.HTTP_404_NOT_FOUND
-        )
-    
-    # 权限检查
-    if current_admin.role != 'platform_admin':
-        if pbl_class.school_id != current_admin.school_id:
-            return error_response(
-                message="无权限查看该班级",
-                code=403,
-                status_code=status.HTTP_403_FORBIDDEN
-            )
-    
     # 获取班级的课程
     courses = db.query(PBLCourse).filter(
-        PBLCourse.class_id == pbl_class.id,
+        PBLCourse.class_id == context.class_id,
         PBLCourse.status == 'published'
     ).all()
     
@@ -2499,7 +2150,7 @@ def get_class_homework(
     
     # 获取班级成员数量
     total_students = db.query(func.count(PBLClassMember.id)).filter(
-        PBLClassMember.class_id == pbl_class.id,
+        PBLClassMember.class_id == context.class_id,
         PBLClassMember.is_active == 1
     ).scalar() or 0
     
@@ -2559,46 +2210,29 @@ def get_class_homework(
 @router.get("/classes/{class_uuid}/homework/export")
 def export_class_homework(
     class_uuid: str,
+    export_format: str = Query('csv', alias='format', description="导出格式：csv 或 xlsx"),
+    background: bool = Query(False, description="是否作为后台任务执行（立即返回任务ID，完成后下载）"),
+    idempotency_key: Optional[str] = Depends(get_idempotency_key),
     db: Session = Depends(get_db),
-    current_admin: Admin = Depends(get_current_admin)
+    context: ClassContext = Depends(get_class_context)
 ):
-    """导出班级作业列表"""
-    from fastapi.responses import Response
-    from ...utils.export import export_homework_to_csv, generate_export_filename
+    """导出班级作业列表（CSV 或 XLSX）"""
+    from ...utils.export import export_homework_to_csv, export_homework_to_xlsx
     
-    pbl_class = db.query(PBLClass).filter(PBLClass.uuid == class_uuid).first()
-    if not pbl_class:
-        return error_response(
-            message="班级不存在",
-            code=404,
-            status_code=status.HTTP_404_NOT_FOUND
-        )
+    if export_format not in EXPORT_FORMATS:
+        return _invalid_export_format()
     
-    # 权限检查
-    if current_admin.role != 'platform_admin':
-        if pbl_class.school_id != current_admin.school_id:
-            return error_response(
-                message="无权限操作",
-                code=403,
-                status_code=status.HTTP_403_FORBIDDEN
-            )
+    if background:
+        return _submit_export_job(
+            db, context, 'class_homework_export', {'class_uuid': class_uuid, 'format': export_format}, idempotency_key
+        )
     
     # 获取作业数据（内部调用）
     homework_data = _get_class_homework_data(class_uuid, db)
     
-    # 导出为 CSV
-    csv_content = export_homework_to_csv(homework_data)
-    
-    # 生成文件名
-    filename = generate_export_filename(f'{pbl_class.name}_homework')
-    
-    # 返回 CSV 文件
-    return Response(
-        content=csv_content.encode('utf-8-sig'),
-        media_type='text/csv',
-        headers={
-            'Content-Disposition': f'attachment; filename="{filename}"'
-        }
+    return _export_file_response(
+        export_format, f'{context.class_name}_homework', homework_data,
+        export_homework_to_csv, export_homework_to_xlsx
     )
 
 
@@ -2675,31 +2309,95 @@ def _get_class_homework_data(class_uuid: str, db: Session) -> List[Dict]:
     return result
 
 
+def _load_task_submissions(db: Session, class_id: int, task_id: int, order_by_number: bool = False) -> List[Dict]:
+    """
+    批量获取班级学生对某个任务的提交情况（固定 3 次查询）
+    
+    列表中不返回提交内容（submission JSON 可能很大），只返回 has_submission，
+    内容通过 get_homework_submission_payload 单独获取
+    """
+    members_query = db.query(PBLClassMember.student_id, User).join(
+        User, PBLClassMember.student_id == User.id
+    ).filter(
+        PBLClassMember.class_id == class_id,
+        PBLClassMember.is_active == 1
+    )
+    if order_by_number:
+        members_query = members_query.order_by(User.student_number)
+    members = members_query.all()
+    if not members:
+        return []
+    
+    # 一次查出全部提交记录，submission 延迟加载
+    progress_map = {
+        progress.user_id: (progress, has_submission)
+        for progress, has_submission in db.query(
+            PBLTaskProgress,
+            PBLTaskProgress.submission.isnot(None).label('has_submission')
+        ).options(
+            *summary_options(PBLTaskProgress)
+        ).filter(
+            PBLTaskProgress.task_id == task_id,
+            PBLTaskProgress.user_id.in_([student_id for student_id, _ in members])
+        )
+    }
+    
+    # 批量获取评分人姓名
+    grader_ids = {progress.graded_by for progress, _ in progress_map.values() if progress.graded_by}
+    grader_names = {}
+    if grader_ids:
+        grader_names = {
+            grader_id: name or real_name
+            for grader_id, name, real_name in db.query(User.id, User.name, User.real_name).filter(
+                User.id.in_(grader_ids)
+            )
+        }
+    
+    result = []
+    for student_id, user in members:
+        item = {
+            'submission_id': None,
+            'student_id': user.id,
+            'student_name': user.name or user.real_name,
+            'student_number': user.student_number or '',
+            'status': 'pending',
+            'has_submission': False,
+            'score': None,
+            'grade': None,
+            'feedback': None,
+            'graded_by': None,
+            'grader_name': None,
+            'graded_at': None,
+            'submitted_at': None
+        }
+        if student_id in progress_map:
+            progress, has_submission = progress_map[student_id]
+            submitted_at = progress.submitted_at or progress.updated_at
+            item.update({
+                'submission_id': progress.id,
+                'status': progress.status,
+                'has_submission': bool(has_submission),
+                'score': progress.score,
+                'grade': getattr(progress, 'grade', None),
+                'feedback': progress.feedback,
+                'graded_by': progress.graded_by,
+                'grader_name': grader_names.get(progress.graded_by),
+                'graded_at': progress.graded_at.isoformat() if progress.graded_at else None,
+                'submitted_at': submitted_at.isoformat() if submitted_at else None
+            })
+        result.append(item)
+    
+    return result
+
+
 @router.get("/classes/{class_uuid}/homework/{task_id}/submissions")
 def get_homework_submissions(
     class_uuid: str,
     task_id: int,
     db: Session = Depends(get_db),
-    current_admin: Admin = Depends(get_current_admin)
+    context: ClassContext = Depends(get_class_context)
 ):
     """获取作业提交详情"""
-    pbl_class = db.query(PBLClass).filter(PBLClass.uuid == class_uuid).first()
-    if not pbl_class:
-        return error_response(
-            message="班级不存在",
-            code=404,
-            status_code=status.HTTP_404_NOT_FOUND
-        )
-    
-    # 权限检查
-    if current_admin.role != 'platform_admin':
-        if pbl_class.school_id != current_admin.school_id:
-            return error_response(
-                message="无权限查看该班级",
-                code=403,
-                status_code=status.HTTP_403_FORBIDDEN
-            )
-    
     # 获取任务
     task = db.query(PBLTask).filter(PBLTask.id == task_id).first()
     if not task:
@@ -2709,60 +2407,7 @@ def get_homework_submissions(
             status_code=status.HTTP_404_NOT_FOUND
         )
     
-    # 获取班级成员
-    members = db.query(PBLClassMember, User).join(
-        User, PBLClassMember.student_id == User.id
-    ).filter(
-        PBLClassMember.class_id == pbl_class.id,
-        PBLClassMember.is_active == 1
-    ).all()
-    
-    result = []
-    for member, user in members:
-        # 获取提交记录
-        progress = db.query(PBLTaskProgress).filter(
-            PBLTaskProgress.task_id == task_id,
-            PBLTaskProgress.user_id == member.student_id
-        ).first()
-        
-        if progress:
-            # 获取评分人信息
-            grader_name = None
-            if progress.graded_by:
-                grader = db.query(User).filter(User.id == progress.graded_by).first()
-                if grader:
-                    grader_name = grader.name or grader.real_name
-            
-            result.append({
-                'submission_id': progress.id,
-                'student_id': user.id,
-                'student_name': user.name or user.real_name,
-                'student_number': user.student_number or '',
-                'status': progress.status,
-                'submission': progress.submission,
-                'score': progress.score,
-                'feedback': progress.feedback,
-                'graded_by': progress.graded_by,
-                'grader_name': grader_name,
-                'graded_at': progress.graded_at.isoformat() if progress.graded_at else None,
-                'submitted_at': progress.updated_at.isoformat() if progress.updated_at else None
-            })
-        else:
-            # 未提交
-            result.append({
-                'submission_id': None,
-                'student_id': user.id,
-                'student_name': user.name or user.real_name,
-                'student_number': user.student_number or '',
-                'status': 'pending',
-                'submission': None,
-                'score': None,
-                'feedback': None,
-                'graded_by': None,
-                'grader_name': None,
-                'graded_at': None,
-                'submitted_at': None
-            })
+    result = _load_task_submissions(db, context.class_id, task_id)
     
     return success_response(data=result)
 
@@ -2771,29 +2416,17 @@ def get_homework_submissions(
 def export_homework_submissions(
     class_uuid: str,
     task_id: int,
+    export_format: str = Query('csv', alias='format', description="导出格式：csv 或 xlsx"),
+    background: bool = Query(False, description="是否作为后台任务执行（立即返回任务ID，完成后下载）"),
+    idempotency_key: Optional[str] = Depends(get_idempotency_key),
     db: Session = Depends(get_db),
-    current_admin: Admin = Depends(get_current_admin)
+    context: ClassContext = Depends(get_class_context)
 ):
-    """导出作业提交详情"""
-    from fastapi.responses import Response
-    from ...utils.export import export_submissions_to_csv, generate_export_filename
+    """导出作业提交详情（CSV 或 XLSX）"""
+    from ...utils.export import export_submissions_to_csv, export_submissions_to_xlsx
     
-    pbl_class = db.query(PBLClass).filter(PBLClass.uuid == class_uuid).first()
-    if not pbl_class:
-        return error_response(
-            message="班级不存在",
-            code=404,
-            status_code=status.HTTP_404_NOT_FOUND
-        )
-    
-    # 权限检查
-    if current_admin.role != 'platform_admin':
-        if pbl_class.school_id != current_admin.school_id:
-            return error_response(
-                message="无权限操作",
-                code=403,
-                status_code=status.HTTP_403_FORBIDDEN
-            )
+    if export_format not in EXPORT_FORMATS:
+        return _invalid_export_format()
     
     # 获取任务
     task = db.query(PBLTask).filter(PBLTask.id == task_id).first()
@@ -2804,22 +2437,19 @@ def export_homework_submissions(
             status_code=status.HTTP_404_NOT_FOUND
         )
     
+    if background:
+        return _submit_export_job(
+            db, context, 'homework_submissions_export',
+            {'class_uuid': class_uuid, 'task_id': task_id, 'format': export_format},
+            idempotency_key
+        )
+    
     # 获取提交数据
     submissions_data = _get_homework_submissions_data(class_uuid, task_id, db)
     
-    # 导出为 CSV
-    csv_content = export_submissions_to_csv(submissions_data)
-    
-    # 生成文件名
-    filename = generate_export_filename(f'{task.title}_submissions')
-    
-    # 返回 CSV 文件
-    return Response(
-        content=csv_content.encode('utf-8-sig'),
-        media_type='text/csv',
-        headers={
-            'Content-Disposition': f'attachment; filename="{filename}"'
-        }
+    return _export_file_response(
+        export_format, f'{task.title}_submissions', submissions_data,
+        export_submissions_to_csv, export_submissions_to_xlsx
     )
 
 
@@ -2829,62 +2459,46 @@ def _get_homework_submissions_data(class_uuid: str, task_id: int, db: Session) -
     if not pbl_class:
         return []
     
-    # 获取班级成员
-    members = db.query(PBLClassMember, User).join(
-        User, PBLClassMember.student_id == User.id
+    return _load_task_submissions(db, pbl_class.id, task_id)
+
+
+@router.get("/classes/{class_uuid}/homework/submissions/{submission_id}")
+def get_homework_submission_payload(
+    class_uuid: str,
+    submission_id: int,
+    db: Session = Depends(get_db),
+    context: ClassContext = Depends(get_class_context)
+):
+    """获取单个作业的提交内容（列表接口不返回 submission，查看时单独获取）"""
+    # 只返回本班学生的提交
+    row = db.query(
+        PBLTaskProgress.id,
+        PBLTaskProgress.task_id,
+        PBLTaskProgress.user_id,
+        PBLTaskProgress.submission
+    ).join(
+        PBLClassMember, and_(
+            PBLClassMember.student_id == PBLTaskProgress.user_id,
+            PBLClassMember.class_id == context.class_id,
+            PBLClassMember.is_active == 1
+        )
     ).filter(
-        PBLClassMember.class_id == pbl_class.id,
-        PBLClassMember.is_active == 1
-    ).all()
+        PBLTaskProgress.id == submission_id
+    ).first()
     
-    result = []
-    for member, user in members:
-        # 获取提交记录
-        progress = db.query(PBLTaskProgress).filter(
-            PBLTaskProgress.task_id == task_id,
-            PBLTaskProgress.user_id == member.student_id
-        ).first()
-        
-        if progress:
-            # 获取评分人信息
-            grader_name = None
-            if progress.graded_by:
-                grader = db.query(User).filter(User.id == progress.graded_by).first()
-                if grader:
-                    grader_name = grader.name or grader.real_name
-            
-            result.append({
-                'submission_id': progress.id,
-                'student_id': user.id,
-                'student_name': user.name or user.real_name,
-                'student_number': user.student_number or '',
-                'status': progress.status,
-                'submission': progress.submission,
-                'score': progress.score,
-                'feedback': progress.feedback,
-                'graded_by': progress.graded_by,
-                'grader_name': grader_name,
-                'graded_at': progress.graded_at.isoformat() if progress.graded_at else None,
-                'submitted_at': progress.updated_at.isoformat() if progress.updated_at else None
-            })
-        else:
-            # 未提交
-            result.append({
-                'submission_id': None,
-                'student_id': user.id,
-                'student_name': user.name or user.real_name,
-                'student_number': user.student_number or '',
-                'status': 'pending',
-                'submission': None,
-                'score': None,
-                'feedback': None,
-                'graded_by': None,
-                'grader_name': None,
-                'graded_at': None,
-                'submitted_at': None
-            })
+    if not row:
+        return error_response(
+            message="提交记录不存在",
+            code=404,
+            status_code=status.HTTP_404_NOT_FOUND
+        )
     
-    return result
+    return success_response(data={
+        'submission_id': row.id,
+        'task_id': row.task_id,
+        'student_id': row.user_id,
+        'submission': row.submission
+    })
 
 
 @router.put("/classes/{class_uuid}/homework/submissions/{submission_id}/review")
@@ -2893,26 +2507,10 @@ def review_homework_submission(
     submission_id: int,
     review_data: TaskReview,
     db: Session = Depends(get_db),
-    current_admin: Admin = Depends(get_current_admin)
+    current_admin: Admin = Depends(get_current_admin),
+    context: ClassContext = Depends(get_class_context)
 ):
     """批阅作业"""
-    pbl_class = db.query(PBLClass).filter(PBLClass.uuid == class_uuid).first()
-    if not pbl_class:
-        return error_response(
-            message="班级不存在",
-            code=404,
-            status_code=status.HTTP_404_NOT_FOUND
-        )
-    
-    # 权限检查
-    if current_admin.role != 'platform_admin':
-        if pbl_class.school_id != current_admin.school_id:
-            return error_response(
-                message="无权限操作",
-                code=403,
-                status_code=status.HTTP_403_FORBIDDEN
-            )
-    
     # 获取提交记录
     progress = db.query(PBLTaskProgress).filter(
         PBLTaskProgress.id == submission_id
@@ -2925,6 +2523,9 @@ def review_homework_submission(
             status_code=status.HTTP_404_NOT_FOUND
         )
     
+    previous_status = progress.status
+    previous_graded_at = progress.graded_at
+    
     # 更新评分和反馈
     if review_data.score is not None:
         progress.score = review_data.score
@@ -2943,6 +2544,25 @@ def review_homework_submission(
     
     logger.info(f"批阅作业 - 提交ID: {submission_id}, 评分: {review_data.score}, 评阅人: {current_admin.username}")
     
+    # 刷新学生成长档案（重新评分时原评分所在学年同样需要刷新）
+    portfolio_refresher.mark(progress.user_id, progress.graded_at)
+    if previous_graded_at:
+        portfolio_refresher.mark(progress.user_id, previous_graded_at)
+    
+    # 推送给该班级的其他看板（不含评语）
+    publish_class_event(context.class_id, EVENT_HOMEWORK_REVIEWED, {
+        'submission_id': progress.id,
+        'task_id': progress.task_id,
+        'student_id': progress.user_id,
+        'score': progress.score,
+        'grade': getattr(progress, 'grade', None),
+        'status': progress.status,
+        'previous_status': previous_status,
+        'graded_by': current_admin.id,
+        'graded_by_name': current_admin.full_name,
+        'graded_at': progress.graded_at
+    })
+    
     return success_response(
         data={
             'submission_id': progress.id,
@@ -2961,36 +2581,16 @@ def review_homework_submission(
 def get_homework_units(
     class_uuid: str,
     db: Session = Depends(get_db),
-    current_admin: Admin = Depends(get_current_admin)
+    context: ClassContext = Depends(get_class_context)
 ):
     """获取班级作业单元列表（极速加载）"""
-    pbl_class = db.query(PBLClass).filter(PBLClass.uuid == class_uuid).first()
-    if not pbl_class:
-        return error_response(
-            message="班级不存在",
-            code=404,
-            status_code=status.HTTP_404_NOT_FOUND
-        )
-    
-    # 权限检查
-    if current_admin.role != 'platform_admin':
-        if pbl_class.school_id != current_admin.school_id:
-            return error_response(
-                message="无权限查看该班级",
-                code=403,
-                status_code=status.HTTP_403_FORBIDDEN
-            )
-    
-    # 获取班级的课程
-    courses = db.query(PBLCourse).filter(
-        PBLCourse.class_id == pbl_class.id,
-        PBLCourse.status == 'published'
-    ).all()
+    # 班级已发布课程（权限依赖中已缓存）
+    courses = context.course_ids
     
     if not courses:
         return success_response(data=[])
     
-    course_ids = [course.id for course in courses]
+    course_ids = list(courses)
     
     # 获取所有单元及其作业数量
     units_data = db.query(
@@ -3027,26 +2627,9 @@ def get_homework_unit_detail(
     class_uuid: str,
     unit_id: int,
     db: Session = Depends(get_db),
-    current_admin: Admin = Depends(get_current_admin)
+    context: ClassContext = Depends(get_class_context)
 ):
     """获取单元作业详情（按需加载）"""
-    pbl_class = db.query(PBLClass).filter(PBLClass.uuid == class_uuid).first()
-    if not pbl_class:
-        return error_response(
-            message="班级不存在",
-            code=404,
-            status_code=status.HTTP_404_NOT_FOUND
-        )
-    
-    # 权限检查
-    if current_admin.role != 'platform_admin':
-        if pbl_class.school_id != current_admin.school_id:
-            return error_response(
-                message="无权限查看该班级",
-                code=403,
-                status_code=status.HTTP_403_FORBIDDEN
-            )
-    
     # 获取单元信息
     unit = db.query(PBLUnit).filter(PBLUnit.id == unit_id).first()
     if not unit:
@@ -3058,7 +2641,7 @@ def get_homework_unit_detail(
     
     # 获取班级成员数量
     total_students = db.query(func.count(PBLClassMember.id)).filter(
-        PBLClassMember.class_id == pbl_class.id,
+        PBLClassMember.class_id == context.class_id,
         PBLClassMember.is_active == 1
     ).scalar() or 0
     
@@ -3125,26 +2708,9 @@ def get_task_submissions_for_grading(
     class_uuid: str,
     task_id: int,
     db: Session = Depends(get_db),
-    current_admin: Admin = Depends(get_current_admin)
+    context: ClassContext = Depends(get_class_context)
 ):
     """获取作业提交列表（用于批改）"""
-    pbl_class = db.query(PBLClass).filter(PBLClass.uuid == class_uuid).first()
-    if not pbl_class:
-        return error_response(
-            message="班级不存在",
-            code=404,
-            status_code=status.HTTP_404_NOT_FOUND
-        )
-    
-    # 权限检查
-    if current_admin.role != 'platform_admin':
-        if pbl_class.school_id != current_admin.school_id:
-            return error_response(
-                message="无权限查看该班级",
-                code=403,
-                status_code=status.HTTP_403_FORBIDDEN
-            )
-    
     # 获取任务信息
     task = db.query(PBLTask).filter(PBLTask.id == task_id).first()
     if not task:
@@ -3154,62 +2720,8 @@ def get_task_submissions_for_grading(
             status_code=status.HTTP_404_NOT_FOUND
         )
     
-    # 获取班级成员及其提交情况
-    members = db.query(PBLClassMember, User).join(
-        User, PBLClassMember.student_id == User.id
-    ).filter(
-        PBLClassMember.class_id == pbl_class.id,
-        PBLClassMember.is_active == 1
-    ).order_by(User.student_number).all()
-    
-    result = []
-    for member, user in members:
-        # 获取提交记录
-        progress = db.query(PBLTaskProgress).filter(
-            PBLTaskProgress.task_id == task_id,
-            PBLTaskProgress.user_id == member.student_id
-        ).first()
-        
-        if progress:
-            # 获取评分人信息
-            grader_name = None
-            if progress.graded_by:
-                grader = db.query(User).filter(User.id == progress.graded_by).first()
-                if grader:
-                    grader_name = grader.name or grader.real_name
-            
-            result.append({
-                'submission_id': progress.id,
-                'student_id': user.id,
-                'student_name': user.name or user.real_name,
-                'student_number': user.student_number or '',
-                'status': progress.status,
-                'submission': progress.submission,
-                'score': progress.score,
-                'grade': getattr(progress, 'grade', None),
-                'feedback': progress.feedback,
-                'graded_by': progress.graded_by,
-                'grader_name': grader_name,
-                'graded_at': progress.graded_at.isoformat() if progress.graded_at else None,
-                'submitted_at': progress.submitted_at.isoformat() if progress.submitted_at else (progress.updated_at.isoformat() if progress.updated_at else None)
-            })
-        else:
-            # 未提交
-            result.append({
-                'submission_id': None,
-                'student_id': user.id,
-                'student_name': user.name or user.real_name,
-                'student_number': user.student_number or '',
-                'status': 'pending',
-                'submission': None,
-                'score': None,
-                'grade': None,
-                'feedback': None,
-                'graded_by': None,
-                'grader_name': None,
-                'graded_at': None,
-                'submitted_at': None
-            })
+    # 获取班级成员及其提交情况（提交内容按需单独获取）
+    result = _load_task_submissions(db, context.class_id, task_id, order_by_number=True)
     
     return success_response(data={
         'task': {
@@ -3228,50 +2740,114 @@ def get_feedback_templates(
     db: Session = Depends(get_db),
     current_admin: Admin = Depends(get_current_admin)
 ):
-    """获取评语模板列表"""
-    from sqlalchemy import Table, MetaData, Column, BigInteger, String, Text, Integer, TIMESTAMP
-    from sqlalchemy.sql import select
-    
-    # 动态访问评语模板表
-    metadata = MetaData()
-    feedback_templates = Table(
-        'pbl_feedback_templates',
-        metadata,
-        Column('id', BigInteger, primary_key=True),
-        Column('uuid', String(36)),
-        Column('school_id', Integer),
-        Column('category', String(50)),
-        Column('title', String(100)),
-        Column('content', Text),
-        Column('is_active', Integer),
-        Column('created_by', Integer),
-        Column('created_at', TIMESTAMP),
-        Column('updated_at', TIMESTAMP),
-        autoload_with=db.get_bind()
+    """获取评语模板列表（按学校缓存，模板写入时失效）"""
+    templates = get_school_feedback_templates(db, current_admin.school_id, category)
+    return success_response(data=templates)
+
+
+def _get_own_feedback_template(db: Session, template_uuid: str, current_admin: Admin):
+    """查询当前学校的评语模板，返回 (模板, 错误响应)"""
+    template = db.query(PBLFeedbackTemplate).filter(
+        PBLFeedbackTemplate.uuid == template_uuid
+    ).first()
+    if not template or template.is_active != 1:
+        return None, error_response(
+            message="评语模板不存在",
+            code=404,
+            status_code=status.HTTP_404_NOT_FOUND
+        )
+    if current_admin.role != 'platform_admin' and template.school_id != current_admin.school_id:
+        return None, error_response(
+            message="无权限操作该评语模板",
+            code=403,
+            status_code=status.HTTP_403_FORBIDDEN
+        )
+    return template, None
+
+
+@router.post("/feedback-templates")
+def create_feedback_template(
+    template_data: FeedbackTemplateCreate,
+    db: Session = Depends(get_db),
+    current_admin: Admin = Depends(get_current_admin)
+):
+    """创建评语模板"""
+    if not current_admin.school_id:
+        return error_response(
+            message="当前账号未关联学校",
+            code=400,
+            status_code=status.HTTP_400_BAD_REQUEST
+        )
+    
+    template = PBLFeedbackTemplate(
+        school_id=current_admin.school_id,
+        category=template_data.category,
+        title=template_data.title,
+        content=template_data.content,
+        is_active=1,
+        created_by=current_admin.id
     )
+    db.add(template)
+    db.commit()
+    db.refresh(template)
     
-    # 构建查询
-    query = select(feedback_templates).where(
-        feedback_templates.c.school_id == current_admin.school_id,
-        feedback_templates.c.is_active == 1
+    invalidate_school_feedback_templates(template.school_id)
+    logger.info(f"创建评语模板 - UUID: {template.uuid}, 学校ID: {template.school_id}, 操作者: {current_admin.username}")
+    
+    return success_response(
+        data={
+            'id': template.id,
+            'uuid': template.uuid,
+            'category': template.category,
+            'title': template.title,
+            'content': template.content
+        },
+        message="评语模板创建成功"
     )
+
+
+@router.put("/feedback-templates/{template_uuid}")
+def update_feedback_template(
+    template_uuid: str,
+    template_data: FeedbackTemplateUpdate,
+    db: Session = Depends(get_db),
+    current_admin: Admin = Depends(get_current_admin)
+):
+    """更新评语模板"""
+    template, error = _get_own_feedback_template(db, template_uuid, current_admin)
+    if error:
+        return error
+    
+    if template_data.category is not None:
+        template.category = template_data.category
+    if template_data.title is not None:
+        template.title = template_data.title
+    if template_data.content is not None:
+        template.content = template_data.content
     
-    if category:
-        query = query.where(feedback_templates.c.category == category)
+    db.commit()
+    
+    invalidate_school_feedback_templates(template.school_id)
+    logger.info(f"更新评语模板 - UUID: {template_uuid}, 操作者: {current_admin.username}")
     
-    query = query.order_by(feedback_templates.c.category, feedback_templates.c.id)
+    return success_response(message="评语模板更新成功")
+
+
+@router.delete("/feedback-templates/{template_uuid}")
+def delete_feedback_template(
+    template_uuid: str,
+    db: Session = Depends(get_db),
+    current_admin: Admin = Depends(get_current_admin)
+):
+    """删除评语模板（软删除）"""
+    template, error = _get_own_feedback_template(db, template_uuid, current_admin)
+    if error:
+        return error
     
-    # 执行查询
-    result = db.execute(query).fetchall()
+    template.is_active = 0
+    db.commit()
     
-    templates = []
-    for row in result:
-        templates.append({
-            'id': row.id,
-            'uuid': row.uuid,
-            'category': row.category,
-            'title': row.title,
-            'content': row.content
-        })
+    invalidate_school_feedback_templates(template.school_id)
+    logger.info(f"删除评语模板 - UUID: {template_uuid}, 操作者: {current_admin.username}")
     
-    return success_response(data=templates)
+    return success_response(message="评语模板已删除")
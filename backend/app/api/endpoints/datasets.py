@@ -11,6 +11,7 @@ from app.utils.timezone import get_beijing_time_naive
 from app.core.deps import get_db, get_current_user
 from app.models.pbl import PBLDataset
 from app.models.admin import User
+from app.services.counter_service import counter_service
 
 router = APIRouter()
 
@@ -109,7 +110,7 @@ async def get_dataset_detail(
         "source": dataset.source,
         "license": dataset.license,
         "preview_images": dataset.preview_images,
-        "download_count": dataset.download_count,
+        "download_count": counter_service.value(PBLDataset.download_count, dataset.id, dataset.download_count),
         "is_public": dataset.is_public,
         "quality_score": float(dataset.quality_score) if dataset.quality_score else None,
         "creator_id": dataset.creator_id,
@@ -285,14 +286,15 @@ async def download_dataset(
     """
     下载数据集
     """
-    dataset = db.query(PBLDataset).filter(PBLDataset.uuid == dataset_uuid).first()
+    dataset = db.query(
+        PBLDataset.id, PBLDataset.name, PBLDataset.file_url, PBLDataset.file_size
+    ).filter(PBLDataset.uuid == dataset_uuid).first()
     
     if not dataset:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="数据集不存在")
     
-    # 增加下载次数
-    dataset.download_count += 1
-    db.commit()
+    # 增加下载次数（内存累加，批量写入）
+    counter_service.incr(PBLDataset.download_count, dataset.id)
     
     return {
         "file_url": dataset.file_url,
@@ -7,11 +7,48 @@ from sqlalchemy.orm import Session
 import json
 
 from app.core.deps import get_db, get_current_user
-from app.models.pbl import PBLEthicsCase, PBLEthicsActivity
+from app.models.pbl import PBLEthicsCase, PBLEthicsActivity, PBLEthicsDiscussionRecord, PBLEthicsReflection
+from app.models.projections import summary_options
 from app.models.admin import User
+from app.utils.timezone import get_beijing_time_naive
+from app.services.counter_service import counter_service, add_like
 
 router = APIRouter()
 
+# 活动详情中附带的讨论记录/反思条数，更多内容通过分页接口获取
+DETAIL_PREVIEW_SIZE = 20
+
+
+def _get_activity_id(db: Session, activity_uuid: str) -> int:
+    """根据UUID获取伦理活动ID（只查主键，不加载JSON大字段）"""
+    activity_id = db.query(PBLEthicsActivity.id).filter(
+        PBLEthicsActivity.uuid == activity_uuid
+    ).scalar()
+    if not activity_id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="伦理活动不存在")
+    return activity_id
+
+
+def _serialize_discussion(record: PBLEthicsDiscussionRecord) -> dict:
+    return {
+        "id": record.id,
+        "student_id": record.student_id,
+        "student_name": record.student_name,
+        "viewpoint": record.viewpoint,
+        "time": record.created_at.isoformat() if record.created_at else None
+    }
+
+
+def _serialize_reflection(reflection: PBLEthicsReflection) -> dict:
+    return {
+        "id": reflection.id,
+        "student_id": reflection.student_id,
+        "student_name": reflection.student_name,
+        "content": reflection.content,
+        "insights": reflection.insights or [],
+        "created_at": reflection.created_at.isoformat() if reflection.created_at else None
+    }
+
 
 # ==================== 伦理案例 ====================
 
@@ -28,8 +65,8 @@ async def get_ethics_cases(
     """
     获取伦理案例列表
     """
-    # 管理员可以查看所有案例（包括未发布的）
-    query = db.query(PBLEthicsCase)
+    # 管理员可以查看所有案例（包括未发布的）；列表不返回正文，延迟加载重字段
+    query = db.query(PBLEthicsCase).options(*summary_options(PBLEthicsCase))
     
     if difficulty:
         query = query.filter(PBLEthicsCase.difficulty == difficulty)
@@ -81,9 +118,8 @@ async def get_ethics_case_detail(
     if not case:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="伦理案例不存在")
     
-    # 增加浏览次数
-    case.view_count += 1
-    db.commit()
+    # 增加浏览次数（内存累加，批量写入）
+    counter_service.incr(PBLEthicsCase.view_count, case.id)
     
     return {
         "id": case.id,
@@ -99,8 +135,8 @@ async def get_ethics_case_detail(
         "cover_image": case.cover_image,
         "author": case.author,
         "source": case.source,
-        "view_count": case.view_count,
-        "like_count": case.like_count,
+        "view_count": counter_service.value(PBLEthicsCase.view_count, case.id, case.view_count),
+        "like_count": counter_service.value(PBLEthicsCase.like_count, case.id, case.like_count),
         "created_at": case.created_at.isoformat() if case.created_at else None,
         "updated_at": case.updated_at.isoformat() if case.updated_at else None
     }
@@ -221,17 +257,19 @@ async def like_ethics_case(
     current_user = Depends(get_current_user)
 ):
     """
-    点赞伦理案例
+    点赞伦理案例（同一用户只计一次）
     """
-    case = db.query(PBLEthicsCase).filter(PBLEthicsCase.uuid == case_uuid).first()
+    case = db.query(PBLEthicsCase.id, PBLEthicsCase.like_count).filter(PBLEthicsCase.uuid == case_uuid).first()
     
     if not case:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="伦理案例不存在")
     
-    case.like_count += 1
-    db.commit()
+    liked = add_like(db, PBLEthicsCase.like_count, case.id, current_user.id)
     
-    return {"message": "点赞成功", "like_count": case.like_count}
+    return {
+        "message": "点赞成功" if liked else "已经点过赞了",
+        "like_count": counter_service.value(PBLEthicsCase.like_count, case.id, case.like_count)
+    }
 
 
 # ==================== 伦理活动 ====================
@@ -304,6 +342,16 @@ async def get_ethics_activity_detail(
     if activity.case_id:
         case = db.query(PBLEthicsCase).filter(PBLEthicsCase.id == activity.case_id).first()
     
+    # 讨论记录和反思只返回第一页，完整内容通过分页接口获取
+    discussion_query = db.query(PBLEthicsDiscussionRecord).filter(
+        PBLEthicsDiscussionRecord.activity_id == activity.id
+    )
+    reflection_query = db.query(PBLEthicsReflection).filter(
+        PBLEthicsReflection.activity_id == activity.id
+    )
+    discussion_records = discussion_query.order_by(PBLEthicsDiscussionRecord.id).limit(DETAIL_PREVIEW_SIZE).all()
+    reflections = reflection_query.order_by(PBLEthicsReflection.id).limit(DETAIL_PREVIEW_SIZE).all()
+    
     return {
         "id": activity.id,
         "uuid": activity.uuid,
@@ -318,9 +366,11 @@ async def get_ethics_activity_detail(
         "participants": activity.participants,
         "group_id": activity.group_id,
         "facilitator_id": activity.facilitator_id,
-        "discussion_records": activity.discussion_records,
+        "discussion_records": [_serialize_discussion(r) for r in discussion_records],
+        "discussion_total": discussion_query.count(),
         "conclusions": activity.conclusions,
-        "reflections": activity.reflections,
+        "reflections": [_serialize_reflection(r) for r in reflections],
+        "reflection_total": reflection_query.count(),
         "scheduled_at": activity.scheduled_at.isoformat() if activity.scheduled_at else None,
         "completed_at": activity.completed_at.isoformat() if activity.completed_at else None,
         "created_at": activity.created_at.isoformat() if activity.created_at else None,
@@ -387,12 +437,8 @@ async def update_ethics_activity(
         activity.status = activity_data["status"]
     if "participants" in activity_data:
         activity.participants = activity_data["participants"]
-    if "discussion_records" in activity_data:
-        activity.discussion_records = activity_data["discussion_records"]
     if "conclusions" in activity_data:
         activity.conclusions = activity_data["conclusions"]
-    if "reflections" in activity_data:
-        activity.reflections = activity_data["reflections"]
     if "scheduled_at" in activity_data:
         activity.scheduled_at = activity_data["scheduled_at"]
     if "completed_at" in activity_data:
@@ -453,6 +499,31 @@ async def join_ethics_activity(
     return {"message": "参与成功"}
 
 
+@router.get("/ethics-activities/{activity_uuid}/discussions")
+async def get_discussion_records(
+    activity_uuid: str,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    分页获取讨论记录（按提交顺序）
+    """
+    activity_id = _get_activity_id(db, activity_uuid)
+    
+    query = db.query(PBLEthicsDiscussionRecord).filter(
+        PBLEthicsDiscussionRecord.activity_id == activity_id
+    )
+    total = query.count()
+    records = query.order_by(PBLEthicsDiscussionRecord.id).offset(skip).limit(limit).all()
+    
+    return {
+        "items": [_serialize_discussion(r) for r in records],
+        "total": total
+    }
+
+
 @router.post("/ethics-activities/{activity_uuid}/discussion")
 async def submit_discussion(
     activity_uuid: str,
@@ -463,24 +534,45 @@ async def submit_discussion(
     """
     提交讨论记录
     """
-    activity = db.query(PBLEthicsActivity).filter(PBLEthicsActivity.uuid == activity_uuid).first()
+    activity_id = _get_activity_id(db, activity_uuid)
+    
+    # 每条讨论单独插入一行，不再读写整个JSON数组
+    record = PBLEthicsDiscussionRecord(
+        activity_id=activity_id,
+        student_id=current_user.id,
+        student_name=current_user.name,
+        viewpoint=discussion_data.get("viewpoint"),
+        created_at=get_beijing_time_naive()
+    )
+    db.add(record)
+    db.commit()
     
-    if not activity:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="伦理活动不存在")
+    return {"message": "提交成功", "id": record.id}
+
+
+@router.get("/ethics-activities/{activity_uuid}/reflections")
+async def get_reflections(
+    activity_uuid: str,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    分页获取反思（按提交顺序）
+    """
+    activity_id = _get_activity_id(db, activity_uuid)
     
-    # 添加讨论记录
-    from datetime import datetime
-    discussion_records = activity.discussion_records or []
-    discussion_records.append({
-        "student_id": current_user.id,
-        "student_name": current_user.name,
-        "viewpoint": discussion_data.get("viewpoint"),
-        "time": get_beijing_time_naive().isoformat()
-    })
-    activity.discussion_records = discussion_records
-    db.commit()
+    query = db.query(PBLEthicsReflection).filter(
+        PBLEthicsReflection.activity_id == activity_id
+    )
+    total = query.count()
+    reflections = query.order_by(PBLEthicsReflection.id).offset(skip).limit(limit).all()
     
-    return {"message": "提交成功"}
+    return {
+        "items": [_serialize_reflection(r) for r in reflections],
+        "total": total
+    }
 
 
 @router.post("/ethics-activities/{activity_uuid}/reflection")
@@ -493,20 +585,18 @@ async def submit_reflection(
     """
     提交反思
     """
-    activity = db.query(PBLEthicsActivity).filter(PBLEthicsActivity.uuid == activity_uuid).first()
-    
-    if not activity:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="伦理活动不存在")
-    
-    # 添加反思记录
-    reflections = activity.reflections or []
-    reflections.append({
-        "student_id": current_user.id,
-        "student_name": current_user.name,
-        "content": reflection_data.get("content"),
-        "insights": reflection_data.get("insights", [])
-    })
-    activity.reflections = reflections
+    activity_id = _get_activity_id(db, activity_uuid)
+    
+    # 每条反思单独插入一行，不再读写整个JSON数组
+    reflection = PBLEthicsReflection(
+        activity_id=activity_id,
+        student_id=current_user.id,
+        student_name=current_user.name,
+        content=reflection_data.get("content"),
+        insights=reflection_data.get("insights", []),
+        created_at=get_beijing_time_naive()
+    )
+    db.add(reflection)
     db.commit()
     
-    return {"message": "提交成功"}
+    return {"message": "提交成功", "id": reflection.id}
@@ -8,6 +8,8 @@ from sqlalchemy.orm import Session
 from app.core.deps import get_db, get_current_user
 from app.models.pbl import PBLExternalExpert, PBLAssessment
 from app.models.admin import User
+from app.services.portfolio_service import portfolio_refresher
+from app.services.assessment_dimension_service import sync_dimension_scores
 
 router = APIRouter()
 
@@ -301,8 +303,11 @@ async def submit_expert_review(
     )
     
     db.add(new_assessment)
+    db.flush()
+    sync_dimension_scores(db, new_assessment)
     db.commit()
     db.refresh(new_assessment)
+    portfolio_refresher.mark(new_assessment.student_id, new_assessment.created_at)
     
     # 更新专家的参与项目数
     # 这里需要建立专家和user的关联
@@ -0,0 +1,91 @@
+"""
+后台任务 API
+批量导入、导出、模板批量授权等接口带 background=true（或模板批量创建课程）时提交后台任务并返回任务ID，
+这里提供任务列表、进度查询和结果文件下载。
+"""
+from urllib.parse import quote
+
+from fastapi import APIRouter, Depends, Query, status
+from fastapi.responses import FileResponse
+from sqlalchemy.orm import Session
+
+from ...core.deps import get_db, get_current_admin
+from ...core.logging_config import get_logger
+from ...core.response import success_response, error_response
+from ...models.admin import Admin
+from ...models.pbl import PBLBackgroundJob
+from ...services.job_service import (
+    get_job, can_view_job, serialize_job, result_file_path, SUCCEEDED
+)
+
+router = APIRouter()
+logger = get_logger(__name__)
+
+
+@router.get("")
+def get_jobs(
+    job_type: str = Query(None, description="任务类型"),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_admin: Admin = Depends(get_current_admin)
+):
+    """我提交的后台任务（按提交时间倒序）"""
+    query = db.query(PBLBackgroundJob).filter(PBLBackgroundJob.creator_id == current_admin.id)
+    if job_type:
+        query = query.filter(PBLBackgroundJob.job_type == job_type)
+
+    total = query.count()
+    jobs = query.order_by(PBLBackgroundJob.id.desc()).offset((page - 1) * page_size).limit(page_size).all()
+
+    return success_response(data={
+        'items': [serialize_job(job) for job in jobs],
+        'total': total,
+        'page': page,
+        'page_size': page_size
+    })
+
+
+@router.get("/{job_uuid}")
+def get_job_status(
+    job_uuid: str,
+    db: Session = Depends(get_db),
+    current_admin: Admin = Depends(get_current_admin)
+):
+    """查询任务状态和进度（前端轮询）"""
+    job = get_job(db, job_uuid)
+    if not job or not can_view_job(job, current_admin):
+        return error_response(message="任务不存在", code=404, status_code=status.HTTP_404_NOT_FOUND)
+
+    return success_response(data=serialize_job(job))
+
+
+@router.get("/{job_uuid}/download")
+def download_job_result(
+    job_uuid: str,
+    db: Session = Depends(get_db),
+    current_admin: Admin = Depends(get_current_admin)
+):
+    """下载任务结果文件"""
+    job = get_job(db, job_uuid)
+    if not job or not can_view_job(job, current_admin):
+        return error_response(message="任务不存在", code=404, status_code=status.HTTP_404_NOT_FOUND)
+
+    if job.status != SUCCEEDED:
+        return error_response(message="任务尚未完成", code=409, status_code=status.HTTP_409_CONFLICT)
+
+    path = result_file_path(job)
+    if path is None:
+        return error_response(
+            message="该任务没有结果文件或文件已过期",
+            code=404,
+            status_code=status.HTTP_404_NOT_FOUND
+        )
+
+    logger.info(f"下载任务结果 - 任务: {job_uuid}, 操作者: {current_admin.username}")
+    return FileResponse(
+        path,
+        headers={
+            'Content-Disposition': f"attachment; filename*=UTF-8''{quote(job.result_filename or path.name)}"
+        }
+    )
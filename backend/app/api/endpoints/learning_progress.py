@@ -1,8 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Body
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 from typing import Optional
 from datetime import datetime
+from collections import defaultdict
 from app.utils.timezone import get_beijing_time_naive
 
 from ...core.response import success_response, error_response
@@ -11,6 +11,9 @@ from ...models.admin import User, Admin
 from ...models.pbl import PBLCourse, PBLUnit, PBLResource, PBLTask, PBLTaskProgress, PBLLearningProgress, PBLClassMember
 from ...schemas.pbl import LearningProgressTrack
 from ...core.logging_config import get_logger
+from ...services.identity_service import resolve_id
+from ...services.course_structure_service import get_course_structure
+from ...services.portfolio_service import portfolio_refresher
 
 router = APIRouter()
 logger = get_logger(__name__)
@@ -217,33 +220,19 @@ def track_learning_activity(
     current_user: User = Depends(get_current_user)
 ):
     """记录学习行为（使用UUID）"""
-    # 验证课程是否存在
-    course = db.query(PBLCourse).filter(PBLCourse.uuid == track_data.course_uuid).first()
-    if not course:
+    # 高频接口：UUID 解析走标识缓存，命中时不查数据库
+    course_id = resolve_id(db, PBLCourse, track_data.course_uuid)
+    if not course_id:
         return error_response(
             message="课程不存在",
             code=404,
             status_code=status.HTTP_404_NOT_FOUND
         )
     
-    # 根据UUID查找对应的ID
-    unit_id = None
-    if track_data.unit_uuid:
-        unit = db.query(PBLUnit).filter(PBLUnit.uuid == track_data.unit_uuid).first()
-        if unit:
-            unit_id = unit.id
-    
-    resource_id = None
-    if track_data.resource_uuid:
-        resource = db.query(PBLResource).filter(PBLResource.uuid == track_data.resource_uuid).first()
-        if resource:
-            resource_id = resource.id
-    
-    task_id = None
-    if track_data.task_uuid:
-        task = db.query(PBLTask).filter(PBLTask.uuid == track_data.task_uuid).first()
-        if task:
-            task_id = task.id
+    # 根据UUID查找对应的ID（不存在时为 None）
+    unit_id = resolve_id(db, PBLUnit, track_data.unit_uuid)
+    resource_id = resolve_id(db, PBLResource, track_data.resource_uuid)
+    task_id = resolve_id(db, PBLTask, track_data.task_uuid)
     
     # 判断完成状态
     is_completed = track_data.progress_value >= 100
@@ -252,7 +241,7 @@ def track_learning_activity(
     # 插入学习进度记录
     learning_progress = PBLLearningProgress(
         user_id=current_user.id,
-        course_id=course.id,
+        course_id=course_id,
         unit_id=unit_id,
         resource_id=resource_id,
         task_id=task_id,
@@ -266,6 +255,10 @@ def track_learning_activity(
     db.add(learning_progress)
     db.commit()
     
+    # 学习时长计入成长档案（后台批量刷新）
+    if track_data.time_spent:
+        portfolio_refresher.mark(current_user.id)
+    
     logger.debug(f"学习行为追踪 - 用户: {current_user.id}, 课程: {track_data.course_uuid}, 类型: {track_data.progress_type}")
     
     return success_response(
@@ -295,8 +288,8 @@ def reset_learning_progress(
     try:
         # 根据UUID查找对应的ID
         if resource_uuid:
-            resource = db.query(PBLResource).filter(PBLResource.uuid == resource_uuid).first()
-            if not resource:
+            resource_id = resolve_id(db, PBLResource, resource_uuid)
+            if not resource_id:
                 return error_response(
                     message="资源不存在",
                     code=404,
@@ -306,14 +299,14 @@ def reset_learning_progress(
             # 删除该资源的所有学习进度记录
             db.query(PBLLearningProgress).filter(
                 PBLLearningProgress.user_id == current_user.id,
-                PBLLearningProgress.resource_id == resource.id
+                PBLLearningProgress.resource_id == resource_id
             ).delete()
             
             logger.debug(f"重置资源进度 - 用户: {current_user.id}, 资源: {resource_uuid}")
         
         if task_uuid:
-            task = db.query(PBLTask).filter(PBLTask.uuid == task_uuid).first()
-            if not task:
+            task_id = resolve_id(db, PBLTask, task_uuid)
+            if not task_id:
                 return error_response(
                     message="任务不存在",
                     code=404,
@@ -323,12 +316,13 @@ def reset_learning_progress(
             # 删除该任务的所有学习进度记录
             db.query(PBLLearningProgress).filter(
                 PBLLearningProgress.user_id == current_user.id,
-                PBLLearningProgress.task_id == task.id
+                PBLLearningProgress.task_id == task_id
             ).delete()
             
             logger.debug(f"重置任务进度 - 用户: {current_user.id}, 任务: {task_uuid}")
         
         db.commit()
+        portfolio_refresher.mark(current_user.id)
         
         return success_response(
             data={'reset': True},
@@ -471,54 +465,47 @@ def get_course_students_progress(
         User.deleted_at == None
     ).all()
     
-    # 获取课程的单元和任务
-    units = db.query(PBLUnit).filter(PBLUnit.course_id == course_id).all()
-    total_units = len(units)
-    
-    tasks = db.query(PBLTask).join(
-        PBLUnit, PBLUnit.id == PBLTask.unit_id
+    # 课程的单元和任务取自课程结构快照
+    structure = get_course_structure(db, course_id)
+    total_units = structure.total_units
+    total_tasks = structure.total_tasks
+    
+    # 一次查询取出所有学生在本课程任务上的进度（不取 submission 内容，只取是否提交）
+    progress_rows = db.query(
+        PBLTaskProgress.user_id,
+        PBLTaskProgress.task_id,
+        PBLTaskProgress.submission.isnot(None).label('submitted'),
+        PBLTaskProgress.score,
+        PBLTaskProgress.updated_at
     ).filter(
-        PBLUnit.course_id == course_id
-    ).all()
-    total_tasks = len(tasks)
-    task_ids = [t.id for t in tasks]
+        PBLTaskProgress.user_id.in_([s.id for s in students]),
+        PBLTaskProgress.task_id.in_(structure.task_ids)
+    ).all() if structure.task_ids and students else []
+    
+    rows_by_student = defaultdict(list)
+    for row in progress_rows:
+        rows_by_student[row.user_id].append(row)
     
     result = []
     for student in students:
-        # 统计任务完成情况
-        completed_tasks = db.query(PBLTaskProgress).filter(
-            PBLTaskProgress.user_id == student.id,
-            PBLTaskProgress.task_id.in_(task_ids),
-            PBLTaskProgress.submission.isnot(None)  # 只要提交了就算完成
-        ).count() if task_ids else 0
+        rows = rows_by_student.get(student.id, [])
+        
+        # 统计任务完成情况（只要提交了就算完成）
+        submitted_task_ids = [row.task_id for row in rows if row.submitted]
+        completed_tasks = len(submitted_task_ids)
         
         # 计算平均分
-        avg_score = db.query(func.avg(PBLTaskProgress.score)).filter(
-            PBLTaskProgress.user_id == student.id,
-            PBLTaskProgress.task_id.in_(task_ids),
-            PBLTaskProgress.score != None
-        ).scalar() if task_ids else None
+        scores = [row.score for row in rows if row.score is not None]
+        avg_score = sum(scores) / len(scores) if scores else None
         
         progress = int((completed_tasks / total_tasks) * 100) if total_tasks > 0 else 0
         
         # 统计完成的单元数
-        completed_units = 0
-        for unit in units:
-            unit_tasks = [t.id for t in tasks if t.unit_id == unit.id]
-            if unit_tasks:
-                unit_completed = db.query(PBLTaskProgress).filter(
-                    PBLTaskProgress.user_id == student.id,
-                    PBLTaskProgress.task_id.in_(unit_tasks),
-                    PBLTaskProgress.submission.isnot(None)  # 只要提交了就算完成
-                ).count()
-                if unit_completed == len(unit_tasks):
-                    completed_units += 1
+        completed_units = structure.completed_units_by_tasks(submitted_task_ids)
         
         # 获取最后活跃时间
-        last_progress = db.query(PBLTaskProgress).filter(
-            PBLTaskProgress.user_id == student.id,
-            PBLTaskProgress.task_id.in_(task_ids)
-        ).order_by(PBLTaskProgress.updated_at.desc()).first() if task_ids else None
+        updated = [row.updated_at for row in rows if row.updated_at]
+        last_active_at = max(updated) if updated else None
         
         result.append({
             'student_id': student.id,
@@ -531,7 +518,7 @@ def get_course_students_progress(
             'completed_tasks': completed_tasks,
             'progress': progress,
             'average_score': round(float(avg_score), 2) if avg_score else None,
-            'last_active_at': last_progress.updated_at.isoformat() if last_progress and last_progress.updated_at else None
+            'last_active_at': last_active_at.isoformat() if last_active_at else None
         })
     
     return success_response(data={'students': result})
@@ -10,7 +10,9 @@ from app.utils.timezone import get_beijing_time_naive
 
 from app.core.deps import get_db, get_current_user, get_current_admin
 from app.models.pbl import PBLStudentPortfolio, PBLUserAchievement, PBLAchievement
+from app.models.projections import summary_options
 from app.models.admin import User
+from app.services.portfolio_service import current_school_year, refresh_portfolios, DEFAULT_GRADE_LEVEL
 
 router = APIRouter()
 
@@ -27,7 +29,7 @@ async def get_all_portfolios(
     """
     管理员获取所有学生成长档案列表
     """
-    query = db.query(PBLStudentPortfolio)
+    query = db.query(PBLStudentPortfolio).options(*summary_options(PBLStudentPortfolio))
     
     # 过滤条件
     if school_year:
@@ -41,10 +43,16 @@ async def get_all_portfolios(
     # 分页查询
     portfolios = query.offset(skip).limit(limit).all()
     
-    # 获取学生信息
+    # 一次查询当前页的学生信息
+    student_ids = {portfolio.student_id for portfolio in portfolios}
+    students = {
+        student.id: student
+        for student in db.query(User).filter(User.id.in_(student_ids)).all()
+    } if student_ids else {}
+    
     items = []
     for portfolio in portfolios:
-        student = db.query(User).filter(User.id == portfolio.student_id).first()
+        student = students.get(portfolio.student_id)
         items.append({
             "uuid": portfolio.uuid,
             "student_id": portfolio.student_id,
@@ -76,7 +84,7 @@ async def get_my_portfolio(
     获取当前用户的成长档案
     """
     if not school_year:
-        school_year = "2024-2025"  # 默认当前学年
+        school_year = current_school_year()  # 默认当前学年
     
     portfolio = db.query(PBLStudentPortfolio).filter(
         PBLStudentPortfolio.student_id == current_user.id,
@@ -84,11 +92,23 @@ async def get_my_portfolio(
     ).first()
     
     if not portfolio:
-        # 创建新档案
+        # 首次访问时按已有学习数据生成档案
+        try:
+            if refresh_portfolios(db, school_year, [current_user.id]):
+                db.commit()
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="学年格式错误")
+        portfolio = db.query(PBLStudentPortfolio).filter(
+            PBLStudentPortfolio.student_id == current_user.id,
+            PBLStudentPortfolio.school_year == school_year
+        ).first()
+    
+    if not portfolio:
+        # 没有学习数据时创建空档案
         portfolio = PBLStudentPortfolio(
             student_id=current_user.id,
             school_year=school_year,
-            grade_level="5-6年级",  # 默认值,应根据实际情况设置
+            grade_level=DEFAULT_GRADE_LEVEL,
             projects_count=0,
             total_learning_hours=0
         )
@@ -128,7 +148,7 @@ async def get_student_portfolio(
     获取指定学生的成长档案
     """
     if not school_year:
-        school_year = "2024-2025"
+        school_year = current_school_year()
     
     portfolio = db.query(PBLStudentPortfolio).filter(
         PBLStudentPortfolio.student_id == student_id,
@@ -252,6 +272,11 @@ async def export_portfolio(
     if not portfolio:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="成长档案不存在")
     
+    # 导出前重新计算汇总字段，避免导出尚未刷新的数据
+    if refresh_portfolios(db, portfolio.school_year, [portfolio.student_id]):
+        db.commit()
+        db.refresh(portfolio)
+    
     # 简单实现:返回JSON数据
     # 实际应该生成PDF或其他格式
     return {
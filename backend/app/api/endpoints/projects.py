@@ -9,6 +9,8 @@ from sqlalchemy import and_
 from app.core.deps import get_db, get_current_user, get_current_user_flexible
 from app.models.pbl import PBLProject, PBLProjectOutput, PBLCourse
 from app.models.admin import User
+from app.services.counter_service import counter_service, add_like
+from app.services.portfolio_service import portfolio_refresher
 
 router = APIRouter()
 
@@ -240,6 +242,10 @@ async def update_project(
     db.commit()
     db.refresh(project)
     
+    # 状态或名称变化影响参与者成长档案中的已完成项目
+    if "status" in project_data or "title" in project_data:
+        portfolio_refresher.mark_project(db, project)
+    
     return {
         "id": project.id,
         "uuid": project.uuid,
@@ -270,6 +276,8 @@ async def delete_project(
     if current_user.group_id != project.group_id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="无权限删除此项目")
     
+    # 删除前记录参与者，删除后刷新成长档案
+    portfolio_refresher.mark_project(db, project)
     db.delete(project)
     db.commit()
     
@@ -301,6 +309,7 @@ async def update_project_status(
     
     project.status = new_status
     db.commit()
+    portfolio_refresher.mark_project(db, project)
     
     return {"message": "更新成功", "status": project.status}
 
@@ -417,6 +426,8 @@ async def submit_project_output(
     db.add(new_output)
     db.commit()
     db.refresh(new_output)
+    if project.status == 'completed':
+        portfolio_refresher.mark(current_user.id, new_output.created_at)
     
     return {
         "id": new_output.id,
@@ -442,9 +453,8 @@ async def get_output_detail(
     if not output:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="成果不存在")
     
-    # 增加浏览次数
-    output.view_count += 1
-    db.commit()
+    # 增加浏览次数（内存累加，批量写入）
+    counter_service.incr(PBLProjectOutput.view_count, output.id)
     
     user = db.query(User).filter(User.id == output.user_id).first()
     project = db.query(PBLProject).filter(PBLProject.id == output.project_id).first()
@@ -463,8 +473,8 @@ async def get_output_detail(
         "thumbnail": output.thumbnail,
         "metadata": output.meta_data,
         "is_public": output.is_public,
-        "view_count": output.view_count,
-        "like_count": output.like_count,
+        "view_count": counter_service.value(PBLProjectOutput.view_count, output.id, output.view_count),
+        "like_count": counter_service.value(PBLProjectOutput.like_count, output.id, output.like_count),
         "user_id": output.user_id,
         "user_name": user.full_name if user else None,
         "project_id": output.project_id,
@@ -546,8 +556,10 @@ async def delete_output(
     if output.user_id != current_user.id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="无权限删除此成果")
     
+    user_id, created_at = output.user_id, output.created_at
     db.delete(output)
     db.commit()
+    portfolio_refresher.mark(user_id, created_at)
     
     return {"message": "删除成功"}
 
@@ -559,18 +571,21 @@ async def like_output(
     current_user = Depends(get_current_user)
 ):
     """
-    点赞成果
+    点赞成果（同一用户只计一次）
     """
-    output = db.query(PBLProjectOutput).filter(PBLProjectOutput.uuid == output_uuid).first()
+    output = db.query(PBLProjectOutput.id, PBLProjectOutput.like_count).filter(
+        PBLProjectOutput.uuid == output_uuid
+    ).first()
     
     if not output:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="成果不存在")
     
-    # 增加点赞数
-    output.like_count += 1
-    db.commit()
+    liked = add_like(db, PBLProjectOutput.like_count, output.id, current_user.id)
     
-    return {"message": "点赞成功", "like_count": output.like_count}
+    return {
+        "message": "点赞成功" if liked else "已经点过赞了",
+        "like_count": counter_service.value(PBLProjectOutput.like_count, output.id, output.like_count)
+    }
 
 
 @router.post("/project-outputs/upload")
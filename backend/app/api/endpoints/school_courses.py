@@ -16,6 +16,7 @@ from ...models.pbl import PBLCourse, PBLSchoolCourse
 from ...models.school import School
 from ...schemas.pbl import SchoolCourseCreate, SchoolCourseUpdate, SchoolCourse, SchoolCourseWithDetails, Course
 from ...core.logging_config import get_logger
+from ...utils.bulk import bulk_upsert
 
 router = APIRouter()
 logger = get_logger(__name__)
@@ -109,39 +110,35 @@ def batch_assign_courses(
             status_code=status.HTTP_403_FORBIDDEN
         )
     
-    assigned_count = 0
-    for course_id in course_ids:
-        # 检查课程是否存在
-        course = db.query(PBLCourse).filter(PBLCourse.id == course_id).first()
-        if not course:
-            continue
-        
-        # 检查是否已经分配
-        existing = db.query(PBLSchoolCourse).filter(
-            PBLSchoolCourse.school_id == school_id,
-            PBLSchoolCourse.course_id == course_id
-        ).first()
-        
-        if existing:
-            continue
-        
-        # 创建分配记录
-        school_course = PBLSchoolCourse(
-            school_id=school_id,
-            course_id=course_id,
-            assigned_by=current_admin.id,
-            status='active'
-        )
-        
-        db.add(school_course)
-        assigned_count += 1
+    # 一次查询确认课程存在
+    found_course_ids = {
+        row[0] for row in db.query(PBLCourse.id).filter(PBLCourse.id.in_(set(course_ids))).all()
+    }
+    
+    rows = [{
+        'school_id': school_id,
+        'course_id': course_id,
+        'assigned_by': current_admin.id,
+        'status': 'active'
+    } for course_id in course_ids if course_id in found_course_ids]
+    
+    # 预取已有分配 + 多行插入，SQL 条数不随课程数增长
+    upsert_result = bulk_upsert(db, PBLSchoolCourse, rows, key_columns=('school_id', 'course_id'))
+    assigned_count = upsert_result.inserted
     
     db.commit()
     
+    # 按传入顺序返回每门课程的处理结果
+    item_statuses = iter(upsert_result.items)
+    results = [
+        {'course_id': course_id, 'status': next(item_statuses)[1] if course_id in found_course_ids else 'not_found'}
+        for course_id in course_ids
+    ]
+    
     logger.info(f"批量分配课程 - 学校: {school_id}, 课程数: {assigned_count}, 操作者: {current_admin.username}")
     
     return success_response(
-        data={'assigned_count': assigned_count},
+        data={'assigned_count': assigned_count, 'results': results},
         message=f"成功分配 {assigned_count} 门课程"
     )
 
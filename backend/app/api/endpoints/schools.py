@@ -2,7 +2,8 @@
 学校管理 API
 用于平台管理员管理学校
 """
-from fastapi import APIRouter, Depends, HTTPException, status, Form
+from fastapi import APIRouter, Depends, HTTPException, status, Form, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from typing import List, Optional
@@ -16,6 +17,10 @@ from ...core.security import get_password_hash
 from ...models.admin import Admin, User
 from ...models.school import School
 from ...core.logging_config import get_logger
+from ...services.identity_service import invalidate_identity
+from ...services.school_report_service import (
+    build_class_reports, build_school_summary, school_classes_query, iter_school_class_reports
+)
 
 router = APIRouter()
 logger = get_logger(__name__)
@@ -455,6 +460,8 @@ def update_school(
         school.video_teacher_view_limit = video_teacher_view_limit
     
     db.commit()
+    # 学校登录缓存了学校名称和启用状态
+    invalidate_identity(School)
     db.refresh(school)
     
     logger.info(f"更新学校信息 - 学校: {school.school_name}, ID: {school_id}, 操作者: {current_admin.username}")
@@ -492,6 +499,7 @@ def toggle_school_active(
     # 切换状态
     school.is_active = not school.is_active
     db.commit()
+    invalidate_identity(School)
     
     status_text = "启用" if school.is_active else "禁用"
     logger.info(f"{status_text}学校 - 学校: {school.school_name}, ID: {school_id}, 操作者: {current_admin.username}")
@@ -798,6 +806,7 @@ def delete_school(
     # 删除学校
     db.delete(school)
     db.commit()
+    invalidate_identity(School)
     
     logger.info(f"删除学校 - 学校: {school.school_name}, ID: {school_id}, 操作者: {current_admin.username}")
     
@@ -878,3 +887,105 @@ def get_school_statistics(
     }
     
     return success_response(data=result)
+
+
+def _check_school_report_access(db: Session, school_id: int, current_admin: Admin):
+    """学校报表权限检查：平台管理员可查看所有，学校管理员只能查看自己的学校"""
+    if current_admin.role not in ['platform_admin', 'school_admin']:
+        return None, error_response(
+            message="无权限查看学校报表",
+            code=403,
+            status_code=status.HTTP_403_FORBIDDEN
+        )
+    if current_admin.role == 'school_admin' and current_admin.school_id != school_id:
+        return None, error_response(
+            message="无权限查看其他学校信息",
+            code=403,
+            status_code=status.HTTP_403_FORBIDDEN
+        )
+    
+    school = db.query(School).filter(School.id == school_id).first()
+    if not school:
+        return None, error_response(
+            message="学校不存在",
+            code=404,
+            status_code=status.HTTP_404_NOT_FOUND
+        )
+    return school, None
+
+
+@router.get("/{school_id}/progress-report")
+def get_school_progress_report(
+    school_id: int,
+    page: int = Query(1, ge=1, description="页码"),
+    page_size: int = Query(20, ge=1, le=100, description="每页班级数"),
+    include_inactive: bool = Query(False, description="是否包含已停用的班级"),
+    db: Session = Depends(get_db),
+    current_admin: Admin = Depends(get_current_admin)
+):
+    """
+    获取学校学习进度报表（按班级分页）
+    每个班级汇总完成率、各状态人数、提交数、平均分和最后活跃时间，
+    summary 为学校全部班级的整体统计（一条聚合查询，与分页无关）。每页固定查询次数，与班级数、学生数无关。
+    权限：平台管理员可查看所有，学校管理员只能查看自己的学校
+    """
+    school, error = _check_school_report_access(db, school_id, current_admin)
+    if error:
+        return error
+    
+    query = school_classes_query(db, school_id, include_inactive)
+    total = query.count()
+    classes = query.offset((page - 1) * page_size).limit(page_size).all()
+    reports = build_class_reports(db, classes)
+    
+    return success_response(data={
+        'school_id': school_id,
+        'school_name': school.school_name,
+        'summary': build_school_summary(db, school_id, include_inactive),
+        'items': reports,
+        'total': total,
+        'page': page,
+        'page_size': page_size,
+        'total_pages': (total + page_size - 1) // page_size
+    })
+
+
+@router.get("/{school_id}/progress-report/export")
+def export_school_progress_report(
+    school_id: int,
+    include_inactive: bool = Query(False, description="是否包含已停用的班级"),
+    db: Session = Depends(get_db),
+    current_admin: Admin = Depends(get_current_admin)
+):
+    """
+    导出学校学习进度报表（CSV，每个班级一行，最后一行为学校合计）
+    按批次查询、逐行输出，不在内存中保留整个报表
+    """
+    from ...utils.export import iter_school_progress_csv, generate_export_filename
+    from urllib.parse import quote
+    
+    school, error = _check_school_report_access(db, school_id, current_admin)
+    if error:
+        return error
+    
+    def generate():
+        # 流式输出在请求依赖释放后才执行，使用独立的会话
+        export_db = SessionLocal()
+        try:
+            yield from iter_school_progress_csv(
+                iter_school_class_reports(export_db, school_id, include_inactive),
+                summary=build_school_summary(export_db, school_id, include_inactive)
+            )
+        finally:
+            export_db.close()
+    
+    filename = generate_export_filename(f'{school.school_name}_progress')
+    logger.info(f"导出学校学习进度报表 - 学校ID: {school_id}, 操作者: {current_admin.username}")
+    
+    return StreamingResponse(
+        generate(),
+        media_type='text/csv',
+        headers={
+            'Content-Disposition': f"attachment; filename*=UTF-8''{quote(filename)}"
+        }
+    )
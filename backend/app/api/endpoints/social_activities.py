@@ -5,15 +5,19 @@ from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, Query, File, UploadFile, status
 from sqlalchemy.orm import Session
 import os
+import uuid
 from datetime import datetime
 from app.utils.timezone import get_beijing_time_naive
 
 from app.core.deps import get_db, get_current_user
-from app.models.pbl import PBLSocialActivity
+from app.models.pbl import PBLSocialActivity, PBLSocialActivityPhoto
 from app.models.admin import User
 
 router = APIRouter()
 
+# 活动详情中附带的照片数量，更多照片通过分页接口获取
+DETAIL_PREVIEW_SIZE = 20
+
 
 @router.get("/social-activities")
 async def get_social_activities(
@@ -119,6 +123,12 @@ async def get_social_activity_detail(
     if not activity:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="活动不存在")
     
+    # 照片只返回第一页，完整列表通过分页接口获取
+    photo_query = db.query(PBLSocialActivityPhoto.photo_url).filter(
+        PBLSocialActivityPhoto.activity_id == activity.id
+    )
+    photos = photo_query.order_by(PBLSocialActivityPhoto.id).limit(DETAIL_PREVIEW_SIZE).all()
+    
     return {
         "id": activity.id,
         "uuid": activity.uuid,
@@ -135,7 +145,8 @@ async def get_social_activity_detail(
         "participants": activity.participants,
         "facilitators": activity.facilitators,
         "status": activity.status,
-        "photos": activity.photos,
+        "photos": [p.photo_url for p in photos],
+        "photo_total": photo_query.count(),
         "summary": activity.summary,
         "feedback": activity.feedback,
         "created_by": activity.created_by,
@@ -216,8 +227,6 @@ async def update_social_activity(
         activity.status = activity_data["status"]
     if "summary" in activity_data:
         activity.summary = activity_data["summary"]
-    if "photos" in activity_data:
-        activity.photos = activity_data["photos"]
     
     db.commit()
     db.refresh(activity)
@@ -333,6 +342,41 @@ async def submit_activity_feedback(
     return {"message": "提交成功"}
 
 
+@router.get("/social-activities/{activity_uuid}/photos")
+async def get_activity_photos(
+    activity_uuid: str,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    分页获取活动照片（按上传顺序）
+    """
+    activity_id = db.query(PBLSocialActivity.id).filter(PBLSocialActivity.uuid == activity_uuid).scalar()
+    
+    if not activity_id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="活动不存在")
+    
+    query = db.query(PBLSocialActivityPhoto).filter(PBLSocialActivityPhoto.activity_id == activity_id)
+    total = query.count()
+    photos = query.order_by(PBLSocialActivityPhoto.id).offset(skip).limit(limit).all()
+    
+    items = []
+    for photo in photos:
+        items.append({
+            "id": photo.id,
+            "photo_url": photo.photo_url,
+            "uploaded_by": photo.uploaded_by,
+            "created_at": photo.created_at.isoformat() if photo.created_at else None
+        })
+    
+    return {
+        "items": items,
+        "total": total
+    }
+
+
 @router.post("/social-activities/{activity_uuid}/photos")
 async def upload_activity_photos(
     activity_uuid: str,
@@ -343,19 +387,19 @@ async def upload_activity_photos(
     """
     上传活动照片
     """
-    activity = db.query(PBLSocialActivity).filter(PBLSocialActivity.uuid == activity_uuid).first()
+    activity_id = db.query(PBLSocialActivity.id).filter(PBLSocialActivity.uuid == activity_uuid).scalar()
     
-    if not activity:
+    if not activity_id:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="活动不存在")
     
     # 创建上传目录
     upload_dir = "uploads/social-activities"
     os.makedirs(upload_dir, exist_ok=True)
     
-    # 生成唯一文件名
+    # 生成唯一文件名（同一秒内多人上传时用随机后缀避免互相覆盖）
     timestamp = get_beijing_time_naive().strftime("%Y%m%d%H%M%S")
     file_extension = os.path.splitext(file.filename)[1]
-    filename = f"{activity.id}_{timestamp}{file_extension}"
+    filename = f"{activity_id}_{timestamp}_{uuid.uuid4().hex[:8]}{file_extension}"
     file_path = os.path.join(upload_dir, filename)
     
     # 保存文件
@@ -365,13 +409,18 @@ async def upload_activity_photos(
     
     photo_url = f"/{file_path}"
     
-    # 添加到活动照片列表
-    photos = activity.photos or []
-    photos.append(photo_url)
-    activity.photos = photos
+    # 每张照片单独插入一行，不再读写整个JSON数组
+    photo = PBLSocialActivityPhoto(
+        activity_id=activity_id,
+        photo_url=photo_url,
+        uploaded_by=current_user.id,
+        created_at=get_beijing_time_naive()
+    )
+    db.add(photo)
     db.commit()
     
     return {
+        "id": photo.id,
         "photo_url": photo_url,
         "message": "上传成功"
     }
@@ -9,7 +9,8 @@ from ...core.deps import get_db, get_current_user
 from ...core.logging_config import get_logger
 from ...schemas.user import UserLogin, UserCreate, UserResponse, TokenResponse, RefreshTokenRequest, RefreshTokenResponse, InstitutionLoginRequest, ChangePasswordRequest
 from ...models.admin import User
-from ...models.school import School
+from ...services.student_search_service import invalidate_school_students
+from ...services.identity_service import resolve_school_by_code
 from ...utils.timezone import get_beijing_time_naive
 
 router = APIRouter()
@@ -20,10 +21,8 @@ def student_login(login_data: InstitutionLoginRequest, db: Session = Depends(get
     """学生用户登录 - 机构登录方式（学校代码+学号+密码）"""
     logger.info(f"收到学生登录请求 - 学校代码: {login_data.school_code}, 学号: {login_data.number}")
     
-    # 1. 查找学校
-    school = db.query(School).filter(
-        School.school_code == login_data.school_code.upper()
-    ).first()
+    # 1. 查找学校（走标识缓存，启用状态只缓存几秒）
+    school = resolve_school_by_code(db, login_data.school_code.upper())
     
     if not school:
         logger.warning(f"机构登录失败：学校不存在 - {login_data.school_code}")
@@ -33,7 +32,8 @@ def student_login(login_data: InstitutionLoginRequest, db: Session = Depends(get
             status_code=status.HTTP_404_NOT_FOUND
         )
     
-    if not school.is_active:
+    school_id, school_name, school_is_active = school
+    if not school_is_active:
         logger.warning(f"机构登录失败：学校已禁用 - {login_data.school_code}")
         return error_response(
             message="学校已禁用",
@@ -43,7 +43,7 @@ def student_login(login_data: InstitutionLoginRequest, db: Session = Depends(get
     
     # 2. 查找用户（通过学号，role为student）
     user = db.query(User).filter(
-        User.school_id == school.id,
+        User.school_id == school_id,
         User.student_number == login_data.number,
         User.role == 'student'
     ).first()
@@ -90,7 +90,7 @@ def student_login(login_data: InstitutionLoginRequest, db: Session = Depends(get
     access_token = create_access_token(data={"sub": str(user.id), "user_role": user.role})
     refresh_token = create_refresh_token(data={"sub": str(user.id), "user_role": user.role})
     
-    logger.info(f"✅ 学生用户登录成功: {user.username} ({user.role}) - {school.school_name} (ID: {user.id})")
+    logger.info(f"✅ 学生用户登录成功: {user.username} ({user.role}) - {school_name} (ID: {user.id})")
     
     # 将 User 模型转换为 UserResponse schema
     user_response = UserResponse.model_validate(user)
@@ -161,6 +161,8 @@ def student_register(user_data: UserCreate, db: Session = Depends(get_db)):
     db.add(new_user)
     db.commit()
     db.refresh(new_user)
+    if new_user.school_id:
+        invalidate_school_students(new_user.school_id)
     
     logger.info(f"学生用户创建成功 - 用户名: {user_data.username}, ID: {new_user.id}")
     
@@ -1,11 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
 from typing import List, Optional
 from datetime import datetime
 
 from ...core.response import success_response, error_response
 from ...core.deps import get_db, get_current_user
 from ...models.pbl import PBLCourse, PBLUnit, PBLProject, PBLResource, PBLTask, PBLLearningProgress, PBLClassMember
+from ...models.projections import summary_options
 from ...utils.timezone import get_beijing_time_naive
 
 router = APIRouter()
@@ -209,6 +210,19 @@ def serialize_unit_detail(unit: PBLUnit) -> dict:
         'updated_at': unit.updated_at.isoformat() if unit.updated_at else None
     }
 
+def _course_with_unit_summaries(db: Session, course_uuid: str):
+    """
+    查询课程并预加载单元、资料和任务（单元摘要只用到数量和类型，
+    不加载资料正文、任务要求、学习指南等重字段）
+    """
+    return db.query(PBLCourse).options(
+        selectinload(PBLCourse.units).options(
+            *summary_options(PBLUnit),
+            selectinload(PBLUnit.resources).options(*summary_options(PBLResource)),
+            selectinload(PBLUnit.tasks).options(*summary_options(PBLTask))
+        )
+    ).filter(PBLCourse.uuid == course_uuid).first()
+
 @router.get("/courses")
 def get_my_courses(
     skip: int = 0,
@@ -255,7 +269,7 @@ def get_course_detail(
     current_user = Depends(get_current_user)
 ):
     """获取课程详情（包含单元列表和项目列表）"""
-    course = db.query(PBLCourse).filter(PBLCourse.uuid == course_uuid).first()
+    course = _course_with_unit_summaries(db, course_uuid)
     
     if not course:
         return error_response(
@@ -369,7 +383,7 @@ def get_course_units(
     current_user = Depends(get_current_user)
 ):
     """获取课程的单元列表"""
-    course = db.query(PBLCourse).filter(PBLCourse.uuid == course_uuid).first()
+    course = _course_with_unit_summaries(db, course_uuid)
     
     if not course:
         return error_response(
@@ -1,14 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Body
+from fastapi import APIRouter, Depends, HTTPException, status, Body, Query
 from sqlalchemy.orm import Session
+from sqlalchemy import or_, and_
 from typing import Optional, Dict, Any
 from datetime import datetime
 
 from ...core.response import success_response, error_response
 from ...core.deps import get_db, get_current_user
+from ...core.logging_config import get_logger
 from ...models.admin import User
 from ...models.pbl import PBLTask, PBLTaskProgress
+from ...utils.pagination import encode_cursor, decode_cursor
+from ...services.class_event_service import publish_unit_event, EVENT_TASK_SUBMITTED
+from ...services.portfolio_service import portfolio_refresher
 
 router = APIRouter()
+logger = get_logger(__name__)
 
 @router.get("/tasks/{task_uuid}")
 def get_task_detail(
@@ -17,11 +23,7 @@ def get_task_detail(
     current_user: User = Depends(get_current_user)
 ):
     """获取任务详情"""
-    import json
-    import logging
-    
-    logger = logging.getLogger(__name__)
-    logger.info(f"获取任务详情 - 任务UUID: {task_uuid}, 用户ID: {current_user.id}")
+    logger.debug(f"获取任务详情 - 任务UUID: {task_uuid}, 用户ID: {current_user.id}")
     
     task = db.query(PBLTask).filter(PBLTask.uuid == task_uuid).first()
     
@@ -40,7 +42,7 @@ def get_task_detail(
     
     # 如果没有进度记录，创建一个
     if not progress:
-        logger.info("未找到进度记录，创建新记录")
+        logger.debug("未找到进度记录，创建新记录")
         progress = PBLTaskProgress(
             task_id=task.id,
             user_id=current_user.id,
@@ -51,10 +53,7 @@ def get_task_detail(
         db.commit()
         db.refresh(progress)
     else:
-        # 刷新对象以确保获取最新数据
-        db.refresh(progress)
-        logger.info(f"找到进度记录 - ID: {progress.id}, 状态: {progress.status}")
-        logger.info(f"提交内容: {json.dumps(progress.submission, ensure_ascii=False) if progress.submission else 'None'}")
+        logger.debug(f"找到进度记录 - ID: {progress.id}, 状态: {progress.status}")
     
     # 构造返回数据
     progress_data = {
@@ -69,8 +68,6 @@ def get_task_detail(
         'updated_at': progress.updated_at.isoformat() if progress.updated_at else None
     }
     
-    logger.info(f"返回的progress数据: {json.dumps(progress_data, ensure_ascii=False)}")
-    
     result = {
         'id': task.id,
         'uuid': task.uuid,
@@ -95,13 +92,6 @@ def submit_task(
     current_user: User = Depends(get_current_user)
 ):
     """学生提交任务（支持重复提交）"""
-    import json
-    import logging
-    
-    logger = logging.getLogger(__name__)
-    logger.info(f"收到提交请求 - 任务UUID: {task_uuid}, 用户ID: {current_user.id}")
-    logger.info(f"提交内容: {json.dumps(submission, ensure_ascii=False)}")
-    
     task = db.query(PBLTask).filter(PBLTask.uuid == task_uuid).first()
     
     if not task:
@@ -111,8 +101,6 @@ def submit_task(
             status_code=status.HTTP_404_NOT_FOUND
         )
     
-    logger.info(f"找到任务 - ID: {task.id}, 标题: {task.title}")
-    
     try:
         # 查找或创建任务进度
         progress = db.query(PBLTaskProgress).filter(
@@ -121,8 +109,9 @@ def submit_task(
         ).first()
         
         is_resubmit = False
+        previous_status = progress.status if progress else None
+        previous_graded_at = progress.graded_at if progress else None
         if not progress:
-            logger.info("创建新的进度记录")
             progress = PBLTaskProgress(
                 task_id=task.id,
                 user_id=current_user.id,
@@ -132,7 +121,6 @@ def submit_task(
             db.add(progress)
             db.flush()  # 先 flush 以获取 ID
         else:
-            logger.info(f"找到现有进度记录 - ID: {progress.id}, 状态: {progress.status}")
             # 如果是重新提交，清除原有的评分和反馈
             if progress.status in ['review', 'completed']:
                 is_resubmit = True
@@ -146,16 +134,28 @@ def submit_task(
         progress.status = 'review'
         progress.progress = 100
         
-        logger.info(f"准备提交到数据库 - 进度ID: {progress.id}, submission: {progress.submission}")
-        
         db.commit()
         db.refresh(progress)
         
-        logger.info(f"数据库提交成功 - 进度ID: {progress.id}")
+        # 只记录摘要信息，提交内容可能很大，不写入日志
+        logger.info(f"作业提交成功 - 任务ID: {task.id}, 用户ID: {current_user.id}, 进度ID: {progress.id}, 重新提交: {is_resubmit}")
+        
+        # 重新提交清除了原评分，刷新原评分所在学年的成长档案
+        if is_resubmit and previous_graded_at:
+            portfolio_refresher.mark(current_user.id, previous_graded_at)
         
-        # 验证数据是否写入
-        verify = db.query(PBLTaskProgress).filter(PBLTaskProgress.id == progress.id).first()
-        logger.info(f"验证写入 - submission: {verify.submission}")
+        # 推送给正在查看该班级的教师看板（不含提交内容）
+        publish_unit_event(db, task.unit_id, EVENT_TASK_SUBMITTED, {
+            'submission_id': progress.id,
+            'task_id': task.id,
+            'unit_id': task.unit_id,
+            'student_id': current_user.id,
+            'student_name': current_user.full_name,
+            'status': progress.status,
+            'previous_status': previous_status,
+            'is_resubmit': is_resubmit,
+            'submitted_at': progress.updated_at
+        })
         
         message = "作业重新提交成功，等待教师重新评分" if is_resubmit else "任务提交成功，等待教师评分"
         
@@ -173,7 +173,7 @@ def submit_task(
         )
     except Exception as e:
         db.rollback()
-        logger.error(f"提交失败: {str(e)}", exc_info=True)
+        logger.error(f"提交失败 - 任务UUID: {task_uuid}, 用户ID: {current_user.id}: {str(e)}", exc_info=True)
         return error_response(
             message=f"提交失败: {str(e)}",
             code=500,
@@ -253,53 +253,102 @@ def update_task_progress(
 @router.get("/my-tasks")
 def get_my_tasks(
     status_filter: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """获取我提交的所有任务"""
+    """
+    获取我提交的任务（按提交时间倒序，游标分页）
+
+    一条联表查询取出任务、单元、课程信息，只查询列表需要的字段。
+    翻页时把上一页返回的 next_cursor 作为 cursor 传入。
+    """
     from ...models.pbl import PBLUnit, PBLCourse
     
     # 只查询已提交的任务（status为review或completed）
-    query = db.query(PBLTaskProgress).filter(
+    statuses = [s for s in ('review', 'completed') if not status_filter or s == status_filter]
+    if not statuses:
+        return success_response(data={'items': [], 'next_cursor': None, 'has_more': False})
+    
+    try:
+        after = decode_cursor(cursor)
+    except ValueError as e:
+        return error_response(message=str(e), code=400, status_code=status.HTTP_400_BAD_REQUEST)
+    
+    query = db.query(
+        PBLTaskProgress.id.label('progress_id'),
+        PBLTaskProgress.status,
+        PBLTaskProgress.progress,
+        PBLTaskProgress.score,
+        PBLTaskProgress.feedback,
+        PBLTaskProgress.updated_at,
+        PBLTaskProgress.graded_at,
+        PBLTask.id.label('task_id'),
+        PBLTask.uuid.label('task_uuid'),
+        PBLTask.title.label('task_title'),
+        PBLTask.type.label('task_type'),
+        PBLTask.difficulty.label('task_difficulty'),
+        PBLTask.estimated_time,
+        PBLUnit.id.label('unit_id'),
+        PBLUnit.uuid.label('unit_uuid'),
+        PBLUnit.title.label('unit_title'),
+        PBLCourse.id.label('course_id'),
+        PBLCourse.uuid.label('course_uuid'),
+        PBLCourse.title.label('course_title')
+    ).join(
+        PBLTask, PBLTask.id == PBLTaskProgress.task_id
+    ).join(
+        PBLUnit, PBLUnit.id == PBLTask.unit_id
+    ).join(
+        PBLCourse, PBLCourse.id == PBLUnit.course_id
+    ).filter(
         PBLTaskProgress.user_id == current_user.id,
-        PBLTaskProgress.status.in_(['review', 'completed'])
+        PBLTaskProgress.status.in_(statuses)
     )
     
-    if status_filter:
-        query = query.filter(PBLTaskProgress.status == status_filter)
+    if after:
+        after_updated_at, after_id = after
+        query = query.filter(or_(
+            PBLTaskProgress.updated_at < after_updated_at,
+            and_(PBLTaskProgress.updated_at == after_updated_at, PBLTaskProgress.id < after_id)
+        ))
     
-    progress_list = query.order_by(PBLTaskProgress.updated_at.desc()).all()
+    # 多取一条用于判断是否还有下一页
+    rows = query.order_by(
+        PBLTaskProgress.updated_at.desc(),
+        PBLTaskProgress.id.desc()
+    ).limit(limit + 1).all()
     
-    result = []
-    for progress in progress_list:
-        task = db.query(PBLTask).filter(PBLTask.id == progress.task_id).first()
-        if task:
-            # 获取单元信息
-            unit = db.query(PBLUnit).filter(PBLUnit.id == task.unit_id).first()
-            if unit:
-                # 获取课程信息
-                course = db.query(PBLCourse).filter(PBLCourse.id == unit.course_id).first()
-                if course:
-                    result.append({
-                        'task_id': task.id,
-                        'task_uuid': task.uuid,
-                        'task_title': task.title,
-                        'task_type': task.type,
-                        'task_difficulty': task.difficulty,
-                        'estimated_time': task.estimated_time,
-                        'unit_id': unit.id,
-                        'unit_uuid': unit.uuid,
-                        'unit_title': unit.title,
-                        'course_id': course.id,
-                        'course_uuid': course.uuid,
-                        'course_title': course.title,
-                        'progress_id': progress.id,
-                        'status': progress.status,
-                        'progress': progress.progress,
-                        'score': progress.score,
-                        'feedback': progress.feedback,
-                        'submitted_at': progress.updated_at.isoformat() if progress.updated_at else None,
-                        'graded_at': progress.graded_at.isoformat() if progress.graded_at else None
-                    })
+    has_more = len(rows) > limit
+    rows = rows[:limit]
     
-    return success_response(data=result)
+    items = [{
+        'task_id': row.task_id,
+        'task_uuid': row.task_uuid,
+        'task_title': row.task_title,
+        'task_type': row.task_type,
+        'task_difficulty': row.task_difficulty,
+        'estimated_time': row.estimated_time,
+        'unit_id': row.unit_id,
+        'unit_uuid': row.unit_uuid,
+        'unit_title': row.unit_title,
+        'course_id': row.course_id,
+        'course_uuid': row.course_uuid,
+        'course_title': row.course_title,
+        'progress_id': row.progress_id,
+        'status': row.status,
+        'progress': row.progress,
+        'score': row.score,
+        'feedback': row.feedback,
+        'submitted_at': row.updated_at.isoformat() if row.updated_at else None,
+        'graded_at': row.graded_at.isoformat() if row.graded_at else None
+    } for row in rows]
+    
+    next_cursor = encode_cursor(rows[-1].updated_at, rows[-1].progress_id) if has_more else None
+    
+    return success_response(data={
+        'items': items,
+        'next_cursor': next_cursor,
+        'has_more': has_more
+    })
@@ -8,10 +8,12 @@ from typing import List, Optional
 from datetime import datetime
 import uuid
 
-from ...core.deps import get_db, get_current_admin
+from ...core.deps import get_db, get_current_admin, get_idempotency_key
 from ...models.pbl import PBLTemplateSchoolPermission, PBLCourseTemplate
 from ...models.admin import Admin
 from ...models.school import School
+from ...services.template_service import grant_template_to_schools
+from ...services.job_service import submit_job, job_submitted_response
 from ...schemas.pbl import (
     TemplateSchoolPermissionCreate,
     TemplateSchoolPermissionUpdate,
@@ -296,6 +298,8 @@ async def batch_grant_permissions(
     valid_from: Optional[datetime] = None,
     valid_until: Optional[datetime] = None,
     remarks: Optional[str] = None,
+    background: bool = Query(False, description="是否作为后台任务执行（立即返回任务ID）"),
+    idempotency_key: Optional[str] = Depends(get_idempotency_key),
     db: Session = Depends(get_db),
     current_user: Admin = Depends(get_current_admin)
 ):
@@ -311,57 +315,37 @@ async def batch_grant_permissions(
     if not template:
         raise HTTPException(status_code=404, detail="课程模板不存在")
     
-    success_count = 0
-    failed_schools = []
-    
-    for school_id in school_ids:
-        # 检查学校是否存在
-        school = db.query(School).filter(School.id == school_id).first()
-        if not school:
-            failed_schools.append({"school_id": school_id, "reason": "学校不存在"})
-            continue
-        
-        # 检查是否已存在
-        existing = db.query(PBLTemplateSchoolPermission).filter(
-            PBLTemplateSchoolPermission.template_id == template_id,
-            PBLTemplateSchoolPermission.school_id == school_id
-        ).first()
-        
-        if existing:
-            failed_schools.append({
-                "school_id": school_id, 
-                "school_name": school.school_name,
-                "reason": "已存在权限记录"
-            })
-            continue
-        
-        # 创建权限
-        permission = PBLTemplateSchoolPermission(
-            uuid=str(uuid.uuid4()),
-            template_id=template_id,
-            school_id=school_id,
-            is_active=is_active,
-            can_customize=can_customize,
-            max_instances=max_instances,
-            valid_from=valid_from,
-            valid_until=valid_until,
-            remarks=remarks,
-            granted_by=current_user.id,
-            current_instances=0
+    # 后台执行：立即返回任务ID
+    if background:
+        job, created = submit_job(
+            db, 'template_batch_grant', current_user,
+            params={
+                'template_id': template_id,
+                'school_ids': school_ids,
+                'is_active': is_active,
+                'can_customize': can_customize,
+                'max_instances': max_instances,
+                'valid_from': valid_from.isoformat() if valid_from else None,
+                'valid_until': valid_until.isoformat() if valid_until else None,
+                'remarks': remarks
+            },
+            idempotency_key=idempotency_key
         )
-        
-        db.add(permission)
-        success_count += 1
+        return job_submitted_response(job, created)
     
+    data = grant_template_to_schools(
+        db, template, school_ids, current_user.id,
+        is_active=is_active,
+        can_customize=can_customize,
+        max_instances=max_instances,
+        valid_from=valid_from,
+        valid_until=valid_until,
+        remarks=remarks
+    )
     db.commit()
     
     return {
         "success": True,
-        "message": f"成功开放给 {success_count} 个学校",
-        "data": {
-            "template_title": template.title,
-            "success_count": success_count,
-            "failed_count": len(failed_schools),
-            "failed_schools": failed_schools
-        }
+        "message": f"成功开放给 {data['success_count']} 个学校",
+        "data": data
     }
@@ -0,0 +1,167 @@
+"""
+响应压缩中间件
+
+根据请求的 Accept-Encoding 协商压缩方式（优先 br，其次 gzip），
+只压缩超过阈值的 JSON / 文本响应。流式响应（如 SSE、分块导出）原样透传。
+
+br 压缩需要安装可选依赖 brotli，未安装时只使用 gzip。
+超过 threadpool_min_size 的响应体放到线程池中压缩，避免阻塞事件循环。
+"""
+import gzip
+from typing import Dict, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+try:
+    import brotli
+except ImportError:  # brotli 为可选依赖
+    brotli = None
+
+# 可以压缩的响应类型
+COMPRESSIBLE_TYPES = (
+    'application/json',
+    'text/',
+    'application/javascript',
+    'application/xml',
+)
+
+# 不压缩的响应类型（事件流需要逐条推送）
+EXCLUDED_TYPES = ('text/event-stream',)
+
+
+def _parse_accept_encoding(accept_encoding: str) -> Dict[str, float]:
+    """解析 Accept-Encoding，返回 {编码: q 值}（q 值不合法的条目忽略）"""
+    result = {}
+    for part in accept_encoding.split(','):
+        name, _, params = part.partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    q = float(value.strip())
+                except ValueError:
+                    q = None
+                break
+        if q is not None:
+            result[name] = q
+    return result
+
+
+def _choose_encoding(accept_encoding: str, allow_br: bool) -> Optional[str]:
+    """根据 Accept-Encoding 选择压缩方式（q=0 表示拒绝，未列出的编码按 * 的 q 值）"""
+    qualities = _parse_accept_encoding(accept_encoding)
+    wildcard = qualities.get('*', 0)
+
+    def accepted(name: str) -> bool:
+        return qualities.get(name, wildcard) > 0
+
+    if allow_br and brotli is not None and accepted('br'):
+        return 'br'
+    if accepted('gzip'):
+        return 'gzip'
+    return None
+
+
+def _merge_vary(vary: Optional[bytes]) -> bytes:
+    """在已有的 Vary 中加入 Accept-Encoding"""
+    if not vary:
+        return b'Accept-Encoding'
+    tokens = [token.strip().lower() for token in vary.split(b',')]
+    if b'*' in tokens or b'accept-encoding' in tokens:
+        return vary
+    return vary + b', Accept-Encoding'
+
+
+def _is_compressible(content_type: str) -> bool:
+    content_type = content_type.lower()
+    if content_type.startswith(EXCLUDED_TYPES):
+        return False
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+class CompressionMiddleware:
+    """纯 ASGI 响应压缩中间件"""
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6,
+                 brotli_quality: int = 4, allow_br: bool = True,
+                 threadpool_min_size: int = 256 * 1024):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.allow_br = allow_br
+        self.threadpool_min_size = threadpool_min_size
+
+    def _compress(self, body: bytes, encoding: str) -> bytes:
+        if encoding == 'br':
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = ''
+        for name, value in scope.get('headers', []):
+            if name == b'accept-encoding':
+                accept_encoding = value.decode('latin-1')
+                break
+        encoding = _choose_encoding(accept_encoding, self.allow_br)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough
+
+            if message['type'] == 'http.response.start':
+                # 先暂存响应头，等拿到响应体后再决定是否压缩
+                start_message = message
+                return
+
+            if message['type'] != 'http.response.body' or passthrough:
+                await send(message)
+                return
+
+            if start_message is not None:
+                pending_start, start_message = start_message, None
+                body = message.get('body', b'')
+                headers = pending_start.get('headers', [])
+                header_map = {k.lower(): v for k, v in headers}
+                content_type = header_map.get(b'content-type', b'').decode('latin-1')
+
+                # 流式响应、已压缩响应、小响应和不可压缩类型原样输出
+                if (message.get('more_body', False)
+                        or b'content-encoding' in header_map
+                        or len(body) < self.minimum_size
+                        or not _is_compressible(content_type)):
+                    passthrough = True
+                    await send(pending_start)
+                    await send(message)
+                    return
+
+                if len(body) >= self.threadpool_min_size:
+                    compressed = await run_in_threadpool(self._compress, body, encoding)
+                else:
+                    compressed = self._compress(body, encoding)
+
+                new_headers = [(k, v) for k, v in headers if k.lower() not in (b'content-length', b'vary')]
+                new_headers.append((b'content-encoding', encoding.encode()))
+                new_headers.append((b'content-length', str(len(compressed)).encode()))
+                vary = b', '.join(v for k, v in headers if k.lower() == b'vary')
+                new_headers.append((b'vary', _merge_vary(vary)))
+                await send({**pending_start, 'headers': new_headers})
+                await send({'type': 'http.response.body', 'body': compressed, 'more_body': False})
+                return
+
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
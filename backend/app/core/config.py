@@ -34,6 +34,12 @@ class Settings(BaseSettings):
     
     # 数据库连接URL（自动构建，无需手动配置）
     database_url: Optional[str] = None
+
+    # 数据库连接池配置（每个进程一个连接池，多 worker 时 MySQL 连接数按进程数成倍增加）
+    db_pool_size: int = 10  # 常驻连接数
+    db_max_overflow: int = 20  # 繁忙时允许额外创建的连接数
+    db_pool_timeout: float = 30  # 等待空闲连接的超时（秒）
+    db_pool_recycle: int = 3600  # 连接使用超过该秒数后重建，需小于 MySQL 的 wait_timeout
     
     # JWT配置（必须从环境变量读取）
     secret_key: str
@@ -54,7 +60,68 @@ class Settings(BaseSettings):
     
     # 日志级别配置
     log_level: str = "INFO"  # DEBUG, INFO, WARNING, ERROR, CRITICAL
+    # 日志格式：text（彩色文本，适合本地开发）或 json（每行一条 JSON，适合日志采集）
+    log_format: str = "text"
+    # 需要采样记录访问日志的高频接口路径前缀（逗号分隔），如视频播放心跳
+    log_sample_paths: str = "/api/v1/video/progress/progress/update,/api/v1/video/progress/event/"
+    # 高频接口访问日志的采样率（0-1），出错或慢请求始终记录
+    log_sample_rate: float = 0.05
+    # 慢请求阈值（毫秒），超过该值的请求始终记录访问日志
+    log_slow_request_ms: int = 1000
+    
+    # 是否开启 /metrics 指标接口（Prometheus 文本格式）
+    metrics_enabled: bool = True
+    
+    # 响应压缩配置（根据 Accept-Encoding 协商 br/gzip，br 需要安装 brotli）
+    compression_enabled: bool = True
+    compression_min_size: int = 1024  # 小于该字节数的响应不压缩
+    compression_gzip_level: int = 6
+    compression_brotli_quality: int = 4
+    compression_threadpool_min_size: int = 262144  # 不小于该字节数的响应放到线程池中压缩，避免阻塞事件循环
+    
+    # 计数器配置（浏览/点赞/下载次数在内存中累加，定期批量写入数据库）
+    counter_flush_interval: float = 5.0  # 刷新间隔（秒）
+    counter_flush_threshold: int = 1000  # 累计增量条目达到该数量时立即刷新
+    
+    # 标识解析缓存配置（UUID/学校代码 -> ID，进程内 LRU）
+    identity_cache_size: int = 50000  # 最大缓存条目数
+    identity_cache_ttl: float = 3600  # 命中记录的缓存时间（秒）
+    identity_cache_negative_ttl: float = 30  # 不存在记录的缓存时间（秒）
     
+    # 班级权限上下文缓存配置（班级、授课教师、已发布课程，进程内）
+    class_access_cache_size: int = 4096  # 最大缓存班级数
+    class_access_cache_ttl: float = 60  # 缓存时间（秒）
+    
+    # 后台任务配置（批量导入、导出、批量授权等在独立的 worker 进程中执行）
+    job_worker_processes: int = 1  # 随应用启动的 worker 进程数，0 表示不启动（单独运行 python -m app.services.job_worker）
+    job_poll_interval: float = 1.0  # 没有待执行任务时的轮询间隔（秒）
+    job_storage_dir: str = "storage/jobs"  # 上传文件和结果文件的存储目录
+    job_stale_timeout: int = 900  # 执行中的任务超过该秒数没有进度更新，视为 worker 已退出
+    job_max_attempts: int = 2  # 最多执行次数（worker 异常退出后重新排队）
+    job_result_retention_hours: int = 72  # 结果文件保留时间（小时）
+    
+    # 班级实时事件配置（教师看板通过 SSE 接收提交、批阅、视频完成等增量事件）
+    class_events_broker: str = "memory"  # 分发方式：memory（进程内）、none（关闭推送）
+    class_events_queue_size: int = 256  # 每个连接待发送事件的上限，溢出后通知看板重新加载
+    class_events_history_size: int = 100  # 每个班级保留的最近事件数（断线重连时补发）
+    class_events_history_ttl: float = 300  # 班级没有连接后继续保留事件的时间（秒）
+    class_events_heartbeat: float = 15  # 心跳间隔（秒），需小于代理的空闲超时
+    
+    # 成长档案统计配置（学习时长、完成项目、平均分按学年汇总，写入后增量刷新）
+    portfolio_refresh_interval: float = 30  # 增量刷新间隔（秒）
+    portfolio_school_year_start_month: int = 9  # 学年开始月份（9 月 1 日至次年 8 月 31 日为一个学年）
+
+    # 生产服务配置（python -m app.core.server 启动，Dockerfile 默认使用）
+    server_host: str = "0.0.0.0"
+    server_port: int = 8000
+    server_workers: int = 1  # worker 进程数，0 表示与 CPU 核数相同
+    server_loop: str = "auto"  # 事件循环：auto（已安装 uvloop 时使用）、uvloop、asyncio
+    server_http: str = "auto"  # HTTP 解析：auto（已安装 httptools 时使用）、httptools、h11
+    server_threadpool_size: int = 0  # 同步接口线程池大小，0 表示与连接池上限（DB_POOL_SIZE + DB_MAX_OVERFLOW）相同
+    server_max_requests: int = 0  # worker 处理该数量的请求后退出并由主进程重启，0 表示不重启
+    server_max_requests_jitter: int = 0  # 每个 worker 的重启阈值额外加 0 ~ 该值的随机数，避免同时重启
+    server_graceful_timeout: int = 30  # 退出时等待进行中请求（如视频进度上报）完成的最长时间（秒）
+
     # 阿里云VOD配置（可选，如果不使用阿里云视频则不需要配置）
     aliyun_access_key_id: Optional[str] = None
     aliyun_access_key_secret: Optional[str] = None
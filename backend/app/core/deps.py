@@ -1,4 +1,4 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, Header, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 from typing import Optional
@@ -181,3 +181,42 @@ def get_current_user_or_admin(
             pass
     
     raise credentials_exception
+
+def get_class_context(
+    request: Request,
+    db: Session = Depends(get_db),
+    current_admin = Depends(get_current_admin)
+):
+    """
+    班级接口的权限依赖：解析路径中的班级UUID（class_uuid 或 class_id），返回 ClassContext
+
+    班级快照（学校、授课教师、已发布课程）走进程内缓存，本校管理员和教师均可访问；
+    需要管理权限的接口使用 get_managed_class_context
+    """
+    from ..services.class_access_service import ClassContext, get_class_snapshot, resolve_access
+    
+    class_uuid = request.path_params.get('class_uuid') or request.path_params.get('class_id')
+    snapshot = get_class_snapshot(db, class_uuid) if class_uuid else None
+    if snapshot is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="班级不存在")
+    
+    access = resolve_access(snapshot, current_admin)
+    if access is None:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="无权限查看该班级")
+    
+    return ClassContext(snapshot, access, current_admin)
+
+def get_managed_class_context(context = Depends(get_class_context)):
+    """班级管理权限依赖：教师必须是本班授课教师"""
+    if not context.can_manage:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="无权限操作该班级")
+    return context
+
+def get_idempotency_key(idempotency_key: Optional[str] = Header(None, alias='Idempotency-Key')) -> Optional[str]:
+    """提交后台任务时的幂等键（请求头 Idempotency-Key），同一管理员重复提交时返回已有任务"""
+    if idempotency_key is None:
+        return None
+    idempotency_key = idempotency_key.strip()
+    if len(idempotency_key) > 100:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Idempotency-Key 不能超过100个字符")
+    return idempotency_key or None
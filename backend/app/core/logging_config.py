@@ -1,11 +1,23 @@
+import atexit
+import copy
 import logging
+import logging.handlers
+import queue
+import random
 import sys
-from typing import Any
+from typing import Any, Iterable, Optional
 import json
 
+# 队列日志监听器（setup_logging 重复调用时需要先停止旧的监听器）
+_queue_listener: Optional[logging.handlers.QueueListener] = None
+
+# LogRecord 的标准属性，其余属性视为通过 extra 传入的结构化字段
+_RESERVED_ATTRS = frozenset(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+
+
 class ColoredFormatter(logging.Formatter):
     """自定义彩色日志格式化器"""
-    
+
     # ANSI颜色代码
     COLORS = {
         'DEBUG': '\033[36m',    # 青色
@@ -15,59 +27,144 @@ class ColoredFormatter(logging.Formatter):
         'CRITICAL': '\033[35m', # 紫色
     }
     RESET = '\033[0m'
-    
+
     def format(self, record: logging.LogRecord) -> str:
-        # 添加颜色
+        # 添加颜色（在副本上修改，避免其他处理器拿到带颜色代码的 levelname）
         if record.levelname in self.COLORS:
+            record = logging.makeLogRecord(record.__dict__)
             record.levelname = f"{self.COLORS[record.levelname]}{record.levelname}{self.RESET}"
         return super().format(record)
 
 
-def setup_logging(level: str = "INFO") -> None:
+class JsonFormatter(logging.Formatter):
+    """JSON 日志格式化器：每条日志输出一行 JSON，便于日志系统采集和检索"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            'time': self.formatTime(record, '%Y-%m-%d %H:%M:%S'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        # 通过 extra 传入的结构化字段
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith('_'):
+                payload[key] = value
+        if record.exc_info:
+            payload['exception'] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """
+    只在请求线程中合并消息参数，异常堆栈留给监听线程格式化
+
+    标准 QueueHandler 会在入队前完整格式化一次（包括异常堆栈），
+    这里的队列不跨进程，不需要这样做。
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def _stop_queue_listener() -> None:
+    """停止队列日志监听器，确保退出前队列中的日志全部写出"""
+    global _queue_listener
+    if _queue_listener is not None:
+        _queue_listener.stop()
+        _queue_listener = None
+
+
+class RequestLogSampler:
+    """
+    请求日志采样器
+
+    视频心跳等高频接口只按比例记录访问日志；
+    出错（状态码 >= 400）或慢请求始终记录。
+    """
+
+    def __init__(self, sampled_paths: Iterable[str], sample_rate: float, slow_ms: float):
+        self.sampled_paths = tuple(p.strip() for p in sampled_paths if p.strip())
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+
+    def should_log(self, path: str, status_code: int, duration_ms: float) -> bool:
+        if status_code >= 400 or duration_ms >= self.slow_ms:
+            return True
+        if self.sampled_paths and path.startswith(self.sampled_paths):
+            return random.random() < self.sample_rate
+        return True
+
+
+def setup_logging(level: str = "INFO", fmt: str = "text", use_queue: bool = True) -> None:
     """
     配置应用程序日志
-    
+
     Args:
         level: 日志级别 (DEBUG, INFO, WARNING, ERROR, CRITICAL)
+        fmt: 日志格式 (text: 彩色文本, json: 每行一条 JSON)
+        use_queue: 是否通过 QueueHandler/QueueListener 异步输出，避免请求线程阻塞在 I/O 上
     """
+    global _queue_listener
+
     # 转换日志级别
     log_level = getattr(logging, level.upper(), logging.INFO)
-    
+
     # 创建根日志记录器
     root_logger = logging.getLogger()
     root_logger.setLevel(log_level)
-    
+
     # 如果已经有处理器，先清除
+    _stop_queue_listener()
     if root_logger.handlers:
         root_logger.handlers.clear()
-    
+
     # 创建控制台处理器
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setLevel(log_level)
-    
+
     # 设置格式
-    formatter = ColoredFormatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
+    if fmt.lower() == "json":
+        formatter = JsonFormatter()
+    else:
+        formatter = ColoredFormatter(
+            '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+            datefmt='%Y-%m-%d %H:%M:%S'
+        )
     console_handler.setFormatter(formatter)
-    
+
     # 添加处理器到根日志记录器
-    root_logger.addHandler(console_handler)
-    
+    if use_queue:
+        # 请求线程只把日志放入队列，由后台线程负责格式化和写出
+        log_queue: Any = queue.SimpleQueue()
+        root_logger.addHandler(_QueueHandler(log_queue))
+        _queue_listener = logging.handlers.QueueListener(
+            log_queue, console_handler, respect_handler_level=True
+        )
+        _queue_listener.start()
+    else:
+        root_logger.addHandler(console_handler)
+
     # 设置第三方库的日志级别
     logging.getLogger("uvicorn").setLevel(logging.INFO)
-    logging.getLogger("uvicorn.access").setLevel(logging.INFO)
+    # 访问日志由 main.py 中的请求日志中间件统一输出（每个请求一行），关闭 uvicorn 自带的访问日志
+    logging.getLogger("uvicorn.access").setLevel(logging.WARNING)
     logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING)
-    
+
+
+atexit.register(_stop_queue_listener)
+
 
 def get_logger(name: str) -> logging.Logger:
     """
     获取日志记录器
-    
+
     Args:
         name: 日志记录器名称，通常使用 __name__
-        
+
     Returns:
         配置好的日志记录器
     """
@@ -0,0 +1,252 @@
+"""
+请求指标采集
+
+提供纯 ASGI 的请求计时中间件和 Prometheus 文本格式的指标输出：
+- 按路由模板（如 /api/v1/admin/club/classes/{class_uuid}/progress）统计延迟直方图
+- 按状态码分类（2xx/3xx/4xx/5xx）统计请求数
+- 当前处理中的请求数
+- 每个请求执行的 SQL 条数
+- 数据库连接池状态
+
+指标保存在进程内存中，多 worker 部署时每个 worker 各自统计。
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .logging_config import get_logger, RequestLogSampler
+
+logger = get_logger(__name__)
+
+# 请求延迟直方图的桶（秒）
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# 单个请求 SQL 条数直方图的桶
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+# 未匹配到路由的请求统一归入该标签，避免随机路径导致指标数量膨胀
+UNMATCHED_ROUTE = "unmatched"
+
+# 当前请求的 SQL 计数器
+_query_counter: ContextVar[Optional[List[int]]] = ContextVar('request_query_counter', default=None)
+
+
+class _Histogram:
+    """简单的累积直方图"""
+
+    __slots__ = ('buckets', 'counts', 'total', 'count')
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.total += value
+        self.count += 1
+
+    def render(self, name: str, labels: str, lines: List[str]) -> None:
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, self.counts):
+            cumulative += bucket_count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {self.count}')
+        lines.append(f'{name}_sum{{{labels}}} {self.total:.6f}')
+        lines.append(f'{name}_count{{{labels}}} {self.count}')
+
+
+def _escape(value: str) -> str:
+    """转义 Prometheus 标签值"""
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class MetricsRegistry:
+    """进程内指标注册表"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latency: Dict[Tuple[str, str], _Histogram] = {}
+        self._query_counts: Dict[Tuple[str, str], _Histogram] = {}
+        self._requests: Dict[Tuple[str, str, str], int] = {}
+        self._in_flight = 0
+        self._engine = None
+
+    def bind_engine(self, engine) -> None:
+        """绑定数据库引擎：统计 SQL 条数并在输出时读取连接池状态"""
+        from sqlalchemy import event
+
+        if self._engine is not None:
+            return
+        self._engine = engine
+        event.listen(engine, 'before_cursor_execute', _count_query)
+
+    def request_started(self) -> None:
+        with self._lock:
+            self._in_flight += 1
+
+    def request_finished(self, method: str, route: str, status_code: int,
+                         duration: float, query_count: int) -> None:
+        key = (method, route)
+        status_class = f"{status_code // 100}xx"
+        with self._lock:
+            self._in_flight -= 1
+            histogram = self._latency.get(key)
+            if histogram is None:
+                histogram = self._latency[key] = _Histogram(LATENCY_BUCKETS)
+            histogram.observe(duration)
+
+            queries = self._query_counts.get(key)
+            if queries is None:
+                queries = self._query_counts[key] = _Histogram(QUERY_COUNT_BUCKETS)
+            queries.observe(query_count)
+
+            counter_key = (method, route, status_class)
+            self._requests[counter_key] = self._requests.get(counter_key, 0) + 1
+
+    def _pool_stats(self) -> Dict[str, int]:
+        """读取连接池状态（QueuePool 才有这些方法）"""
+        pool = self._engine.pool if self._engine is not None else None
+        stats = {}
+        for name in ('size', 'checkedin', 'checkedout', 'overflow'):
+            getter = getattr(pool, name, None)
+            if callable(getter):
+                stats[name] = getter()
+        return stats
+
+    def render(self) -> str:
+        """输出 Prometheus 文本格式"""
+        lines: List[str] = []
+        with self._lock:
+            lines.append('# HELP pbl_http_requests_total HTTP 请求总数（按路由模板和状态码分类）')
+            lines.append('# TYPE pbl_http_requests_total counter')
+            for (method, route, status_class), value in sorted(self._requests.items()):
+                lines.append(
+                    f'pbl_http_requests_total{{method="{method}",route="{_escape(route)}",'
+                    f'status="{status_class}"}} {value}'
+                )
+
+            lines.append('# HELP pbl_http_request_duration_seconds HTTP 请求处理耗时')
+            lines.append('# TYPE pbl_http_request_duration_seconds histogram')
+            for (method, route), histogram in sorted(self._latency.items()):
+                histogram.render('pbl_http_request_duration_seconds',
+                                 f'method="{method}",route="{_escape(route)}"', lines)
+
+            lines.append('# HELP pbl_http_request_db_queries 单个请求执行的 SQL 条数')
+            lines.append('# TYPE pbl_http_request_db_queries histogram')
+            for (method, route), histogram in sorted(self._query_counts.items()):
+                histogram.render('pbl_http_request_db_queries',
+                                 f'method="{method}",route="{_escape(route)}"', lines)
+
+            lines.append('# HELP pbl_http_requests_in_flight 当前处理中的请求数')
+            lines.append('# TYPE pbl_http_requests_in_flight gauge')
+            lines.append(f'pbl_http_requests_in_flight {self._in_flight}')
+
+        pool_stats = self._pool_stats()
+        if pool_stats:
+            lines.append('# HELP pbl_db_pool_connections 数据库连接池状态')
+            lines.append('# TYPE pbl_db_pool_connections gauge')
+            for name, value in pool_stats.items():
+                lines.append(f'pbl_db_pool_connections{{state="{name}"}} {value}')
+
+        return '\n'.join(lines) + '\n'
+
+
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    """SQLAlchemy 事件：累加当前请求的 SQL 条数"""
+    counter = _query_counter.get()
+    if counter is not None:
+        counter[0] += 1
+
+
+def _route_template(scope) -> str:
+    """
+    获取请求匹配到的完整路由模板（FastAPI 匹配路由后会把 route 写入 scope）
+
+    较新版本的 FastAPI 在 include_router 时不再把前缀拼进 route.path，
+    前缀取实际路径中被路由模板匹配的部分之前的内容（项目的路由前缀都不含路径参数）
+    """
+    route = scope.get('route')
+    template = getattr(route, 'path', None)
+    if not template:
+        return UNMATCHED_ROUTE
+    path_regex = getattr(route, 'path_regex', None)
+    path = scope.get('path', '')
+    if path_regex is None or path_regex.match(path):
+        return template
+    index = path.find('/', 1)
+    while index != -1:
+        if path_regex.match(path[index:]):
+            return path[:index] + template
+        index = path.find('/', index + 1)
+    return template
+
+
+# 全局指标注册表
+metrics_registry = MetricsRegistry()
+
+
+class MetricsMiddleware:
+    """
+    纯 ASGI 请求计时中间件
+
+    相比 BaseHTTPMiddleware 不需要为每个请求额外创建任务和响应流，
+    同时负责采集指标和输出访问日志（每个请求一行，高频接口按采样器采样）。
+    """
+
+    def __init__(self, app, registry: MetricsRegistry = metrics_registry,
+                 log_sampler: Optional[RequestLogSampler] = None):
+        self.app = app
+        self.registry = registry
+        self.log_sampler = log_sampler
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        status_holder = [500]
+        counter = [0]
+        _query_counter.set(counter)
+
+        async def send_wrapper(message):
+            if message['type'] == 'http.response.start':
+                status_holder[0] = message['status']
+            await send(message)
+
+        self.registry.request_started()
+        start_time = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - start_time
+            method = scope.get('method', '')
+            route = _route_template(scope)
+            status_code = status_holder[0]
+            self.registry.request_finished(method, route, status_code, duration, counter[0])
+            self._log_request(scope, method, route, status_code, duration * 1000, counter[0])
+
+    def _log_request(self, scope, method: str, route: str, status_code: int,
+                     duration_ms: float, query_count: int) -> None:
+        path = scope.get('path', '')
+        if self.log_sampler is not None and not self.log_sampler.should_log(path, status_code, duration_ms):
+            return
+        client = scope.get('client')
+        # 结构化字段通过 extra 传给 JSON 格式化器
+        logger.info(
+            f"{method} {path} - 状态码: {status_code} - 耗时: {duration_ms:.1f}ms - SQL: {query_count}",
+            extra={
+                'method': method,
+                'path': path,
+                'route': route,
+                'status': status_code,
+                'duration_ms': round(duration_ms, 1),
+                'db_queries': query_count,
+                'client': client[0] if client else None,
+            }
+        )
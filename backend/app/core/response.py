@@ -1,7 +1,37 @@
+from decimal import Decimal
 from typing import Any, Optional
 
+import orjson
 from fastapi.responses import JSONResponse
 
+# orjson 序列化选项：
+# - OPT_NON_STR_KEYS: 兼容标准库行为，允许 int 等非字符串字典键
+# - OPT_SERIALIZE_NUMPY: 直接序列化 numpy 数组和标量
+_ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def _default(obj: Any) -> Any:
+    """orjson 不支持的类型（datetime/date/UUID 已原生支持）"""
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if isinstance(obj, bytes):
+        return obj.decode('utf-8', errors='replace')
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def render_json(content: Any) -> bytes:
+    """使用 orjson 序列化，datetime 输出为 ISO 8601 字符串，Decimal 输出为数字"""
+    return orjson.dumps(content, default=_default, option=_ORJSON_OPTIONS)
+
+
+class FastJSONResponse(JSONResponse):
+    """基于 orjson 的 JSONResponse，可直接返回 datetime/Decimal，无需手动 isoformat()"""
+
+    def render(self, content: Any) -> bytes:
+        return render_json(content)
+
 
 def success_response(
     data: Optional[Any] = None,
@@ -10,7 +40,7 @@ def success_response(
     status_code: int = 200,
 ) -> JSONResponse:
     """Standard success response wrapper."""
-    return JSONResponse(
+    return FastJSONResponse(
         status_code=status_code,
         content={"success": True, "code": code, "message": message, "data": data},
     )
@@ -23,8 +53,7 @@ def error_response(
     data: Optional[Any] = None,
 ) -> JSONResponse:
     """Standard error response wrapper."""
-    return JSONResponse(
+    return FastJSONResponse(
         status_code=status_code,
         content={"success": False, "code": code, "message": message, "data": data},
     )
-
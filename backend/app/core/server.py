@@ -0,0 +1,245 @@
+"""
+生产环境服务入口
+原来 Dockerfile 直接运行单进程的 uvicorn main:app，所有同步接口共用一个进程的线程池。
+本模块按 SERVER_* 配置启动服务：
+  - 多个 worker 进程共用一个监听 socket，主进程监控 worker，退出后自动补起
+  - 事件循环 / HTTP 解析按配置使用 uvloop / httptools（未安装时退回 asyncio / h11）
+  - worker 处理 SERVER_MAX_REQUESTS（加上随机增量）个请求后平滑退出，由主进程重启，回收内存
+  - 退出时先结束看板 SSE 长连接，再等待进行中的请求（如视频进度上报）写完，最后执行应用的 shutdown
+  - 多进程时后台任务 worker 由主进程统一启动，不随每个 Web worker 各启动一组
+
+同步接口线程池的大小由 main.py 启动时调用 configure_threadpool 设置，默认与数据库连接池上限相同：
+线程数多于连接数时，多出的线程只是在连接池中排队，等待超过 DB_POOL_TIMEOUT 后请求失败。
+
+运行：python -m app.core.server [--workers 4] [--port 8000]
+"""
+import argparse
+import importlib.util
+import multiprocessing
+import os
+import random
+import signal
+import threading
+import time
+from typing import List
+
+import uvicorn
+from anyio import to_thread
+
+from .config import settings
+from .logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# worker 启动后不到该秒数就退出，视为启动失败，等待 RESTART_DELAY 秒后再补起，避免反复重启
+MIN_WORKER_LIFETIME = 5.0
+RESTART_DELAY = 1.0
+
+# 停止时除 SERVER_GRACEFUL_TIMEOUT 外，再给应用 shutdown（写入计数、刷新成长档案等）留出的时间（秒）
+SHUTDOWN_MARGIN = 15.0
+
+
+def _resolve_impl(name: str, preferred: str, module: str, fallback: str) -> str:
+    """auto 时已安装 module 则使用 preferred；指定 preferred 但未安装时退回 fallback"""
+    name = (name or 'auto').lower()
+    if name not in ('auto', preferred):
+        return name
+    if importlib.util.find_spec(module) is not None:
+        return preferred
+    if name == preferred:
+        logger.warning(f"未安装 {module}，使用 {fallback}")
+    return fallback
+
+
+def resolve_loop(name: str) -> str:
+    """事件循环实现：uvloop 或 asyncio"""
+    return _resolve_impl(name, 'uvloop', 'uvloop', 'asyncio')
+
+
+def resolve_http(name: str) -> str:
+    """HTTP 解析实现：httptools 或 h11"""
+    return _resolve_impl(name, 'httptools', 'httptools', 'h11')
+
+
+def worker_count() -> int:
+    """worker 进程数（SERVER_WORKERS 为 0 时与 CPU 核数相同）"""
+    if settings.server_workers > 0:
+        return settings.server_workers
+    return os.cpu_count() or 1
+
+
+def threadpool_size() -> int:
+    """同步接口线程池大小（SERVER_THREADPOOL_SIZE 为 0 时与连接池上限相同）"""
+    if settings.server_threadpool_size > 0:
+        return settings.server_threadpool_size
+    return max(1, settings.db_pool_size + settings.db_max_overflow)
+
+
+def configure_threadpool() -> None:
+    """设置同步接口线程池大小（需在事件循环中调用，main.py 启动时执行）"""
+    limiter = to_thread.current_default_thread_limiter()
+    limiter.total_tokens = threadpool_size()
+    logger.info(f"同步接口线程池: {limiter.total_tokens}")
+
+
+class Server(uvicorn.Server):
+    """退出时先结束看板 SSE 长连接，再等待进行中的请求"""
+
+    async def shutdown(self, sockets=None) -> None:
+        # SSE 连接不会自己结束，不先关闭的话会一直等到 graceful timeout，
+        # 超时后与仍在进行的请求一起被取消
+        from ..services.class_event_service import close_broker
+        close_broker()
+        await super().shutdown(sockets=sockets)
+
+
+def run_worker(config: uvicorn.Config, sockets, max_requests: int, max_requests_jitter: int) -> None:
+    """worker 进程入口（spawn 方式创建，随机数种子各不相同）"""
+    if max_requests > 0:
+        config.limit_max_requests = max_requests + random.randint(0, max(max_requests_jitter, 0))
+    config.configure_logging()
+    try:
+        Server(config).run(sockets=sockets)
+    except KeyboardInterrupt:
+        pass
+
+
+class WorkerSupervisor:
+    """Web worker 进程组：共用监听 socket，worker 退出（达到请求数上限或异常）后补起"""
+
+    def __init__(self, config: uvicorn.Config, workers: int, max_requests: int = 0, max_requests_jitter: int = 0):
+        self.config = config
+        self.workers = workers
+        self.max_requests = max_requests
+        self.max_requests_jitter = max_requests_jitter
+        self._context = multiprocessing.get_context('spawn')
+        self._stopping = threading.Event()
+
+    def _spawn(self, index: int, sockets) -> multiprocessing.Process:
+        process = self._context.Process(
+            target=run_worker,
+            args=(self.config, sockets, self.max_requests, self.max_requests_jitter),
+            name=f'server-worker-{index}'
+        )
+        process.start()
+        return process
+
+    def _handle_signal(self, signum, frame) -> None:
+        logger.info(f"收到信号 {signum}，等待 worker 处理完进行中的请求后退出")
+        self._stopping.set()
+
+    def run(self) -> None:
+        """启动 worker 并监控，收到 SIGTERM / SIGINT 后停止"""
+        sock = self.config.bind_socket()
+        sockets = [sock]
+        signal.signal(signal.SIGTERM, self._handle_signal)
+        signal.signal(signal.SIGINT, self._handle_signal)
+
+        processes = [self._spawn(index, sockets) for index in range(self.workers)]
+        started = [time.monotonic()] * self.workers
+        logger.info(f"Web worker 已启动 - 进程数: {self.workers}, PID: {[p.pid for p in processes]}")
+        try:
+            while not self._stopping.wait(0.5):
+                for index, process in enumerate(processes):
+                    if process.is_alive():
+                        continue
+                    process.join()
+                    if time.monotonic() - started[index] < MIN_WORKER_LIFETIME:
+                        logger.error(f"Web worker 启动后很快退出，{RESTART_DELAY} 秒后重试 - "
+                                     f"PID: {process.pid}, 退出码: {process.exitcode}")
+                        if self._stopping.wait(RESTART_DELAY):
+                            break
+                    else:
+                        logger.info(f"Web worker 已退出，重新启动 - PID: {process.pid}, 退出码: {process.exitcode}")
+                    processes[index] = self._spawn(index, sockets)
+                    started[index] = time.monotonic()
+        finally:
+            self._stop(processes)
+            sock.close()
+
+    def _stop(self, processes: List[multiprocessing.Process]) -> None:
+        """通知 worker 平滑退出，超时后强制结束"""
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        timeout = (settings.server_graceful_timeout or 0) + SHUTDOWN_MARGIN
+        deadline = time.monotonic() + timeout
+        for process in processes:
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                logger.warning(f"Web worker 未在 {timeout} 秒内退出，强制结束 - PID: {process.pid}")
+                process.kill()
+                process.join()
+        logger.info("Web worker 已全部退出")
+
+
+def create_config(app: str, host: str, port: int) -> uvicorn.Config:
+    """uvicorn 配置（app 为 “模块:变量” 形式，由 worker 进程自行导入）"""
+    return uvicorn.Config(
+        app,
+        host=host,
+        port=port,
+        loop=resolve_loop(settings.server_loop),
+        http=resolve_http(settings.server_http),
+        timeout_graceful_shutdown=settings.server_graceful_timeout or None,
+        log_level=settings.log_level.lower(),
+        # 访问日志由 MetricsMiddleware 按采样规则记录
+        access_log=False
+    )
+
+
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description='CodeHubot PBL 生产服务')
+    parser.add_argument('--app', default='main:app', help='ASGI 应用（模块:变量）')
+    parser.add_argument('--host', default=settings.server_host, help='监听地址')
+    parser.add_argument('--port', type=int, default=settings.server_port, help='监听端口')
+    parser.add_argument('--workers', type=int, default=None, help='worker 进程数（默认取 SERVER_WORKERS）')
+    return parser.parse_args()
+
+
+def main():
+    """python -m app.core.server"""
+    from .logging_config import setup_logging
+    setup_logging(level=settings.log_level, fmt=settings.log_format)
+
+    args = parse_args()
+    workers = args.workers if args.workers and args.workers > 0 else worker_count()
+    config = create_config(args.app, args.host, args.port)
+    logger.info(
+        f"启动服务 - 地址: {args.host}:{args.port}, worker: {workers}, 事件循环: {config.loop}, "
+        f"HTTP: {config.http}, 线程池: {threadpool_size()}, 请求数上限: {settings.server_max_requests or '不限'}"
+    )
+
+    # 单进程且不需要定期重启时直接在当前进程运行
+    if workers == 1 and settings.server_max_requests <= 0:
+        Server(config).run()
+        return
+
+    if workers > 1 and settings.class_events_broker == 'memory':
+        logger.warning("班级实时事件使用进程内分发（CLASS_EVENTS_BROKER=memory），"
+                       "多 worker 时看板只能收到同一 worker 内发布的事件")
+
+    # 后台任务 worker 由主进程启动：数量不随 Web worker 成倍增加，Web worker 重启时也不必等待任务结束
+    job_pool = None
+    if settings.job_worker_processes > 0:
+        from ..services.job_worker import JobWorkerPool
+        job_pool = JobWorkerPool(settings.job_worker_processes)
+        job_pool.start()
+        # spawn 出的 Web worker 重新读取环境变量，不再各自启动
+        os.environ['JOB_WORKER_PROCESSES'] = '0'
+
+    try:
+        WorkerSupervisor(
+            config,
+            workers,
+            max_requests=settings.server_max_requests,
+            max_requests_jitter=settings.server_max_requests_jitter
+        ).run()
+    finally:
+        if job_pool is not None:
+            job_pool.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -6,7 +6,11 @@ from ..core.config import settings
 SQLALCHEMY_DATABASE_URL = settings.database_url
 
 engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, 
-    pool_pre_ping=True
+    SQLALCHEMY_DATABASE_URL,
+    pool_pre_ping=True,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_timeout=settings.db_pool_timeout,
+    pool_recycle=settings.db_pool_recycle
 )
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
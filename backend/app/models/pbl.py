@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, Enum, ForeignKey, DateTime, JSON, DECIMAL, BigInteger, Date
+from sqlalchemy import Column, Integer, String, Text, Enum, ForeignKey, DateTime, JSON, DECIMAL, BigInteger, Date, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import uuid
@@ -229,6 +229,11 @@ class PBLProject(Base):
 
 class PBLTaskProgress(Base):
     __tablename__ = "pbl_task_progress"
+    __table_args__ = (
+        Index('idx_user_task', 'user_id', 'task_id'),
+        Index('idx_task_status', 'task_id', 'status'),
+        Index('idx_user_status_updated', 'user_id', 'status', 'updated_at'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     task_id = Column(Integer, ForeignKey("pbl_tasks.id"), nullable=False)
@@ -316,6 +321,9 @@ class PBLClass(Base):
 class PBLClassMember(Base):
     """班级成员表（多对多关系）"""
     __tablename__ = "pbl_class_members"
+    __table_args__ = (
+        Index('idx_class_active', 'class_id', 'is_active'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     class_id = Column(Integer, ForeignKey("pbl_classes.id"), nullable=False)
@@ -415,6 +423,26 @@ class PBLAssessment(Base):
     updated_at = Column(DateTime, default=get_beijing_time_naive, onupdate=get_beijing_time_naive, nullable=False)
 
 
+class PBLAssessmentDimensionScore(Base):
+    """评价维度得分表（pbl_assessments.dimensions 每个维度一行，创建/修改评价时同步写入）"""
+    __tablename__ = "pbl_assessment_dimension_scores"
+    __table_args__ = (
+        Index('idx_assessment_id', 'assessment_id'),
+        Index('idx_student_dimension', 'student_id', 'dimension'),
+        Index('idx_course_dimension', 'course_id', 'dimension'),
+    )
+
+    id = Column(BigInteger, primary_key=True, index=True)
+    assessment_id = Column(BigInteger, ForeignKey("pbl_assessments.id", ondelete="CASCADE"), nullable=False)
+    student_id = Column(Integer, nullable=False, comment='被评价学生ID（冗余字段）')
+    course_id = Column(BigInteger, comment='评价对象所属课程ID（冗余字段，评价对象为学生时为空）')
+    assessor_role = Column(Enum('teacher', 'student', 'expert', 'self'), nullable=False, comment='评价人角色（冗余字段）')
+    dimension = Column(String(100), nullable=False, comment='维度名称')
+    score = Column(DECIMAL(6, 2), nullable=False, comment='维度得分')
+    weight = Column(DECIMAL(6, 4), comment='维度权重')
+    assessed_at = Column(DateTime, nullable=False, comment='评价时间（冗余字段）')
+
+
 class PBLAssessmentTemplate(Base):
     __tablename__ = "pbl_assessment_templates"
 
@@ -501,15 +529,46 @@ class PBLEthicsActivity(Base):
     group_id = Column(Integer)
     facilitator_id = Column(Integer)
     status = Column(Enum('planned', 'ongoing', 'completed', 'cancelled'), default='planned')
-    discussion_records = Column(JSON)
+    discussion_records = Column(JSON)  # 已迁移到 pbl_ethics_discussion_records，不再写入
     conclusions = Column(Text)
-    reflections = Column(JSON)
+    reflections = Column(JSON)  # 已迁移到 pbl_ethics_reflections，不再写入
     scheduled_at = Column(DateTime)
     completed_at = Column(DateTime)
     created_at = Column(DateTime, default=get_beijing_time_naive, nullable=False)
     updated_at = Column(DateTime, default=get_beijing_time_naive, onupdate=get_beijing_time_naive, nullable=False)
 
 
+class PBLEthicsDiscussionRecord(Base):
+    """伦理活动讨论记录表（每条观点一行，只追加）"""
+    __tablename__ = "pbl_ethics_discussion_records"
+    __table_args__ = (
+        Index('idx_ethics_discussion_activity', 'activity_id', 'id'),
+    )
+
+    id = Column(BigInteger, primary_key=True, index=True)
+    activity_id = Column(BigInteger, ForeignKey("pbl_ethics_activities.id", ondelete="CASCADE"), nullable=False)
+    student_id = Column(Integer)  # Foreign Key to core_users
+    student_name = Column(String(100), comment='学生姓名（冗余字段）')
+    viewpoint = Column(Text, comment='观点内容')
+    created_at = Column(DateTime, default=get_beijing_time_naive, nullable=False)
+
+
+class PBLEthicsReflection(Base):
+    """伦理活动反思表（每条反思一行，只追加）"""
+    __tablename__ = "pbl_ethics_reflections"
+    __table_args__ = (
+        Index('idx_ethics_reflection_activity', 'activity_id', 'id'),
+    )
+
+    id = Column(BigInteger, primary_key=True, index=True)
+    activity_id = Column(BigInteger, ForeignKey("pbl_ethics_activities.id", ondelete="CASCADE"), nullable=False)
+    student_id = Column(Integer)  # Foreign Key to core_users
+    student_name = Column(String(100), comment='学生姓名（冗余字段）')
+    content = Column(Text, comment='反思内容')
+    insights = Column(JSON, comment='收获要点')
+    created_at = Column(DateTime, default=get_beijing_time_naive, nullable=False)
+
+
 class PBLExternalExpert(Base):
     __tablename__ = "pbl_external_experts"
 
@@ -548,7 +607,7 @@ class PBLSocialActivity(Base):
     participants = Column(JSON)
     facilitators = Column(JSON)
     status = Column(Enum('planned', 'registration', 'ongoing', 'completed', 'cancelled'), default='planned')
-    photos = Column(JSON)
+    photos = Column(JSON)  # 已迁移到 pbl_social_activity_photos，不再写入
     summary = Column(Text)
     feedback = Column(JSON)
     created_by = Column(Integer)
@@ -556,8 +615,25 @@ class PBLSocialActivity(Base):
     updated_at = Column(DateTime, default=get_beijing_time_naive, onupdate=get_beijing_time_naive, nullable=False)
 
 
+class PBLSocialActivityPhoto(Base):
+    """社会实践活动照片表（每张照片一行，只追加）"""
+    __tablename__ = "pbl_social_activity_photos"
+    __table_args__ = (
+        Index('idx_social_activity_photo_activity', 'activity_id', 'id'),
+    )
+
+    id = Column(BigInteger, primary_key=True, index=True)
+    activity_id = Column(BigInteger, ForeignKey("pbl_social_activities.id", ondelete="CASCADE"), nullable=False)
+    photo_url = Column(String(500), nullable=False, comment='照片地址')
+    uploaded_by = Column(Integer, comment='上传者ID')
+    created_at = Column(DateTime, default=get_beijing_time_naive, nullable=False)
+
+
 class PBLStudentPortfolio(Base):
     __tablename__ = "pbl_student_portfolios"
+    __table_args__ = (
+        UniqueConstraint('student_id', 'school_year', name='uk_student_year'),
+    )
 
     id = Column(BigInteger, primary_key=True, index=True)
     uuid = Column(String(36), unique=True, default=generate_uuid, nullable=False)
@@ -604,6 +680,10 @@ class PBLUserAchievement(Base):
 
 class PBLLearningProgress(Base):
     __tablename__ = "pbl_learning_progress"
+    __table_args__ = (
+        Index('idx_user_unit_resource_status', 'user_id', 'unit_id', 'resource_id', 'status'),
+        Index('idx_user_unit_task_status', 'user_id', 'unit_id', 'task_id', 'status'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, nullable=False)  # Foreign Key to core_users
@@ -624,6 +704,9 @@ class PBLLearningProgress(Base):
 class PBLVideoWatchRecord(Base):
     """视频观看记录表"""
     __tablename__ = "pbl_video_watch_records"
+    __table_args__ = (
+        Index('idx_resource_user', 'resource_id', 'user_id'),
+    )
 
     id = Column(BigInteger, primary_key=True, index=True)
     resource_id = Column(BigInteger, ForeignKey("pbl_resources.id"), nullable=False)
@@ -657,6 +740,10 @@ class PBLVideoUserPermission(Base):
 class PBLVideoPlayProgress(Base):
     """视频播放进度追踪表"""
     __tablename__ = "pbl_video_play_progress"
+    __table_args__ = (
+        Index('idx_session_id', 'session_id'),
+        Index('idx_resource_user_updated', 'resource_id', 'user_id', 'updated_at'),
+    )
 
     id = Column(BigInteger, primary_key=True, index=True)
     uuid = Column(String(36), unique=True, default=generate_uuid, nullable=False)
@@ -745,3 +832,65 @@ class PBLTemplateSchoolPermission(Base):
     # 时间戳
     created_at = Column(DateTime, default=get_beijing_time_naive, nullable=False)
     updated_at = Column(DateTime, default=get_beijing_time_naive, onupdate=get_beijing_time_naive, nullable=False)
+
+
+class PBLFeedbackTemplate(Base):
+    """评语模板表（作业批改时使用）"""
+    __tablename__ = "pbl_feedback_templates"
+
+    id = Column(BigInteger, primary_key=True, index=True)
+    uuid = Column(String(36), unique=True, default=generate_uuid, nullable=False)
+    school_id = Column(Integer, nullable=False)  # Foreign Key to core_schools
+    category = Column(String(50), nullable=False, comment='模板分类：general-通用，excellent-优秀，good-良好，pass-及格，fail-不及格')
+    title = Column(String(100), nullable=False, comment='模板标题')
+    content = Column(Text, nullable=False, comment='模板内容')
+    is_active = Column(Integer, default=1, nullable=False, comment='是否启用')
+    created_by = Column(Integer, comment='创建者ID')
+    created_at = Column(DateTime, default=get_beijing_time_naive, nullable=False)
+    updated_at = Column(DateTime, default=get_beijing_time_naive, onupdate=get_beijing_time_naive, nullable=False)
+
+
+class PBLLikeRecord(Base):
+    """点赞记录表（同一用户对同一对象只计一次）"""
+    __tablename__ = "pbl_like_records"
+    __table_args__ = (
+        UniqueConstraint('target_type', 'target_id', 'user_id', name='uk_target_user'),
+        Index('idx_user_id', 'user_id'),
+    )
+
+    id = Column(BigInteger, primary_key=True, index=True)
+    target_type = Column(String(50), nullable=False, comment='点赞对象类型（对象所在表名）')
+    target_id = Column(BigInteger, nullable=False, comment='点赞对象ID')
+    user_id = Column(Integer, nullable=False)  # Foreign Key to core_users
+    created_at = Column(DateTime, default=get_beijing_time_naive, nullable=False)
+
+
+class PBLBackgroundJob(Base):
+    """后台任务表（批量导入、导出、批量授权等耗时操作）"""
+    __tablename__ = "pbl_background_jobs"
+    __table_args__ = (
+        UniqueConstraint('creator_id', 'idempotency_key', name='uk_creator_idempotency'),
+        Index('idx_status_id', 'status', 'id'),
+        Index('idx_creator_created', 'creator_id', 'created_at'),
+    )
+
+    # SQLite 只有 INTEGER 主键才会自增，便于用 SQLite 测试任务流程
+    id = Column(BigInteger().with_variant(Integer, 'sqlite'), primary_key=True)
+    uuid = Column(String(36), unique=True, default=generate_uuid, nullable=False)
+    job_type = Column(String(50), nullable=False, comment='任务类型')
+    status = Column(String(20), default='pending', nullable=False, comment='状态：pending/running/succeeded/failed')
+    progress = Column(Integer, default=0, nullable=False, comment='进度（0-100）')
+    message = Column(String(500), comment='当前进度说明或失败原因')
+    params = Column(JSON, comment='任务参数')
+    result = Column(JSON, comment='任务结果摘要')
+    result_path = Column(String(500), comment='结果文件路径（相对任务存储目录）')
+    result_filename = Column(String(255), comment='结果文件下载名称')
+    idempotency_key = Column(String(100), comment='幂等键（同一创建者内唯一）')
+    creator_id = Column(Integer, nullable=False)  # Foreign Key to core_users
+    school_id = Column(Integer)  # Foreign Key to core_schools
+    attempts = Column(Integer, default=0, nullable=False, comment='已执行次数')
+    worker_id = Column(String(100), comment='执行的 worker')
+    created_at = Column(DateTime, default=get_beijing_time_naive, nullable=False)
+    started_at = Column(DateTime, comment='开始执行时间')
+    heartbeat_at = Column(DateTime, comment='最近一次进度更新时间')
+    finished_at = Column(DateTime, comment='结束时间')
@@ -0,0 +1,55 @@
+"""
+列表查询的列投影
+部分模型带有很大的 Text / JSON 字段（资料正文、任务要求、作业提交内容、案例正文、成长档案、
+视频观看区间等），列表接口通常用不到，但 db.query(Model) 会把它们全部取回并反序列化。
+
+这里为每个模型登记"重字段"，列表查询用 summary_options 延迟加载：
+
+    db.query(PBLResource).options(*summary_options(PBLResource))
+    selectinload(PBLUnit.resources).options(*summary_options(PBLResource))
+
+需要其中某个字段时在 include 中列出。延迟加载的字段被访问时会单独发一条查询，
+所以列表中确实要返回的字段不要延迟。
+"""
+from typing import Dict, List, Tuple, Type
+
+from sqlalchemy.orm import defer
+
+from ..db.base_class import Base
+from .pbl import (
+    PBLUnit, PBLResource, PBLTask, PBLTaskProgress, PBLProjectOutput, PBLEthicsCase,
+    PBLStudentPortfolio, PBLVideoPlayProgress
+)
+
+# 模型 -> 列表中默认不加载的字段
+HEAVY_COLUMNS: Dict[Type[Base], Tuple[str, ...]] = {
+    PBLUnit: ('learning_guide',),
+    PBLResource: ('content',),
+    PBLTask: ('requirements', 'prerequisites'),
+    PBLTaskProgress: ('submission',),
+    PBLProjectOutput: ('meta_data',),
+    PBLEthicsCase: ('content', 'discussion_questions', 'reference_links'),
+    PBLStudentPortfolio: (
+        'completed_projects', 'achievements', 'skill_assessment', 'growth_trajectory', 'highlights',
+        'teacher_comments', 'self_reflection', 'parent_feedback'
+    ),
+    PBLVideoPlayProgress: ('watched_ranges', 'user_agent'),
+}
+
+
+def summary_options(model: Type[Base], *include: str) -> List:
+    """
+    列表查询的加载选项：延迟加载模型的重字段
+
+    Args:
+        model: 模型类
+        include: 仍需加载的重字段名
+
+    Returns:
+        可直接传给 Query.options() 或关系加载器 .options() 的选项列表
+    """
+    return [
+        defer(getattr(model, name))
+        for name in HEAVY_COLUMNS.get(model, ())
+        if name not in include
+    ]
@@ -0,0 +1,148 @@
+"""
+评价维度得分服务
+pbl_assessments.dimensions（JSON 数组）中的每个维度在 pbl_assessment_dimension_scores 中保存一行，
+创建/修改评价时同步重写；学生、班级、课程的维度统计都用一条 GROUP BY 查询完成，
+不再加载全部评价后在 Python 中遍历 JSON。
+
+维度格式：{"dimension" 或 "name": 维度名称, "score": 得分, "weight": 权重, "comment": 评语}
+（前端使用 dimension，早期数据使用 name）。
+"""
+from decimal import Decimal, InvalidOperation
+from typing import Dict, List, Optional
+
+from sqlalchemy import func, insert
+from sqlalchemy.orm import Session
+
+from ..models.pbl import (
+    PBLAssessment, PBLAssessmentDimensionScore, PBLProject, PBLProjectOutput, PBLTask, PBLUnit
+)
+
+# 维度名称最大长度（与表字段一致）
+MAX_DIMENSION_LENGTH = 100
+
+
+def _to_decimal(value) -> Optional[Decimal]:
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        result = Decimal(str(value))
+    except (InvalidOperation, ValueError):
+        return None
+    return result if result.is_finite() else None
+
+
+def parse_dimension_scores(dimensions) -> List[Dict]:
+    """
+    取出每个维度的名称、得分、权重
+
+    名称为空的维度跳过；没有得分按 0 计（与原统计接口一致），得分不是数字的跳过
+    """
+    if not isinstance(dimensions, list):
+        return []
+    result = []
+    for dim in dimensions:
+        if not isinstance(dim, dict):
+            continue
+        name = next((
+            dim[key].strip() for key in ('dimension', 'name')
+            if isinstance(dim.get(key), str) and dim[key].strip()
+        ), None)
+        if not name:
+            continue
+        score = _to_decimal(dim.get('score', 0))
+        if score is None:
+            continue
+        result.append({
+            'dimension': name[:MAX_DIMENSION_LENGTH],
+            'score': score,
+            'weight': _to_decimal(dim.get('weight'))
+        })
+    return result
+
+
+def resolve_course_id(db: Session, target_type: Optional[str], target_id) -> Optional[int]:
+    """评价对象所属课程（任务 -> 单元 -> 课程，成果 -> 项目 -> 课程）"""
+    if not target_id:
+        return None
+    if target_type == 'task':
+        row = db.query(PBLUnit.course_id).join(PBLTask, PBLTask.unit_id == PBLUnit.id).filter(
+            PBLTask.id == target_id
+        ).first()
+    elif target_type == 'project':
+        row = db.query(PBLProject.course_id).filter(PBLProject.id == target_id).first()
+    elif target_type == 'output':
+        row = db.query(PBLProject.course_id).join(
+            PBLProjectOutput, PBLProjectOutput.project_id == PBLProject.id
+        ).filter(PBLProjectOutput.id == target_id).first()
+    else:
+        return None
+    return row[0] if row else None
+
+
+def sync_dimension_scores(db: Session, assessment: PBLAssessment) -> int:
+    """
+    按评价当前的 dimensions 重写维度得分（不提交，由调用方 commit）
+
+    新建评价需先 flush 取得评价ID
+
+    Returns:
+        写入的维度数
+    """
+    db.query(PBLAssessmentDimensionScore).filter(
+        PBLAssessmentDimensionScore.assessment_id == assessment.id
+    ).delete(synchronize_session=False)
+
+    scores = parse_dimension_scores(assessment.dimensions)
+    if not scores:
+        return 0
+    course_id = resolve_course_id(db, assessment.target_type, assessment.target_id)
+    db.execute(insert(PBLAssessmentDimensionScore), [{
+        'assessment_id': assessment.id,
+        'student_id': assessment.student_id,
+        'course_id': course_id,
+        'assessor_role': assessment.assessor_role,
+        'dimension': item['dimension'],
+        'score': item['score'],
+        'weight': item['weight'],
+        'assessed_at': assessment.created_at
+    } for item in scores])
+    return len(scores)
+
+
+def dimension_stats(db: Session, *filters, by_student: bool = False) -> List[Dict]:
+    """
+    按维度（by_student 时按学生 + 维度）分组统计得分
+
+    Args:
+        filters: pbl_assessment_dimension_scores 上的过滤条件
+
+    Returns:
+        [{dimension, avg_score, min_score, max_score, count, student_count 或 student_id}]
+    """
+    Score = PBLAssessmentDimensionScore
+    group_columns = [Score.student_id, Score.dimension] if by_student else [Score.dimension]
+    rows = db.query(
+        *group_columns,
+        func.avg(Score.score),
+        func.min(Score.score),
+        func.max(Score.score),
+        func.count(Score.id),
+        func.count(func.distinct(Score.student_id))
+    ).filter(*filters).group_by(*group_columns).order_by(*group_columns).all()
+
+    result = []
+    for row in rows:
+        avg_score, min_score, max_score, count, student_count = row[-5:]
+        item = {
+            'dimension': row[len(group_columns) - 1],
+            'avg_score': round(float(avg_score), 2) if avg_score is not None else 0,
+            'min_score': float(min_score) if min_score is not None else 0,
+            'max_score': float(max_score) if max_score is not None else 0,
+            'count': count
+        }
+        if by_student:
+            item['student_id'] = row[0]
+        else:
+            item['student_count'] = student_count
+        result.append(item)
+    return result
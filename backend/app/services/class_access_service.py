@@ -0,0 +1,160 @@
+"""
+班级权限上下文服务
+班级接口（club_classes / class_analytics / classes_groups）几乎每个都要先按 UUID 查班级、
+比较学校、必要时查授课教师，看板一次打开 6-8 个统计接口，每个都重复这些查询。
+
+这里把权限判断需要的数据缓存为班级快照（班级ID、学校、名称、授课教师ID、已发布课程ID）：
+  - 快照按班级 UUID 缓存在进程内，短 TTL；同一班级的所有管理员共用一份，
+    权限判断在快照上完成，不再查询数据库
+  - 授课教师增删、课程创建/发布/删除、班级修改/删除时调用 invalidate_class_access 失效；
+    其他 worker 依赖 TTL 过期
+  - 需要完整班级记录时用 ClassContext.get_class 按主键获取
+"""
+from typing import Dict, FrozenSet, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from ..core.cache import TTLCache, MISSING
+from ..core.config import settings
+from ..core.logging_config import get_logger
+from ..models.pbl import PBLClass, PBLClassTeacher, PBLCourse
+
+logger = get_logger(__name__)
+
+# 班级UUID -> ClassSnapshot
+_snapshot_cache = TTLCache(maxsize=settings.class_access_cache_size, ttl=settings.class_access_cache_ttl)
+
+# 班级ID -> 班级UUID（按班级ID失效时使用）
+_class_uuids: Dict[int, str] = {}
+
+# 访问级别
+ACCESS_PLATFORM = 'platform_admin'      # 平台管理员
+ACCESS_SCHOOL_ADMIN = 'school_admin'    # 本校学校管理员
+ACCESS_CLASS_TEACHER = 'class_teacher'  # 班级授课教师
+ACCESS_SCHOOL_TEACHER = 'school_teacher'  # 本校教师（非本班授课教师）
+
+# 可以管理班级（成员、教师、作业批改等）的访问级别
+MANAGE_LEVELS = frozenset({ACCESS_PLATFORM, ACCESS_SCHOOL_ADMIN, ACCESS_CLASS_TEACHER})
+
+
+class ClassSnapshot:
+    """权限判断需要的班级数据（构建后不再修改）"""
+
+    __slots__ = ('class_id', 'class_uuid', 'school_id', 'name', 'teacher_ids', 'course_ids')
+
+    def __init__(self, class_id: int, class_uuid: str, school_id: int, name: str,
+                 teacher_ids: FrozenSet[int], course_ids: Tuple[int, ...]):
+        self.class_id = class_id
+        self.class_uuid = class_uuid
+        self.school_id = school_id
+        self.name = name
+        self.teacher_ids = teacher_ids
+        # 已发布课程ID，按ID排序
+        self.course_ids = course_ids
+
+
+class ClassContext:
+    """当前管理员访问某个班级的上下文"""
+
+    __slots__ = ('snapshot', 'access', 'admin')
+
+    def __init__(self, snapshot: ClassSnapshot, access: str, admin):
+        self.snapshot = snapshot
+        self.access = access
+        self.admin = admin
+
+    @property
+    def class_id(self) -> int:
+        return self.snapshot.class_id
+
+    @property
+    def class_uuid(self) -> str:
+        return self.snapshot.class_uuid
+
+    @property
+    def school_id(self) -> int:
+        return self.snapshot.school_id
+
+    @property
+    def class_name(self) -> str:
+        return self.snapshot.name
+
+    @property
+    def course_ids(self) -> Tuple[int, ...]:
+        return self.snapshot.course_ids
+
+    @property
+    def can_manage(self) -> bool:
+        return self.access in MANAGE_LEVELS
+
+    def get_class(self, db: Session) -> Optional[PBLClass]:
+        """按主键获取完整班级记录（同一会话内重复调用走 identity map）"""
+        return db.get(PBLClass, self.class_id)
+
+
+def _build_snapshot(db: Session, class_uuid: str) -> Optional[ClassSnapshot]:
+    row = db.query(PBLClass.id, PBLClass.school_id, PBLClass.name).filter(PBLClass.uuid == class_uuid).first()
+    if not row:
+        return None
+    teacher_ids = frozenset(
+        teacher_id for (teacher_id,) in db.query(PBLClassTeacher.teacher_id).filter(
+            PBLClassTeacher.class_id == row.id
+        )
+    )
+    course_ids = tuple(
+        course_id for (course_id,) in db.query(PBLCourse.id).filter(
+            PBLCourse.class_id == row.id,
+            PBLCourse.status == 'published'
+        ).order_by(PBLCourse.id)
+    )
+    return ClassSnapshot(row.id, class_uuid, row.school_id, row.name, teacher_ids, course_ids)
+
+
+def get_class_snapshot(db: Session, class_uuid: str) -> Optional[ClassSnapshot]:
+    """获取班级快照（带缓存），班级不存在时返回 None（不缓存）"""
+    snapshot = _snapshot_cache.get(class_uuid)
+    if snapshot is not MISSING:
+        return snapshot
+    snapshot = _build_snapshot(db, class_uuid)
+    if snapshot is not None:
+        _snapshot_cache.set(class_uuid, snapshot)
+        _class_uuids[snapshot.class_id] = class_uuid
+    return snapshot
+
+
+def resolve_access(snapshot: ClassSnapshot, admin) -> Optional[str]:
+    """
+    计算管理员对班级的访问级别，无权访问时返回 None
+
+    与各接口原有的判断一致：
+      - 平台管理员可访问所有班级
+      - 学校管理员、教师只能访问本校班级；教师是否为本班授课教师区分为不同级别
+    """
+    if admin.role == 'platform_admin':
+        return ACCESS_PLATFORM
+    if admin.school_id is None or admin.school_id != snapshot.school_id:
+        return None
+    if admin.role == 'school_admin':
+        return ACCESS_SCHOOL_ADMIN
+    if admin.role == 'teacher':
+        return ACCESS_CLASS_TEACHER if admin.id in snapshot.teacher_ids else ACCESS_SCHOOL_TEACHER
+    return None
+
+
+def invalidate_class_access(class_uuid: Optional[str] = None, class_id: Optional[int] = None) -> None:
+    """
+    失效班级快照（授课教师、已发布课程、班级学校或名称变化后调用）
+
+    class_uuid 和 class_id 任给其一；都不给时清空全部
+    """
+    if class_uuid is None and class_id is None:
+        _snapshot_cache.clear()
+        _class_uuids.clear()
+        logger.debug("班级权限上下文缓存已清空")
+        return
+    if class_uuid is None:
+        class_uuid = _class_uuids.pop(class_id, None)
+        if class_uuid is None:
+            return
+    _snapshot_cache.delete(class_uuid)
+    logger.debug(f"班级权限上下文已失效 - 班级: {class_uuid}")
@@ -0,0 +1,408 @@
+"""
+班级实时事件服务（教师看板推送）
+上课时教师看板原来轮询 class_analytics / club_classes 的统计接口，每次轮询都重新执行完整的聚合查询。
+现在学生提交作业、教师批阅、学生看完视频时，在业务提交后发布一条增量事件，
+通过 SSE 连接（class_analytics 的 /classes/{class_uuid}/live）推送给正在查看该班级的看板，
+看板打开时加载一次统计数据，之后按事件增量更新，不再重新聚合。
+
+事件分发通过 ClassEventBroker 接口完成，按 CLASS_EVENTS_BROKER 选择实现：
+  - memory：进程内分发（默认）。只能送达同一进程内的连接，多 worker 部署时
+    需要用 register_broker 注册跨进程的实现（如 Redis 发布订阅），否则部分事件收不到
+  - none：关闭推送，发布事件为空操作，看板退回轮询
+
+每个班级保留最近的事件，断线重连时按 Last-Event-ID 补发；补发不了（进程重启、历史已被覆盖、
+连接发送队列溢出）时推送 resync 事件，看板重新加载统计数据。
+"""
+import asyncio
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional, Set
+
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..core.logging_config import get_logger
+from ..core.response import render_json
+from ..models.pbl import PBLCourse, PBLResource, PBLUnit
+
+logger = get_logger(__name__)
+
+# 事件类型
+EVENT_TASK_SUBMITTED = 'task_submitted'        # 学生提交（或重新提交）作业
+EVENT_HOMEWORK_REVIEWED = 'homework_reviewed'  # 教师批阅作业
+EVENT_VIDEO_COMPLETED = 'video_completed'      # 学生看完视频（播放到 90% 以上）
+EVENT_RESYNC = 'resync'                        # 无法补发增量，看板需要重新加载
+
+
+class ClassEvent:
+    """一条班级事件（构建后不再修改，SSE 报文只编码一次，所有连接共用）"""
+
+    __slots__ = ('event_id', 'class_id', 'event_type', 'data', 'payload')
+
+    def __init__(self, event_id: Optional[str], class_id: int, event_type: str, data: Dict[str, Any]):
+        self.event_id = event_id
+        self.class_id = class_id
+        self.event_type = event_type
+        self.data = data
+        lines = [f"event: {event_type}\n".encode()]
+        if event_id is not None:
+            lines.insert(0, f"id: {event_id}\n".encode())
+        # orjson 输出不含换行，可以直接作为一行 data
+        lines.append(b"data: " + render_json(data) + b"\n\n")
+        self.payload = b"".join(lines)
+
+
+def _resync_event(class_id: int, reason: str) -> ClassEvent:
+    # 不带 id，避免客户端用它作为下次重连的 Last-Event-ID
+    return ClassEvent(None, class_id, EVENT_RESYNC, {'reason': reason})
+
+
+# Subscription.get 返回该值表示分发已关闭（应用退出），连接应结束
+CLOSED = object()
+
+
+class Subscription:
+    """
+    一个 SSE 连接的订阅
+
+    事件可以在任意线程发布（同步接口运行在线程池中），通过 call_soon_threadsafe 放入
+    连接所在事件循环的队列；队列满时丢弃后续事件，下次读取时返回 resync。
+    """
+
+    def __init__(self, class_id: int, queue_size: int, on_close: Callable[['Subscription'], None]):
+        self.class_id = class_id
+        self._loop = asyncio.get_running_loop()
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._overflowed = False
+        self._on_close = on_close
+        self._closed = False
+
+    def deliver(self, event) -> None:
+        """投递事件（线程安全）"""
+        try:
+            self._loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # 事件循环已关闭
+            pass
+
+    def _put(self, event) -> None:
+        if event is CLOSED:
+            self._closed = True
+            # 保证读取方能被唤醒
+            if self._queue.full():
+                self._queue.get_nowait()
+            self._queue.put_nowait(CLOSED)
+            return
+        if self._overflowed:
+            return
+        if self._queue.full():
+            self._overflowed = True
+            return
+        self._queue.put_nowait(event)
+
+    async def get(self, timeout: float):
+        """等待下一条事件；超时返回 None，分发关闭时返回 CLOSED"""
+        if self._overflowed and not self._closed:
+            # 已经漏掉事件，剩余的增量没有意义
+            while not self._queue.empty():
+                self._queue.get_nowait()
+            self._overflowed = False
+            return _resync_event(self.class_id, 'overflow')
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self) -> None:
+        """取消订阅（连接结束时调用）"""
+        self._on_close(self)
+
+
+class ClassEventBroker:
+    """
+    事件分发接口
+
+    publish 可以在任意线程调用，不能抛出异常影响业务请求；
+    subscribe 在事件循环中调用，返回的订阅在连接结束时 close。
+    """
+
+    # 为 False 时 SSE 接口直接返回 503，看板退回轮询
+    enabled = True
+
+    def has_listeners(self) -> bool:
+        """当前是否可能有看板在接收事件（为 False 时发布方可以跳过查询班级等准备工作）"""
+        return True
+
+    def publish(self, class_id: int, event_type: str, data: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def subscribe(self, class_id: int, last_event_id: Optional[str] = None) -> Subscription:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """关闭分发，结束所有连接（应用退出时调用）"""
+
+
+class NullBroker(ClassEventBroker):
+    """关闭推送：不分发事件"""
+
+    enabled = False
+
+    def has_listeners(self) -> bool:
+        return False
+
+    def publish(self, class_id: int, event_type: str, data: Dict[str, Any]) -> None:
+        pass
+
+    def subscribe(self, class_id: int, last_event_id: Optional[str] = None) -> Subscription:
+        subscription = Subscription(class_id, 1, lambda sub: None)
+        subscription.deliver(CLOSED)
+        return subscription
+
+
+class _ClassChannel:
+    """一个班级的订阅者和最近事件"""
+
+    __slots__ = ('seq', 'history', 'subscribers', 'idle_since')
+
+    def __init__(self, history_size: int):
+        self.seq = 0
+        self.history: Deque[ClassEvent] = deque(maxlen=history_size)
+        self.subscribers: Set[Subscription] = set()
+        self.idle_since: Optional[float] = None
+
+
+class InProcessBroker(ClassEventBroker):
+    """
+    进程内事件分发
+
+    只为有看板连接（或在 history_ttl 内有过连接）的班级记录事件，其他班级的事件直接丢弃；
+    事件ID为 “进程标识-班级内序号”，重连时据此判断能否从历史中补发。
+    """
+
+    def __init__(self, queue_size: int = 256, history_size: int = 100, history_ttl: float = 300):
+        self.queue_size = queue_size
+        self.history_size = history_size
+        self.history_ttl = history_ttl
+        # 进程标识：进程重启后旧的 Last-Event-ID 无法补发
+        self._boot_id = uuid.uuid4().hex[:8]
+        self._channels: Dict[int, _ClassChannel] = {}
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def has_listeners(self) -> bool:
+        return bool(self._channels)
+
+    def _prune(self, now: float) -> None:
+        """删除长时间没有连接的班级（调用方持有锁）"""
+        expired = [
+            class_id for class_id, channel in self._channels.items()
+            if channel.idle_since is not None and now - channel.idle_since > self.history_ttl
+        ]
+        for class_id in expired:
+            del self._channels[class_id]
+
+    def publish(self, class_id: int, event_type: str, data: Dict[str, Any]) -> None:
+        with self._lock:
+            channel = self._channels.get(class_id)
+            if channel is None:
+                return
+            channel.seq += 1
+            event = ClassEvent(f"{self._boot_id}-{channel.seq}", class_id, event_type, data)
+            channel.history.append(event)
+            # 在锁内投递，保证同一班级的事件按序号顺序到达每个连接
+            for subscription in channel.subscribers:
+                subscription.deliver(event)
+            self._prune(time.monotonic())
+
+    def _replay(self, channel: _ClassChannel, last_event_id: Optional[str]) -> Optional[List[ClassEvent]]:
+        """计算重连时需要补发的事件，无法补发时返回 None"""
+        if not last_event_id:
+            return []
+        boot_id, _, seq = last_event_id.partition('-')
+        if boot_id != self._boot_id or not seq.isdigit():
+            return None
+        last_seq = int(seq)
+        if last_seq > channel.seq:
+            return None
+        missed = channel.seq - last_seq
+        if missed > len(channel.history):
+            return None
+        return list(channel.history)[len(channel.history) - missed:] if missed else []
+
+    def subscribe(self, class_id: int, last_event_id: Optional[str] = None) -> Subscription:
+        subscription = Subscription(class_id, self.queue_size, self._unsubscribe)
+        if self._closed:
+            subscription.deliver(CLOSED)
+            return subscription
+        with self._lock:
+            self._prune(time.monotonic())
+            channel = self._channels.get(class_id)
+            if channel is None:
+                channel = self._channels[class_id] = _ClassChannel(self.history_size)
+            channel.subscribers.add(subscription)
+            channel.idle_since = None
+            # 登记订阅和投递补发事件都在锁内完成：之后发布的事件排在补发事件之后，不会重复或遗漏
+            replay = self._replay(channel, last_event_id)
+            if replay is None:
+                subscription.deliver(_resync_event(class_id, 'expired'))
+            else:
+                for event in replay:
+                    subscription.deliver(event)
+        return subscription
+
+    def _unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            channel = self._channels.get(subscription.class_id)
+            if channel is None:
+                return
+            channel.subscribers.discard(subscription)
+            if not channel.subscribers:
+                channel.idle_since = time.monotonic()
+
+    def subscriber_count(self, class_id: Optional[int] = None) -> int:
+        """当前连接数（class_id 为空时统计所有班级）"""
+        with self._lock:
+            if class_id is not None:
+                channel = self._channels.get(class_id)
+                return len(channel.subscribers) if channel else 0
+            return sum(len(channel.subscribers) for channel in self._channels.values())
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            subscribers = [sub for channel in self._channels.values() for sub in channel.subscribers]
+            self._channels.clear()
+        for subscription in subscribers:
+            subscription.deliver(CLOSED)
+
+
+# ===== 分发实现注册 =====
+
+_broker_factories: Dict[str, Callable[[], ClassEventBroker]] = {
+    'memory': lambda: InProcessBroker(
+        queue_size=settings.class_events_queue_size,
+        history_size=settings.class_events_history_size,
+        history_ttl=settings.class_events_history_ttl
+    ),
+    'none': NullBroker,
+}
+
+_broker: Optional[ClassEventBroker] = None
+_broker_lock = threading.Lock()
+
+
+def register_broker(name: str, factory: Callable[[], ClassEventBroker]) -> None:
+    """注册事件分发实现（需在第一次发布或订阅之前调用）"""
+    _broker_factories[name] = factory
+
+
+def get_broker() -> ClassEventBroker:
+    """当前的事件分发实现（第一次调用时按配置创建）"""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                name = settings.class_events_broker
+                factory = _broker_factories.get(name)
+                if factory is None:
+                    logger.error(f"未知的班级事件分发方式: {name}，使用进程内分发")
+                    factory = _broker_factories['memory']
+                _broker = factory()
+    return _broker
+
+
+def close_broker() -> None:
+    """结束所有看板连接（应用退出时调用，避免 SSE 长连接阻塞退出）"""
+    if _broker is not None:
+        _broker.close()
+
+
+# ===== 发布 =====
+
+def publish_class_event(class_id: Optional[int], event_type: str, data: Dict[str, Any]) -> None:
+    """发布班级事件（在业务提交之后调用，失败只记录日志）"""
+    if class_id is None:
+        return
+    try:
+        get_broker().publish(class_id, event_type, data)
+    except Exception as e:
+        logger.warning(f"发布班级事件失败 - 班级ID: {class_id}, 类型: {event_type}, 错误: {str(e)}")
+
+
+def _class_id_for_unit(db: Session, unit_id: int) -> Optional[int]:
+    return db.query(PBLCourse.class_id).join(
+        PBLUnit, PBLUnit.course_id == PBLCourse.id
+    ).filter(PBLUnit.id == unit_id).scalar()
+
+
+def publish_unit_event(db: Session, unit_id: int, event_type: str, data: Dict[str, Any]) -> None:
+    """
+    发布单元所属班级的事件（按 单元 -> 课程 -> 班级 查找班级）
+
+    没有看板连接时跳过查询
+    """
+    try:
+        if not get_broker().has_listeners():
+            return
+        class_id = _class_id_for_unit(db, unit_id)
+    except Exception as e:
+        logger.warning(f"查找单元所属班级失败 - 单元ID: {unit_id}, 错误: {str(e)}")
+        return
+    publish_class_event(class_id, event_type, data)
+
+
+def publish_resource_event(db: Session, resource_id: int, event_type: str, data: Dict[str, Any]) -> None:
+    """
+    发布资料所属班级的事件（按 资料 -> 单元 -> 课程 -> 班级 查找班级，事件数据补充 unit_id）
+
+    没有看板连接时跳过查询
+    """
+    try:
+        if not get_broker().has_listeners():
+            return
+        row = db.query(PBLCourse.class_id, PBLUnit.id.label('unit_id')).join(
+            PBLUnit, PBLUnit.course_id == PBLCourse.id
+        ).join(
+            PBLResource, PBLResource.unit_id == PBLUnit.id
+        ).filter(PBLResource.id == resource_id).first()
+    except Exception as e:
+        logger.warning(f"查找资料所属班级失败 - 资料ID: {resource_id}, 错误: {str(e)}")
+        return
+    if row is not None:
+        publish_class_event(row.class_id, event_type, {**data, 'unit_id': row.unit_id})
+
+
+# ===== SSE 输出 =====
+
+async def sse_stream(
+    subscription: Subscription,
+    is_disconnected: Callable[[], Awaitable[bool]],
+    heartbeat: float,
+    hello: Optional[Dict[str, Any]] = None
+) -> AsyncIterator[bytes]:
+    """
+    把订阅转换为 SSE 报文流
+
+    没有事件时每隔 heartbeat 秒发送一次注释行保持连接（代理的空闲超时），同时检测客户端是否已断开
+    """
+    try:
+        # 断线后浏览器 3 秒后重连
+        yield b"retry: 3000\n\n"
+        if hello is not None:
+            yield ClassEvent(None, subscription.class_id, 'ready', hello).payload
+        while True:
+            event = await subscription.get(heartbeat)
+            if event is CLOSED:
+                break
+            if event is None:
+                if await is_disconnected():
+                    break
+                yield b": keep-alive\n\n"
+                continue
+            yield event.payload
+    finally:
+        subscription.close()
+
@@ -0,0 +1,197 @@
+"""
+计数服务
+浏览次数、点赞数、下载次数等计数字段的累加
+
+原来的做法是加载整行、在 Python 中 count += 1 再提交，热门内容会成为热点行并丢失并发增量。
+现在增量先在进程内存中合并，由后台线程按间隔（或累计条目达到阈值时）批量执行
+UPDATE ... SET x = x + :delta，数据库端原子累加，多进程部署下也不会丢失增量。
+
+读取时用 value() 把数据库中的值与本进程尚未写入的增量合并。
+其他进程的未写入增量要等其刷新后才能看到，最大延迟为一个刷新间隔。
+"""
+import threading
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import bindparam, insert
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..core.logging_config import get_logger
+from ..db.session import SessionLocal
+from ..models.pbl import PBLLikeRecord
+
+logger = get_logger(__name__)
+
+# (表名, 字段名, 记录ID)
+CounterKey = Tuple[str, str, int]
+
+
+class CounterService:
+    """进程内计数缓冲 + 批量原子刷新"""
+
+    def __init__(
+        self,
+        flush_interval: float = 5.0,
+        flush_threshold: int = 1000,
+        session_factory: Callable[[], Session] = SessionLocal
+    ):
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self.session_factory = session_factory
+
+        self._pending: Dict[CounterKey, int] = defaultdict(int)
+        # 正在写入数据库的增量，提交完成前读取时仍需合并，避免计数短暂回退
+        self._flushing: Dict[CounterKey, int] = {}
+        self._tables = {}
+        self._lock = threading.Lock()
+        # 同一时间只允许一个刷新在执行
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def _key(attr, obj_id: int) -> CounterKey:
+        return (attr.class_.__tablename__, attr.key, obj_id)
+
+    def incr(self, attr, obj_id: int, delta: int = 1) -> None:
+        """
+        累加计数
+
+        Args:
+            attr: 计数字段，如 PBLEthicsCase.view_count
+            obj_id: 记录ID
+            delta: 增量
+        """
+        key = self._key(attr, obj_id)
+        with self._lock:
+            if key[0] not in self._tables:
+                self._tables[key[0]] = attr.class_.__table__
+            self._pending[key] += delta
+            size = len(self._pending)
+        if size >= self.flush_threshold:
+            self._wakeup.set()
+
+    def pending(self, attr, obj_id: int) -> int:
+        """本进程尚未写入数据库的增量"""
+        key = self._key(attr, obj_id)
+        with self._lock:
+            return self._pending.get(key, 0) + self._flushing.get(key, 0)
+
+    def value(self, attr, obj_id: int, persisted: Optional[int]) -> int:
+        """数据库中的值 + 本进程未写入的增量"""
+        return (persisted or 0) + self.pending(attr, obj_id)
+
+    def flush(self, db: Optional[Session] = None) -> int:
+        """
+        将累计的增量写入数据库
+
+        每个计数字段一条 executemany 的 UPDATE x = x + :delta，按ID排序以减少多进程间的锁等待。
+        写入失败时增量会放回缓冲区，下次刷新重试。
+
+        Returns:
+            写入的记录条数
+        """
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                batch, self._pending = self._pending, defaultdict(int)
+                self._flushing = dict(batch)
+
+            grouped: Dict[Tuple[str, str], List[dict]] = defaultdict(list)
+            for (table_name, column, obj_id), delta in sorted(batch.items()):
+                if delta:
+                    grouped[(table_name, column)].append({'b_id': obj_id, 'b_delta': delta})
+
+            own_session = db is None
+            if own_session:
+                db = self.session_factory()
+            try:
+                for (table_name, column), rows in grouped.items():
+                    table = self._tables[table_name]
+                    stmt = table.update().where(
+                        table.c.id == bindparam('b_id')
+                    ).values({column: table.c[column] + bindparam('b_delta')})
+                    db.execute(stmt, rows)
+                db.commit()
+            except Exception:
+                db.rollback()
+                with self._lock:
+                    for key, delta in batch.items():
+                        self._pending[key] += delta
+                raise
+            finally:
+                with self._lock:
+                    self._flushing = {}
+                if own_session:
+                    db.close()
+
+            logger.debug(f"计数已写入数据库 - 记录数: {len(batch)}")
+            return len(batch)
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"计数写入失败，将在下次刷新时重试: {str(e)}", exc_info=True)
+
+    def start(self) -> None:
+        """启动后台刷新线程"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name='counter-flush', daemon=True)
+        self._thread.start()
+        logger.info(f"计数刷新线程已启动 - 间隔: {self.flush_interval}秒, 阈值: {self.flush_threshold}")
+
+    def stop(self) -> None:
+        """停止后台刷新线程，并写入剩余增量"""
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_interval + 5)
+            self._thread = None
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"停止时写入计数失败: {str(e)}", exc_info=True)
+
+
+counter_service = CounterService(
+    flush_interval=settings.counter_flush_interval,
+    flush_threshold=settings.counter_flush_threshold
+)
+
+
+def add_like(db: Session, attr, target_id: int, user_id: int) -> bool:
+    """
+    记录点赞（同一用户对同一对象只计一次）
+
+    点赞记录通过唯一键去重（INSERT IGNORE），新增成功时累加点赞数。
+
+    Args:
+        db: 数据库会话
+        attr: 点赞数字段，如 PBLEthicsCase.like_count
+        target_id: 点赞对象ID
+        user_id: 用户ID
+
+    Returns:
+        是否为新点赞
+    """
+    result = db.execute(
+        insert(PBLLikeRecord).prefix_with('IGNORE').values(
+            target_type=attr.class_.__tablename__,
+            target_id=target_id,
+            user_id=user_id
+        )
+    )
+    db.commit()
+    if result.rowcount != 1:
+        return False
+    counter_service.incr(attr, target_id)
+    return True
@@ -0,0 +1,194 @@
+"""
+课程结构快照服务
+课程 -> 单元 -> 任务 的结构（每个单元的任务ID、任务数、单元总数）在学生端和教师端的
+进度统计中反复用到，而结构只在单元/任务增删改时变化。这里把结构构建为不可变快照：
+  - 一条查询取出课程的全部单元和任务，按 (单元顺序, 任务顺序) 排成紧凑的元组
+  - 快照缓存在进程内，单元/任务增删改时调用 invalidate_course_structure 失效
+  - 每个课程有版本号，失效时递增；构建期间版本变化的快照不写入缓存，
+    避免并发失效后写回旧结构。派生数据（如进度统计缓存）可以用 (课程ID, 版本) 作为键
+其他 worker 依赖 TTL 过期。
+"""
+import threading
+from collections import defaultdict
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from sqlalchemy.orm import Session
+
+from ..core.cache import TTLCache, MISSING
+from ..core.logging_config import get_logger
+from ..models.pbl import PBLUnit, PBLTask
+
+logger = get_logger(__name__)
+
+# 课程ID -> CourseStructure
+_structure_cache = TTLCache(maxsize=2048, ttl=600)
+
+# 课程ID -> 版本号（失效时递增）
+_versions: Dict[int, int] = defaultdict(int)
+_versions_lock = threading.Lock()
+
+
+class CourseStructure:
+    """课程结构快照（构建后不再修改）"""
+
+    __slots__ = ('course_id', 'version', 'unit_ids', 'task_ids',
+                 'unit_offsets', 'unit_task_counts', 'task_unit_ids', '_unit_index', '_task_unit')
+
+    def __init__(self, course_id: int, version: int, units: Sequence[Tuple[int, Sequence[int]]]):
+        """
+        Args:
+            course_id: 课程ID
+            version: 构建时的版本号
+            units: [(单元ID, [任务ID, ...]), ...]，按单元顺序、任务顺序排列
+        """
+        self.course_id = course_id
+        self.version = version
+        # 单元ID，按单元顺序
+        self.unit_ids: Tuple[int, ...] = tuple(unit_id for unit_id, _ in units)
+        # 全部任务ID，按单元分段连续存放
+        self.task_ids: Tuple[int, ...] = tuple(task_id for _, task_ids in units for task_id in task_ids)
+        # 第 i 个单元的任务为 task_ids[unit_offsets[i]:unit_offsets[i + 1]]
+        offsets = [0]
+        for _, task_ids in units:
+            offsets.append(offsets[-1] + len(task_ids))
+        self.unit_offsets: Tuple[int, ...] = tuple(offsets)
+        # 每个单元的任务数，与 unit_ids 一一对应
+        self.unit_task_counts: Tuple[int, ...] = tuple(len(task_ids) for _, task_ids in units)
+        # 任务所属单元，与 task_ids 一一对应
+        self.task_unit_ids: Tuple[int, ...] = tuple(unit_id for unit_id, task_ids in units for _ in task_ids)
+        self._unit_index: Dict[int, int] = {unit_id: i for i, unit_id in enumerate(self.unit_ids)}
+        self._task_unit: Dict[int, int] = dict(zip(self.task_ids, self.task_unit_ids))
+
+    @property
+    def total_units(self) -> int:
+        return len(self.unit_ids)
+
+    @property
+    def total_tasks(self) -> int:
+        return len(self.task_ids)
+
+    def unit_task_ids(self, unit_id: int) -> Tuple[int, ...]:
+        """单元下的任务ID，单元不属于该课程时返回空元组"""
+        i = self._unit_index.get(unit_id)
+        if i is None:
+            return ()
+        return self.task_ids[self.unit_offsets[i]:self.unit_offsets[i + 1]]
+
+    def unit_of(self, task_id: int) -> Optional[int]:
+        """任务所属单元ID，任务不属于该课程时返回 None"""
+        return self._task_unit.get(task_id)
+
+    def task_count(self, unit_id: int) -> int:
+        i = self._unit_index.get(unit_id)
+        return self.unit_task_counts[i] if i is not None else 0
+
+    def completed_units(self, completed_by_unit: Mapping[int, int]) -> int:
+        """
+        统计完成的单元数（单元内所有任务都完成才算完成，没有任务的单元不计入）
+
+        Args:
+            completed_by_unit: {单元ID: 该单元已完成的任务数}
+        """
+        return sum(
+            1 for unit_id, task_count in zip(self.unit_ids, self.unit_task_counts)
+            if task_count and completed_by_unit.get(unit_id, 0) >= task_count
+        )
+
+    def completed_units_by_tasks(self, completed_task_ids: Iterable[int]) -> int:
+        """按已完成的任务ID集合统计完成的单元数"""
+        completed_by_unit: Dict[int, int] = defaultdict(int)
+        for task_id in set(completed_task_ids):
+            unit_id = self._task_unit.get(task_id)
+            if unit_id is not None:
+                completed_by_unit[unit_id] += 1
+        return self.completed_units(completed_by_unit)
+
+
+def _build_structures(db: Session, course_ids: List[int], versions: Dict[int, int]) -> Dict[int, CourseStructure]:
+    """一条查询构建多个课程的结构快照"""
+    rows = db.query(
+        PBLUnit.course_id, PBLUnit.id, PBLTask.id
+    ).outerjoin(
+        PBLTask, PBLTask.unit_id == PBLUnit.id
+    ).filter(
+        PBLUnit.course_id.in_(course_ids)
+    ).order_by(
+        PBLUnit.course_id, PBLUnit.order, PBLUnit.id, PBLTask.order, PBLTask.id
+    ).all()
+
+    units_by_course: Dict[int, List[Tuple[int, List[int]]]] = {course_id: [] for course_id in course_ids}
+    for course_id, unit_id, task_id in rows:
+        units = units_by_course[course_id]
+        if not units or units[-1][0] != unit_id:
+            units.append((unit_id, []))
+        if task_id is not None:
+            units[-1][1].append(task_id)
+
+    return {
+        course_id: CourseStructure(course_id, versions[course_id], units)
+        for course_id, units in units_by_course.items()
+    }
+
+
+def get_course_structures(db: Session, course_ids: Iterable[int]) -> Dict[int, CourseStructure]:
+    """
+    批量获取课程结构快照，未缓存的课程合并为一条查询构建
+
+    Returns:
+        {课程ID: CourseStructure}；不存在的课程得到空结构
+    """
+    result: Dict[int, CourseStructure] = {}
+    missing = []
+    for course_id in course_ids:
+        if course_id is None or course_id in result:
+            continue
+        cached = _structure_cache.get(course_id)
+        if cached is MISSING:
+            missing.append(course_id)
+        else:
+            result[course_id] = cached
+
+    if missing:
+        with _versions_lock:
+            versions = {course_id: _versions[course_id] for course_id in missing}
+        built = _build_structures(db, missing, versions)
+        with _versions_lock:
+            for course_id, structure in built.items():
+                # 构建期间被失效过的快照只用于本次请求，不写入缓存
+                if _versions[course_id] == structure.version:
+                    _structure_cache.set(course_id, structure)
+        result.update(built)
+        logger.debug(f"构建课程结构快照 - 课程: {missing}")
+
+    return result
+
+
+def get_course_structure(db: Session, course_id: int) -> CourseStructure:
+    """获取课程结构快照（带缓存）"""
+    return get_course_structures(db, (course_id,))[course_id]
+
+
+def get_course_version(course_id: int) -> int:
+    """课程结构的当前版本号"""
+    with _versions_lock:
+        return _versions[course_id]
+
+
+def invalidate_course_structure(*course_ids: Optional[int]) -> None:
+    """失效课程结构快照（单元/任务增删改后调用），版本号递增"""
+    with _versions_lock:
+        for course_id in course_ids:
+            if course_id is None:
+                continue
+            _versions[course_id] += 1
+            _structure_cache.delete(course_id)
+    logger.debug(f"课程结构快照已失效 - 课程: {course_ids}")
+
+
+def invalidate_course_structure_for_units(db: Session, *unit_ids: Optional[int]) -> None:
+    """按单元ID失效所属课程的结构快照（任务增删改时使用）"""
+    unit_ids = [unit_id for unit_id in unit_ids if unit_id is not None]
+    if not unit_ids:
+        return
+    course_ids = [row[0] for row in db.query(PBLUnit.course_id).filter(PBLUnit.id.in_(unit_ids)).distinct()]
+    invalidate_course_structure(*course_ids)
@@ -0,0 +1,75 @@
+"""
+评语模板服务
+按学校缓存评语模板，批改页面打开时直接命中内存，模板写入时失效对应学校的缓存
+"""
+from sqlalchemy.orm import Session
+from typing import List, Dict, Any, Optional
+
+from ..models.pbl import PBLFeedbackTemplate
+from ..core.cache import TTLCache
+from ..core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# 每个学校一个缓存条目；TTL 用于兜底多 worker 部署和直接改库的情况
+_school_templates_cache = TTLCache(maxsize=1024, ttl=600)
+
+
+def _load_school_templates(db: Session, school_id: int) -> List[Dict[str, Any]]:
+    """从数据库加载学校的全部启用模板"""
+    templates = db.query(
+        PBLFeedbackTemplate.id,
+        PBLFeedbackTemplate.uuid,
+        PBLFeedbackTemplate.category,
+        PBLFeedbackTemplate.title,
+        PBLFeedbackTemplate.content
+    ).filter(
+        PBLFeedbackTemplate.school_id == school_id,
+        PBLFeedbackTemplate.is_active == 1
+    ).order_by(
+        PBLFeedbackTemplate.category,
+        PBLFeedbackTemplate.id
+    ).all()
+
+    return [
+        {
+            'id': t.id,
+            'uuid': t.uuid,
+            'category': t.category,
+            'title': t.title,
+            'content': t.content
+        }
+        for t in templates
+    ]
+
+
+def get_school_feedback_templates(
+    db: Session,
+    school_id: int,
+    category: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """
+    获取学校的评语模板（带缓存）
+
+    Args:
+        db: 数据库会话
+        school_id: 学校ID
+        category: 模板分类（可选）
+
+    Returns:
+        模板列表，按分类、ID排序
+    """
+    templates = _school_templates_cache.get_or_load(
+        school_id,
+        lambda: _load_school_templates(db, school_id)
+    )
+    if category:
+        return [t for t in templates if t['category'] == category]
+    # 返回副本，避免调用方修改缓存中的列表
+    return list(templates)
+
+
+def invalidate_school_feedback_templates(school_id: int) -> None:
+    """失效学校的评语模板缓存（模板新增、修改、删除后调用）"""
+    _school_templates_cache.delete(school_id)
+    logger.debug(f"评语模板缓存已失效 - 学校ID: {school_id}")
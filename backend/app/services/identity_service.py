@@ -0,0 +1,138 @@
+"""
+标识解析服务
+大部分接口第一步都是把 UUID（或学校代码）解析为数据库ID。这类映射创建后基本不变，
+因此缓存在进程内的 LRU 中：
+  - 命中直接返回，不查数据库
+  - 不存在的值也缓存（负缓存，TTL 较短），避免无效 UUID 反复打到数据库
+  - 批量解析时，未命中的值合并为一条 IN 查询
+  - 记录删除时调用 invalidate_identity 失效；其他 worker 依赖 TTL 过期
+只缓存不可变的映射（UUID -> ID）；会变化的少量字段（如学校启用状态）只缓存几秒，
+失效只作用于当前进程，多 worker 时其他进程最多延迟这几秒看到变化。需要完整记录时仍按 ID 查询。
+"""
+from typing import Any, Dict, Iterable, Optional, Sequence, Tuple
+
+from sqlalchemy.orm import Session
+
+from ..core.cache import TTLCache, MISSING
+from ..core.config import settings
+from ..core.logging_config import get_logger
+from ..models.school import School
+
+logger = get_logger(__name__)
+
+# (表名, 查找列, 返回列, 查找值) -> 返回列的值元组；不存在时为 None
+_identity_cache = TTLCache(maxsize=settings.identity_cache_size, ttl=settings.identity_cache_ttl)
+
+# 单条 IN 查询的最大值数量
+RESOLVE_CHUNK_SIZE = 500
+
+# 学校登录需要的字段（学校启停、改名时整体失效）
+SCHOOL_LOGIN_FIELDS = ('id', 'school_name', 'is_active')
+
+# 学校登录字段的缓存时间（秒）：启用状态会变化，其他 worker 的缓存不会被失效，只缓存几秒
+SCHOOL_LOGIN_CACHE_TTL = 5
+
+
+def _cache_key(model, column: str, fields: Tuple[str, ...], value: Any) -> Tuple:
+    return (model.__tablename__, column, fields, value)
+
+
+def _resolve(
+    db: Session,
+    model,
+    values: Iterable[Any],
+    column: str = 'uuid',
+    fields: Tuple[str, ...] = ('id',),
+    ttl: Optional[float] = None
+) -> Dict[Any, Optional[Tuple]]:
+    """批量解析，返回 {查找值: 字段值元组或 None}（ttl 为空时使用 IDENTITY_CACHE_TTL）"""
+    result: Dict[Any, Optional[Tuple]] = {}
+    missing = []
+    for value in values:
+        if value is None or value in result:
+            continue
+        cached = _identity_cache.get(_cache_key(model, column, fields, value))
+        if cached is MISSING:
+            missing.append(value)
+            result[value] = None
+        else:
+            result[value] = cached
+
+    lookup = getattr(model, column)
+    for start in range(0, len(missing), RESOLVE_CHUNK_SIZE):
+        chunk = missing[start:start + RESOLVE_CHUNK_SIZE]
+        rows = db.query(lookup, *[getattr(model, f) for f in fields]).filter(lookup.in_(chunk)).all()
+        found = {row[0]: tuple(row[1:]) for row in rows}
+        for value in chunk:
+            row = found.get(value)
+            result[value] = row
+            if row is None:
+                _identity_cache.set(_cache_key(model, column, fields, value), None,
+                                    ttl=settings.identity_cache_negative_ttl)
+            else:
+                _identity_cache.set(_cache_key(model, column, fields, value), row, ttl=ttl)
+
+    return result
+
+
+def resolve_id(db: Session, model, value: Optional[Any], column: str = 'uuid') -> Optional[int]:
+    """
+    解析单个标识
+
+    Args:
+        db: 数据库会话
+        model: ORM 模型（如 PBLCourse、PBLUnit）
+        value: 标识值（如 UUID），为空（None 或空字符串）时返回 None
+        column: 查找列，默认 uuid
+
+    Returns:
+        记录ID，不存在时返回 None
+    """
+    if not value:
+        return None
+    row = _resolve(db, model, (value,), column).get(value)
+    return row[0] if row else None
+
+
+def resolve_ids(db: Session, model, values: Sequence[Any], column: str = 'uuid') -> Dict[Any, int]:
+    """
+    批量解析标识，未命中缓存的值合并为一条 IN 查询
+
+    Returns:
+        {标识值: 记录ID}，不存在的标识不在结果中
+    """
+    return {value: row[0] for value, row in _resolve(db, model, values, column).items() if row}
+
+
+def resolve_school_by_code(db: Session, school_code: str) -> Optional[Tuple[int, str, bool]]:
+    """
+    按学校代码解析学校（登录使用）
+
+    启用状态会变化，只缓存 SCHOOL_LOGIN_CACHE_TTL 秒：停用学校后，其他 worker 最多几秒后拒绝登录
+
+    Returns:
+        (学校ID, 学校名称, 是否启用)，学校不存在时返回 None
+    """
+    return _resolve(
+        db, School, (school_code,), 'school_code', SCHOOL_LOGIN_FIELDS, ttl=SCHOOL_LOGIN_CACHE_TTL
+    ).get(school_code)
+
+
+def invalidate_identity(model, value: Optional[Any] = None) -> int:
+    """
+    失效标识缓存（删除记录、修改学校代码或状态后调用）
+
+    Args:
+        model: ORM 模型
+        value: 标识值（如 UUID）；为空时失效该表的全部缓存
+
+    Returns:
+        失效的条目数
+    """
+    table = model.__tablename__
+    if value is None:
+        count = _identity_cache.delete_where(lambda key: key[0] == table)
+    else:
+        count = _identity_cache.delete_where(lambda key: key[0] == table and key[3] == value)
+    logger.debug(f"标识缓存已失效 - 表: {table}, 值: {value}, 条目数: {count}")
+    return count
@@ -0,0 +1,194 @@
+"""
+后台任务处理函数
+worker 进程导入本模块时注册各任务类型，处理函数与同步接口共用同一套业务逻辑：
+  - import_students / import_teachers：CSV 批量导入学生、教师（user_import_service）
+  - class_progress_export / class_homework_export / homework_submissions_export：班级报表导出为 CSV / XLSX 文件
+  - template_batch_grant：模板批量开放给学校（template_service）
+  - template_instantiate：基于模板为多个班级创建课程，每个班级单独提交
+
+权限在提交任务的接口中检查，这里不再重复判断。
+"""
+from datetime import datetime
+from typing import Dict
+
+from sqlalchemy.orm import Session
+
+from ..core.logging_config import get_logger
+from ..models.pbl import PBLClass, PBLCourseTemplate, PBLTask
+from ..models.school import School
+from ..utils.export import generate_export_filename
+from .class_access_service import invalidate_class_access
+from .job_service import JobContext, JobError, job_handler
+from .template_service import grant_template_to_schools, instantiate_template_for_class
+from .user_import_service import decode_csv, import_students, import_teachers
+
+logger = get_logger(__name__)
+
+# 导入结果中保留的错误条数（完整错误数可能很大）
+MAX_RESULT_ERRORS = 200
+
+
+def _import_users(db: Session, ctx: JobContext, importer, label: str) -> Dict:
+    school = db.query(School).filter(School.id == ctx.params['school_id']).first()
+    if not school:
+        raise JobError("学校不存在")
+
+    text = decode_csv(ctx.upload_path().read_bytes())
+    if text is None:
+        raise JobError("无法识别文件编码，请确保CSV文件使用UTF-8或GBK编码")
+
+    def on_progress(done: int, total: int):
+        # 预留 10% 给提交
+        ctx.update_progress(done * 90 // total, f"已处理 {done} 行")
+
+    result = importer(db, school, text, on_progress=on_progress)
+    ctx.update_progress(90, "正在保存", force=True)
+    db.commit()
+
+    errors = result['errors']
+    logger.info(
+        f"后台批量导入{label}完成 - 任务: {ctx.job_uuid}, 成功: {result['success_count']}, 失败: {len(errors)}"
+    )
+    return {
+        'success_count': result['success_count'],
+        'error_count': len(errors),
+        'errors': errors[:MAX_RESULT_ERRORS]
+    }
+
+
+@job_handler('import_students')
+def handle_import_students(db: Session, ctx: JobContext) -> Dict:
+    from .student_search_service import invalidate_school_students
+
+    result = _import_users(db, ctx, import_students, '学生')
+    # 只能失效 worker 进程的索引，Web 进程依赖 TTL 过期
+    invalidate_school_students(ctx.params['school_id'])
+    return result
+
+
+@job_handler('import_teachers')
+def handle_import_teachers(db: Session, ctx: JobContext) -> Dict:
+    return _import_users(db, ctx, import_teachers, '教师')
+
+
+def _export(ctx: JobContext, filename_prefix: str, data, csv_exporter, xlsx_exporter) -> Dict:
+    export_format = ctx.params.get('format', 'csv')
+    filename = generate_export_filename(filename_prefix, extension=export_format)
+    ctx.update_progress(50, f"正在生成文件（{len(data)} 行）", force=True)
+    if export_format == 'xlsx':
+        ctx.write_result(filename, xlsx_exporter(data))
+    else:
+        # 使用 BOM 以支持 Excel 正确显示中文
+        ctx.write_result(filename, [csv_exporter(data).encode('utf-8-sig')])
+    return {'rows': len(data), 'format': export_format}
+
+
+def _get_class(db: Session, ctx: JobContext) -> PBLClass:
+    pbl_class = db.query(PBLClass).filter(PBLClass.uuid == ctx.params['class_uuid']).first()
+    if not pbl_class:
+        raise JobError("班级不存在")
+    return pbl_class
+
+
+@job_handler('class_progress_export')
+def handle_class_progress_export(db: Session, ctx: JobContext) -> Dict:
+    from ..api.endpoints.club_classes import _get_class_progress_data
+    from ..utils.export import export_progress_to_csv, export_progress_to_xlsx
+
+    pbl_class = _get_class(db, ctx)
+    ctx.update_progress(10, "正在统计学习进度", force=True)
+    data = _get_class_progress_data(pbl_class.uuid, db)
+    return _export(ctx, f'{pbl_class.name}_progress', data, export_progress_to_csv, export_progress_to_xlsx)
+
+
+@job_handler('class_homework_export')
+def handle_class_homework_export(db: Session, ctx: JobContext) -> Dict:
+    from ..api.endpoints.club_classes import _get_class_homework_data
+    from ..utils.export import export_homework_to_csv, export_homework_to_xlsx
+
+    pbl_class = _get_class(db, ctx)
+    ctx.update_progress(10, "正在统计作业", force=True)
+    data = _get_class_homework_data(pbl_class.uuid, db)
+    return _export(ctx, f'{pbl_class.name}_homework', data, export_homework_to_csv, export_homework_to_xlsx)
+
+
+@job_handler('homework_submissions_export')
+def handle_homework_submissions_export(db: Session, ctx: JobContext) -> Dict:
+    from ..api.endpoints.club_classes import _get_homework_submissions_data
+    from ..utils.export import export_submissions_to_csv, export_submissions_to_xlsx
+
+    pbl_class = _get_class(db, ctx)
+    task = db.query(PBLTask).filter(PBLTask.id == ctx.params['task_id']).first()
+    if not task:
+        raise JobError("任务不存在")
+    ctx.update_progress(10, "正在读取提交记录", force=True)
+    data = _get_homework_submissions_data(pbl_class.uuid, task.id, db)
+    return _export(ctx, f'{task.title}_submissions', data, export_submissions_to_csv, export_submissions_to_xlsx)
+
+
+@job_handler('template_batch_grant')
+def handle_template_batch_grant(db: Session, ctx: JobContext) -> Dict:
+    params = ctx.params
+    template = db.query(PBLCourseTemplate).filter(PBLCourseTemplate.id == params['template_id']).first()
+    if not template:
+        raise JobError("课程模板不存在")
+
+    data = grant_template_to_schools(
+        db, template, params['school_ids'], ctx.creator_id,
+        is_active=params.get('is_active', 1),
+        can_customize=params.get('can_customize', 1),
+        max_instances=params.get('max_instances'),
+        valid_from=datetime.fromisoformat(params['valid_from']) if params.get('valid_from') else None,
+        valid_until=datetime.fromisoformat(params['valid_until']) if params.get('valid_until') else None,
+        remarks=params.get('remarks')
+    )
+    db.commit()
+    return data
+
+
+@job_handler('template_instantiate')
+def handle_template_instantiate(db: Session, ctx: JobContext) -> Dict:
+    """逐个班级创建课程并提交，单个班级失败不影响其他班级"""
+    template = db.query(PBLCourseTemplate).filter(PBLCourseTemplate.id == ctx.params['template_id']).first()
+    if not template:
+        raise JobError("课程模板不存在")
+    template_id = template.id
+
+    class_ids = ctx.params['class_ids']
+    classes = {
+        pbl_class.id: pbl_class
+        for pbl_class in db.query(PBLClass).filter(PBLClass.id.in_(class_ids)).all()
+    }
+
+    results = []
+    for index, class_id in enumerate(class_ids):
+        pbl_class = classes.get(class_id)
+        if pbl_class is None:
+            results.append({'class_id': class_id, 'status': 'failed', 'error': '班级不存在'})
+            continue
+        try:
+            course, counts = instantiate_template_for_class(db, template, pbl_class, ctx.creator_id)
+            db.commit()
+            invalidate_class_access(class_id=class_id)
+            results.append({
+                'class_id': class_id,
+                'class_name': pbl_class.name,
+                'status': 'created',
+                'course_uuid': course.uuid,
+                **counts
+            })
+        except Exception as e:
+            db.rollback()
+            # 回滚后重新加载模板（使用次数已回滚）
+            template = db.get(PBLCourseTemplate, template_id)
+            logger.error(f"模板批量创建课程失败 - 模板ID: {template_id}, 班级ID: {class_id}, 错误: {str(e)}")
+            results.append({'class_id': class_id, 'class_name': pbl_class.name, 'status': 'failed', 'error': str(e)})
+        ctx.update_progress((index + 1) * 100 // len(class_ids), f"已处理 {index + 1}/{len(class_ids)} 个班级")
+
+    created = sum(1 for item in results if item['status'] == 'created')
+    return {
+        'template_title': template.title,
+        'created_count': created,
+        'failed_count': len(results) - created,
+        'results': results
+    }
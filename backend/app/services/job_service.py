@@ -0,0 +1,461 @@
+"""
+后台任务服务
+批量导入、导出、模板批量授权、模板批量实例化等耗时操作不在请求中执行：
+接口提交任务后立即返回任务ID，由独立进程中的 worker（job_worker）领取执行，
+前端轮询任务状态，完成后下载结果文件。
+
+  - 任务保存在 pbl_background_jobs 表；worker 用带 status='pending' 条件的 UPDATE 领取，
+    多进程、多机部署下同一任务只会被一个 worker 执行。不依赖 MySQL 特有语法，可以用 SQLite 测试
+  - 同一管理员带相同幂等键（Idempotency-Key）重复提交时返回已有任务，不重复执行
+  - 执行中通过 JobContext.update_progress 更新进度（独立会话提交，不影响任务自身的事务），
+    进度更新同时作为心跳；超过 JOB_STALE_TIMEOUT 没有心跳的任务视为 worker 已退出，重新排队或标记失败
+  - 上传文件和结果文件保存在 JOB_STORAGE_DIR，表中只记录相对路径
+
+任务处理函数用 @job_handler 注册（见 job_handlers），签名为 handler(db, ctx) -> 结果摘要 dict；
+抛出 JobError 时以其消息作为失败原因。
+"""
+import os
+import shutil
+import time
+from datetime import timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..core.logging_config import get_logger
+from ..core.response import success_response
+from ..models.pbl import PBLBackgroundJob, generate_uuid
+from ..utils.timezone import get_beijing_time_naive
+
+logger = get_logger(__name__)
+
+# 任务状态
+PENDING = 'pending'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+FINISHED_STATUSES = (SUCCEEDED, FAILED)
+
+# 进度更新的最小间隔（秒），避免逐行提交
+PROGRESS_INTERVAL = 1.0
+
+# 任务类型 -> 处理函数
+_handlers: Dict[str, Callable[[Session, 'JobContext'], Optional[Dict[str, Any]]]] = {}
+
+
+class JobError(Exception):
+    """任务执行失败（消息会作为失败原因展示给用户）"""
+
+
+def job_handler(job_type: str):
+    """注册任务处理函数"""
+    def decorator(func):
+        _handlers[job_type] = func
+        return func
+    return decorator
+
+
+def get_job_handler(job_type: str):
+    return _handlers.get(job_type)
+
+
+def storage_root() -> Path:
+    """任务存储目录（上传文件、结果文件）"""
+    return Path(settings.job_storage_dir).resolve()
+
+
+def _storage_path(relative_path: str) -> Path:
+    return storage_root() / relative_path
+
+
+class JobContext:
+    """任务执行上下文：参数、进度更新、上传文件和结果文件"""
+
+    def __init__(self, job: PBLBackgroundJob, session_factory: Callable[[], Session]):
+        self.job_id = job.id
+        self.job_uuid = job.uuid
+        self.job_type = job.job_type
+        self.params: Dict[str, Any] = dict(job.params or {})
+        self.creator_id = job.creator_id
+        self.school_id = job.school_id
+        self.session_factory = session_factory
+        self.result_path: Optional[str] = None
+        self.result_filename: Optional[str] = None
+        self._last_progress_at = 0.0
+
+    def update_progress(self, progress: int, message: Optional[str] = None, force: bool = False) -> None:
+        """
+        更新进度（0-100），同时刷新心跳
+
+        在独立会话中提交，不影响任务自身尚未提交的事务；间隔小于 PROGRESS_INTERVAL 的更新会被跳过
+        """
+        now = time.monotonic()
+        if not force and now - self._last_progress_at < PROGRESS_INTERVAL:
+            return
+        self._last_progress_at = now
+
+        values = {
+            PBLBackgroundJob.progress: max(0, min(100, int(progress))),
+            PBLBackgroundJob.heartbeat_at: get_beijing_time_naive()
+        }
+        if message is not None:
+            values[PBLBackgroundJob.message] = message[:500]
+        db = self.session_factory()
+        try:
+            db.query(PBLBackgroundJob).filter(PBLBackgroundJob.id == self.job_id).update(
+                values, synchronize_session=False
+            )
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"更新任务进度失败 - 任务: {self.job_uuid}, 错误: {str(e)}")
+        finally:
+            db.close()
+
+    def upload_path(self) -> Path:
+        """提交任务时保存的上传文件"""
+        relative_path = self.params.get('upload_path')
+        if not relative_path:
+            raise JobError("任务缺少上传文件")
+        path = _storage_path(relative_path)
+        if not path.exists():
+            raise JobError("上传文件不存在或已过期，请重新提交")
+        return path
+
+    def write_result(self, filename: str, chunks: Iterable[bytes]) -> Path:
+        """
+        把结果逐段写入文件（先写临时文件，完成后改名）
+
+        Args:
+            filename: 下载时的文件名
+            chunks: 文件内容片段（可以是生成器，如 iter_xlsx）
+        """
+        relative_dir = Path('results') / self.job_uuid
+        directory = storage_root() / relative_dir
+        directory.mkdir(parents=True, exist_ok=True)
+        suffix = Path(filename).suffix
+        path = directory / f'result{suffix}'
+        tmp_path = directory / f'result{suffix}.tmp'
+        with open(tmp_path, 'wb') as f:
+            for chunk in chunks:
+                f.write(chunk)
+        os.replace(tmp_path, path)
+
+        self.result_path = str(relative_dir / path.name)
+        self.result_filename = filename
+        return path
+
+
+def save_upload(contents: bytes, suffix: str) -> str:
+    """保存任务的上传文件，返回相对存储目录的路径"""
+    relative_path = Path('uploads') / f'{generate_uuid()}{suffix}'
+    path = storage_root() / relative_path
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(contents)
+    return str(relative_path)
+
+
+def _remove_file(relative_path: Optional[str]) -> None:
+    if not relative_path:
+        return
+    try:
+        _storage_path(relative_path).unlink()
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.warning(f"删除任务文件失败 - 路径: {relative_path}, 错误: {str(e)}")
+
+
+def submit_job(
+    db: Session,
+    job_type: str,
+    creator,
+    params: Optional[Dict[str, Any]] = None,
+    idempotency_key: Optional[str] = None,
+    school_id: Optional[int] = None,
+    upload: Optional[Tuple[bytes, str]] = None
+) -> Tuple[PBLBackgroundJob, bool]:
+    """
+    提交后台任务
+
+    Args:
+        db: 数据库会话
+        job_type: 任务类型
+        creator: 提交任务的管理员
+        params: 任务参数（需可 JSON 序列化）
+        idempotency_key: 幂等键，同一管理员重复提交时返回已有任务
+        school_id: 任务所属学校（用于学校管理员查看本校任务）
+        upload: (文件内容, 扩展名)，保存后路径写入 params['upload_path']
+
+    Returns:
+        (任务, 是否新建)
+    """
+    if idempotency_key:
+        existing = db.query(PBLBackgroundJob).filter(
+            PBLBackgroundJob.creator_id == creator.id,
+            PBLBackgroundJob.idempotency_key == idempotency_key
+        ).first()
+        if existing:
+            return existing, False
+
+    params = dict(params or {})
+    upload_path = None
+    if upload is not None:
+        upload_path = save_upload(*upload)
+        params['upload_path'] = upload_path
+
+    job = PBLBackgroundJob(
+        job_type=job_type,
+        status=PENDING,
+        progress=0,
+        params=params,
+        idempotency_key=idempotency_key,
+        creator_id=creator.id,
+        school_id=school_id
+    )
+    db.add(job)
+    try:
+        db.commit()
+    except IntegrityError:
+        # 并发提交了相同的幂等键
+        db.rollback()
+        _remove_file(upload_path)
+        existing = db.query(PBLBackgroundJob).filter(
+            PBLBackgroundJob.creator_id == creator.id,
+            PBLBackgroundJob.idempotency_key == idempotency_key
+        ).first()
+        if existing is None:
+            raise
+        return existing, False
+    db.refresh(job)
+
+    logger.info(f"提交后台任务 - 任务: {job.uuid}, 类型: {job_type}, 提交者: {creator.username}")
+    return job, True
+
+
+def job_submitted_response(job: PBLBackgroundJob, created: bool):
+    """提交任务接口的统一响应（202，返回任务ID和当前状态）"""
+    return success_response(
+        data=serialize_job(job),
+        message="任务已提交，请稍后查询进度" if created else "相同幂等键的任务已存在",
+        status_code=202
+    )
+
+
+def get_job(db: Session, job_uuid: str) -> Optional[PBLBackgroundJob]:
+    return db.query(PBLBackgroundJob).filter(PBLBackgroundJob.uuid == job_uuid).first()
+
+
+def can_view_job(job: PBLBackgroundJob, admin) -> bool:
+    """平台管理员可查看全部任务，学校管理员可查看本校任务，其他人只能查看自己提交的任务"""
+    if admin.role == 'platform_admin' or job.creator_id == admin.id:
+        return True
+    return admin.role == 'school_admin' and job.school_id is not None and job.school_id == admin.school_id
+
+
+def result_file_path(job: PBLBackgroundJob) -> Optional[Path]:
+    """结果文件的绝对路径，没有结果文件或已清理时返回 None"""
+    if not job.result_path:
+        return None
+    path = _storage_path(job.result_path)
+    return path if path.exists() else None
+
+
+def serialize_job(job: PBLBackgroundJob) -> Dict[str, Any]:
+    return {
+        'job_id': job.uuid,
+        'job_type': job.job_type,
+        'status': job.status,
+        'progress': job.progress,
+        'message': job.message,
+        'result': job.result,
+        'has_file': bool(job.result_path),
+        'filename': job.result_filename,
+        'created_at': job.created_at.isoformat() if job.created_at else None,
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None
+    }
+
+
+# ==========================================================================================================
+# worker 使用的函数
+# ==========================================================================================================
+
+def claim_next_job(db: Session, worker_id: str) -> Optional[int]:
+    """
+    领取最早提交的待执行任务
+
+    先查出若干候选，再逐个执行带 status='pending' 条件的 UPDATE，影响行数为 1 才算领取成功，
+    多个 worker 同时领取时只有一个能成功。
+
+    Returns:
+        领取到的任务ID，没有待执行任务时返回 None
+    """
+    candidates = [
+        job_id for (job_id,) in db.query(PBLBackgroundJob.id).filter(
+            PBLBackgroundJob.status == PENDING
+        ).order_by(PBLBackgroundJob.id).limit(5)
+    ]
+    now = get_beijing_time_naive()
+    for job_id in candidates:
+        claimed = db.query(PBLBackgroundJob).filter(
+            PBLBackgroundJob.id == job_id,
+            PBLBackgroundJob.status == PENDING
+        ).update({
+            PBLBackgroundJob.status: RUNNING,
+            PBLBackgroundJob.worker_id: worker_id,
+            PBLBackgroundJob.attempts: PBLBackgroundJob.attempts + 1,
+            PBLBackgroundJob.started_at: now,
+            PBLBackgroundJob.heartbeat_at: now
+        }, synchronize_session=False)
+        db.commit()
+        if claimed:
+            return job_id
+    return None
+
+
+def _finish_job(session_factory: Callable[[], Session], job_id: int, values: Dict) -> None:
+    db = session_factory()
+    try:
+        values[PBLBackgroundJob.finished_at] = get_beijing_time_naive()
+        db.query(PBLBackgroundJob).filter(PBLBackgroundJob.id == job_id).update(values, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def execute_job(job_id: int, session_factory: Callable[[], Session]) -> str:
+    """
+    执行已领取的任务，记录结果或失败原因
+
+    Returns:
+        任务的最终状态
+    """
+    db = session_factory()
+    ctx = None
+    started = time.perf_counter()
+    try:
+        job = db.get(PBLBackgroundJob, job_id)
+        if job is None:
+            return FAILED
+        ctx = JobContext(job, session_factory)
+        handler = get_job_handler(job.job_type)
+        if handler is None:
+            raise JobError(f"未知的任务类型: {job.job_type}")
+
+        logger.info(f"开始执行后台任务 - 任务: {ctx.job_uuid}, 类型: {ctx.job_type}")
+        result = handler(db, ctx)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        if isinstance(e, JobError):
+            message = str(e)
+            logger.warning(f"后台任务失败 - 任务ID: {job_id}, 原因: {message}")
+        else:
+            message = f"任务执行失败：{str(e)}"
+            logger.error(f"后台任务异常 - 任务ID: {job_id}, 错误: {str(e)}", exc_info=True)
+        if ctx is not None:
+            _remove_file(ctx.result_path)
+        _finish_job(session_factory, job_id, {
+            PBLBackgroundJob.status: FAILED,
+            PBLBackgroundJob.message: message[:500],
+            PBLBackgroundJob.result_path: None
+        })
+        return FAILED
+    finally:
+        db.close()
+        if ctx is not None:
+            _remove_file(ctx.params.get('upload_path'))
+
+    _finish_job(session_factory, job_id, {
+        PBLBackgroundJob.status: SUCCEEDED,
+        PBLBackgroundJob.progress: 100,
+        PBLBackgroundJob.message: '已完成',
+        PBLBackgroundJob.result: result,
+        PBLBackgroundJob.result_path: ctx.result_path,
+        PBLBackgroundJob.result_filename: ctx.result_filename
+    })
+    logger.info(
+        f"后台任务完成 - 任务: {ctx.job_uuid}, 类型: {ctx.job_type}, "
+        f"耗时: {time.perf_counter() - started:.1f}秒"
+    )
+    return SUCCEEDED
+
+
+def recover_stale_jobs(db: Session, timeout: Optional[int] = None, max_attempts: Optional[int] = None) -> int:
+    """
+    处理 worker 异常退出留下的任务：超时没有心跳的执行中任务重新排队，达到最大执行次数的标记失败
+
+    Returns:
+        处理的任务数
+    """
+    timeout = settings.job_stale_timeout if timeout is None else timeout
+    max_attempts = settings.job_max_attempts if max_attempts is None else max_attempts
+    now = get_beijing_time_naive()
+    stale_ids = [
+        job_id for (job_id,) in db.query(PBLBackgroundJob.id).filter(
+            PBLBackgroundJob.status == RUNNING,
+            PBLBackgroundJob.heartbeat_at < now - timedelta(seconds=timeout)
+        )
+    ]
+    if not stale_ids:
+        return 0
+
+    # 条件中保留 status，避免覆盖刚好在此期间完成的任务
+    requeued = db.query(PBLBackgroundJob).filter(
+        PBLBackgroundJob.id.in_(stale_ids),
+        PBLBackgroundJob.status == RUNNING,
+        PBLBackgroundJob.attempts < max_attempts
+    ).update({
+        PBLBackgroundJob.status: PENDING,
+        PBLBackgroundJob.worker_id: None,
+        PBLBackgroundJob.message: '执行中断，已重新排队'
+    }, synchronize_session=False)
+    failed = db.query(PBLBackgroundJob).filter(
+        PBLBackgroundJob.id.in_(stale_ids),
+        PBLBackgroundJob.status == RUNNING,
+        PBLBackgroundJob.attempts >= max_attempts
+    ).update({
+        PBLBackgroundJob.status: FAILED,
+        PBLBackgroundJob.message: '执行中断且已达到最大执行次数',
+        PBLBackgroundJob.finished_at: now
+    }, synchronize_session=False)
+    db.commit()
+
+    if requeued or failed:
+        logger.warning(f"处理中断的后台任务 - 重新排队: {requeued}, 标记失败: {failed}")
+    return requeued + failed
+
+
+def purge_expired_results(db: Session, retention_hours: Optional[int] = None) -> int:
+    """
+    删除过期的结果文件（任务记录保留，只清空结果路径）
+
+    Returns:
+        清理的任务数
+    """
+    retention_hours = settings.job_result_retention_hours if retention_hours is None else retention_hours
+    cutoff = get_beijing_time_naive() - timedelta(hours=retention_hours)
+    jobs = db.query(PBLBackgroundJob.id, PBLBackgroundJob.uuid).filter(
+        PBLBackgroundJob.status.in_(FINISHED_STATUSES),
+        PBLBackgroundJob.finished_at < cutoff,
+        PBLBackgroundJob.result_path.isnot(None)
+    ).all()
+    if not jobs:
+        return 0
+
+    for _, job_uuid in jobs:
+        shutil.rmtree(storage_root() / 'results' / job_uuid, ignore_errors=True)
+    db.query(PBLBackgroundJob).filter(
+        PBLBackgroundJob.id.in_([job_id for job_id, _ in jobs])
+    ).update({
+        PBLBackgroundJob.result_path: None,
+        PBLBackgroundJob.message: '结果文件已过期清理'
+    }, synchronize_session=False)
+    db.commit()
+
+    logger.info(f"清理过期的任务结果文件 - 任务数: {len(jobs)}")
+    return len(jobs)
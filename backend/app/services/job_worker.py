@@ -0,0 +1,211 @@
+"""
+后台任务 worker
+每个 worker 是一个独立进程（spawn 方式创建，不继承 Web 进程的数据库连接），循环领取并执行任务，
+同一进程内任务串行执行，并发度等于进程数。空闲时按 JOB_POLL_INTERVAL 轮询；
+每隔一段时间顺带处理中断的任务和过期的结果文件。
+
+启动方式：
+  - 随应用启动：JOB_WORKER_PROCESSES > 0 时，main.py 启动时创建 worker 子进程，关闭时等待当前任务结束
+  - 单独运行：python -m app.services.job_worker --processes 2
+    （多 worker / 多机部署时建议把 JOB_WORKER_PROCESSES 设为 0，单独运行，避免每个 Web 进程各启动一组）
+  - 指定数据库：--database-url sqlite:///jobs.db，可用 SQLite 或本地 MySQL 代替正式库测试任务流程
+"""
+import argparse
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import time
+from typing import List, Optional
+
+from ..core.config import settings
+from ..core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# 处理中断任务、清理过期结果文件的间隔（秒）
+MAINTENANCE_INTERVAL = 60
+
+# 停止时等待当前任务结束的时间（秒），超时后强制结束，任务由心跳超时机制重新排队
+STOP_TIMEOUT = 30
+
+# 设置停止事件的最长等待时间（秒）：worker 在 stop_event.wait() 中被强制结束时事件锁不会释放，set() 会一直阻塞
+STOP_EVENT_TIMEOUT = 5
+
+
+def _session_factory(database_url: Optional[str]):
+    if not database_url:
+        from ..db.session import SessionLocal
+        return SessionLocal
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    return sessionmaker(autocommit=False, autoflush=False, bind=create_engine(database_url, pool_pre_ping=True))
+
+
+def run_worker(stop_event, database_url: Optional[str] = None, setup_log: bool = True) -> None:
+    """
+    worker 主循环（在子进程中执行）
+
+    Args:
+        stop_event: 停止事件，设置后执行完当前任务即退出
+        database_url: 数据库地址，为空时使用配置中的数据库
+        setup_log: 是否初始化日志（spawn 出的子进程需要重新初始化）
+    """
+    # Ctrl+C 会发给整个进程组，由父进程通过 stop_event 通知退出，避免任务执行到一半被中断
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # SIGTERM（如发给整个进程组）只设置本地标志，执行完当前任务后退出：
+    # 默认处理会在 stop_event.wait() 中直接结束进程，留下未释放的事件锁，父进程 set() 时一直阻塞；
+    # 信号处理函数中也不能 set() 共享事件，主线程可能正持有同一把锁
+    terminated = False
+
+    def handle_sigterm(signum, frame):
+        nonlocal terminated
+        terminated = True
+
+    signal.signal(signal.SIGTERM, handle_sigterm)
+    if setup_log:
+        from ..core.logging_config import setup_logging
+        setup_logging(level=settings.log_level, fmt=settings.log_format)
+    # 导入时注册任务处理函数
+    from . import job_handlers  # noqa: F401
+    from .job_service import claim_next_job, execute_job, recover_stale_jobs, purge_expired_results
+
+    session_factory = _session_factory(database_url)
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    logger.info(f"后台任务 worker 已启动 - {worker_id}")
+
+    last_maintenance = 0.0
+    while not terminated and not stop_event.is_set():
+        if time.monotonic() - last_maintenance >= MAINTENANCE_INTERVAL:
+            last_maintenance = time.monotonic()
+            db = session_factory()
+            try:
+                recover_stale_jobs(db)
+                purge_expired_results(db)
+            except Exception as e:
+                db.rollback()
+                logger.error(f"后台任务维护失败: {str(e)}", exc_info=True)
+            finally:
+                db.close()
+
+        db = session_factory()
+        try:
+            job_id = claim_next_job(db, worker_id)
+        except Exception as e:
+            db.rollback()
+            job_id = None
+            logger.error(f"领取后台任务失败: {str(e)}", exc_info=True)
+        finally:
+            db.close()
+
+        if job_id is None:
+            stop_event.wait(settings.job_poll_interval)
+            continue
+        execute_job(job_id, session_factory)
+
+    logger.info(f"后台任务 worker 已退出 - {worker_id}")
+
+
+class JobWorkerPool:
+    """后台任务 worker 进程组"""
+
+    def __init__(self, processes: int, database_url: Optional[str] = None):
+        self.processes = processes
+        self.database_url = database_url
+        self._context = multiprocessing.get_context('spawn')
+        self._stop_event = None
+        self._workers: List[multiprocessing.Process] = []
+
+    def start(self) -> None:
+        """启动 worker 进程"""
+        if self.processes <= 0 or self._workers:
+            return
+        self._stop_event = self._context.Event()
+        for index in range(self.processes):
+            worker = self._context.Process(
+                target=run_worker,
+                args=(self._stop_event, self.database_url),
+                name=f'job-worker-{index}',
+                daemon=True
+            )
+            worker.start()
+            self._workers.append(worker)
+        logger.info(f"后台任务 worker 进程已启动 - 进程数: {self.processes}")
+
+    def _set_stop_event(self, timeout: float) -> bool:
+        """
+        在单独的线程中设置停止事件，最多等待 timeout 秒
+
+        worker 异常退出时可能仍持有事件锁，直接 set() 会让调用方一直阻塞
+
+        Returns:
+            是否已设置
+        """
+        setter = threading.Thread(target=self._stop_event.set, name='job-worker-stop', daemon=True)
+        setter.start()
+        setter.join(timeout)
+        return not setter.is_alive()
+
+    def request_stop(self) -> None:
+        """通知 worker 执行完当前任务后退出（不等待）"""
+        if self._stop_event is not None:
+            self._set_stop_event(0)
+
+    def stop(self, timeout: float = STOP_TIMEOUT) -> None:
+        """通知 worker 退出，等待当前任务结束，超时后强制结束"""
+        if not self._workers:
+            return
+        deadline = time.monotonic() + timeout
+        # worker 都已退出（如整个进程组收到信号）时不再设置事件
+        if any(worker.is_alive() for worker in self._workers) and not self._set_stop_event(STOP_EVENT_TIMEOUT):
+            logger.warning("后台任务停止事件被已退出的 worker 占用，直接结束 worker 进程")
+            deadline = time.monotonic()
+        for worker in self._workers:
+            worker.join(max(0.0, deadline - time.monotonic()))
+            if worker.is_alive():
+                logger.warning(f"后台任务 worker 未在 {timeout} 秒内退出，强制结束 - PID: {worker.pid}")
+                # worker 收到 SIGTERM 后仍会等当前任务结束，这里用 SIGKILL
+                worker.kill()
+                worker.join()
+        self._workers = []
+        logger.info("后台任务 worker 进程已停止")
+
+    def join(self) -> None:
+        for worker in self._workers:
+            worker.join()
+
+
+# 随应用启动的 worker 进程组
+job_worker_pool = JobWorkerPool(settings.job_worker_processes)
+
+
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description='后台任务 worker')
+    parser.add_argument('--processes', type=int, default=max(settings.job_worker_processes, 1), help='worker 进程数')
+    parser.add_argument('--database-url', default=None, help='数据库地址（默认使用 .env 中的配置）')
+    return parser.parse_args()
+
+
+def main():
+    """单独运行 worker：python -m app.services.job_worker"""
+    from ..core.logging_config import setup_logging
+    setup_logging(level=settings.log_level, fmt=settings.log_format)
+
+    args = parse_args()
+    pool = JobWorkerPool(args.processes, database_url=args.database_url)
+
+    def handle_signal(signum, frame):
+        logger.info(f"收到信号 {signum}，等待当前任务结束后退出")
+        pool.request_stop()
+
+    signal.signal(signal.SIGTERM, handle_signal)
+    signal.signal(signal.SIGINT, handle_signal)
+
+    pool.start()
+    pool.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,459 @@
+"""
+成长档案统计服务
+pbl_student_portfolios 中的汇总字段按学年（school_year，如 "2025-2026"）计算：
+  - total_learning_hours：学年内学习记录（pbl_learning_progress）的 time_spent 合计，换算为小时
+  - completed_projects / projects_count：学年内参与（提交过成果，或所在小组在学年内创建）且已完成的项目
+  - avg_score：学年内作业评分（pbl_task_progress.score，按 graded_at）与评价总分
+    （pbl_assessments.total_score 按 max_score 折算为百分制）的平均值
+
+计算方式：对一批学生按表各执行一条 GROUP BY 查询，结果一次批量写入（bulk_upsert），
+不逐个学生查询；汇总值没有变化的档案不写入。
+
+增量刷新：作业提交/评分、学习记录、项目成果、项目状态、评价写入后调用 portfolio_refresher.mark，
+把 (学生, 学年) 记入进程内的待刷新集合，后台线程按 PORTFOLIO_REFRESH_INTERVAL 批量重新计算。
+重新计算是幂等的，多进程各自刷新不会累计出错；漏掉的写入路径或历史数据用全量重建修正：
+  python -m app.services.portfolio_service --school-code BJ-YCZX --school-year 2025-2026
+"""
+import argparse
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..core.logging_config import get_logger
+from ..db.session import SessionLocal
+from ..models.admin import User
+from ..models.pbl import (
+    PBLAssessment, PBLClass, PBLGroupMember, PBLLearningProgress, PBLProject,
+    PBLProjectOutput, PBLStudentPortfolio, PBLTaskProgress
+)
+from ..models.school import School
+from ..utils.bulk import bulk_upsert
+from ..utils.timezone import get_beijing_time_naive
+
+logger = get_logger(__name__)
+
+# 新建档案时学生所在班级没有填写年级时使用的学段（与原来 /my-portfolio 的默认值一致）
+DEFAULT_GRADE_LEVEL = "5-6年级"
+
+# 每批计算的学生数（IN 列表长度）
+REFRESH_BATCH_SIZE = 500
+
+# 汇总字段
+AGGREGATE_COLUMNS = ('total_learning_hours', 'projects_count', 'avg_score', 'completed_projects')
+
+
+# ===== 学年 =====
+
+def school_year_of(at: datetime) -> str:
+    """时间所在的学年，如 2025-09-01 ~ 2026-08-31 为 "2025-2026" """
+    start_year = at.year if at.month >= settings.portfolio_school_year_start_month else at.year - 1
+    return f"{start_year}-{start_year + 1}"
+
+
+def current_school_year() -> str:
+    return school_year_of(get_beijing_time_naive())
+
+
+def school_year_range(school_year: str) -> Tuple[datetime, datetime]:
+    """学年的时间范围 [开始, 结束)，格式错误时抛出 ValueError"""
+    first, _, second = school_year.partition('-')
+    if not (first.isdigit() and second.isdigit() and int(second) == int(first) + 1):
+        raise ValueError(f"学年格式错误: {school_year}（应为 2025-2026）")
+    month = settings.portfolio_school_year_start_month
+    return datetime(int(first), month, 1), datetime(int(second), month, 1)
+
+
+# ===== 计算 =====
+
+def _to_hours(seconds) -> int:
+    return int((Decimal(seconds or 0) / 3600).quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+
+
+def compute_portfolio_stats(db: Session, school_year: str, student_ids: Sequence[int]) -> Dict[int, Dict]:
+    """
+    计算一批学生在某学年的汇总字段（每张表一条 GROUP BY 查询）
+
+    Returns:
+        {学生ID: {total_learning_hours, projects_count, avg_score, completed_projects}}，
+        只包含学年内有学习记录、评分或完成项目的学生
+    """
+    if not student_ids:
+        return {}
+    start, end = school_year_range(school_year)
+
+    seconds = dict(db.query(
+        PBLLearningProgress.user_id,
+        func.sum(PBLLearningProgress.time_spent)
+    ).filter(
+        PBLLearningProgress.user_id.in_(student_ids),
+        PBLLearningProgress.created_at >= start,
+        PBLLearningProgress.created_at < end
+    ).group_by(PBLLearningProgress.user_id).all())
+
+    # 学生ID -> [分数合计, 评分次数]
+    scores: Dict[int, List] = defaultdict(lambda: [Decimal(0), 0])
+    task_scores = db.query(
+        PBLTaskProgress.user_id,
+        func.sum(PBLTaskProgress.score),
+        func.count(PBLTaskProgress.score)
+    ).filter(
+        PBLTaskProgress.user_id.in_(student_ids),
+        PBLTaskProgress.score.isnot(None),
+        PBLTaskProgress.graded_at >= start,
+        PBLTaskProgress.graded_at < end
+    ).group_by(PBLTaskProgress.user_id).all()
+    # 评价总分按满分折算为百分制（满分为空或 0 时按 100 计）
+    full_score = func.coalesce(func.nullif(PBLAssessment.max_score, 0), 100)
+    assessment_scores = db.query(
+        PBLAssessment.student_id,
+        func.sum(PBLAssessment.total_score * 100 / full_score),
+        func.count(PBLAssessment.total_score)
+    ).filter(
+        PBLAssessment.student_id.in_(student_ids),
+        PBLAssessment.total_score.isnot(None),
+        PBLAssessment.created_at >= start,
+        PBLAssessment.created_at < end
+    ).group_by(PBLAssessment.student_id).all()
+    for student_id, total, count in list(task_scores) + list(assessment_scores):
+        scores[student_id][0] += Decimal(str(total or 0))
+        scores[student_id][1] += count
+
+    # 已完成项目：学年内提交过成果的项目 + 所在小组在学年内创建的项目
+    project_columns = (PBLProject.id, PBLProject.uuid, PBLProject.title, PBLProject.updated_at)
+    by_output = db.query(PBLProjectOutput.user_id, *project_columns).join(
+        PBLProject, PBLProject.id == PBLProjectOutput.project_id
+    ).filter(
+        PBLProjectOutput.user_id.in_(student_ids),
+        PBLProjectOutput.created_at >= start,
+        PBLProjectOutput.created_at < end,
+        PBLProject.status == 'completed'
+    ).distinct().all()
+    by_group = db.query(PBLGroupMember.user_id, *project_columns).join(
+        PBLProject, PBLProject.group_id == PBLGroupMember.group_id
+    ).filter(
+        PBLGroupMember.user_id.in_(student_ids),
+        PBLGroupMember.is_active == 1,
+        PBLProject.created_at >= start,
+        PBLProject.created_at < end,
+        PBLProject.status == 'completed'
+    ).distinct().all()
+    projects: Dict[int, Dict[int, Dict]] = defaultdict(dict)
+    for student_id, project_id, project_uuid, title, completed_at in list(by_output) + list(by_group):
+        projects[student_id][project_id] = {
+            'project_id': project_id,
+            'uuid': project_uuid,
+            'title': title,
+            'completed_at': completed_at.isoformat() if completed_at else None
+        }
+
+    stats = {}
+    for student_id in set(seconds) | set(scores) | set(projects):
+        total, count = scores.get(student_id, (0, 0))
+        completed = sorted(
+            projects.get(student_id, {}).values(),
+            key=lambda item: (item['completed_at'] or '', item['project_id'])
+        )
+        stats[student_id] = {
+            'total_learning_hours': _to_hours(seconds.get(student_id)),
+            'projects_count': len(completed),
+            'avg_score': (Decimal(total) / count).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP) if count else None,
+            'completed_projects': completed
+        }
+    return stats
+
+
+def _empty_stats() -> Dict:
+    return {'total_learning_hours': 0, 'projects_count': 0, 'avg_score': None, 'completed_projects': []}
+
+
+def _grade_levels(db: Session, student_ids: Iterable[int]) -> Dict[int, str]:
+    """学生所在班级的年级（新建档案时作为学段）"""
+    student_ids = list(student_ids)
+    if not student_ids:
+        return {}
+    rows = db.query(User.id, PBLClass.grade).join(
+        PBLClass, PBLClass.id == User.class_id
+    ).filter(User.id.in_(student_ids)).all()
+    return {student_id: grade for student_id, grade in rows if grade}
+
+
+def refresh_portfolios(db: Session, school_year: str, student_ids: Sequence[int]) -> int:
+    """
+    重新计算并写入一批学生某学年的档案汇总字段（不提交，由调用方 commit）
+
+    学年内有数据的学生没有档案时新建；已有档案的学生即使没有数据也会更新（清零）。
+
+    Returns:
+        新建或更新的档案数
+    """
+    if not student_ids:
+        return 0
+    stats = compute_portfolio_stats(db, school_year, student_ids)
+    existing = {
+        student_id for (student_id,) in db.query(PBLStudentPortfolio.student_id).filter(
+            PBLStudentPortfolio.student_id.in_(student_ids),
+            PBLStudentPortfolio.school_year == school_year
+        )
+    }
+    targets = sorted(set(stats) | existing)
+    if not targets:
+        return 0
+    grade_levels = _grade_levels(db, set(stats) - existing)
+
+    rows = []
+    for student_id in targets:
+        row = {'student_id': student_id, 'school_year': school_year}
+        row.update(stats.get(student_id) or _empty_stats())
+        row['grade_level'] = grade_levels.get(student_id, DEFAULT_GRADE_LEVEL)
+        rows.append(row)
+    expected = {row['student_id']: tuple(row[c] for c in AGGREGATE_COLUMNS) for row in rows}
+
+    def needs_update(current) -> bool:
+        return tuple(getattr(current, c) for c in AGGREGATE_COLUMNS) != expected[current.student_id]
+
+    result = bulk_upsert(
+        db, PBLStudentPortfolio, rows,
+        key_columns=('student_id', 'school_year'),
+        update_columns=AGGREGATE_COLUMNS,
+        fetch_columns=AGGREGATE_COLUMNS,
+        needs_update=needs_update
+    )
+    return result.inserted + result.updated
+
+
+# ===== 增量刷新 =====
+
+class PortfolioRefresher:
+    """待刷新的 (学生, 学年) 集合 + 后台批量刷新线程（结构与计数服务一致）"""
+
+    def __init__(self, refresh_interval: float = 30, session_factory: Callable[[], Session] = SessionLocal):
+        self.refresh_interval = refresh_interval
+        self.session_factory = session_factory
+        self._pending: Set[Tuple[int, str]] = set()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def mark(self, student_id: Optional[int], at: Optional[datetime] = None) -> None:
+        """标记学生在某时间所在学年的档案需要刷新（at 为空时为当前学年）"""
+        if not student_id:
+            return
+        school_year = school_year_of(at) if at else current_school_year()
+        with self._lock:
+            self._pending.add((student_id, school_year))
+
+    def mark_project(self, db: Session, project: PBLProject) -> None:
+        """
+        标记项目所有参与者（成果提交人、小组成员）的档案需要刷新
+
+        在项目状态变化或删除前调用；标记项目创建时和当前的学年
+        """
+        try:
+            participants = {
+                user_id for (user_id,) in db.query(PBLProjectOutput.user_id).filter(
+                    PBLProjectOutput.project_id == project.id
+                ).distinct()
+            }
+            if project.group_id:
+                participants.update(
+                    user_id for (user_id,) in db.query(PBLGroupMember.user_id).filter(
+                        PBLGroupMember.group_id == project.group_id,
+                        PBLGroupMember.is_active == 1
+                    )
+                )
+        except Exception as e:
+            logger.warning(f"查询项目参与者失败 - 项目ID: {project.id}, 错误: {str(e)}")
+            return
+        for user_id in participants:
+            self.mark(user_id)
+            if project.created_at:
+                self.mark(user_id, project.created_at)
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def flush(self) -> int:
+        """
+        重新计算所有待刷新的档案，按学年分组、每批 REFRESH_BATCH_SIZE 个学生
+
+        写入失败时待刷新项放回集合，下次重试
+
+        Returns:
+            新建或更新的档案数
+        """
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                batch, self._pending = self._pending, set()
+
+            by_year: Dict[str, List[int]] = defaultdict(list)
+            for student_id, school_year in batch:
+                by_year[school_year].append(student_id)
+
+            written = 0
+            db = self.session_factory()
+            try:
+                for school_year, student_ids in by_year.items():
+                    student_ids.sort()
+                    for start in range(0, len(student_ids), REFRESH_BATCH_SIZE):
+                        written += refresh_portfolios(db, school_year, student_ids[start:start + REFRESH_BATCH_SIZE])
+                        db.commit()
+            except Exception:
+                db.rollback()
+                with self._lock:
+                    self._pending |= batch
+                raise
+            finally:
+                db.close()
+
+            logger.debug(f"成长档案已刷新 - 待刷新: {len(batch)}, 写入: {written}")
+            return written
+
+    def _run(self) -> None:
+        while not self._stopping.wait(self.refresh_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"成长档案刷新失败，将在下次刷新时重试: {str(e)}", exc_info=True)
+
+    def start(self) -> None:
+        """启动后台刷新线程"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name='portfolio-refresh', daemon=True)
+        self._thread.start()
+        logger.info(f"成长档案刷新线程已启动 - 间隔: {self.refresh_interval}秒")
+
+    def stop(self) -> None:
+        """停止后台刷新线程，并刷新剩余的档案"""
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.refresh_interval + 5)
+            self._thread = None
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"停止时刷新成长档案失败: {str(e)}", exc_info=True)
+
+
+portfolio_refresher = PortfolioRefresher(refresh_interval=settings.portfolio_refresh_interval)
+
+
+# ===== 全量重建 =====
+
+def rebuild_portfolios(
+    session_factory: Callable[[], Session],
+    school_years: Sequence[str],
+    school_id: Optional[int] = None,
+    batch_size: int = REFRESH_BATCH_SIZE,
+    on_batch: Optional[Callable[[int, int], None]] = None
+) -> Dict:
+    """
+    全量重建档案汇总字段
+
+    按学生ID游标分批（每批 batch_size 个学生），每批每个学年计算一次并提交，
+    内存占用只与批大小有关，与学校人数无关。
+
+    Args:
+        session_factory: 会话工厂
+        school_years: 需要重建的学年
+        school_id: 学校ID，为空时重建所有学生
+        batch_size: 每批学生数
+        on_batch: 每批完成后的回调 (已处理学生数, 已写入档案数)
+
+    Returns:
+        {'students': 学生数, 'written': 写入档案数, 'batches': 批次数}
+    """
+    for school_year in school_years:
+        school_year_range(school_year)
+
+    students = written = batches = 0
+    last_id = 0
+    while True:
+        db = session_factory()
+        try:
+            query = db.query(User.id).filter(User.role == 'student', User.id > last_id)
+            if school_id is not None:
+                query = query.filter(User.school_id == school_id)
+            student_ids = [student_id for (student_id,) in query.order_by(User.id).limit(batch_size)]
+            if not student_ids:
+                break
+            for school_year in school_years:
+                written += refresh_portfolios(db, school_year, student_ids)
+                db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        last_id = student_ids[-1]
+        students += len(student_ids)
+        batches += 1
+        if on_batch:
+            on_batch(students, written)
+
+    return {'students': students, 'written': written, 'batches': batches}
+
+
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description='全量重建学生成长档案统计')
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--school-code', help='学校代码')
+    target.add_argument('--school-id', type=int, help='学校ID')
+    target.add_argument('--all-schools', action='store_true', help='重建所有学生')
+    parser.add_argument('--school-year', action='append', dest='school_years',
+                        help='学年，如 2025-2026，可重复指定（默认当前学年）')
+    parser.add_argument('--batch-size', type=int, default=REFRESH_BATCH_SIZE, help='每批学生数')
+    return parser.parse_args()
+
+
+def main():
+    """全量重建：python -m app.services.portfolio_service --school-code BJ-YCZX"""
+    from ..core.logging_config import setup_logging
+    setup_logging(level=settings.log_level, fmt=settings.log_format)
+
+    args = parse_args()
+    school_years = args.school_years or [current_school_year()]
+
+    school_id = args.school_id
+    if args.school_code:
+        db = SessionLocal()
+        try:
+            school = db.query(School.id).filter(School.school_code == args.school_code).first()
+        finally:
+            db.close()
+        if not school:
+            print(f"❌ 学校不存在: {args.school_code}")
+            raise SystemExit(1)
+        school_id = school.id
+
+    print(f"重建成长档案 - 学校ID: {school_id if school_id is not None else '全部'}, 学年: {', '.join(school_years)}")
+    started = time.perf_counter()
+
+    def on_batch(students: int, written: int):
+        print(f"  已处理 {students} 名学生，写入 {written} 份档案")
+
+    result = rebuild_portfolios(
+        SessionLocal, school_years, school_id=school_id, batch_size=args.batch_size, on_batch=on_batch
+    )
+    print(
+        f"✓ 完成 - 学生: {result['students']}, 写入档案: {result['written']}, "
+        f"批次: {result['batches']}, 耗时: {time.perf_counter() - started:.1f}秒"
+    )
+
+
+if __name__ == "__main__":
+    main()
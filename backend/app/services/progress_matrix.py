@@ -0,0 +1,156 @@
+"""
+学习进度矩阵
+把 (学生, 单元) 的已完成任务数装入稠密的 学生 × 单元 矩阵，与每个单元的任务数向量比较，
+一次性向量化计算：
+  - 每个学生的完成单元数、完成率、学习状态
+  - 各状态人数、完成率分布、各单元完成人数
+大班级和全校报表中不再逐学生、逐单元在 Python 中循环判断。
+
+判定规则与原有接口一致：
+  - 单元完成 = 该单元已完成任务数 >= 任务数，且任务数 > 0（没有任务的单元不算完成）
+  - 完成率 = 完成单元数 / 单元总数 * 100（单元总数包含没有任务的单元）
+  - 状态：完成率 100 为 completed，大于 0 为 in_progress，否则 not_started
+"""
+from itertools import chain
+from typing import Dict, Iterable, List, Sequence, Sized, Tuple
+
+import numpy as np
+
+# 状态编码，与 STATUS_NAMES 下标对应
+NOT_STARTED = 0
+IN_PROGRESS = 1
+COMPLETED = 2
+STATUS_NAMES = ('not_started', 'in_progress', 'completed')
+
+# 完成率分布的默认区间：[0, 20) [20, 40) [40, 60) [60, 80) [80, 100]
+DEFAULT_RATE_BINS = (0, 20, 40, 60, 80, 100)
+
+
+def _index_of(sorted_ids: np.ndarray, order: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """把ID映射为矩阵下标，不存在的ID返回 -1"""
+    if len(sorted_ids) == 0:
+        return np.full(len(values), -1, dtype=np.int64)
+    pos = np.searchsorted(sorted_ids, values)
+    pos = np.minimum(pos, len(sorted_ids) - 1)
+    found = sorted_ids[pos] == values
+    return np.where(found, order[pos], -1)
+
+
+class ProgressMatrix:
+    """学生 × 单元 的已完成任务数矩阵"""
+
+    def __init__(self, student_ids: Sequence[int], unit_ids: Sequence[int], unit_task_counts: Sequence[int]):
+        """
+        Args:
+            student_ids: 学生ID（矩阵的行，按传入顺序）
+            unit_ids: 单元ID（矩阵的列，按传入顺序）
+            unit_task_counts: 每个单元的任务数，与 unit_ids 一一对应
+        """
+        self.student_ids = np.asarray(student_ids, dtype=np.int64)
+        self.unit_ids = np.asarray(unit_ids, dtype=np.int64)
+        self.task_counts = np.asarray(unit_task_counts, dtype=np.int32)
+        self.completed = np.zeros((len(self.student_ids), len(self.unit_ids)), dtype=np.int32)
+
+        self._student_order = np.argsort(self.student_ids, kind='stable')
+        self._student_sorted = self.student_ids[self._student_order]
+        self._unit_order = np.argsort(self.unit_ids, kind='stable')
+        self._unit_sorted = self.unit_ids[self._unit_order]
+
+    @classmethod
+    def from_structure(cls, structure, student_ids: Sequence[int]) -> 'ProgressMatrix':
+        """按课程结构快照（CourseStructure）创建空矩阵"""
+        return cls(student_ids, structure.unit_ids, structure.unit_task_counts)
+
+    @property
+    def total_units(self) -> int:
+        return len(self.unit_ids)
+
+    def add_counts(self, rows: Iterable[Tuple[int, int, int]]) -> 'ProgressMatrix':
+        """
+        累加已完成任务数
+
+        Args:
+            rows: (学生ID, 单元ID, 已完成任务数)，通常是按 (学生, 单元) 分组的查询结果；
+                不在矩阵中的学生或单元会被忽略
+        """
+        # 已知行数时预先分配，避免 fromiter 反复扩容
+        count = len(rows) * 3 if isinstance(rows, Sized) else -1
+        data = np.fromiter(chain.from_iterable(rows), dtype=np.int64, count=count).reshape(-1, 3)
+        if len(data) == 0:
+            return self
+        rows_idx = _index_of(self._student_sorted, self._student_order, data[:, 0])
+        cols_idx = _index_of(self._unit_sorted, self._unit_order, data[:, 1])
+        valid = (rows_idx >= 0) & (cols_idx >= 0)
+        # 按扁平下标累加（同一 (学生, 单元) 出现多次时求和）
+        flat = rows_idx[valid] * self.completed.shape[1] + cols_idx[valid]
+        added = np.bincount(flat, weights=data[valid, 2], minlength=self.completed.size)
+        self.completed += added.astype(np.int32).reshape(self.completed.shape)
+        return self
+
+    def unit_completed(self) -> np.ndarray:
+        """学生 × 单元 的布尔矩阵：单元是否完成"""
+        return (self.completed >= self.task_counts) & (self.task_counts > 0)
+
+    def completed_units(self) -> np.ndarray:
+        """每个学生的完成单元数"""
+        return self.unit_completed().sum(axis=1)
+
+    def completion_rates(self) -> np.ndarray:
+        """每个学生的完成率（0-100 的浮点数；单元总数为 0 时全为 0）"""
+        if self.total_units == 0:
+            return np.zeros(len(self.student_ids), dtype=np.float64)
+        return self.completed_units() / self.total_units * 100
+
+    def statuses(self) -> np.ndarray:
+        """每个学生的状态编码（NOT_STARTED / IN_PROGRESS / COMPLETED）"""
+        rates = self.completion_rates()
+        return np.select([rates == 100, rates > 0], [COMPLETED, IN_PROGRESS], default=NOT_STARTED)
+
+    def status_counts(self) -> Dict[str, int]:
+        """各状态人数"""
+        counts = np.bincount(self.statuses(), minlength=len(STATUS_NAMES))
+        return {name: int(counts[code]) for code, name in enumerate(STATUS_NAMES)}
+
+    def rate_distribution(self, bins: Sequence[float] = DEFAULT_RATE_BINS) -> List[Dict]:
+        """完成率分布（最后一个区间包含右端点）"""
+        counts, edges = np.histogram(self.completion_rates(), bins=bins)
+        return [
+            {'min': int(edges[i]), 'max': int(edges[i + 1]), 'count': int(counts[i])}
+            for i in range(len(counts))
+        ]
+
+    def unit_completion_counts(self) -> Dict[int, int]:
+        """每个单元的完成人数"""
+        counts = self.unit_completed().sum(axis=0)
+        return {int(unit_id): int(count) for unit_id, count in zip(self.unit_ids, counts)}
+
+    def summary(self) -> Dict:
+        """整体统计：人数、平均完成率、各状态人数、完成率分布"""
+        total = len(self.student_ids)
+        rates = self.completion_rates()
+        status_counts = self.status_counts()
+        return {
+            'total_students': total,
+            'avg_completion_rate': int(rates.sum() / total) if total else 0,
+            'completed_count': status_counts['completed'],
+            'in_progress_count': status_counts['in_progress'],
+            'not_started_count': status_counts['not_started'],
+            'rate_distribution': self.rate_distribution()
+        }
+
+    def student_rows(self) -> Dict[int, Tuple[int, int, str]]:
+        """
+        按学生返回逐行结果，供组装列表响应使用
+
+        Returns:
+            {学生ID: (完成单元数, 完成率（取整）, 状态)}
+        """
+        completed_units = self.completed_units()
+        rates = self.completion_rates().astype(np.int64)
+        statuses = self.statuses()
+        return {
+            int(student_id): (int(units), int(rate), STATUS_NAMES[status])
+            for student_id, units, rate, status in zip(
+                self.student_ids.tolist(), completed_units.tolist(), rates.tolist(), statuses.tolist()
+            )
+        }
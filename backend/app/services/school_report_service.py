@@ -0,0 +1,319 @@
+"""
+学校学习进度报表服务
+按班级汇总一所学校的学习情况（完成率、各状态人数、提交数、平均分、最后活跃时间）。
+
+一批班级固定 4 次查询，与班级数、课程数、学生数无关：
+  1. 班级成员
+  2. 班级下已发布的课程
+  3. 课程结构（走 course_structure_service 快照缓存，全部命中时不查询）
+  4. 学习进度：对 PBLTaskProgress 按 (学生, 单元) 分组扫描一遍，同时得到
+     已完成任务数、提交数、得分和最后活跃时间
+完成率和状态在每门课程的 ProgressMatrix 上向量化计算，再按班级合并。
+分页接口按班级分页；导出按批次生成，边查询边输出。
+学校整体统计（build_school_summary）不依赖分页，用一条聚合查询在数据库中计算。
+"""
+from collections import defaultdict
+from typing import Dict, Iterator, List, Sequence
+
+import numpy as np
+from sqlalchemy import func, case
+from sqlalchemy.orm import Session
+
+from ..core.logging_config import get_logger
+from ..models.pbl import PBLClass, PBLClassMember, PBLCourse, PBLUnit, PBLTask, PBLTaskProgress
+from .course_structure_service import get_course_structures
+from .progress_matrix import ProgressMatrix, DEFAULT_RATE_BINS
+
+logger = get_logger(__name__)
+
+# 导出时每批处理的班级数
+EXPORT_BATCH_SIZE = 50
+
+
+def _empty_report(pbl_class: PBLClass) -> Dict:
+    return {
+        'class_id': pbl_class.id,
+        'class_uuid': pbl_class.uuid,
+        'class_name': pbl_class.name,
+        'grade': pbl_class.grade,
+        'student_count': 0,
+        'course_count': 0,
+        'avg_completion_rate': 0,
+        'completed_count': 0,
+        'in_progress_count': 0,
+        'not_started_count': 0,
+        'rate_distribution': [
+            {'min': DEFAULT_RATE_BINS[i], 'max': DEFAULT_RATE_BINS[i + 1], 'count': 0}
+            for i in range(len(DEFAULT_RATE_BINS) - 1)
+        ],
+        'submissions_count': 0,
+        'graded_count': 0,
+        'avg_score': None,
+        'active_students': 0,
+        'last_active': None
+    }
+
+
+def build_class_reports(db: Session, classes: Sequence[PBLClass]) -> List[Dict]:
+    """
+    汇总一批班级的学习进度
+
+    完成率、各状态人数按 (学生, 课程) 统计：班级有多门课程时，每个学生在每门课程各计一次。
+
+    Returns:
+        与 classes 顺序一致的班级报表列表
+    """
+    reports = {pbl_class.id: _empty_report(pbl_class) for pbl_class in classes}
+    if not reports:
+        return []
+    class_ids = list(reports.keys())
+
+    # 1. 班级成员
+    members: Dict[int, List[int]] = defaultdict(list)
+    for class_id, student_id in db.query(PBLClassMember.class_id, PBLClassMember.student_id).filter(
+        PBLClassMember.class_id.in_(class_ids),
+        PBLClassMember.is_active == 1
+    ):
+        members[class_id].append(student_id)
+
+    # 2. 班级下已发布的课程
+    course_class: Dict[int, int] = {
+        course_id: class_id
+        for course_id, class_id in db.query(PBLCourse.id, PBLCourse.class_id).filter(
+            PBLCourse.class_id.in_(class_ids),
+            PBLCourse.status == 'published'
+        )
+    }
+
+    # 3. 课程结构快照
+    structures = get_course_structures(db, course_class.keys())
+    unit_course = {
+        unit_id: course_id
+        for course_id, structure in structures.items()
+        for unit_id in structure.unit_ids
+    }
+
+    # 4. 一次扫描学习进度，按课程分发
+    course_rows: Dict[int, List[tuple]] = defaultdict(list)
+    student_stats: Dict[int, Dict[int, list]] = defaultdict(dict)
+    if unit_course:
+        rows = db.query(
+            PBLTaskProgress.user_id,
+            PBLTask.unit_id,
+            func.count(func.distinct(case((PBLTaskProgress.status == 'completed', PBLTaskProgress.task_id)))),
+            func.sum(case((PBLTaskProgress.submission.isnot(None), 1), else_=0)),
+            func.count(PBLTaskProgress.score),
+            func.sum(PBLTaskProgress.score),
+            func.max(PBLTaskProgress.updated_at)
+        ).join(
+            PBLTask, PBLTask.id == PBLTaskProgress.task_id
+        ).filter(
+            PBLTask.unit_id.in_(list(unit_course.keys())),
+            PBLTaskProgress.user_id.in_(
+                db.query(PBLClassMember.student_id).filter(
+                    PBLClassMember.class_id.in_(class_ids),
+                    PBLClassMember.is_active == 1
+                )
+            )
+        ).group_by(
+            PBLTaskProgress.user_id,
+            PBLTask.unit_id
+        ).all()
+
+        member_sets = {class_id: set(student_ids) for class_id, student_ids in members.items()}
+        for user_id, unit_id, completed, submissions, graded, score_sum, last_active in rows:
+            course_id = unit_course[unit_id]
+            class_id = course_class[course_id]
+            # 学生可能同时在多个班级，只统计本班课程的进度
+            if user_id not in member_sets.get(class_id, ()):
+                continue
+            course_rows[course_id].append((user_id, unit_id, completed))
+
+            # [提交数, 已评分数, 总分, 最后活跃时间]
+            stats = student_stats[class_id].get(user_id)
+            if stats is None:
+                stats = student_stats[class_id][user_id] = [0, 0, 0, None]
+            stats[0] += int(submissions or 0)
+            stats[1] += int(graded or 0)
+            stats[2] += int(score_sum or 0)
+            if last_active and (stats[3] is None or last_active > stats[3]):
+                stats[3] = last_active
+
+    # 完成率和状态：每门课程一个矩阵，按班级合并
+    class_rates: Dict[int, List[np.ndarray]] = defaultdict(list)
+    for course_id, class_id in course_class.items():
+        report = reports[class_id]
+        report['course_count'] += 1
+        student_ids = members.get(class_id)
+        if not student_ids:
+            continue
+        matrix = ProgressMatrix.from_structure(structures[course_id], student_ids).add_counts(course_rows[course_id])
+        class_rates[class_id].append(matrix.completion_rates())
+        for name, count in matrix.status_counts().items():
+            report[f'{name}_count'] += count
+        for bucket, item in zip(report['rate_distribution'], matrix.rate_distribution()):
+            bucket['count'] += item['count']
+
+    for class_id, report in reports.items():
+        report['student_count'] = len(members.get(class_id, ()))
+        rates = class_rates.get(class_id)
+        if rates:
+            report['avg_completion_rate'] = int(np.concatenate(rates).mean())
+
+        stats = student_stats.get(class_id, {}).values()
+        graded = sum(item[1] for item in stats)
+        last_active = max((item[3] for item in stats if item[3]), default=None)
+        report['submissions_count'] = sum(item[0] for item in stats)
+        report['graded_count'] = graded
+        report['avg_score'] = round(sum(item[2] for item in stats) / graded, 1) if graded else None
+        report['active_students'] = len(stats)
+        report['last_active'] = last_active.isoformat() if last_active else None
+
+    return [reports[pbl_class.id] for pbl_class in classes]
+
+
+def build_school_summary(db: Session, school_id: int, include_inactive: bool = False) -> Dict:
+    """
+    学校全部班级的整体统计（一条聚合查询，与分页无关）
+
+    口径与 build_class_reports 相同：完成率、各状态人数按 (学生, 课程) 统计，学生数、有学习记录人数
+    按班级累加（学生在多个班级时各计一次），提交数、得分只统计学生所在班级课程的进度。
+    平均完成率为全部 (学生, 课程) 完成率的平均值。
+    """
+    class_filter = [PBLClass.school_id == school_id]
+    if not include_inactive:
+        class_filter.append(PBLClass.is_active == 1)
+    class_ids = db.query(PBLClass.id).filter(*class_filter)
+
+    members = db.query(
+        PBLClassMember.class_id.label('class_id'),
+        PBLClassMember.student_id.label('student_id')
+    ).filter(
+        PBLClassMember.class_id.in_(class_ids),
+        PBLClassMember.is_active == 1
+    ).subquery()
+
+    courses = db.query(
+        PBLCourse.id.label('course_id'),
+        PBLCourse.class_id.label('class_id')
+    ).filter(
+        PBLCourse.class_id.in_(class_ids),
+        PBLCourse.status == 'published'
+    ).subquery()
+
+    # 每个单元的任务数
+    unit_tasks = db.query(
+        PBLUnit.id.label('unit_id'),
+        PBLUnit.course_id.label('course_id'),
+        func.count(PBLTask.id).label('task_count')
+    ).outerjoin(
+        PBLTask, PBLTask.unit_id == PBLUnit.id
+    ).filter(
+        PBLUnit.course_id.in_(db.query(courses.c.course_id))
+    ).group_by(PBLUnit.id, PBLUnit.course_id).subquery()
+
+    # (学生, 单元) 的已完成任务数、提交数和得分
+    unit_progress = db.query(
+        PBLTaskProgress.user_id.label('user_id'),
+        PBLTask.unit_id.label('unit_id'),
+        func.count(func.distinct(case((PBLTaskProgress.status == 'completed', PBLTaskProgress.task_id)))).label('completed'),
+        func.sum(case((PBLTaskProgress.submission.isnot(None), 1), else_=0)).label('submissions'),
+        func.count(PBLTaskProgress.score).label('graded'),
+        func.sum(PBLTaskProgress.score).label('score_sum')
+    ).join(
+        PBLTask, PBLTask.id == PBLTaskProgress.task_id
+    ).filter(
+        PBLTask.unit_id.in_(db.query(unit_tasks.c.unit_id)),
+        PBLTaskProgress.user_id.in_(db.query(members.c.student_id))
+    ).group_by(PBLTaskProgress.user_id, PBLTask.unit_id).subquery()
+
+    # 每个 (班级, 学生, 课程) 一行
+    pairs = db.query(
+        members.c.class_id,
+        members.c.student_id,
+        func.count(unit_tasks.c.unit_id).label('total_units'),
+        func.sum(case(
+            ((unit_tasks.c.task_count > 0) & (unit_progress.c.completed >= unit_tasks.c.task_count), 1),
+            else_=0
+        )).label('completed_units'),
+        func.sum(unit_progress.c.submissions).label('submissions'),
+        func.sum(unit_progress.c.graded).label('graded'),
+        func.sum(unit_progress.c.score_sum).label('score_sum')
+    ).select_from(members).join(
+        courses, courses.c.class_id == members.c.class_id
+    ).outerjoin(
+        unit_tasks, unit_tasks.c.course_id == courses.c.course_id
+    ).outerjoin(
+        unit_progress,
+        (unit_progress.c.user_id == members.c.student_id) & (unit_progress.c.unit_id == unit_tasks.c.unit_id)
+    ).group_by(
+        members.c.class_id, members.c.student_id, courses.c.course_id
+    ).subquery()
+
+    # 有学习记录的 (班级, 学生)
+    active_pairs = db.query(pairs.c.class_id, pairs.c.student_id).filter(
+        pairs.c.submissions.isnot(None)
+    ).distinct().subquery()
+
+    rate = case(
+        (pairs.c.total_units > 0, pairs.c.completed_units * 100.0 / pairs.c.total_units),
+        else_=0
+    )
+    row = db.query(
+        db.query(func.count()).select_from(PBLClass).filter(*class_filter).scalar_subquery(),
+        db.query(func.count()).select_from(members).scalar_subquery(),
+        db.query(func.count()).select_from(active_pairs).scalar_subquery(),
+        func.count(),
+        func.avg(rate),
+        func.sum(case(((pairs.c.total_units > 0) & (pairs.c.completed_units == pairs.c.total_units), 1), else_=0)),
+        func.sum(case(((pairs.c.completed_units > 0) & (pairs.c.completed_units < pairs.c.total_units), 1), else_=0)),
+        func.sum(pairs.c.submissions),
+        func.sum(pairs.c.graded),
+        func.sum(pairs.c.score_sum)
+    ).select_from(pairs).one()
+
+    (class_count, student_count, active_students, pair_count, avg_rate,
+     completed, in_progress, submissions, graded, score_sum) = row
+    completed = int(completed or 0)
+    in_progress = int(in_progress or 0)
+    graded = int(graded or 0)
+    return {
+        'class_count': int(class_count or 0),
+        'student_count': int(student_count or 0),
+        'avg_completion_rate': int(avg_rate or 0),
+        'completed_count': completed,
+        'in_progress_count': in_progress,
+        'not_started_count': int(pair_count or 0) - completed - in_progress,
+        'submissions_count': int(submissions or 0),
+        'graded_count': graded,
+        'avg_score': round(float(score_sum) / graded, 1) if graded else None,
+        'active_students': int(active_students or 0)
+    }
+
+
+def school_classes_query(db: Session, school_id: int, include_inactive: bool = False):
+    """学校的班级查询（按ID排序，供分页和导出使用）"""
+    query = db.query(PBLClass).filter(PBLClass.school_id == school_id)
+    if not include_inactive:
+        query = query.filter(PBLClass.is_active == 1)
+    return query.order_by(PBLClass.id)
+
+
+def iter_school_class_reports(
+    db: Session,
+    school_id: int,
+    include_inactive: bool = False,
+    batch_size: int = EXPORT_BATCH_SIZE
+) -> Iterator[Dict]:
+    """按批次逐个生成学校全部班级的报表（按班级ID键集分页，用于流式导出）"""
+    last_id = 0
+    while True:
+        classes = school_classes_query(db, school_id, include_inactive).filter(
+            PBLClass.id > last_id
+        ).limit(batch_size).all()
+        if not classes:
+            return
+        for report in build_class_reports(db, classes):
+            yield report
+        last_id = classes[-1].id
+        logger.debug(f"学校进度报表导出 - 学校ID: {school_id}, 已处理到班级ID: {last_id}")
@@ -0,0 +1,181 @@
+"""
+学生搜索索引
+
+“可添加学生”选择器按姓名、拼音首字母、学号搜索。core_users 与 CodeHubot 共用，
+不便为搜索新增列或全文索引，因此在进程内为每个学校维护一份只读索引：
+  - 索引键：姓名/真实姓名、姓名拼音首字母、学号，以及它们的所有后缀
+    （后缀 + 前缀匹配 = 子串匹配，与原来的 LIKE '%关键字%' 语义一致）
+  - 查找：键有序存放，bisect 定位前缀区间，复杂度 O(log n + 命中数)
+索引由一条查询构建，缓存在 TTLCache 中；学生增删改时调用 invalidate_school_students 失效，
+其他 worker 依赖 TTL 过期。索引只负责给出候选学生ID，成员过滤、权限等条件仍由 SQL 判断。
+
+拼音首字母需要安装可选依赖 pypinyin，未安装时只按姓名和学号搜索。
+"""
+import bisect
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import Query, Session
+
+from ..core.cache import TTLCache
+from ..core.logging_config import get_logger
+from ..models.admin import Admin as User
+from ..utils.pagination import encode_cursor
+
+try:
+    from pypinyin import Style, lazy_pinyin
+except ImportError:  # pypinyin 为可选依赖
+    lazy_pinyin = None
+
+logger = get_logger(__name__)
+
+# 学校ID -> StudentSearchIndex
+_index_cache = TTLCache(maxsize=256, ttl=300)
+
+# 搜索命中后每次交给 SQL 过滤的学生ID数量
+CANDIDATE_CHUNK_SIZE = 200
+
+# 前缀区间上界（大于任何实际字符）
+_MAX_CHAR = '\U0010ffff'
+
+
+def _initials(text: str) -> str:
+    """姓名拼音首字母，如 王小明 -> wxm"""
+    if lazy_pinyin is None:
+        return ''
+    return ''.join(lazy_pinyin(text, style=Style.FIRST_LETTER, errors='ignore')).lower()
+
+
+def _suffixes(text: str) -> Iterable[str]:
+    for i in range(len(text)):
+        yield text[i:]
+
+
+class StudentSearchIndex:
+    """单个学校的学生搜索索引"""
+
+    def __init__(self, students: Iterable[Tuple[int, Optional[str], Optional[str], Optional[str]]]):
+        """
+        Args:
+            students: (学生ID, 姓名, 真实姓名, 学号)
+        """
+        entries: Set[Tuple[str, int]] = set()
+        # 学生ID -> 排序键 (学号, ID)，与 SQL 的分页顺序一致
+        self.sort_keys: Dict[int, Tuple[str, int]] = {}
+
+        for student_id, name, real_name, student_number in students:
+            number = (student_number or '').lower()
+            self.sort_keys[student_id] = (student_number or '', student_id)
+            texts = {t.strip().lower() for t in (name, real_name) if t and t.strip()}
+            for text in list(texts):
+                initials = _initials(text)
+                if initials:
+                    texts.add(initials)
+            if number:
+                texts.add(number)
+            for text in texts:
+                for suffix in _suffixes(text):
+                    entries.add((suffix, student_id))
+
+        self._entries: List[Tuple[str, int]] = sorted(entries)
+        self._keys: List[str] = [key for key, _ in self._entries]
+
+    def search(self, keyword: str) -> List[Tuple[str, int]]:
+        """
+        搜索学生
+
+        Returns:
+            命中学生的排序键 (学号, ID)，已排序
+        """
+        keyword = keyword.strip().lower()
+        if not keyword:
+            return []
+        lo = bisect.bisect_left(self._keys, keyword)
+        hi = bisect.bisect_left(self._keys, keyword + _MAX_CHAR, lo)
+        ids = {student_id for _, student_id in self._entries[lo:hi]}
+        return sorted(self.sort_keys[student_id] for student_id in ids)
+
+    def __len__(self) -> int:
+        return len(self.sort_keys)
+
+
+def _build_index(db: Session, school_id: int) -> StudentSearchIndex:
+    rows = db.query(
+        User.id, User.name, User.real_name, User.student_number
+    ).filter(
+        User.school_id == school_id,
+        User.role == 'student',
+        User.deleted_at == None
+    ).all()
+    index = StudentSearchIndex(rows)
+    logger.debug(f"构建学生搜索索引 - 学校ID: {school_id}, 学生数: {len(index)}")
+    return index
+
+
+def get_school_index(db: Session, school_id: int) -> StudentSearchIndex:
+    """获取学校的学生搜索索引（未缓存时构建）"""
+    return _index_cache.get_or_load(school_id, lambda: _build_index(db, school_id))
+
+
+def search_school_students(db: Session, school_id: int, keyword: str) -> List[Tuple[str, int]]:
+    """按姓名、拼音首字母、学号搜索学校内的学生，返回已排序的 (学号, ID)"""
+    return get_school_index(db, school_id).search(keyword)
+
+
+def paginate_students(
+    query: Query,
+    after: Optional[Tuple[str, int]],
+    limit: int,
+    candidates: Optional[List[Tuple[str, int]]] = None
+) -> Tuple[list, Optional[str]]:
+    """
+    按 (学号, ID) 游标分页查询学生
+
+    Args:
+        query: 已带过滤条件（学校、角色、NOT EXISTS 成员排除等）的 User 查询
+        after: 上一页最后一个学生的 (学号, ID)，decode_cursor(cursor, parse=str) 的结果
+        limit: 每页数量
+        candidates: 搜索命中的 (学号, ID)；为空表示不搜索。
+            按顺序分批用 id IN (...) 交给 SQL 过滤，凑满一页即停止，
+            因此每页的查询次数与命中数无关，只与被过滤掉的比例有关
+
+    Returns:
+        (学生列表, 下一页游标)，没有下一页时游标为 None
+    """
+    if candidates is None:
+        sort_number = func.coalesce(User.student_number, '')
+        query = query.order_by(sort_number, User.id)
+        if after:
+            after_number, after_id = after
+            query = query.filter(or_(
+                sort_number > after_number,
+                and_(sort_number == after_number, User.id > after_id)
+            ))
+        # 多取一条用于判断是否还有下一页
+        students = query.limit(limit + 1).all()
+    else:
+        start = bisect.bisect_right(candidates, after) if after else 0
+        students = []
+        while start < len(candidates) and len(students) <= limit:
+            chunk = [student_id for _, student_id in candidates[start:start + CANDIDATE_CHUNK_SIZE]]
+            rows = query.filter(User.id.in_(chunk)).all()
+            # 按索引的排序键排序（与游标比较方式一致，不受数据库排序规则影响）
+            rows.sort(key=lambda s: (s.student_number or '', s.id))
+            students.extend(rows)
+            start += CANDIDATE_CHUNK_SIZE
+
+    has_more = len(students) > limit
+    students = students[:limit]
+    next_cursor = None
+    if has_more:
+        last = students[-1]
+        next_cursor = encode_cursor(last.student_number or '', last.id)
+    return students, next_cursor
+
+
+def invalidate_school_students(school_id: Optional[int] = None) -> None:
+    """学生增删改后失效索引；school_id 为空时失效全部学校"""
+    if school_id is None:
+        _index_cache.clear()
+    else:
+        _index_cache.delete(school_id)
@@ -1,17 +1,20 @@
 """
 课程模板服务
-提供从模板创建课程实例的功能
+提供从模板创建课程实例、批量开放模板权限的功能
 """
 from sqlalchemy.orm import Session
 import uuid as uuid_lib
-from typing import Optional, Tuple
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
 from ..models.pbl import (
-    PBLCourse, PBLCourseTemplate,
+    PBLClass, PBLCourse, PBLCourseTemplate,
     PBLUnit, PBLUnitTemplate,
     PBLResource, PBLResourceTemplate,
     PBLTask, PBLTaskTemplate,
     PBLTemplateSchoolPermission
 )
+from ..models.school import School
+from ..utils.bulk import bulk_upsert, INSERTED, EXISTS
 from ..utils.timezone import get_beijing_time_naive
 from ..core.logging_config import get_logger
 
@@ -211,3 +214,196 @@ def validate_template_permission(
         raise ValueError(f"已达到该模板的最大实例数限制（{permission.max_instances}）")
     
     return template, permission
+
+
+def instantiate_template_for_class(
+    db: Session,
+    template: PBLCourseTemplate,
+    pbl_class: PBLClass,
+    creator_id: int,
+    title: Optional[str] = None
+) -> Tuple[PBLCourse, Dict[str, int]]:
+    """
+    基于模板为班级创建已发布的课程（单元默认关闭、任务默认草稿），调用方负责提交事务
+
+    Args:
+        db: 数据库会话
+        template: 课程模板
+        pbl_class: 班级
+        creator_id: 创建者ID
+        title: 课程标题，为空时使用 "班级名称 + 模板标题"
+
+    Returns:
+        (课程, {'units_count', 'resources_count', 'tasks_count'})
+    """
+    course_title = title if title else f"{pbl_class.name}{template.title}"
+    
+    new_course = PBLCourse(
+        template_id=template.id,
+        template_version=template.version,
+        is_customized=0,
+        sync_with_template=1,
+        class_id=pbl_class.id,
+        class_name=pbl_class.name,
+        title=course_title,
+        description=template.description,
+        cover_image=template.cover_image,
+        duration=template.duration,
+        difficulty=template.difficulty,
+        status='published',
+        creator_id=creator_id,
+        school_id=pbl_class.school_id
+    )
+    db.add(new_course)
+    db.flush()
+    
+    # 从模板复制单元、资源、任务
+    units_count = 0
+    resources_count = 0
+    tasks_count = 0
+    
+    # 查询模板的所有单元（包括关联的资源和任务）
+    template_units = db.query(PBLUnitTemplate).filter(
+        PBLUnitTemplate.course_template_id == template.id
+    ).order_by(PBLUnitTemplate.order).all()
+    
+    # 复制单元、资源、任务
+    for template_unit in template_units:
+        # 创建单元副本，默认状态为 'locked'（关闭）
+        new_unit = PBLUnit(
+            course_id=new_course.id,
+            title=template_unit.title,
+            description=template_unit.description,
+            order=template_unit.order,
+            status='locked',  # 默认关闭
+            learning_guide=template_unit.learning_objectives  # 复制学习目标作为学习指南
+        )
+        db.add(new_unit)
+        db.flush()  # 获取新单元的ID
+        units_count += 1
+        
+        # 复制资源
+        template_resources = db.query(PBLResourceTemplate).filter(
+            PBLResourceTemplate.unit_template_id == template_unit.id
+        ).order_by(PBLResourceTemplate.order).all()
+        
+        for template_resource in template_resources:
+            new_resource = PBLResource(
+                unit_id=new_unit.id,
+                type=template_resource.type,
+                title=template_resource.title,
+                description=template_resource.description,
+                url=template_resource.url,
+                content=template_resource.content,
+                duration=template_resource.duration,
+                order=template_resource.order,
+                video_id=template_resource.video_id,
+                video_cover_url=template_resource.video_cover_url,
+                max_views=template_resource.default_max_views
+            )
+            db.add(new_resource)
+            resources_count += 1
+        
+        # 复制任务
+        template_tasks = db.query(PBLTaskTemplate).filter(
+            PBLTaskTemplate.unit_template_id == template_unit.id
+        ).order_by(PBLTaskTemplate.order).all()
+        
+        for template_task in template_tasks:
+            new_task = PBLTask(
+                unit_id=new_unit.id,
+                title=template_task.title,
+                description=template_task.description,
+                type=template_task.type,
+                difficulty=template_task.difficulty,
+                estimated_time=template_task.estimated_time,
+                order=template_task.order,
+                requirements=template_task.requirements,
+                prerequisites=template_task.prerequisites,
+                is_required=1,  # 默认必做
+                publish_status='draft'  # 默认草稿状态
+            )
+            db.add(new_task)
+            tasks_count += 1
+    
+    # 更新模板使用次数
+    template.usage_count += 1
+    
+    return new_course, {
+        'units_count': units_count,
+        'resources_count': resources_count,
+        'tasks_count': tasks_count
+    }
+
+
+def grant_template_to_schools(
+    db: Session,
+    template: PBLCourseTemplate,
+    school_ids: List[int],
+    granted_by: int,
+    is_active: int = 1,
+    can_customize: int = 1,
+    max_instances: Optional[int] = None,
+    valid_from: Optional[datetime] = None,
+    valid_until: Optional[datetime] = None,
+    remarks: Optional[str] = None
+) -> Dict:
+    """
+    批量开放模板给多个学校（已有权限的学校跳过），调用方负责提交事务
+
+    Returns:
+        成功数、失败学校列表和按传入顺序的逐个处理结果
+    """
+    # 一次查询取出所有学校
+    schools = {
+        school.id: school.school_name
+        for school in db.query(School.id, School.school_name).filter(School.id.in_(set(school_ids))).all()
+    }
+    
+    failed_schools = []
+    rows = []
+    for school_id in school_ids:
+        if school_id not in schools:
+            failed_schools.append({"school_id": school_id, "reason": "学校不存在"})
+            continue
+        rows.append({
+            "uuid": str(uuid_lib.uuid4()),
+            "template_id": template.id,
+            "school_id": school_id,
+            "is_active": is_active,
+            "can_customize": can_customize,
+            "max_instances": max_instances,
+            "valid_from": valid_from,
+            "valid_until": valid_until,
+            "remarks": remarks,
+            "granted_by": granted_by,
+            "current_instances": 0
+        })
+    
+    # 预取已有权限 + 多行插入，SQL 条数不随学校数增长
+    upsert_result = bulk_upsert(
+        db, PBLTemplateSchoolPermission, rows,
+        key_columns=("template_id", "school_id")
+    )
+    for (_, school_id), item_status in upsert_result.items:
+        if item_status != INSERTED:
+            failed_schools.append({
+                "school_id": school_id,
+                "school_name": schools[school_id],
+                "reason": "已存在权限记录" if item_status == EXISTS else "重复的学校ID"
+            })
+    
+    # 按传入顺序返回每个学校的处理结果
+    item_statuses = iter(upsert_result.items)
+    results = [
+        {"school_id": school_id, "status": next(item_statuses)[1] if school_id in schools else "not_found"}
+        for school_id in school_ids
+    ]
+    
+    return {
+        "template_title": template.title,
+        "success_count": upsert_result.inserted,
+        "failed_count": len(failed_schools),
+        "failed_schools": failed_schools,
+        "results": results
+    }
@@ -0,0 +1,223 @@
+"""
+用户批量导入服务
+学生、教师 CSV 批量导入的逐行校验和创建逻辑，供同步导入接口和后台任务（job_handlers）共用。
+"""
+import csv
+import io
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from ..core.logging_config import get_logger
+from ..core.security import get_password_hash
+from ..models.admin import User
+from ..models.pbl import PBLClass
+from ..models.school import School
+
+logger = get_logger(__name__)
+
+# 上传文件可能使用的编码（按顺序尝试）
+CSV_ENCODINGS = ['utf-8-sig', 'utf-8', 'gbk', 'gb2312', 'gb18030']
+
+# 进度回调：(已处理行数, 总行数)
+ProgressCallback = Callable[[int, int], None]
+
+
+def decode_csv(contents: bytes) -> Optional[str]:
+    """尝试多种编码格式解码 CSV 文件，都失败时返回 None"""
+    for encoding in CSV_ENCODINGS:
+        try:
+            return contents.decode(encoding)
+        except (UnicodeDecodeError, LookupError):
+            continue
+    return None
+
+
+def _count_rows(text: str) -> int:
+    """数据行数的估计值（用于进度计算）"""
+    return max(text.count('\n'), 1)
+
+
+def import_students(
+    db: Session,
+    school: School,
+    text: str,
+    on_progress: Optional[ProgressCallback] = None
+) -> Dict:
+    """
+    从 CSV 内容导入学生（调用方负责提交事务）
+
+    Returns:
+        {'success_count': 成功数, 'errors': 错误和警告列表}
+    """
+    csv_reader = csv.DictReader(io.StringIO(text))
+    total = _count_rows(text)
+
+    success_count = 0
+    error_list: List[Dict] = []
+
+    # 获取该学校的所有班级，用于名称查找
+    classes_dict = {}
+    classes = db.query(PBLClass).filter(
+        PBLClass.school_id == school.id,
+        PBLClass.is_active == 1
+    ).all()
+    for cls in classes:
+        classes_dict[cls.name] = cls.id
+
+    for row_num, row in enumerate(csv_reader, start=2):  # 从第2行开始（第1行是标题）
+        if on_progress:
+            on_progress(row_num - 1, total)
+        try:
+            # 验证必填字段
+            if not row.get('student_number') or not row.get('name') or not row.get('gender'):
+                error_list.append({
+                    'row': row_num,
+                    'error': '缺少必填字段（student_number, name, gender）'
+                })
+                continue
+
+            # 自动生成用户名：学号 + 学校编码
+            username = f"{row['student_number']}@{school.school_code}"
+
+            # 检查用户名是否已存在
+            if db.query(User).filter(User.username == username).first():
+                error_list.append({
+                    'row': row_num,
+                    'student_number': row['student_number'],
+                    'error': '该学号在本校已存在'
+                })
+                continue
+
+            # 转换性别：男->male, 女->female
+            gender_map = {
+                '男': 'male',
+                '女': 'female',
+                'male': 'male',
+                'female': 'female'
+            }
+            gender = gender_map.get(row.get('gender', '').strip())
+            if not gender:
+                error_list.append({
+                    'row': row_num,
+                    'error': '性别格式错误，请填写"男"或"女"'
+                })
+                continue
+
+            # 处理班级：如果提供了班级名称，查找对应的班级ID
+            # 如果班级名称为空，则不分配班级但允许导入
+            class_id = None
+            if row.get('class_name'):
+                class_name = row['class_name'].strip()
+                if class_name:  # 班级名称不为空
+                    if class_name in classes_dict:
+                        class_id = classes_dict[class_name]
+                    else:
+                        # 班级不存在，给出警告但不阻止导入
+                        error_list.append({
+                            'row': row_num,
+                            'warning': f'班级"{class_name}"不存在，已导入但未分配班级'
+                        })
+
+            # 生成默认密码（如果没有提供）
+            password = row.get('password') or '123456'
+
+            # 创建学生用户（不收集电话和邮箱）
+            new_student = User(
+                username=username,
+                name=row['name'],
+                student_number=row['student_number'],
+                class_id=class_id,
+                gender=gender,
+                password_hash=get_password_hash(password),
+                role='student',
+                school_id=school.id,
+                school_name=school.school_name,
+                is_active=True,
+                need_change_password=True  # 首次登录需要修改密码
+            )
+
+            db.add(new_student)
+            success_count += 1
+
+        except Exception as e:
+            error_list.append({
+                'row': row_num,
+                'error': str(e)
+            })
+
+    return {'success_count': success_count, 'errors': error_list}
+
+
+def import_teachers(
+    db: Session,
+    school: School,
+    text: str,
+    on_progress: Optional[ProgressCallback] = None
+) -> Dict:
+    """
+    从 CSV 内容导入教师（调用方负责提交事务）
+
+    Returns:
+        {'success_count': 成功数, 'errors': 错误列表}
+    """
+    csv_reader = csv.DictReader(io.StringIO(text))
+    total = _count_rows(text)
+
+    success_count = 0
+    error_list: List[Dict] = []
+
+    for row_num, row in enumerate(csv_reader, start=2):
+        if on_progress:
+            on_progress(row_num - 1, total)
+        try:
+            # 验证必填字段
+            if not row.get('teacher_number') or not row.get('name') or not row.get('gender'):
+                error_list.append({
+                    'row': row_num,
+                    'error': '缺少必填字段（teacher_number, name, gender）'
+                })
+                continue
+
+            # 自动生成用户名：工号 + 学校编码
+            username = f"{row['teacher_number']}@{school.school_code}"
+
+            # 检查用户名是否已存在
+            if db.query(User).filter(User.username == username).first():
+                error_list.append({
+                    'row': row_num,
+                    'teacher_number': row['teacher_number'],
+                    'error': '该工号在本校已存在'
+                })
+                continue
+
+            # 生成默认密码
+            password = row.get('password') or '123456'
+
+            # 创建教师用户
+            new_teacher = User(
+                username=username,
+                name=row['name'],
+                teacher_number=row['teacher_number'],
+                subject=row.get('subject'),
+                gender=row.get('gender'),
+                phone=row.get('phone'),
+                email=row.get('email') if row.get('email') else None,
+                password_hash=get_password_hash(password),
+                role='teacher',
+                school_id=school.id,
+                school_name=school.school_name,
+                is_active=True,
+                need_change_password=True
+            )
+
+            db.add(new_teacher)
+            success_count += 1
+
+        except Exception as e:
+            error_list.append({
+                'row': row_num,
+                'error': str(e)
+            })
+
+    return {'success_count': success_count, 'errors': error_list}
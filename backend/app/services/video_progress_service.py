@@ -22,6 +22,8 @@ from ..models.pbl import (
     PBLVideoPlayEvent,
     PBLVideoWatchRecord
 )
+from ..models.projections import summary_options
+from .class_event_service import publish_resource_event, EVENT_VIDEO_COMPLETED
 
 
 class VideoProgressService:
@@ -266,6 +268,7 @@ class VideoProgressService:
         if not progress:
             return None
         
+        was_completed = bool(progress.is_completed)
         progress.current_position = position
         progress.status = 'ended'
         progress.last_event = 'ended'
@@ -291,6 +294,16 @@ class VideoProgressService:
             position=position
         )
         
+        # 本次播放首次达到完成标准时推送给教师看板
+        if progress.is_completed and not was_completed:
+            publish_resource_event(db, progress.resource_id, EVENT_VIDEO_COMPLETED, {
+                'resource_id': progress.resource_id,
+                'student_id': progress.user_id,
+                'position': position,
+                'duration': progress.duration,
+                'completed_at': progress.end_time
+            })
+        
         return progress
     
     @staticmethod
@@ -414,8 +427,10 @@ class VideoProgressService:
         Returns:
             观看统计信息
         """
-        # 查询所有会话
-        sessions = db.query(PBLVideoPlayProgress).filter(
+        # 查询所有会话（只做统计，不加载观看区间等重字段）
+        sessions = db.query(PBLVideoPlayProgress).options(
+            *summary_options(PBLVideoPlayProgress)
+        ).filter(
             PBLVideoPlayProgress.resource_id == resource_id,
             PBLVideoPlayProgress.user_id == user_id
         ).all()
@@ -462,8 +477,10 @@ class VideoProgressService:
         Returns:
             视频观看统计信息
         """
-        # 查询所有会话
-        sessions = db.query(PBLVideoPlayProgress).filter(
+        # 查询所有会话（只做统计，不加载观看区间等重字段）
+        sessions = db.query(PBLVideoPlayProgress).options(
+            *summary_options(PBLVideoPlayProgress)
+        ).filter(
             PBLVideoPlayProgress.resource_id == resource_id
         ).all()
         
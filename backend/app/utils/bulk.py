@@ -0,0 +1,145 @@
+"""
+批量写入工具
+批量授权、批量分配、批量添加成员等场景使用：
+  1. 一条 IN 查询预取已存在的记录
+  2. 需要新增或更新的记录合并为多行 INSERT ... ON DUPLICATE KEY UPDATE（按 chunk_size 分批）
+无论传入多少条，SQL 条数只与批次数有关，不随条数线性增长。
+
+依赖表上的唯一键（如 uk_template_school、uk_school_course、uk_group_user），
+预取与写入之间如有并发插入，ON DUPLICATE KEY UPDATE 保证不会因唯一键冲突报错。
+"""
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import tuple_
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.orm import Session
+
+# 单条结果状态
+INSERTED = 'inserted'    # 新增
+UPDATED = 'updated'      # 已存在，按 update_columns 更新（如重新激活）
+EXISTS = 'exists'        # 已存在，未修改
+DUPLICATE = 'duplicate'  # 与本批次中前面的记录重复
+
+
+class BulkUpsertResult:
+    """批量写入结果"""
+
+    def __init__(self):
+        # 按传入顺序的单条结果：(唯一键, 状态)
+        self.items: List[Tuple[Tuple, str]] = []
+        # 本次执行的 SQL 条数（预取 + 写入）
+        self.statements = 0
+
+    def count(self, status: str) -> int:
+        return sum(1 for _, s in self.items if s == status)
+
+    def status_by_key(self) -> Dict[Tuple, str]:
+        return {key: s for key, s in self.items}
+
+    @property
+    def inserted(self) -> int:
+        return self.count(INSERTED)
+
+    @property
+    def updated(self) -> int:
+        return self.count(UPDATED)
+
+
+def _apply_defaults(table, row: Dict[str, Any]) -> Dict[str, Any]:
+    """补齐 Python 端默认值（uuid、created_at 等），保证多行 VALUES 的列一致"""
+    row = dict(row)
+    for column in table.columns:
+        if column.key in row or column.primary_key:
+            continue
+        default = column.default
+        if default is None:
+            continue
+        if default.is_callable:
+            row[column.key] = default.arg(None)
+        elif default.is_scalar:
+            row[column.key] = default.arg
+    return row
+
+
+def bulk_upsert(
+    db: Session,
+    model,
+    rows: Sequence[Dict[str, Any]],
+    key_columns: Sequence[str],
+    update_columns: Sequence[str] = (),
+    fetch_columns: Sequence[str] = (),
+    needs_update: Optional[Callable[[Any], bool]] = None,
+    chunk_size: int = 500
+) -> BulkUpsertResult:
+    """
+    批量插入缺失记录，可选更新已存在的记录
+
+    Args:
+        db: 数据库会话（不提交，由调用方 commit）
+        model: ORM 模型
+        rows: 待写入的记录，每条为 {列名: 值}
+        key_columns: 唯一键列（需与表上的唯一索引一致）
+        update_columns: 已存在记录需要更新的列
+        fetch_columns: 预取时额外查询的列，供 needs_update 判断
+        needs_update: 判断已存在记录是否需要更新，参数为预取的行；为空时已存在记录一律不更新
+        chunk_size: 每条 INSERT 的最大行数
+
+    Returns:
+        BulkUpsertResult，items 与 rows 一一对应
+    """
+    result = BulkUpsertResult()
+    if not rows:
+        return result
+
+    table = model.__table__
+    keys = [tuple(row[c] for c in key_columns) for row in rows]
+
+    # 所有记录取值相同的键列作为等值条件，其余键列用 IN
+    fixed = {c: rows[0][c] for c in key_columns if all(row[c] == rows[0][c] for row in rows)}
+    varying = [c for c in key_columns if c not in fixed]
+
+    query = db.query(
+        *[getattr(model, c) for c in key_columns],
+        *[getattr(model, c) for c in fetch_columns]
+    ).filter(*[getattr(model, c) == v for c, v in fixed.items()])
+    if len(varying) == 1:
+        query = query.filter(getattr(model, varying[0]).in_({row[varying[0]] for row in rows}))
+    elif varying:
+        query = query.filter(tuple_(*[getattr(model, c) for c in varying]).in_(
+            {tuple(row[c] for c in varying) for row in rows}
+        ))
+    existing = {tuple(getattr(r, c) for c in key_columns): r for r in query.all()}
+    result.statements += 1
+
+    to_write = []
+    seen = set()
+    for key, row in zip(keys, rows):
+        if key in seen:
+            result.items.append((key, DUPLICATE))
+            continue
+        seen.add(key)
+        current = existing.get(key)
+        if current is None:
+            result.items.append((key, INSERTED))
+            to_write.append(_apply_defaults(table, row))
+        elif update_columns and needs_update is not None and needs_update(current):
+            result.items.append((key, UPDATED))
+            to_write.append(_apply_defaults(table, row))
+        else:
+            result.items.append((key, EXISTS))
+
+    if not to_write:
+        return result
+
+    # 没有需要更新的列时用 key = key 占位，只为吞掉并发插入造成的唯一键冲突
+    update_set = list(update_columns) or [key_columns[0]]
+    if 'updated_at' in table.c and 'updated_at' not in update_set:
+        update_set.append('updated_at')
+
+    for start in range(0, len(to_write), chunk_size):
+        stmt = mysql_insert(table).values(to_write[start:start + chunk_size])
+        stmt = stmt.on_duplicate_key_update({c: stmt.inserted[c] for c in update_set})
+        db.execute(stmt)
+        result.statements += 1
+
+    return result
@@ -1,20 +1,25 @@
 """
 数据导出工具
-支持导出为 CSV 和 Excel 格式
+支持导出为 CSV 和 Excel（XLSX，流式写入）格式
 """
 import csv
 import io
-from typing import List, Dict, Any
+import math
+import re
+import zipfile
+from itertools import chain
+from typing import List, Dict, Any, Iterable, Iterator, Optional
 from datetime import datetime
+from xml.sax.saxutils import escape as xml_escape
 from app.utils.timezone import get_beijing_time_naive
 
 
-def export_to_csv(data: List[Dict[str, Any]], headers: List[str]) -> str:
+def export_to_csv(data: Iterable[Dict[str, Any]], headers: List[str]) -> str:
     """
     导出数据到 CSV 格式
     
     Args:
-        data: 数据列表
+        data: 数据列表（可以是生成器）
         headers: 列标题列表
     
     Returns:
@@ -36,32 +41,23 @@ def export_to_csv(data: List[Dict[str, Any]], headers: List[str]) -> str:
     return csv_content
 
 
-def export_progress_to_csv(progress_data: List[Dict[str, Any]]) -> str:
-    """
-    导出学习进度数据到 CSV
-    
-    Args:
-        progress_data: 学习进度数据列表
-    
-    Returns:
-        CSV 字符串
-    """
-    headers = [
-        '学生姓名',
-        '学号',
-        '完成率(%)',
-        '状态',
-        '已完成单元',
-        '总单元数',
-        '学习时长(小时)',
-        '提交作业数',
-        '最后活跃时间'
-    ]
-    
-    # 转换数据格式
-    csv_data = []
+PROGRESS_HEADERS = [
+    '学生姓名',
+    '学号',
+    '完成率(%)',
+    '状态',
+    '已完成单元',
+    '总单元数',
+    '学习时长(小时)',
+    '提交作业数',
+    '最后活跃时间'
+]
+
+
+def _progress_rows(progress_data: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """学习进度数据转换为导出行"""
     for item in progress_data:
-        csv_data.append({
+        yield {
             '学生姓名': item.get('name', ''),
             '学号': item.get('student_number', ''),
             '完成率(%)': item.get('completion_rate', 0),
@@ -71,38 +67,53 @@ def export_progress_to_csv(progress_data: List[Dict[str, Any]]) -> str:
             '学习时长(小时)': item.get('learning_hours', 0),
             '提交作业数': item.get('submissions_count', 0),
             '最后活跃时间': item.get('last_active', '')
-        })
-    
-    return export_to_csv(csv_data, headers)
+        }
 
 
-def export_homework_to_csv(homework_data: List[Dict[str, Any]]) -> str:
+def export_progress_to_csv(progress_data: List[Dict[str, Any]]) -> str:
     """
-    导出作业数据到 CSV
+    导出学习进度数据到 CSV
     
     Args:
-        homework_data: 作业数据列表
+        progress_data: 学习进度数据列表
     
     Returns:
         CSV 字符串
     """
-    headers = [
-        '作业标题',
-        '所属单元',
-        '状态',
-        '是否必做',
-        '提交人数',
-        '总人数',
-        '待批改数',
-        '开始时间',
-        '截止时间',
-        '创建时间'
-    ]
+    return export_to_csv(_progress_rows(progress_data), PROGRESS_HEADERS)
+
+
+def export_progress_to_xlsx(progress_data: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    """
+    导出学习进度数据到 Excel（流式）
+    
+    Args:
+        progress_data: 学习进度数据（可以是生成器）
     
-    # 转换数据格式
-    csv_data = []
+    Returns:
+        XLSX 文件片段
+    """
+    return iter_xlsx(_progress_rows(progress_data), PROGRESS_HEADERS, sheet_name='学习进度')
+
+
+HOMEWORK_HEADERS = [
+    '作业标题',
+    '所属单元',
+    '状态',
+    '是否必做',
+    '提交人数',
+    '总人数',
+    '待批改数',
+    '开始时间',
+    '截止时间',
+    '创建时间'
+]
+
+
+def _homework_rows(homework_data: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """作业数据转换为导出行"""
     for item in homework_data:
-        csv_data.append({
+        yield {
             '作业标题': item.get('title', ''),
             '所属单元': item.get('unit_name', ''),
             '状态': get_homework_status_name(item.get('status', '')),
@@ -113,36 +124,51 @@ def export_homework_to_csv(homework_data: List[Dict[str, Any]]) -> str:
             '开始时间': item.get('start_time', ''),
             '截止时间': item.get('deadline', ''),
             '创建时间': item.get('created_at', '')
-        })
-    
-    return export_to_csv(csv_data, headers)
+        }
 
 
-def export_submissions_to_csv(submissions_data: List[Dict[str, Any]]) -> str:
+def export_homework_to_csv(homework_data: List[Dict[str, Any]]) -> str:
     """
-    导出作业提交数据到 CSV
+    导出作业数据到 CSV
     
     Args:
-        submissions_data: 作业提交数据列表
+        homework_data: 作业数据列表
     
     Returns:
         CSV 字符串
     """
-    headers = [
-        '学生姓名',
-        '学号',
-        '状态',
-        '分数',
-        '反馈',
-        '评阅人',
-        '评阅时间',
-        '提交时间'
-    ]
+    return export_to_csv(_homework_rows(homework_data), HOMEWORK_HEADERS)
+
+
+def export_homework_to_xlsx(homework_data: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    """
+    导出作业数据到 Excel（流式）
+    
+    Args:
+        homework_data: 作业数据（可以是生成器）
     
-    # 转换数据格式
-    csv_data = []
+    Returns:
+        XLSX 文件片段
+    """
+    return iter_xlsx(_homework_rows(homework_data), HOMEWORK_HEADERS, sheet_name='作业列表')
+
+
+SUBMISSION_HEADERS = [
+    '学生姓名',
+    '学号',
+    '状态',
+    '分数',
+    '反馈',
+    '评阅人',
+    '评阅时间',
+    '提交时间'
+]
+
+
+def _submission_rows(submissions_data: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """作业提交数据转换为导出行"""
     for item in submissions_data:
-        csv_data.append({
+        yield {
             '学生姓名': item.get('student_name', ''),
             '学号': item.get('student_number', ''),
             '状态': get_submission_status_name(item.get('status', '')),
@@ -151,9 +177,285 @@ def export_submissions_to_csv(submissions_data: List[Dict[str, Any]]) -> str:
             '评阅人': item.get('grader_name', '') or '',
             '评阅时间': item.get('graded_at', '') or '',
             '提交时间': item.get('submitted_at', '') or '未提交'
-        })
+        }
+
+
+def export_submissions_to_csv(submissions_data: List[Dict[str, Any]]) -> str:
+    """
+    导出作业提交数据到 CSV
+    
+    Args:
+        submissions_data: 作业提交数据列表
+    
+    Returns:
+        CSV 字符串
+    """
+    return export_to_csv(_submission_rows(submissions_data), SUBMISSION_HEADERS)
+
+
+def export_submissions_to_xlsx(submissions_data: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    """
+    导出作业提交数据到 Excel（流式）
+    
+    Args:
+        submissions_data: 作业提交数据（可以是生成器）
+    
+    Returns:
+        XLSX 文件片段
+    """
+    return iter_xlsx(_submission_rows(submissions_data), SUBMISSION_HEADERS, sheet_name='提交详情')
+
+
+def iter_csv(rows: Iterable[Dict[str, Any]], headers: List[str]) -> Iterator[bytes]:
+    """
+    逐行生成 CSV（用于 StreamingResponse，不在内存中拼接整个文件）
+    
+    Args:
+        rows: 数据行（可以是生成器）
+        headers: 列标题列表
+    
+    Returns:
+        UTF-8 编码的 CSV 片段，第一段带 BOM 以支持 Excel 正确显示中文
+    """
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=headers)
+    writer.writeheader()
+    yield output.getvalue().encode('utf-8-sig')
     
-    return export_to_csv(csv_data, headers)
+    for row in rows:
+        output.seek(0)
+        output.truncate(0)
+        writer.writerow(row)
+        yield output.getvalue().encode('utf-8')
+
+
+def iter_school_progress_csv(
+    reports: Iterable[Dict[str, Any]],
+    summary: Optional[Dict[str, Any]] = None
+) -> Iterator[bytes]:
+    """
+    逐行导出学校学习进度报表（每个班级一行）
+    
+    Args:
+        reports: 班级报表（可以是生成器）
+        summary: 学校整体统计，提供时在最后输出一行合计
+    
+    Returns:
+        CSV 片段
+    """
+    headers = [
+        '班级',
+        '年级',
+        '学生数',
+        '课程数',
+        '平均完成率(%)',
+        '已完成',
+        '进行中',
+        '未开始',
+        '提交作业数',
+        '已评分数',
+        '平均分',
+        '有学习记录人数',
+        '最后活跃时间'
+    ]
+    
+    rows = (
+        {
+            '班级': item.get('class_name', ''),
+            '年级': item.get('grade', '') or '',
+            '学生数': item.get('student_count', 0),
+            '课程数': item.get('course_count', 0),
+            '平均完成率(%)': item.get('avg_completion_rate', 0),
+            '已完成': item.get('completed_count', 0),
+            '进行中': item.get('in_progress_count', 0),
+            '未开始': item.get('not_started_count', 0),
+            '提交作业数': item.get('submissions_count', 0),
+            '已评分数': item.get('graded_count', 0),
+            '平均分': item.get('avg_score') if item.get('avg_score') is not None else '',
+            '有学习记录人数': item.get('active_students', 0),
+            '最后活跃时间': item.get('last_active', '') or ''
+        }
+        for item in reports
+    )
+    if summary is not None:
+        rows = chain(rows, [{
+            '班级': f"合计（{summary.get('class_count', 0)} 个班级）",
+            '年级': '',
+            '学生数': summary.get('student_count', 0),
+            '课程数': '',
+            '平均完成率(%)': summary.get('avg_completion_rate', 0),
+            '已完成': summary.get('completed_count', 0),
+            '进行中': summary.get('in_progress_count', 0),
+            '未开始': summary.get('not_started_count', 0),
+            '提交作业数': summary.get('submissions_count', 0),
+            '已评分数': summary.get('graded_count', 0),
+            '平均分': summary.get('avg_score') if summary.get('avg_score') is not None else '',
+            '有学习记录人数': summary.get('active_students', 0),
+            '最后活跃时间': ''
+        }])
+    
+    return iter_csv(rows, headers)
+
+
+# ==========================================================================================================
+# XLSX 流式写入
+# 工作表 XML 逐行写入 zip 条目，zip 输出到不可 seek 的缓冲区（zipfile 会改用数据描述符），
+# 每写一批行就把已压缩的数据交给调用方；单元格使用内联字符串，不需要共享字符串表，
+# 内存占用与行数无关。
+# ==========================================================================================================
+
+# 每写入多少行输出一次
+XLSX_FLUSH_ROWS = 500
+
+# XML 1.0 不允许的控制字符
+_XML_ILLEGAL_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+_XLSX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '</Types>'
+)
+
+_XLSX_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+
+_XLSX_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="{sheet_name}" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+
+_XLSX_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+    'Target="styles.xml"/>'
+    '</Relationships>'
+)
+
+# 两种单元格样式：0 默认，1 标题行加粗
+_XLSX_STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="2"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/></cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+
+_XLSX_SHEET_HEAD = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<sheetViews><sheetView workbookViewId="0">'
+    '<pane ySplit="1" topLeftCell="A2" activePane="bottomLeft" state="frozen"/>'
+    '</sheetView></sheetViews>'
+    '<sheetData>'
+)
+
+_XLSX_SHEET_TAIL = '</sheetData></worksheet>'
+
+
+class _StreamSink(io.RawIOBase):
+    """zipfile 的输出目标：暂存写入的数据，由生成器取走（不支持 seek）"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _xlsx_cell(value: Any, style: int = 0) -> str:
+    """生成一个单元格：数字写为数值，其他写为内联字符串，空值写为空单元格"""
+    style_attr = f' s="{style}"' if style else ''
+    if value is None or value == '':
+        return f'<c{style_attr}/>'
+    if isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value):
+        return f'<c{style_attr}><v>{value}</v></c>'
+    if isinstance(value, datetime):
+        value = value.strftime('%Y-%m-%d %H:%M:%S')
+    text = xml_escape(_XML_ILLEGAL_CHARS.sub('', str(value)))
+    return f'<c t="inlineStr"{style_attr}><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _xlsx_row(index: int, values: Iterable[Any], style: int = 0) -> str:
+    return f'<row r="{index}">' + ''.join(_xlsx_cell(value, style) for value in values) + '</row>'
+
+
+def iter_xlsx(rows: Iterable[Dict[str, Any]], headers: List[str], sheet_name: str = 'Sheet1') -> Iterator[bytes]:
+    """
+    逐行生成 XLSX 文件（用于 StreamingResponse，不在内存中保留整个工作表）
+    
+    Args:
+        rows: 数据行（可以是生成器），按 headers 取值
+        headers: 列标题列表（第一行，加粗并冻结）
+        sheet_name: 工作表名称（最长 31 个字符）
+    
+    Returns:
+        XLSX 文件片段，全部拼接后即为完整文件
+    """
+    sink = _StreamSink()
+    with zipfile.ZipFile(sink, mode='w', compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('[Content_Types].xml', _XLSX_CONTENT_TYPES)
+        archive.writestr('_rels/.rels', _XLSX_ROOT_RELS)
+        archive.writestr('xl/workbook.xml', _XLSX_WORKBOOK.format(sheet_name=xml_escape(sheet_name[:31], {'"': '&quot;'})))
+        archive.writestr('xl/_rels/workbook.xml.rels', _XLSX_WORKBOOK_RELS)
+        archive.writestr('xl/styles.xml', _XLSX_STYLES)
+        yield sink.drain()
+        
+        with archive.open('xl/worksheets/sheet1.xml', mode='w') as sheet:
+            sheet.write(_XLSX_SHEET_HEAD.encode('utf-8'))
+            sheet.write(_xlsx_row(1, headers, style=1).encode('utf-8'))
+            
+            buffer = []
+            for index, row in enumerate(rows, start=2):
+                buffer.append(_xlsx_row(index, (row.get(header) for header in headers)))
+                if len(buffer) >= XLSX_FLUSH_ROWS:
+                    sheet.write(''.join(buffer).encode('utf-8'))
+                    buffer.clear()
+                    chunk = sink.drain()
+                    if chunk:
+                        yield chunk
+            if buffer:
+                sheet.write(''.join(buffer).encode('utf-8'))
+            sheet.write(_XLSX_SHEET_TAIL.encode('utf-8'))
+    # 关闭压缩包时写入中央目录
+    yield sink.drain()
 
 
 def get_status_name(status: str) -> str:
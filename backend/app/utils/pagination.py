@@ -0,0 +1,52 @@
+"""
+游标分页工具
+按 (排序字段, ID) 做 keyset 分页，游标对前端是不透明字符串
+"""
+import base64
+from datetime import datetime
+from typing import Any, Callable, Optional, Tuple, Union
+
+
+def encode_cursor(sort_value: Union[datetime, str], row_id: int) -> str:
+    """
+    生成游标
+
+    Args:
+        sort_value: 最后一条记录的排序字段值（时间或字符串，如学号）
+        row_id: 最后一条记录的ID（排序字段相同时用于区分先后）
+
+    Returns:
+        URL 安全的游标字符串
+    """
+    if isinstance(sort_value, datetime):
+        sort_value = sort_value.isoformat()
+    raw = f"{sort_value}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(
+    cursor: Optional[str],
+    parse: Callable[[str], Any] = datetime.fromisoformat
+) -> Optional[Tuple[Any, int]]:
+    """
+    解析游标
+
+    Args:
+        cursor: 游标字符串
+        parse: 排序字段的解析函数，默认按时间解析；字符串排序字段传 str
+
+    Returns:
+        (排序字段值, ID)，游标为空时返回 None
+
+    Raises:
+        ValueError: 游标格式错误
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8')
+        sort_value, row_id = raw.rsplit('|', 1)
+        return parse(sort_value), int(row_id)
+    except Exception:
+        raise ValueError("无效的分页游标")
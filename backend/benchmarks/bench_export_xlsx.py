@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+导出内存基准测试
+
+用随机生成的学习进度数据（逐行生成，不预先放入列表），对比：
+  - CSV：export_progress_to_csv 一次生成整个字符串
+  - XLSX：export_progress_to_xlsx 流式输出，逐段丢弃（模拟 StreamingResponse 发送）
+输出每种方式的耗时、输出大小和 tracemalloc 峰值内存；XLSX 的峰值不应随行数增长。
+最后校验 XLSX 是合法的 zip 包，工作表 XML 可以解析且行数正确。
+
+不需要数据库。
+
+示例：
+  python benchmarks/bench_export_xlsx.py --rows 5000 50000
+"""
+
+import argparse
+import io
+import sys
+import time
+import tracemalloc
+import zipfile
+from pathlib import Path
+
+# 添加项目路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description='导出内存基准测试')
+    parser.add_argument('--rows', type=int, nargs='+', default=[5000, 50000], help='导出行数（可指定多个）')
+    return parser.parse_args()
+
+
+def _progress_data(rows):
+    """逐行生成学习进度数据（与 _get_class_progress_data 的字段一致）"""
+    statuses = ('not_started', 'in_progress', 'completed')
+    for i in range(rows):
+        yield {
+            'name': f'学生{i}',
+            'student_number': f'S{i:08d}',
+            'completion_rate': i % 101,
+            'status': statuses[i % 3],
+            'completed_units': i % 12,
+            'total_units': 12,
+            'learning_hours': round((i % 50) * 0.5, 1),
+            'submissions_count': i % 20,
+            'last_active': '2026-03-01T10:20:30'
+        }
+
+
+def _measure(func):
+    """执行 func，返回 (结果, 耗时ms, 峰值内存字节)"""
+    tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        result = func()
+        elapsed = (time.perf_counter() - started) * 1000
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def _format_bytes(size):
+    if size >= 1024 * 1024:
+        return f"{size / 1024 / 1024:.1f}MB"
+    if size >= 1024:
+        return f"{size / 1024:.1f}KB"
+    return f"{size}B"
+
+
+def _verify_xlsx(content, rows):
+    """校验 XLSX 结构和行数"""
+    from xml.etree import ElementTree
+
+    namespace = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+    with zipfile.ZipFile(io.BytesIO(content)) as archive:
+        if archive.testzip() is not None:
+            return False
+        with archive.open('xl/worksheets/sheet1.xml') as sheet:
+            count = sum(
+                1 for _, element in ElementTree.iterparse(sheet)
+                if element.tag == f'{namespace}row'
+            )
+    # 加一行标题
+    return count == rows + 1
+
+
+def run(args):
+    """执行基准测试"""
+    from app.utils.export import export_progress_to_csv, export_progress_to_xlsx
+
+    print("=" * 80)
+    print(f"{'行数':>8}{'格式':>8}{'耗时(ms)':>12}{'输出大小':>12}{'峰值内存':>12}")
+    print("-" * 80)
+
+    ok = True
+    xlsx_peaks = []
+    for rows in args.rows:
+        csv_content, csv_ms, csv_peak = _measure(lambda: export_progress_to_csv(_progress_data(rows)))
+        print(f"{rows:>8}{'csv':>8}{csv_ms:>12.1f}{_format_bytes(len(csv_content.encode('utf-8'))):>12}"
+              f"{_format_bytes(csv_peak):>12}")
+        del csv_content
+
+        def stream_xlsx():
+            # 只统计大小，不保留输出
+            return sum(len(chunk) for chunk in export_progress_to_xlsx(_progress_data(rows)))
+
+        xlsx_size, xlsx_ms, xlsx_peak = _measure(stream_xlsx)
+        xlsx_peaks.append(xlsx_peak)
+        print(f"{rows:>8}{'xlsx':>8}{xlsx_ms:>12.1f}{_format_bytes(xlsx_size):>12}{_format_bytes(xlsx_peak):>12}")
+
+        content = b''.join(export_progress_to_xlsx(_progress_data(rows)))
+        if _verify_xlsx(content, rows):
+            print(f"{'':>8}✓ XLSX 结构校验通过（{rows} 行数据 + 标题行）")
+        else:
+            print(f"{'':>8}✗ XLSX 结构校验失败")
+            ok = False
+
+    print("=" * 80)
+    if len(xlsx_peaks) > 1:
+        growth = max(xlsx_peaks) / min(xlsx_peaks)
+        print(f"XLSX 峰值内存：最小 {_format_bytes(min(xlsx_peaks))}，最大 {_format_bytes(max(xlsx_peaks))}"
+              f"（{growth:.2f} 倍）")
+    print("✓ 完成" if ok else "❌ 存在校验失败")
+    return ok
+
+
+def main():
+    """主函数"""
+    args = parse_args()
+    try:
+        sys.exit(0 if run(args) else 1)
+    except ImportError as e:
+        print(f"❌ 导入错误: {str(e)}")
+        print()
+        print("请确保已安装所有依赖:")
+        print("  pip install -r requirements.txt")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+学习进度矩阵基准测试
+
+用随机生成的 (学生, 单元) 已完成任务数，对比两种计算方式：
+  - 逐学生、逐单元的 Python 循环（原 get_class_progress / get_class_progress_overview 的做法）
+  - app.services.progress_matrix.ProgressMatrix 向量化计算
+校验两者的完成单元数、完成率、学习状态完全一致，并分别输出装载（查询结果 -> 内存结构）
+和计算的耗时。
+
+不需要数据库，只依赖 numpy。
+
+示例：
+  python benchmarks/bench_progress_matrix.py --students 5000 --units 40 --repeat 5
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# 添加项目路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description='学习进度矩阵基准测试')
+    parser.add_argument('--students', type=int, default=5000, help='学生数')
+    parser.add_argument('--units', type=int, default=40, help='单元数')
+    parser.add_argument('--max-tasks', type=int, default=5, help='每个单元的最大任务数（含 0，即没有任务的单元）')
+    parser.add_argument('--fill', type=float, default=0.6, help='有进度记录的 (学生, 单元) 比例')
+    parser.add_argument('--repeat', type=int, default=5, help='重复次数')
+    parser.add_argument('--seed', type=int, default=42, help='随机种子')
+    return parser.parse_args()
+
+
+def build_data(args):
+    """生成学生、单元、任务数和按 (学生, 单元) 分组的已完成任务数"""
+    rng = random.Random(args.seed)
+    student_ids = list(range(100001, 100001 + args.students))
+    unit_ids = list(range(1, args.units + 1))
+    task_counts = [rng.randint(0, args.max_tasks) for _ in unit_ids]
+    rows = []
+    for student_id in student_ids:
+        for unit_id, task_count in zip(unit_ids, task_counts):
+            if task_count and rng.random() < args.fill:
+                rows.append((student_id, unit_id, rng.randint(0, task_count)))
+    return student_ids, unit_ids, task_counts, rows
+
+
+def loop_load(student_ids, unit_ids, task_counts, rows):
+    """原实现的装载：查询结果 -> {学生ID: {单元ID: 已完成任务数}}"""
+    student_unit_progress = {}
+    for user_id, unit_id, completed_count in rows:
+        student_unit_progress.setdefault(user_id, {})[unit_id] = completed_count
+    return student_unit_progress
+
+
+def loop_compute(student_ids, unit_ids, task_counts, student_unit_progress):
+    """原实现的计算：逐学生、逐单元循环"""
+    unit_task_map = dict(zip(unit_ids, task_counts))
+    total_units = len(unit_ids)
+    result = {}
+    for student_id in student_ids:
+        completed_units = 0
+        student_progress = student_unit_progress.get(student_id, {})
+        for unit_id, task_count in unit_task_map.items():
+            if task_count == 0:
+                continue
+            if student_progress.get(unit_id, 0) >= task_count:
+                completed_units += 1
+        completion_rate = int((completed_units / total_units) * 100) if total_units > 0 else 0
+        learning_status = 'not_started'
+        if completion_rate == 100:
+            learning_status = 'completed'
+        elif completion_rate > 0:
+            learning_status = 'in_progress'
+        result[student_id] = (completed_units, completion_rate, learning_status)
+    return result
+
+
+def matrix_load(student_ids, unit_ids, task_counts, rows):
+    """ProgressMatrix 装载：查询结果 -> 学生 × 单元 矩阵"""
+    from app.services.progress_matrix import ProgressMatrix
+
+    return ProgressMatrix(student_ids, unit_ids, task_counts).add_counts(rows)
+
+
+def matrix_compute(student_ids, unit_ids, task_counts, matrix):
+    """ProgressMatrix 向量化计算"""
+    result = matrix.student_rows()
+    matrix.summary()
+    return result
+
+
+def _measure(load, compute, repeat, student_ids, unit_ids, task_counts, rows):
+    """分别统计装载、计算和总耗时"""
+    load_durations, compute_durations, total_durations = [], [], []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        loaded = load(student_ids, unit_ids, task_counts, rows)
+        loaded_at = time.perf_counter()
+        result = compute(student_ids, unit_ids, task_counts, loaded)
+        finished = time.perf_counter()
+        load_durations.append((loaded_at - started) * 1000)
+        compute_durations.append((finished - loaded_at) * 1000)
+        total_durations.append((finished - started) * 1000)
+    return result, load_durations, compute_durations, total_durations
+
+
+def run(args):
+    """执行基准测试"""
+    data = build_data(args)
+    print(f"学生数: {args.students}, 单元数: {args.units}, 进度记录: {len(data[3])}")
+    print("=" * 64)
+    print(f"{'方式':<20}{'装载(ms)':>12}{'计算(ms)':>12}{'合计(ms)':>12}")
+    print("-" * 64)
+
+    expected, *loop_durations = _measure(loop_load, loop_compute, args.repeat, *data)
+    actual, *matrix_durations = _measure(matrix_load, matrix_compute, args.repeat, *data)
+
+    for name, durations in (('Python 循环', loop_durations), ('ProgressMatrix', matrix_durations)):
+        load, compute, total = (statistics.median(d) for d in durations)
+        print(f"{name:<20}{load:>12.1f}{compute:>12.1f}{total:>12.1f}")
+    print("=" * 64)
+
+    compute_speedup = statistics.median(loop_durations[1]) / max(statistics.median(matrix_durations[1]), 1e-9)
+    total_speedup = statistics.median(loop_durations[2]) / max(statistics.median(matrix_durations[2]), 1e-9)
+    print(f"计算加速比: {compute_speedup:.1f}x，总加速比: {total_speedup:.1f}x（各取 {args.repeat} 次中位数）")
+
+    ok = actual == expected
+    print("✓ 两种方式结果一致" if ok else "✗ 结果不一致")
+    return ok
+
+
+def main():
+    """主函数"""
+    args = parse_args()
+    try:
+        sys.exit(0 if run(args) else 1)
+    except ImportError as e:
+        print(f"❌ 导入错误: {str(e)}")
+        print()
+        print("请确保已安装所有依赖:")
+        print("  pip install -r requirements.txt")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
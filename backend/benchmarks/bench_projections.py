@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+列表查询列投影基准测试
+
+对 app.models.projections.HEAVY_COLUMNS 中登记的每个模型，取同一批记录分别执行：
+  - 完整加载：db.query(Model)
+  - 列表投影：db.query(Model).options(*summary_options(Model))
+输出两种方式的查询 + ORM 实例化耗时，以及列表投影少传输的重字段字节数。
+
+使用 .env 中配置的数据库（建议先用 generate_data.py 生成压测数据），只读，不修改数据。
+
+示例：
+  python benchmarks/bench_projections.py --rows 500 --repeat 5
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# 添加项目路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description='列表查询列投影基准测试')
+    parser.add_argument('--rows', type=int, default=500, help='每个模型取的记录数')
+    parser.add_argument('--repeat', type=int, default=5, help='重复次数')
+    return parser.parse_args()
+
+
+def _time_query(db, build, repeat):
+    """执行查询并实例化，每次执行前清空会话，避免命中 identity map"""
+    durations = []
+    for _ in range(repeat):
+        db.expunge_all()
+        started = time.perf_counter()
+        build().all()
+        durations.append((time.perf_counter() - started) * 1000)
+    return statistics.median(durations)
+
+
+def _format_bytes(size):
+    if size >= 1024 * 1024:
+        return f"{size / 1024 / 1024:.1f}MB"
+    if size >= 1024:
+        return f"{size / 1024:.1f}KB"
+    return f"{size}B"
+
+
+def run(args):
+    """执行基准测试"""
+    from sqlalchemy import func
+    from app.db.session import SessionLocal
+    from app.models.projections import HEAVY_COLUMNS, summary_options
+
+    db = SessionLocal()
+    try:
+        print("=" * 88)
+        print(f"{'模型':<24}{'记录数':>8}{'重字段':>12}{'完整(ms)':>12}{'投影(ms)':>12}{'节省':>10}")
+        print("-" * 88)
+
+        total_full = total_summary = 0.0
+        for model, columns in HEAVY_COLUMNS.items():
+            ids = [row[0] for row in db.query(model.id).order_by(model.id).limit(args.rows)]
+            if not ids:
+                print(f"{model.__name__:<24}{'0':>8}  （无数据，跳过）")
+                continue
+
+            heavy_bytes = db.query(
+                func.sum(sum(func.coalesce(func.length(getattr(model, name)), 0) for name in columns))
+            ).filter(model.id.in_(ids)).scalar() or 0
+
+            full_ms = _time_query(db, lambda: db.query(model).filter(model.id.in_(ids)), args.repeat)
+            summary_ms = _time_query(
+                db,
+                lambda: db.query(model).options(*summary_options(model)).filter(model.id.in_(ids)),
+                args.repeat
+            )
+            total_full += full_ms
+            total_summary += summary_ms
+
+            saved = (1 - summary_ms / full_ms) * 100 if full_ms else 0
+            print(f"{model.__name__:<24}{len(ids):>8}{_format_bytes(int(heavy_bytes)):>12}"
+                  f"{full_ms:>12.1f}{summary_ms:>12.1f}{saved:>9.0f}%")
+
+        print("=" * 88)
+        print(f"合计：完整加载 {total_full:.1f}ms，列表投影 {total_summary:.1f}ms（各取 {args.repeat} 次中位数）")
+        print("✓ 完成")
+        return True
+    finally:
+        db.close()
+
+
+def main():
+    """主函数"""
+    args = parse_args()
+    try:
+        sys.exit(0 if run(args) else 1)
+    except ImportError as e:
+        print(f"❌ 导入错误: {str(e)}")
+        print()
+        print("请确保已安装所有依赖:")
+        print("  pip install -r requirements.txt")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+响应序列化基准测试
+
+用与大响应接口同形状的数据对比：
+  - 标准库 json（Starlette JSONResponse 的实现，datetime 需先手动 isoformat()）
+  - orjson（app.core.response.render_json，datetime/Decimal 原生支持）
+以及 gzip / br 压缩后的大小和耗时。
+
+数据形状：
+  class_progress     班级学习进度列表（get_class_progress）
+  course_detail      课程完整详情树（单元 -> 资源 / 任务）
+  submissions        作业提交列表（含 JSON submission 字段）
+
+示例：
+  python benchmarks/bench_response.py --students 200 --units 12 --repeat 20
+
+接口级别的对比（含数据库查询）请使用 load_test.py 的 dashboard / export 场景。
+"""
+
+import argparse
+import gzip
+import json
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+
+# 添加项目路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description='响应序列化基准测试')
+    parser.add_argument('--students', type=int, default=200, help='班级学生数')
+    parser.add_argument('--units', type=int, default=12, help='课程单元数')
+    parser.add_argument('--tasks-per-unit', type=int, default=4, help='每个单元的任务数')
+    parser.add_argument('--resources-per-unit', type=int, default=6, help='每个单元的资源数')
+    parser.add_argument('--repeat', type=int, default=20, help='每项测试重复次数')
+    return parser.parse_args()
+
+
+def _now():
+    return datetime(2025, 10, 19, 8, 0, 0) + timedelta(seconds=random.randint(0, 86400 * 30))
+
+
+def build_class_progress(args):
+    """班级学习进度列表"""
+    students = []
+    for index in range(args.students):
+        units = []
+        for unit_index in range(args.units):
+            units.append({
+                'unit_id': unit_index + 1,
+                'unit_title': f'第{unit_index + 1}单元',
+                'completed_tasks': random.randint(0, args.tasks_per_unit),
+                'total_tasks': args.tasks_per_unit,
+                'progress': Decimal(random.randint(0, 10000)) / 100,
+                'last_activity': _now(),
+            })
+        students.append({
+            'student_id': 10000 + index,
+            'student_name': f'学生{index + 1}',
+            'student_number': f'S{index + 1:06d}',
+            'overall_progress': Decimal(random.randint(0, 10000)) / 100,
+            'completed_tasks': random.randint(0, args.units * args.tasks_per_unit),
+            'joined_at': _now(),
+            'units': units,
+        })
+    return {'class_name': '压测班级', 'total_students': args.students, 'students': students}
+
+
+def build_course_detail(args):
+    """课程完整详情树"""
+    units = []
+    for unit_index in range(args.units):
+        units.append({
+            'id': unit_index + 1,
+            'uuid': f'unit-{unit_index + 1:08d}',
+            'title': f'第{unit_index + 1}单元',
+            'description': '单元描述' * 20,
+            'learning_guide': {'objectives': ['目标一', '目标二', '目标三'], 'key_points': ['要点'] * 5},
+            'open_from': _now(),
+            'resources': [{
+                'id': unit_index * 100 + r,
+                'uuid': f'res-{unit_index}-{r}',
+                'type': 'video' if r % 2 == 0 else 'document',
+                'title': f'资源 {unit_index + 1}-{r + 1}',
+                'content': '文档内容' * 50,
+                'duration': 600,
+                'created_at': _now(),
+            } for r in range(args.resources_per_unit)],
+            'tasks': [{
+                'id': unit_index * 100 + t,
+                'uuid': f'task-{unit_index}-{t}',
+                'title': f'任务 {unit_index + 1}-{t + 1}',
+                'requirements': {'items': ['要求'] * 5},
+                'deadline': _now(),
+            } for t in range(args.tasks_per_unit)],
+        })
+    return {'id': 1, 'title': '压测课程', 'units': units}
+
+
+def build_submissions(args):
+    """作业提交列表"""
+    submissions = []
+    for index in range(args.students):
+        submissions.append({
+            'progress_id': index + 1,
+            'student_id': 10000 + index,
+            'student_name': f'学生{index + 1}',
+            'status': 'review',
+            'score': random.randint(60, 100),
+            'submission': {
+                'content': '这是学生提交的作业内容。' * 40,
+                'files': [{'name': f'附件{i}.pdf', 'url': f'https://example.com/{index}/{i}.pdf'} for i in range(3)],
+                'links': ['https://example.com/project'],
+            },
+            'submitted_at': _now(),
+            'graded_at': _now(),
+        })
+    return {'task_title': '压测作业', 'submissions': submissions}
+
+
+def _to_stdlib_compatible(value):
+    """模拟各接口中手动调用 isoformat() / float() 的转换"""
+    if isinstance(value, dict):
+        return {k: _to_stdlib_compatible(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_to_stdlib_compatible(v) for v in value]
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+def _stdlib_render(content):
+    """与 Starlette JSONResponse.render 一致"""
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None,
+                      separators=(",", ":")).encode("utf-8")
+
+
+def _timeit(func, repeat):
+    samples = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples), result
+
+
+def run(args):
+    """执行基准测试"""
+    from app.core.response import render_json
+
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+
+    random.seed(20251019)
+    payloads = {
+        'class_progress': build_class_progress(args),
+        'course_detail': build_course_detail(args),
+        'submissions': build_submissions(args),
+    }
+
+    print("=" * 100)
+    print(f"{'数据':<16}{'大小(KB)':>10}{'stdlib(ms)':>12}{'orjson(ms)':>12}{'加速':>8}"
+          f"{'gzip(KB)':>10}{'gzip(ms)':>10}{'br(KB)':>9}{'br(ms)':>9}")
+    print("-" * 100)
+    for name, payload in payloads.items():
+        content = {'success': True, 'code': 0, 'message': 'success', 'data': payload}
+
+        # stdlib 需要先把 datetime/Decimal 转换掉（对应接口里的手动 isoformat），转换耗时计入
+        stdlib_ms, stdlib_body = _timeit(lambda: _stdlib_render(_to_stdlib_compatible(content)), args.repeat)
+        orjson_ms, body = _timeit(lambda: render_json(content), args.repeat)
+
+        gzip_ms, gzipped = _timeit(lambda: gzip.compress(body, compresslevel=6), args.repeat)
+        if brotli is not None:
+            br_ms, br_body = _timeit(lambda: brotli.compress(body, quality=4), args.repeat)
+            br_size, br_time = f"{len(br_body) / 1024:.1f}", f"{br_ms:.2f}"
+        else:
+            br_size, br_time = '-', '-'
+
+        assert json.loads(body) == json.loads(stdlib_body), f"{name}: 序列化结果不一致"
+
+        print(f"{name:<16}{len(body) / 1024:>10.1f}{stdlib_ms:>12.2f}{orjson_ms:>12.2f}"
+              f"{stdlib_ms / orjson_ms if orjson_ms else 0:>7.1f}x"
+              f"{len(gzipped) / 1024:>10.1f}{gzip_ms:>10.2f}{br_size:>9}{br_time:>9}")
+    print("=" * 100)
+    if brotli is None:
+        print("提示: 未安装 brotli，跳过 br 压缩测试（pip install brotli）")
+    return True
+
+
+def main():
+    """主函数"""
+    args = parse_args()
+    try:
+        sys.exit(0 if run(args) else 1)
+    except ImportError as e:
+        print(f"❌ 导入错误: {str(e)}")
+        print()
+        print("请确保已安装所有依赖:")
+        print("  pip install -r requirements.txt")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
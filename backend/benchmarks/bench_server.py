@@ -0,0 +1,408 @@
+#!/usr/bin/env python3
+"""
+生产服务吞吐量基准
+
+不需要数据库。用 app.core.server（python -m app.core.server）启动一个模拟应用：
+同步接口先从连接池（SQLAlchemy QueuePool，大小取 DB_POOL_SIZE / DB_MAX_OVERFLOW）取连接并等待
+--db-ms 毫秒（模拟 MySQL 查询），再执行 --cpu-ms 毫秒的 Python 计算（模拟组装和序列化响应）。
+  1. 吞吐量：对比原来的单进程（anyio 默认 40 个线程）、单 worker（线程池与连接池一致）、
+     多 worker 的每秒请求数和延迟
+  2. worker 重启：设置 SERVER_MAX_REQUESTS / SERVER_MAX_REQUESTS_JITTER 持续压测，
+     worker 按请求数退出并被补起，请求不失败
+  3. 平滑退出：视频进度上报进行中、看板 SSE 连接打开时向主进程发送 SIGTERM，
+     进行中的写入完成，SSE 连接立即结束，进程在 graceful timeout 之前退出
+
+压测客户端与服务运行在同一台机器上，多 worker 的收益受 CPU 核数限制。
+
+示例：
+  python benchmarks/bench_server.py --duration 10 --concurrency 32 --workers 4
+"""
+
+import argparse
+import multiprocessing
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# 添加项目路径
+BACKEND_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+# 服务进程通过该环境变量导入 bench_server:app
+ROLE_ENV = 'BENCH_SERVER_ROLE'
+
+
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description='生产服务吞吐量基准')
+    parser.add_argument('--duration', type=float, default=10, help='每种配置的压测时间（秒）')
+    parser.add_argument('--warmup', type=float, default=2, help='每种配置压测前的预热时间（秒）')
+    parser.add_argument('--concurrency', type=int, default=32, help='并发连接数')
+    parser.add_argument('--client-processes', type=int, default=2, help='压测客户端进程数')
+    parser.add_argument('--workers', type=int, default=max(2, min(os.cpu_count() or 1, 4)), help='多 worker 配置的进程数')
+    parser.add_argument('--db-ms', type=float, default=20, help='每个请求占用数据库连接的时间（毫秒）')
+    parser.add_argument('--cpu-ms', type=float, default=3, help='每个请求的 Python 计算时间（毫秒）')
+    parser.add_argument('--port', type=int, default=18100, help='监听端口')
+    return parser.parse_args()
+
+
+def _check(ok, message):
+    print(f"  {'✓' if ok else '✗'} {message}")
+    return ok
+
+
+# ========== 模拟应用（服务进程中导入） ==========
+
+class _FakeConnection:
+    """连接池中的模拟连接"""
+
+    def rollback(self):
+        pass
+
+    def commit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def create_app():
+    """模拟应用：同步接口占用连接池连接，SSE 接口使用班级事件分发"""
+    from fastapi import FastAPI, Request
+    from fastapi.responses import StreamingResponse
+    from sqlalchemy.pool import QueuePool
+    from app.core.config import settings
+    from app.core.server import configure_threadpool
+    from app.services.class_event_service import get_broker, sse_stream
+
+    db_seconds = float(os.environ.get('BENCH_DB_MS', '20')) / 1000
+    cpu_seconds = float(os.environ.get('BENCH_CPU_MS', '3')) / 1000
+    write_log = os.environ.get('BENCH_WRITE_LOG')
+    pool = QueuePool(
+        _FakeConnection,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        timeout=settings.db_pool_timeout
+    )
+    bench_app = FastAPI()
+
+    @bench_app.on_event("startup")
+    async def startup():
+        configure_threadpool()
+
+    @bench_app.get("/work")
+    def work():
+        connection = pool.connect()
+        try:
+            time.sleep(db_seconds)
+        finally:
+            connection.close()
+        deadline = time.perf_counter() + cpu_seconds
+        rows = 0
+        while time.perf_counter() < deadline:
+            rows += len(str(rows))
+        return {'pid': os.getpid(), 'rows': rows}
+
+    @bench_app.post("/video-progress")
+    def video_progress(seconds: float = 0, marker: str = ''):
+        # 模拟进行中的视频进度写入：持有连接 seconds 秒后提交
+        connection = pool.connect()
+        try:
+            time.sleep(seconds)
+            if write_log:
+                with open(write_log, 'a') as f:
+                    f.write(marker + '\n')
+        finally:
+            connection.close()
+        return {'pid': os.getpid(), 'marker': marker}
+
+    @bench_app.get("/live")
+    async def live(request: Request):
+        subscription = get_broker().subscribe(1)
+        return StreamingResponse(
+            sse_stream(subscription, request.is_disconnected, heartbeat=settings.class_events_heartbeat),
+            media_type='text/event-stream'
+        )
+
+    return bench_app
+
+
+if os.environ.get(ROLE_ENV) == 'server':
+    app = create_app()
+
+
+# ========== 服务进程 ==========
+
+def start_server(args, workers, extra_env=None):
+    """用 app.core.server 启动模拟应用，等待可以响应请求"""
+    import requests
+
+    env = dict(os.environ)
+    env.update({
+        ROLE_ENV: 'server',
+        'PYTHONPATH': os.pathsep.join([str(Path(__file__).parent), str(BACKEND_DIR)]),
+        'BENCH_DB_MS': str(args.db_ms),
+        'BENCH_CPU_MS': str(args.cpu_ms),
+        'LOG_LEVEL': 'WARNING',
+        'JOB_WORKER_PROCESSES': '0',
+        'METRICS_ENABLED': 'false',
+    })
+    env.update(extra_env or {})
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'app.core.server', '--app', 'bench_server:app',
+         '--host', '127.0.0.1', '--port', str(args.port), '--workers', str(workers)],
+        cwd=str(BACKEND_DIR), env=env
+    )
+    base_url = f'http://127.0.0.1:{args.port}'
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'服务启动失败，退出码: {process.returncode}')
+        try:
+            if requests.get(base_url + '/work', timeout=2).status_code == 200:
+                return process, base_url
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    process.kill()
+    raise RuntimeError('服务启动超时')
+
+
+def stop_server(process, timeout=60):
+    """发送 SIGTERM 并等待退出，返回耗时（秒）"""
+    started = time.monotonic()
+    process.send_signal(signal.SIGTERM)
+    try:
+        process.wait(timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+    return time.monotonic() - started
+
+
+# ========== 压测客户端 ==========
+
+def _client_process(base_url, threads, warmup_until, stop_at, result_queue):
+    """一个客户端进程：threads 个线程各自保持一个 keep-alive 连接循环请求"""
+    import requests
+
+    latencies, pids = [], set()
+    counters = {'errors': 0, 'retries': 0}
+    lock = threading.Lock()
+
+    def loop():
+        session = requests.Session()
+        local_latencies, local_pids, errors, retries = [], set(), 0, 0
+        while True:
+            now = time.time()
+            if now >= stop_at:
+                break
+            started = time.perf_counter()
+            response = None
+            # 与 Nginx 的 proxy_next_upstream 一样，连接被关闭（worker 重启）时 GET 请求重试一次
+            for attempt in range(2):
+                try:
+                    response = session.get(base_url + '/work', timeout=30)
+                    break
+                except requests.ConnectionError:
+                    if attempt == 0:
+                        retries += 1
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            if now < warmup_until:
+                continue
+            if response is None or response.status_code != 200:
+                errors += 1
+                continue
+            local_latencies.append(elapsed_ms)
+            local_pids.add(response.json()['pid'])
+        with lock:
+            latencies.extend(local_latencies)
+            pids.update(local_pids)
+            counters['errors'] += errors
+            counters['retries'] += retries
+
+    workers = [threading.Thread(target=loop) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    result_queue.put((latencies, sorted(pids), counters['errors'], counters['retries']))
+
+
+def run_load(base_url, args):
+    """并发压测，返回 {rps, p50, p99, errors, retries, pids}"""
+    context = multiprocessing.get_context('spawn')
+    result_queue = context.Queue()
+    warmup_until = time.time() + 1 + args.warmup
+    stop_at = warmup_until + args.duration
+    processes = max(1, args.client_processes)
+    per_process = [args.concurrency // processes + (1 if i < args.concurrency % processes else 0)
+                   for i in range(processes)]
+    clients = [
+        context.Process(target=_client_process, args=(base_url, threads, warmup_until, stop_at, result_queue))
+        for threads in per_process if threads > 0
+    ]
+    for client in clients:
+        client.start()
+    latencies, pids, errors, retries = [], set(), 0, 0
+    for _ in clients:
+        part_latencies, part_pids, part_errors, part_retries = result_queue.get()
+        latencies.extend(part_latencies)
+        pids.update(part_pids)
+        errors += part_errors
+        retries += part_retries
+    for client in clients:
+        client.join()
+
+    latencies.sort()
+    return {
+        'rps': len(latencies) / args.duration,
+        'p50': statistics.median(latencies) if latencies else 0,
+        'p99': latencies[max(0, int(len(latencies) * 0.99) - 1)] if latencies else 0,
+        'errors': errors,
+        'retries': retries,
+        'pids': pids
+    }
+
+
+# ========== 校验 ==========
+
+def check_throughput(args):
+    """不同配置的吞吐量对比"""
+    from app.core.config import settings
+
+    pool_limit = settings.db_pool_size + settings.db_max_overflow
+    configs = [
+        ('原单进程（线程池 40）', 1, {'SERVER_THREADPOOL_SIZE': '40'}),
+        (f'单 worker（线程池 {pool_limit}）', 1, {}),
+        (f'{args.workers} worker（线程池 {pool_limit}）', args.workers, {}),
+    ]
+    print(f"{'配置':<24}{'请求/秒':>10}{'p50(ms)':>10}{'p99(ms)':>10}{'错误':>6}{'进程':>6}")
+    ok = True
+    for label, workers, extra_env in configs:
+        process, base_url = start_server(args, workers, extra_env)
+        try:
+            result = run_load(base_url, args)
+        finally:
+            stop_server(process)
+        print(f"{label:<24}{result['rps']:>10.1f}{result['p50']:>10.1f}{result['p99']:>10.1f}"
+              f"{result['errors']:>6}{len(result['pids']):>6}")
+        ok &= result['errors'] == 0
+    return _check(ok, "各配置压测期间没有失败的请求")
+
+
+def check_recycle(args):
+    """worker 按请求数退出并被补起，请求不失败"""
+    max_requests = 300
+    process, base_url = start_server(args, 2, {
+        'SERVER_MAX_REQUESTS': str(max_requests),
+        'SERVER_MAX_REQUESTS_JITTER': str(max_requests // 2)
+    })
+    try:
+        result = run_load(base_url, args)
+    finally:
+        stop_server(process)
+    ok = _check(len(result['pids']) > 2,
+                f"压测期间共 {len(result['pids'])} 个 worker 处理过请求（2 个 worker，每个处理 "
+                f"{max_requests}~{max_requests + max_requests // 2} 个请求后重启）")
+    ok &= _check(result['errors'] == 0,
+                 f"没有失败的请求（{result['rps']:.1f} 请求/秒，连接被关闭后重试 {result['retries']} 次）")
+    return ok
+
+
+def check_graceful_shutdown(args, workers):
+    """SIGTERM 时进行中的写入完成、SSE 连接结束、在 graceful timeout 之前退出"""
+    import requests
+
+    graceful_timeout = 30
+    write_seconds = 2.0
+    with tempfile.TemporaryDirectory(prefix='bench_server_') as temp_dir:
+        write_log = os.path.join(temp_dir, 'writes.log')
+        process, base_url = start_server(args, workers, {
+            'SERVER_GRACEFUL_TIMEOUT': str(graceful_timeout),
+            'BENCH_WRITE_LOG': write_log
+        })
+        results = {}
+
+        def write():
+            try:
+                response = requests.post(base_url + '/video-progress',
+                                         params={'seconds': write_seconds, 'marker': 'in-flight'}, timeout=60)
+                results['write'] = response.status_code
+            except requests.RequestException as e:
+                results['write'] = str(e)
+
+        def stream():
+            started = time.monotonic()
+            try:
+                with requests.get(base_url + '/live', stream=True, timeout=60) as response:
+                    for _ in response.iter_lines():
+                        pass
+                results['stream'] = 'closed'
+            except requests.RequestException as e:
+                results['stream'] = str(e)
+            results['stream_seconds'] = time.monotonic() - started
+
+        threads = [threading.Thread(target=write), threading.Thread(target=stream)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.5)
+        elapsed = stop_server(process, timeout=graceful_timeout + 30)
+        for thread in threads:
+            thread.join(10)
+        with open(write_log) as f:
+            written = f.read().split()
+
+    mode = '单进程' if workers == 1 else f'{workers} worker'
+    ok = _check(results.get('write') == 200 and written == ['in-flight'],
+                f"{mode}：SIGTERM 时进行中的视频进度写入完成（状态: {results.get('write')}）")
+    ok &= _check(results.get('stream') == 'closed',
+                 f"{mode}：看板 SSE 连接随退出结束（{results.get('stream')}）")
+    ok &= _check(process.returncode is not None and elapsed < graceful_timeout,
+                 f"{mode}：{elapsed:.1f} 秒退出（graceful timeout {graceful_timeout} 秒）")
+    return ok
+
+
+def run(args):
+    """执行基准"""
+    from app.core.config import settings
+    from app.core.server import resolve_http, resolve_loop
+
+    print(f"事件循环: {resolve_loop(settings.server_loop)}, HTTP: {resolve_http(settings.server_http)}, "
+          f"连接池: {settings.db_pool_size} + {settings.db_max_overflow}, CPU 核数: {os.cpu_count()}")
+    print(f"每个请求占用连接 {args.db_ms}ms + 计算 {args.cpu_ms}ms，{args.concurrency} 并发，每种配置 {args.duration} 秒")
+    print()
+    print("1. 吞吐量")
+    ok = check_throughput(args)
+    print("2. worker 重启")
+    ok &= check_recycle(args)
+    print("3. 平滑退出")
+    ok &= check_graceful_shutdown(args, 1)
+    ok &= check_graceful_shutdown(args, 2)
+
+    print()
+    print("✓ 全部校验通过" if ok else "❌ 存在校验失败")
+    return ok
+
+
+def main():
+    """主函数"""
+    args = parse_args()
+    try:
+        sys.exit(0 if run(args) else 1)
+    except ImportError as e:
+        print(f"❌ 导入错误: {str(e)}")
+        print()
+        print("请确保已安装所有依赖:")
+        print("  pip install -r requirements.txt")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+学生进度详情基准
+
+对比教师端「学生进度详情」原来的实现（每个单元一条任务查询 + 一条进度查询）与
+club_classes.get_student_progress / get_students_progress_batch 的新实现：
+  1. 结果一致：逐个学生比较两种实现返回的数据
+  2. SQL 条数与耗时：单个学生、以及一次预取前后学生的批量接口
+
+默认使用临时 SQLite 数据库（只创建相关表），也可以用 --database-url 指定本地 MySQL 的空库
+（脚本会重建相关表）。
+
+示例：
+  python benchmarks/bench_student_progress.py --units 30 --tasks-per-unit 5 --students 40
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# 添加项目路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+CLASS_ID = 1
+COURSE_ID = 1
+
+
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description='学生进度详情基准')
+    parser.add_argument('--units', type=int, default=30, help='单元数')
+    parser.add_argument('--tasks-per-unit', type=int, default=5, help='每个单元的任务数')
+    parser.add_argument('--students', type=int, default=40, help='班级学生数')
+    parser.add_argument('--prefetch', type=int, default=5, help='批量接口一次查询的学生数（当前 + 前后）')
+    parser.add_argument('--database-url', default=None, help='数据库地址（默认使用临时 SQLite 文件）')
+    parser.add_argument('--seed', type=int, default=7, help='随机种子')
+    return parser.parse_args()
+
+
+def _check(ok, message):
+    print(f"  {'✓' if ok else '✗'} {message}")
+    return ok
+
+
+def setup(engine, args, rng):
+    """建表并生成一个班级、一门课程及学生进度"""
+    from app.models.admin import User
+    from app.models.pbl import PBLClass, PBLClassMember, PBLCourse, PBLUnit, PBLTask, PBLTaskProgress
+
+    tables = [User, PBLClass, PBLClassMember, PBLCourse, PBLUnit, PBLTask, PBLTaskProgress]
+    with engine.begin() as conn:
+        for model in reversed(tables):
+            model.__table__.drop(conn, checkfirst=True)
+        for model in tables:
+            model.__table__.create(conn)
+
+        conn.execute(PBLClass.__table__.insert(), [{'id': CLASS_ID, 'uuid': 'class-1', 'school_id': 1, 'name': '一班'}])
+        conn.execute(PBLCourse.__table__.insert(), [{
+            'id': COURSE_ID, 'uuid': 'course-1', 'class_id': CLASS_ID, 'title': '课程', 'status': 'published'
+        }])
+        student_ids = list(range(1, args.students + 1))
+        conn.execute(User.__table__.insert(), [{
+            'id': i, 'username': f'student_{i}', 'password_hash': 'x', 'role': 'student',
+            'name': f'学生{i}' if i % 3 else None, 'real_name': f'真实姓名{i}', 'student_number': f'S{i:04d}'
+        } for i in student_ids])
+        conn.execute(PBLClassMember.__table__.insert(), [
+            {'class_id': CLASS_ID, 'student_id': i, 'is_active': 1} for i in student_ids
+        ])
+
+        units, tasks = [], []
+        for u in range(1, args.units + 1):
+            units.append({
+                'id': u, 'uuid': f'unit-{u}', 'course_id': COURSE_ID, 'title': f'单元{u}',
+                'description': f'第{u}单元', 'order': u
+            })
+            for t in range(args.tasks_per_unit):
+                task_id = len(tasks) + 1
+                tasks.append({
+                    'id': task_id, 'uuid': f'task-{task_id}', 'unit_id': u, 'title': f'任务{task_id}',
+                    'type': rng.choice(['analysis', 'coding', 'design', 'deployment']),
+                    'is_required': rng.choice([0, 1]), 'order': t
+                })
+        # 最后一个单元没有任务
+        units.append({
+            'id': args.units + 1, 'uuid': 'unit-empty', 'course_id': COURSE_ID, 'title': '空单元',
+            'description': None, 'order': args.units + 1
+        })
+        conn.execute(PBLUnit.__table__.insert(), units)
+        conn.execute(PBLTask.__table__.insert(), tasks)
+
+        started = datetime(2025, 9, 1)
+        progress = []
+        for student_id in student_ids:
+            done = rng.random()
+            for task in tasks:
+                if rng.random() > done + 0.1:
+                    continue
+                status = rng.choice(['completed', 'completed', 'review', 'in-progress'])
+                progress.append({
+                    'task_id': task['id'], 'user_id': student_id, 'status': status,
+                    'submission': {'content': 'x' * 200} if status != 'in-progress' else None,
+                    'score': rng.randint(60, 100) if status == 'completed' else None,
+                    'updated_at': started + timedelta(minutes=len(progress))
+                })
+        conn.execute(PBLTaskProgress.__table__.insert(), progress)
+    return student_ids
+
+
+def legacy_student_progress(db, class_id, student_id):
+    """原实现：每个单元一条任务查询 + 一条进度查询"""
+    from sqlalchemy import func
+    from app.models.admin import User
+    from app.models.pbl import PBLClassMember, PBLCourse, PBLUnit, PBLTask, PBLTaskProgress
+
+    member = db.query(PBLClassMember).filter(
+        PBLClassMember.class_id == class_id,
+        PBLClassMember.student_id == student_id,
+        PBLClassMember.is_active == 1
+    ).first()
+    if not member:
+        return None
+    user = db.query(User).filter(User.id == student_id).first()
+    course = db.query(PBLCourse).filter(
+        PBLCourse.class_id == class_id, PBLCourse.status == 'published'
+    ).all()[0]
+    units_with_tasks = db.query(PBLUnit).filter(PBLUnit.course_id == course.id).order_by(PBLUnit.order).all()
+
+    total_units = len(units_with_tasks)
+    completed_units = 0
+    units_detail = []
+    for unit in units_with_tasks:
+        tasks = db.query(PBLTask).filter(PBLTask.unit_id == unit.id).order_by(PBLTask.order).all()
+        task_ids = [t.id for t in tasks]
+        task_progress_list = []
+        if task_ids:
+            progress_records = db.query(PBLTaskProgress).filter(
+                PBLTaskProgress.task_id.in_(task_ids),
+                PBLTaskProgress.user_id == student_id
+            ).all()
+            progress_dict = {p.task_id: p for p in progress_records}
+            for task in tasks:
+                progress = progress_dict.get(task.id)
+                task_progress_list.append({
+                    'task_id': task.id,
+                    'task_title': task.title,
+                    'task_type': task.type,
+                    'is_required': task.is_required == 1,
+                    'status': progress.status if progress else 'not_started',
+                    'score': progress.score if progress else None,
+                    'submission_time': progress.updated_at.isoformat() if progress and progress.updated_at else None
+                })
+        completed_tasks = len([tp for tp in task_progress_list if tp['status'] == 'completed'])
+        total_tasks = len(tasks)
+        unit_completed = completed_tasks == total_tasks and total_tasks > 0
+        if unit_completed:
+            completed_units += 1
+        units_detail.append({
+            'unit_id': unit.id,
+            'unit_title': unit.title,
+            'unit_description': unit.description,
+            'completed_tasks': completed_tasks,
+            'total_tasks': total_tasks,
+            'completion_rate': int(completed_tasks / total_tasks * 100) if total_tasks > 0 else 0,
+            'is_completed': unit_completed,
+            'tasks': task_progress_list
+        })
+
+    total_submissions = db.query(func.count(PBLTaskProgress.id)).join(
+        PBLTask, PBLTaskProgress.task_id == PBLTask.id
+    ).join(
+        PBLUnit, PBLTask.unit_id == PBLUnit.id
+    ).filter(
+        PBLUnit.course_id == course.id,
+        PBLTaskProgress.user_id == student_id,
+        PBLTaskProgress.submission.isnot(None)
+    ).scalar() or 0
+
+    return {
+        'student': {'id': user.id, 'name': user.name or user.real_name, 'student_number': user.student_number},
+        'overall': {
+            'completion_rate': int(completed_units / total_units * 100) if total_units > 0 else 0,
+            'completed_units': completed_units,
+            'total_units': total_units,
+            'learning_hours': total_submissions * 2,
+            'submissions_count': total_submissions
+        },
+        'units': units_detail
+    }
+
+
+def _data(response):
+    return json.loads(response.body)['data']
+
+
+def run(args):
+    """执行基准"""
+    from sqlalchemy import create_engine, event
+    from sqlalchemy.orm import sessionmaker
+    from app.api.endpoints.club_classes import get_student_progress, get_students_progress_batch
+    from app.services.class_access_service import ClassContext, ClassSnapshot
+
+    temp_dir = tempfile.mkdtemp(prefix='bench_student_progress_')
+    database_url = args.database_url or f"sqlite:///{os.path.join(temp_dir, 'progress.db')}"
+    engine = create_engine(database_url)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    rng = random.Random(args.seed)
+
+    statements = []
+
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    ok = True
+    db = None
+    try:
+        student_ids = setup(engine, args, rng)
+        # 权限依赖中缓存的班级快照（已发布课程ID）
+        snapshot = ClassSnapshot(CLASS_ID, 'class-1', 1, '一班', frozenset(), (COURSE_ID,))
+        context = ClassContext(snapshot, 'teacher', None)
+        db = session_factory()
+        event.listen(engine, 'before_cursor_execute', count_statement)
+
+        def measure(func):
+            statements.clear()
+            started = time.perf_counter()
+            result = func()
+            elapsed = time.perf_counter() - started
+            db.expunge_all()
+            return result, elapsed, len(statements)
+
+        print(f"课程 {args.units} 个单元 × {args.tasks_per_unit} 个任务，班级 {len(student_ids)} 名学生")
+
+        print("1. 结果一致")
+        legacy_stats, new_stats = [], []
+        mismatched = []
+        for student_id in student_ids:
+            expected, elapsed, count = measure(lambda: legacy_student_progress(db, CLASS_ID, student_id))
+            legacy_stats.append((elapsed, count))
+            response, elapsed, count = measure(lambda: get_student_progress('class-1', student_id, db, context))
+            new_stats.append((elapsed, count))
+            if _data(response) != json.loads(json.dumps(expected)):
+                mismatched.append(student_id)
+        ok &= _check(not mismatched, f"{len(student_ids)} 名学生的进度详情与原实现一致"
+                     + (f"（不一致: {mismatched[:5]}）" if mismatched else ""))
+        response, _, _ = measure(lambda: get_student_progress('class-1', 10 ** 9, db, context))
+        ok &= _check(response.status_code == 404, "不在班级中的学生返回 404")
+
+        print("2. SQL 条数与耗时")
+        legacy_ms = sum(e for e, _ in legacy_stats) * 1000 / len(legacy_stats)
+        new_ms = sum(e for e, _ in new_stats) * 1000 / len(new_stats)
+        print(f"    原实现：{legacy_stats[0][1]} 条 SQL，平均 {legacy_ms:.2f}ms/学生")
+        print(f"    新实现：{new_stats[0][1]} 条 SQL，平均 {new_ms:.2f}ms/学生")
+        ok &= _check(all(count == 3 for _, count in new_stats), "单个学生固定 3 条 SQL，与单元数无关")
+
+        batch_ids = student_ids[:args.prefetch]
+        response, elapsed, count = measure(
+            lambda: get_students_progress_batch('class-1', batch_ids + [10 ** 9], db, context)
+        )
+        data = _data(response)
+        expected = [json.loads(json.dumps(legacy_student_progress(db, CLASS_ID, sid))) for sid in batch_ids]
+        db.expunge_all()
+        ok &= _check(
+            data['items'] == expected and data['missing_student_ids'] == [10 ** 9] and count == 3,
+            f"批量预取 {len(batch_ids)} 名学生：{count} 条 SQL，{elapsed * 1000:.2f}ms"
+            f"（逐个请求约 {new_ms * len(batch_ids):.2f}ms）"
+        )
+    finally:
+        if event.contains(engine, 'before_cursor_execute', count_statement):
+            event.remove(engine, 'before_cursor_execute', count_statement)
+        if db is not None:
+            db.close()
+        engine.dispose()
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+    print()
+    print("✓ 全部校验通过" if ok else "❌ 存在校验失败")
+    return ok
+
+
+def main():
+    """主函数"""
+    args = parse_args()
+    try:
+        sys.exit(0 if run(args) else 1)
+    except ImportError as e:
+        print(f"❌ 导入错误: {str(e)}")
+        print()
+        print("请确保已安装所有依赖:")
+        print("  pip install -r requirements.txt")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
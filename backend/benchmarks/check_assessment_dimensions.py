@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+评价维度统计校验
+
+随机生成评价（维度名称混用 dimension / name，部分维度缺少得分或得分不是数字），
+通过 app.services.assessment_dimension_service.sync_dimension_scores 写入维度得分表，校验：
+  1. 拆分：每条评价写入的维度与 dimensions JSON 一致；修改维度后重写，不残留旧记录
+  2. 统计：学生、课程（按学生分组）的 GROUP BY 结果与逐条遍历 JSON 的参照一致，
+     并对比原来加载学生全部评价后在 Python 中遍历的耗时
+
+默认使用临时 SQLite 数据库（BIGINT 主键按 INTEGER 建表，以便自增），也可以用 --database-url
+指定本地 MySQL 的空库（脚本会重建相关表）。
+
+示例：
+  python benchmarks/check_assessment_dimensions.py --assessments 5000 --students 500
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+
+# 添加项目路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+DIMENSIONS = ['创新思维', '团队协作', '问题解决', '表达沟通', '技术实现']
+
+
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description='评价维度统计校验')
+    parser.add_argument('--assessments', type=int, default=5000, help='评价数')
+    parser.add_argument('--students', type=int, default=500, help='学生数')
+    parser.add_argument('--courses', type=int, default=5, help='课程数')
+    parser.add_argument('--database-url', default=None, help='数据库地址（默认使用临时 SQLite 文件）')
+    parser.add_argument('--seed', type=int, default=7, help='随机种子')
+    return parser.parse_args()
+
+
+def _check(ok, message):
+    print(f"  {'✓' if ok else '✗'} {message}")
+    return ok
+
+
+def _random_dimensions(rng):
+    dimensions = []
+    for name in rng.sample(DIMENSIONS, rng.randint(1, len(DIMENSIONS))):
+        dim = {rng.choice(['dimension', 'name']): name, 'weight': 0.2, 'comment': ''}
+        roll = rng.random()
+        if roll < 0.9:
+            dim['score'] = rng.randint(50, 100)
+        elif roll < 0.95:
+            dim['score'] = str(rng.randint(50, 100))
+        elif roll < 0.98:
+            dim['score'] = '未评'
+        dimensions.append(dim)
+    return dimensions
+
+
+def reference_stats(assessments, key):
+    """逐条遍历 dimensions JSON 计算 {分组: {维度: [得分合计, 次数]}}"""
+    from app.services.assessment_dimension_service import parse_dimension_scores
+
+    stats = defaultdict(lambda: defaultdict(lambda: [Decimal(0), 0]))
+    for assessment in assessments:
+        group = key(assessment)
+        if group is None:
+            continue
+        for item in parse_dimension_scores(assessment['dimensions']):
+            stats[group][item['dimension']][0] += item['score']
+            stats[group][item['dimension']][1] += 1
+    return {
+        group: {name: (round(float(total / count), 2), count) for name, (total, count) in dims.items()}
+        for group, dims in stats.items()
+    }
+
+
+def setup(engine, args, rng):
+    """建表并写入课程结构（每门课程一个单元、若干任务和项目）"""
+    from app.models.pbl import (
+        PBLAssessment, PBLAssessmentDimensionScore, PBLProject, PBLTask, PBLUnit, PBLProjectOutput
+    )
+
+    tables = [PBLUnit, PBLTask, PBLProject, PBLProjectOutput, PBLAssessment, PBLAssessmentDimensionScore]
+    with engine.begin() as conn:
+        for model in reversed(tables):
+            model.__table__.drop(conn, checkfirst=True)
+        for model in tables:
+            model.__table__.create(conn)
+        conn.execute(PBLUnit.__table__.insert(), [
+            {'id': c, 'uuid': f'unit-{c}', 'course_id': c, 'title': f'单元{c}', 'order': 1}
+            for c in range(1, args.courses + 1)
+        ])
+        conn.execute(PBLTask.__table__.insert(), [
+            {'id': t, 'uuid': f'task-{t}', 'unit_id': 1 + t % args.courses, 'title': f'任务{t}'}
+            for t in range(1, args.courses * 10 + 1)
+        ])
+        conn.execute(PBLProject.__table__.insert(), [
+            {'id': p, 'uuid': f'project-{p}', 'course_id': 1 + p % args.courses, 'title': f'项目{p}'}
+            for p in range(1, args.courses * 5 + 1)
+        ])
+
+    # 评价对象：任务（课程 = 任务所在单元的课程）、项目、学生（没有课程）
+    assessments = []
+    started = datetime(2025, 9, 1)
+    for i in range(args.assessments):
+        target_type = rng.choice(['task', 'project', 'student'])
+        if target_type == 'task':
+            target_id = rng.randint(1, args.courses * 10)
+            course_id = 1 + target_id % args.courses
+        elif target_type == 'project':
+            target_id = rng.randint(1, args.courses * 5)
+            course_id = 1 + target_id % args.courses
+        else:
+            target_id, course_id = rng.randint(1, args.students), None
+        assessments.append({
+            'student_id': rng.randint(1, args.students),
+            'assessor_id': 1,
+            'assessor_role': rng.choice(['teacher', 'student', 'expert', 'self']),
+            'target_type': target_type,
+            'target_id': target_id,
+            'course_id': course_id,
+            'dimensions': _random_dimensions(rng),
+            'created_at': started + timedelta(minutes=i)
+        })
+    return assessments
+
+
+def run(args):
+    """执行校验"""
+    from sqlalchemy import BigInteger, create_engine, func
+    from sqlalchemy.ext.compiler import compiles
+    from sqlalchemy.orm import sessionmaker
+    from app.models.pbl import PBLAssessment, PBLAssessmentDimensionScore
+    from app.services.assessment_dimension_service import (
+        dimension_stats, parse_dimension_scores, sync_dimension_scores
+    )
+
+    @compiles(BigInteger, 'sqlite')
+    def _sqlite_bigint(type_, compiler, **kw):
+        # SQLite 只有 INTEGER PRIMARY KEY 自增
+        return 'INTEGER'
+
+    temp_dir = tempfile.mkdtemp(prefix='check_dimensions_')
+    database_url = args.database_url or f"sqlite:///{os.path.join(temp_dir, 'dimensions.db')}"
+    engine = create_engine(database_url)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    rng = random.Random(args.seed)
+    Score = PBLAssessmentDimensionScore
+    ok = True
+
+    db = None
+    try:
+        assessments = setup(engine, args, rng)
+        db = session_factory()
+
+        print("1. 拆分")
+        started = time.perf_counter()
+        records, record_ids = [], []
+        for item in assessments:
+            record = PBLAssessment(**{k: v for k, v in item.items() if k != 'course_id'})
+            db.add(record)
+            db.flush()
+            sync_dimension_scores(db, record)
+            records.append(record)
+            record_ids.append(record.id)
+        db.commit()
+        elapsed = time.perf_counter() - started
+        expected_rows = sum(len(parse_dimension_scores(item['dimensions'])) for item in assessments)
+        stored_rows = db.query(func.count(Score.id)).scalar()
+        ok &= _check(stored_rows == expected_rows,
+                     f"{len(assessments)} 条评价写入 {stored_rows} 条维度得分（{elapsed:.2f}秒，含创建评价）")
+        stored_courses = dict(db.query(Score.assessment_id, Score.course_id).distinct().all())
+        expected_courses = {
+            record_id: item['course_id'] for record_id, item in zip(record_ids, assessments)
+            if parse_dimension_scores(item['dimensions'])
+        }
+        ok &= _check(stored_courses == expected_courses, "冗余的课程ID与评价对象所属课程一致")
+
+        # 修改第一条评价的维度，旧记录被替换
+        first, first_item = records[0], assessments[0]
+        first_item['dimensions'] = [{'dimension': '修改后维度', 'score': 88, 'weight': 1}]
+        first.dimensions = first_item['dimensions']
+        sync_dimension_scores(db, first)
+        db.commit()
+        rows = db.query(Score.dimension, Score.score).filter(Score.assessment_id == first.id).all()
+        ok &= _check([(name, float(score)) for name, score in rows] == [('修改后维度', 88.0)], "修改维度后重写，不残留旧记录")
+
+        print("2. 统计")
+        by_student = reference_stats(assessments, lambda a: a['student_id'])
+        by_course_student = reference_stats(
+            assessments, lambda a: (a['course_id'], a['student_id']) if a['course_id'] else None
+        )
+
+        # 学生：原来加载全部评价后遍历 JSON，现在维度得分表上 GROUP BY
+        sample = list(range(1, min(args.students, 100) + 1))
+        started = time.perf_counter()
+        for student_id in sample:
+            legacy = defaultdict(list)
+            for assessment in db.query(PBLAssessment).filter(PBLAssessment.student_id == student_id).all():
+                for dim in assessment.dimensions or []:
+                    legacy[dim.get('name') or dim.get('dimension')].append(dim.get('score', 0))
+            db.expunge_all()
+        legacy_elapsed = time.perf_counter() - started
+
+        started = time.perf_counter()
+        mismatched = 0
+        for student_id in sample:
+            items = dimension_stats(db, Score.student_id == student_id)
+            got = {item['dimension']: (item['avg_score'], item['count']) for item in items}
+            mismatched += got != by_student.get(student_id, {})
+        sql_elapsed = time.perf_counter() - started
+        ok &= _check(mismatched == 0, f"{len(sample)} 名学生的维度平均分与参照一致")
+        print(f"    加载评价后遍历 JSON {legacy_elapsed * 1000 / len(sample):.2f}ms/学生，"
+              f"维度得分表 GROUP BY {sql_elapsed * 1000 / len(sample):.2f}ms/学生")
+
+        started = time.perf_counter()
+        mismatched = 0
+        for course_id in range(1, args.courses + 1):
+            items = dimension_stats(db, Score.course_id == course_id, by_student=True)
+            got = defaultdict(dict)
+            for item in items:
+                got[(course_id, item['student_id'])][item['dimension']] = (item['avg_score'], item['count'])
+            expected = {key: value for key, value in by_course_student.items() if key[0] == course_id}
+            mismatched += dict(got) != expected
+        elapsed = time.perf_counter() - started
+        ok &= _check(mismatched == 0, f"{args.courses} 门课程按学生 + 维度分组与参照一致（{elapsed * 1000:.1f}ms）")
+
+        teacher_rows = sum(
+            len(parse_dimension_scores(a['dimensions'])) for a in assessments if a['assessor_role'] == 'teacher'
+        )
+        items = dimension_stats(db, Score.assessor_role == 'teacher')
+        ok &= _check(sum(item['count'] for item in items) == teacher_rows, "按评价人角色过滤")
+    finally:
+        if db is not None:
+            db.close()
+        engine.dispose()
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+    print()
+    print("✓ 全部校验通过" if ok else "❌ 存在校验失败")
+    return ok
+
+
+def main():
+    """主函数"""
+    args = parse_args()
+    try:
+        sys.exit(0 if run(args) else 1)
+    except ImportError as e:
+        print(f"❌ 导入错误: {str(e)}")
+        print()
+        print("请确保已安装所有依赖:")
+        print("  pip install -r requirements.txt")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+批量写入 SQL 条数校验
+
+用压测数据（generate_data.py 生成）调用 app.utils.bulk.bulk_upsert，
+把其他班级的学生批量加入第一个班级。统计实际发出的 SQL 条数，
+校验条数只与批次数有关（1 条预取 + 每批 1 条 INSERT），不随学生数增长。
+
+所有写入在同一个事务中执行，结束后回滚，不会修改数据。
+
+示例：
+  python benchmarks/check_bulk_upsert.py --sizes 10 100 500
+"""
+
+import argparse
+import json
+import math
+import sys
+from pathlib import Path
+
+# 添加项目路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+DEFAULT_MANIFEST = Path(__file__).parent / 'bench_manifest.json'
+
+
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description='批量写入 SQL 条数校验')
+    parser.add_argument('--manifest', default=str(DEFAULT_MANIFEST), help='压测数据清单文件')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 500], help='每次写入的学生数')
+    parser.add_argument('--chunk-size', type=int, default=500, help='每条 INSERT 的最大行数')
+    return parser.parse_args()
+
+
+def run(args):
+    """执行校验"""
+    from sqlalchemy import event
+    from app.db.session import SessionLocal, engine
+    from app.models.pbl import PBLClassMember
+    from app.utils.bulk import bulk_upsert, INSERTED, EXISTS
+
+    manifest = json.loads(Path(args.manifest).read_text(encoding='utf-8'))
+    classes = [c for school in manifest['schools'] for c in school['classes']]
+    if len(classes) < 2:
+        print("✗ 压测数据至少需要两个班级，请调整 generate_data.py 的参数")
+        return False
+
+    target = classes[0]
+    own_students = target['student_ids']
+    other_students = [sid for c in classes[1:] for sid in c['student_ids']]
+
+    statements = []
+
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', count_statement)
+
+    all_ok = True
+    db = SessionLocal()
+    try:
+        class_id = db.query(PBLClassMember.class_id).filter(
+            PBLClassMember.student_id == own_students[0],
+            PBLClassMember.is_active == 1
+        ).scalar()
+
+        print("=" * 72)
+        print(f"目标班级 {target['class_uuid']}，已有成员 {len(own_students)} 人")
+        print(f"{'写入数':>8}{'新增':>8}{'已存在':>8}{'SQL条数':>10}{'期望':>8}  结果")
+        print("-" * 72)
+
+        for size in args.sizes:
+            # 一半是班级已有成员，一半是新成员，覆盖 “已存在” 和 “新增” 两种情况
+            existing_part = own_students[:size // 2]
+            new_part = other_students[:size - len(existing_part)]
+            rows = [{
+                'class_id': class_id,
+                'student_id': student_id,
+                'role': 'member',
+                'is_active': 1
+            } for student_id in existing_part + new_part]
+
+            # 每次在保存点内执行并回滚，各轮互不影响
+            savepoint = db.begin_nested()
+            statements.clear()
+            result = bulk_upsert(
+                db, PBLClassMember, rows,
+                key_columns=('class_id', 'student_id', 'is_active'),
+                chunk_size=args.chunk_size
+            )
+            # 只统计 bulk_upsert 自身发出的语句
+            sql_count = len([s for s in statements if not s.lstrip().upper().startswith(('SAVEPOINT', 'RELEASE', 'ROLLBACK'))])
+            savepoint.rollback()
+
+            expected = 1 + math.ceil(result.count(INSERTED) / args.chunk_size)
+            ok = sql_count == expected == result.statements
+            all_ok = all_ok and ok
+            print(f"{len(rows):>8}{result.count(INSERTED):>8}{result.count(EXISTS):>8}"
+                  f"{sql_count:>10}{expected:>8}  {'✓' if ok else '✗'}")
+    finally:
+        db.rollback()
+        db.close()
+        event.remove(engine, 'before_cursor_execute', count_statement)
+
+    print("=" * 72)
+    print("✓ SQL 条数不随写入条数增长" if all_ok else "✗ SQL 条数与期望不一致")
+    return all_ok
+
+
+def main():
+    """主函数"""
+    args = parse_args()
+    try:
+        sys.exit(0 if run(args) else 1)
+    except FileNotFoundError:
+        print(f"❌ 找不到清单文件: {args.manifest}")
+        print("请先运行: python benchmarks/generate_data.py")
+        sys.exit(1)
+    except ImportError as e:
+        print(f"❌ 导入错误: {str(e)}")
+        print()
+        print("请确保已安装所有依赖:")
+        print("  pip install -r requirements.txt")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
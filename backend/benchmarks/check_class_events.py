@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+班级实时事件分发校验
+
+不需要数据库，直接使用 app.services.class_event_service.InProcessBroker：
+  1. 分发：多个发布线程（模拟线程池中的同步接口）向多个班级发布事件，每个看板连接
+     收到且只收到本班级的全部事件，顺序与序号一致；输出发布吞吐量和投递延迟
+  2. 无连接的班级：发布为空操作，不记录历史
+  3. 断线重连：按 Last-Event-ID 补发漏掉的事件；进程标识不同或历史已被覆盖时推送 resync
+  4. 队列溢出：连接长时间不读取时丢弃增量，下次读取收到 resync
+  5. SSE 输出：报文格式、空闲心跳，关闭分发后连接结束
+
+示例：
+  python benchmarks/check_class_events.py --classes 20 --subscribers 5 --threads 8 --events 2000
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+
+# 添加项目路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description='班级实时事件分发校验')
+    parser.add_argument('--classes', type=int, default=20, help='班级数')
+    parser.add_argument('--subscribers', type=int, default=5, help='每个班级的看板连接数')
+    parser.add_argument('--threads', type=int, default=8, help='发布线程数')
+    parser.add_argument('--events', type=int, default=2000, help='每个发布线程发布的事件数')
+    return parser.parse_args()
+
+
+def _check(ok, message):
+    print(f"  {'✓' if ok else '✗'} {message}")
+    return ok
+
+
+async def _collect(subscription, expected, timeout=30):
+    """读取 expected 条事件，返回事件列表"""
+    from app.services.class_event_service import CLOSED
+
+    events = []
+    deadline = time.monotonic() + timeout
+    while len(events) < expected and time.monotonic() < deadline:
+        event = await subscription.get(1.0)
+        if event is None:
+            continue
+        if event is CLOSED:
+            break
+        events.append((time.perf_counter(), event))
+    return events
+
+
+async def _publish_phase(broker, subscriptions, threads, events, interval):
+    """
+    多个线程按轮转方式向各班级发布事件（interval 为每条事件之间的间隔，0 表示尽快发布），
+    所有连接读取各自班级的事件，返回 (校验结果, 发布耗时, 投递延迟列表)
+    """
+    class_count = len(subscriptions)
+    expected = {class_id: 0 for class_id in subscriptions}
+    for thread_index in range(threads):
+        for i in range(events):
+            expected[(thread_index + i) % class_count + 1] += 1
+    # 事件序号在班级内连续，接着上一轮的序号
+    first_seq = {class_id: broker._channels[class_id].seq + 1 for class_id in subscriptions}
+
+    def publisher(thread_index):
+        for i in range(events):
+            class_id = (thread_index + i) % class_count + 1
+            broker.publish(class_id, 'task_submitted', {
+                'thread': thread_index, 'seq': i, 'published_at': time.perf_counter()
+            })
+            if interval:
+                time.sleep(interval)
+
+    def join_all():
+        for thread in publishers:
+            thread.join()
+
+    collectors = [
+        asyncio.ensure_future(_collect(sub, expected[class_id]))
+        for class_id, subs in subscriptions.items() for sub in subs
+    ]
+    started = time.perf_counter()
+    publishers = [threading.Thread(target=publisher, args=(index,)) for index in range(threads)]
+    for thread in publishers:
+        thread.start()
+    # 在线程池中等待，事件循环继续接收投递
+    await asyncio.get_running_loop().run_in_executor(None, join_all)
+    elapsed = time.perf_counter() - started
+    results = iter(await asyncio.gather(*collectors))
+
+    ok = True
+    latencies = []
+    for class_id, subs in subscriptions.items():
+        for _ in subs:
+            received = next(results)
+            seqs = [int(event.event_id.rsplit('-', 1)[1]) for _, event in received]
+            ok &= len(received) == expected[class_id]
+            ok &= all(event.class_id == class_id for _, event in received)
+            ok &= seqs == list(range(first_seq[class_id], first_seq[class_id] + expected[class_id]))
+            latencies.extend(at - event.data['published_at'] for at, event in received)
+    latencies.sort()
+    return ok, elapsed, latencies
+
+
+def _format_latency(latencies):
+    return (f"p50 {statistics.median(latencies) * 1000:.2f}ms，"
+            f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.2f}ms")
+
+
+async def check_fanout(args):
+    from app.services.class_event_service import InProcessBroker
+
+    print("1. 分发")
+    total = args.threads * args.events
+    broker = InProcessBroker(queue_size=total, history_size=100)
+    subscriptions = {
+        class_id: [broker.subscribe(class_id) for _ in range(args.subscribers)]
+        for class_id in range(1, args.classes + 1)
+    }
+    connections = args.classes * args.subscribers
+
+    ok, elapsed, latencies = await _publish_phase(broker, subscriptions, args.threads, args.events, 0)
+    ok = _check(ok, f"突发：{connections} 个连接都按顺序收到本班级的全部事件")
+    print(f"    发布 {total} 条事件（投递 {len(latencies)} 次），耗时 {elapsed:.2f}秒，"
+          f"{total / elapsed:,.0f} 条/秒；积压下的投递延迟 {_format_latency(latencies)}")
+
+    # 课堂上的实际频率远低于突发：每个线程每 5ms 发布一条
+    paced_events = min(args.events, 200)
+    paced_ok, elapsed, latencies = await _publish_phase(broker, subscriptions, args.threads, paced_events, 0.005)
+    ok &= _check(paced_ok, f"匀速：{args.threads * paced_events / elapsed:,.0f} 条/秒，投递延迟 {_format_latency(latencies)}")
+
+    for subs in subscriptions.values():
+        for sub in subs:
+            sub.close()
+    ok &= _check(broker.subscriber_count() == 0, "连接关闭后取消订阅")
+    return ok
+
+
+async def check_no_listeners():
+    from app.services.class_event_service import InProcessBroker
+
+    print("2. 无连接的班级")
+    broker = InProcessBroker()
+    ok = _check(not broker.has_listeners(), "没有连接时 has_listeners 为 False（发布方跳过查询班级）")
+    broker.publish(1, 'task_submitted', {})
+    subscription = broker.subscribe(1, None)
+    event = await subscription.get(0.05)
+    ok &= _check(event is None, "连接之前发布的事件不会补发给新连接")
+    subscription.close()
+    return ok
+
+
+async def check_replay():
+    from app.services.class_event_service import InProcessBroker, EVENT_RESYNC
+
+    print("3. 断线重连")
+    broker = InProcessBroker(history_size=10)
+    first = broker.subscribe(1)
+    for i in range(5):
+        broker.publish(1, 'task_submitted', {'i': i})
+    events = [event for _, event in await _collect(first, 5)]
+    first.close()
+    last_event_id = events[-1].event_id
+
+    for i in range(5, 8):
+        broker.publish(1, 'task_submitted', {'i': i})
+    second = broker.subscribe(1, last_event_id)
+    replayed = [event.data['i'] for _, event in await _collect(second, 3)]
+    ok = _check(replayed == [5, 6, 7], f"按 Last-Event-ID 补发 {len(replayed)} 条漏掉的事件")
+    second.close()
+
+    other = broker.subscribe(1, 'otherboot-3')
+    event = (await _collect(other, 1))[0][1]
+    ok &= _check(event.event_type == EVENT_RESYNC, "其他进程（或重启前）的事件ID推送 resync")
+    other.close()
+
+    for i in range(20):
+        broker.publish(1, 'task_submitted', {'i': i})
+    stale = broker.subscribe(1, last_event_id)
+    event = (await _collect(stale, 1))[0][1]
+    ok &= _check(event.event_type == EVENT_RESYNC, "漏掉的事件超过保留数量时推送 resync")
+    stale.close()
+    return ok
+
+
+async def check_overflow():
+    from app.services.class_event_service import InProcessBroker, EVENT_RESYNC
+
+    print("4. 队列溢出")
+    broker = InProcessBroker(queue_size=8)
+    subscription = broker.subscribe(1)
+    for i in range(20):
+        broker.publish(1, 'task_submitted', {'i': i})
+    await asyncio.sleep(0.05)
+    event = await subscription.get(0.1)
+    ok = _check(event.event_type == EVENT_RESYNC, "连接不读取导致溢出后收到 resync")
+    broker.publish(1, 'task_submitted', {'i': 20})
+    event = await subscription.get(1.0)
+    ok &= _check(event.data == {'i': 20}, "resync 之后继续接收新事件")
+    subscription.close()
+    return ok
+
+
+async def check_sse():
+    from app.services.class_event_service import InProcessBroker, sse_stream
+
+    print("5. SSE 输出")
+    broker = InProcessBroker()
+    subscription = broker.subscribe(1)
+
+    async def is_disconnected():
+        return False
+
+    stream = sse_stream(subscription, is_disconnected, heartbeat=0.05, hello={'class_uuid': 'c1'})
+    chunks = [await stream.__anext__(), await stream.__anext__(), await stream.__anext__()]
+    ok = _check(
+        chunks[0] == b"retry: 3000\n\n"
+        and chunks[1].startswith(b"event: ready\ndata: {")
+        and chunks[2] == b": keep-alive\n\n",
+        "重连间隔、ready 事件、空闲心跳"
+    )
+
+    broker.publish(1, 'homework_reviewed', {'submission_id': 1, 'score': 90})
+    chunk = await stream.__anext__()
+    ok &= _check(
+        chunk.split(b"\n")[0].startswith(b"id: ") and b"event: homework_reviewed\n" in chunk
+        and chunk.endswith(b'data: {"submission_id":1,"score":90}\n\n'),
+        "事件报文包含 id / event / data"
+    )
+
+    broker.close()
+    remaining = [chunk async for chunk in stream]
+    ok &= _check(remaining == [] and broker.subscriber_count() == 0, "关闭分发后连接结束")
+    return ok
+
+
+async def run_checks(args):
+    ok = await check_fanout(args)
+    ok &= await check_no_listeners()
+    ok &= await check_replay()
+    ok &= await check_overflow()
+    ok &= await check_sse()
+    return ok
+
+
+def run(args):
+    """执行校验"""
+    ok = asyncio.run(run_checks(args))
+    print()
+    print("✓ 全部校验通过" if ok else "❌ 存在校验失败")
+    return ok
+
+
+def main():
+    """主函数"""
+    args = parse_args()
+    try:
+        sys.exit(0 if run(args) else 1)
+    except ImportError as e:
+        print(f"❌ 导入错误: {str(e)}")
+        print()
+        print("请确保已安装所有依赖:")
+        print("  pip install -r requirements.txt")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+计数服务并发校验
+
+模拟多 worker 进程 × 多线程同时对同一条伦理案例累加浏览次数和点赞：
+  - 浏览次数：每个线程调用 counter_service.incr()，期间各进程按间隔批量刷新
+  - 点赞：每个线程用不同用户点赞一次，再重复点赞一次（应被去重）
+结束后从数据库读取，校验浏览次数 == 进程数 × 线程数 × 每线程次数，
+点赞数 == 不重复用户数，即没有丢失或重复的增量。
+
+校验使用一条临时创建的伦理案例，结束后删除。
+
+示例：
+  python benchmarks/check_counters.py --processes 4 --threads 8 --increments 500
+"""
+
+import argparse
+import multiprocessing
+import sys
+import threading
+import time
+from pathlib import Path
+
+# 添加项目路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+# 点赞用户ID起始值（不需要真实用户，只用于去重键）
+LIKE_USER_BASE = 900000000
+
+
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description='计数服务并发校验')
+    parser.add_argument('--processes', type=int, default=4, help='模拟的 worker 进程数')
+    parser.add_argument('--threads', type=int, default=8, help='每个进程的线程数')
+    parser.add_argument('--increments', type=int, default=500, help='每个线程的浏览次数累加次数')
+    parser.add_argument('--flush-interval', type=float, default=0.2, help='刷新间隔（秒）')
+    return parser.parse_args()
+
+
+def worker(process_index, case_id, args):
+    """单个 worker 进程：多线程累加，后台线程按间隔刷新"""
+    from app.db.session import SessionLocal, engine
+    from app.models.pbl import PBLEthicsCase
+    from app.services.counter_service import CounterService, add_like, counter_service
+
+    # fork 出来的进程不能复用父进程的连接
+    engine.dispose()
+
+    views = CounterService(flush_interval=args.flush_interval, flush_threshold=10 ** 9)
+    views.start()
+
+    def run_thread(thread_index):
+        db = SessionLocal()
+        try:
+            for _ in range(args.increments):
+                views.incr(PBLEthicsCase.view_count, case_id)
+            user_id = LIKE_USER_BASE + process_index * args.threads + thread_index
+            add_like(db, PBLEthicsCase.like_count, case_id, user_id)
+            # 重复点赞不应计数
+            add_like(db, PBLEthicsCase.like_count, case_id, user_id)
+        finally:
+            db.close()
+
+    threads = [threading.Thread(target=run_thread, args=(i,)) for i in range(args.threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    views.stop()
+    # add_like 使用全局计数服务，退出前写入
+    counter_service.flush()
+
+
+def run(args):
+    """执行校验"""
+    from app.db.session import SessionLocal, engine
+    from app.models.pbl import PBLEthicsCase, PBLLikeRecord
+
+    db = SessionLocal()
+    case = PBLEthicsCase(
+        title='计数并发校验（临时数据）',
+        description='check_counters.py 创建，执行结束后删除',
+        ethics_topics=[],
+        is_published=0,
+        view_count=0,
+        like_count=0
+    )
+    db.add(case)
+    db.commit()
+    case_id = case.id
+    db.close()
+    engine.dispose()
+
+    print(f"临时伦理案例ID: {case_id}")
+    print(f"进程数: {args.processes}, 每进程线程数: {args.threads}, 每线程累加: {args.increments}")
+
+    started = time.perf_counter()
+    processes = [
+        multiprocessing.Process(target=worker, args=(i, case_id, args))
+        for i in range(args.processes)
+    ]
+    for p in processes:
+        p.start()
+    for p in processes:
+        p.join()
+    elapsed = time.perf_counter() - started
+
+    db = SessionLocal()
+    try:
+        row = db.query(PBLEthicsCase.view_count, PBLEthicsCase.like_count).filter(
+            PBLEthicsCase.id == case_id
+        ).first()
+        expected_views = args.processes * args.threads * args.increments
+        expected_likes = args.processes * args.threads
+        failed_workers = [p.exitcode for p in processes if p.exitcode != 0]
+
+        print(f"耗时: {elapsed:.2f}s")
+        print(f"浏览次数: {row.view_count} / 期望 {expected_views}")
+        print(f"点赞数:   {row.like_count} / 期望 {expected_likes}")
+
+        ok = (not failed_workers
+              and row.view_count == expected_views
+              and row.like_count == expected_likes)
+        if failed_workers:
+            print(f"✗ 有 worker 进程异常退出: {failed_workers}")
+        print("✓ 没有丢失或重复的增量" if ok else "✗ 计数不一致")
+        return ok
+    finally:
+        db.query(PBLLikeRecord).filter(
+            PBLLikeRecord.target_type == PBLEthicsCase.__tablename__,
+            PBLLikeRecord.target_id == case_id
+        ).delete(synchronize_session=False)
+        db.query(PBLEthicsCase).filter(PBLEthicsCase.id == case_id).delete(synchronize_session=False)
+        db.commit()
+        db.close()
+
+
+def main():
+    """主函数"""
+    args = parse_args()
+    try:
+        sys.exit(0 if run(args) else 1)
+    except ImportError as e:
+        print(f"❌ 导入错误: {str(e)}")
+        print()
+        print("请确保已安装所有依赖:")
+        print("  pip install -r requirements.txt")
+        sys.exit(1)
+    except Exception as e:
+        print(f"❌ 校验失败: {str(e)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+后台任务流程校验
+
+默认使用临时 SQLite 数据库（只创建 pbl_background_jobs 表），也可以用 --database-url 指定本地 MySQL：
+  1. 幂等键：同一管理员相同幂等键重复提交返回同一个任务
+  2. 多进程领取：启动多个 worker 进程执行一批任务，校验每个任务恰好执行一次，且由多个进程分担
+  3. 失败处理：抛出 JobError 的任务标记为失败并记录原因，不留下结果文件
+  4. 结果文件：任务写入的结果文件可以按任务找到
+  5. 中断恢复：心跳超时的执行中任务重新排队，达到最大执行次数的标记失败
+
+任务文件写入临时目录，执行结束后删除。
+
+示例：
+  python benchmarks/check_jobs.py --jobs 40 --processes 4
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+# 添加项目路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+# worker 子进程继承环境变量，任务文件写入临时目录
+if 'CHECK_JOBS_STORAGE_DIR' not in os.environ:
+    os.environ['CHECK_JOBS_STORAGE_DIR'] = tempfile.mkdtemp(prefix='check_jobs_')
+os.environ['JOB_STORAGE_DIR'] = os.environ['CHECK_JOBS_STORAGE_DIR']
+
+
+def _register_check_handlers():
+    """注册校验用的任务类型（worker 子进程以 spawn 方式导入本脚本时同样会注册）"""
+    from app.services.job_service import job_handler, JobError
+
+    @job_handler('check_sleep')
+    def handle_sleep(db, ctx):
+        time.sleep(ctx.params.get('seconds', 0.05))
+        ctx.update_progress(50, "执行中", force=True)
+        return {'pid': os.getpid()}
+
+    @job_handler('check_fail')
+    def handle_fail(db, ctx):
+        ctx.write_result('partial.csv', [b'a,b\n'])
+        raise JobError("校验用的失败任务")
+
+    @job_handler('check_file')
+    def handle_file(db, ctx):
+        ctx.write_result('结果.csv', [b'name\n', 'value\n'.encode('utf-8')])
+        return {'rows': 1}
+
+
+try:
+    _register_check_handlers()
+except ImportError:
+    # 由 main() 提示安装依赖
+    pass
+
+
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description='后台任务流程校验')
+    parser.add_argument('--jobs', type=int, default=40, help='多进程领取校验的任务数')
+    parser.add_argument('--processes', type=int, default=4, help='worker 进程数')
+    parser.add_argument('--database-url', default=None, help='数据库地址（默认使用临时 SQLite 文件）')
+    parser.add_argument('--timeout', type=float, default=120, help='等待任务完成的最长时间（秒）')
+    return parser.parse_args()
+
+
+def _check(ok, message):
+    print(f"  {'✓' if ok else '✗'} {message}")
+    return ok
+
+
+def run(args):
+    """执行校验"""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from app.models.pbl import PBLBackgroundJob
+    from app.services import job_service
+    from app.services.job_worker import JobWorkerPool
+    from app.utils.timezone import get_beijing_time_naive
+
+    storage_dir = os.environ['JOB_STORAGE_DIR']
+    database_url = args.database_url or f"sqlite:///{Path(storage_dir) / 'jobs.db'}"
+    engine = create_engine(database_url)
+    PBLBackgroundJob.__table__.create(engine, checkfirst=True)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    creator = SimpleNamespace(id=987654321, username='check_jobs')
+
+    db = session_factory()
+    ok = True
+    try:
+        # 清理上次中断留下的校验任务
+        db.query(PBLBackgroundJob).filter(PBLBackgroundJob.creator_id == creator.id).delete()
+        db.commit()
+
+        print("1. 幂等键")
+        first, created_first = job_service.submit_job(db, 'check_sleep', creator, idempotency_key='check-key')
+        second, created_second = job_service.submit_job(db, 'check_sleep', creator, idempotency_key='check-key')
+        ok &= _check(created_first and not created_second and first.id == second.id, "重复提交返回同一个任务")
+
+        print("2. 多进程领取")
+        job_ids = [first.id] + [
+            job_service.submit_job(db, 'check_sleep', creator, params={'seconds': 0.05})[0].id
+            for _ in range(args.jobs - 1)
+        ]
+        fail_job, _ = job_service.submit_job(db, 'check_fail', creator)
+        file_job, _ = job_service.submit_job(db, 'check_file', creator)
+        all_ids = job_ids + [fail_job.id, file_job.id]
+
+        pool = JobWorkerPool(args.processes, database_url=database_url)
+        started = time.perf_counter()
+        pool.start()
+        try:
+            deadline = time.monotonic() + args.timeout
+            while time.monotonic() < deadline:
+                db.expire_all()
+                unfinished = db.query(PBLBackgroundJob).filter(
+                    PBLBackgroundJob.id.in_(all_ids),
+                    PBLBackgroundJob.status.notin_(job_service.FINISHED_STATUSES)
+                ).count()
+                if unfinished == 0:
+                    break
+                time.sleep(0.2)
+        finally:
+            pool.stop()
+        elapsed = time.perf_counter() - started
+
+        db.expire_all()
+        jobs = db.query(PBLBackgroundJob).filter(PBLBackgroundJob.id.in_(job_ids)).all()
+        succeeded = [job for job in jobs if job.status == job_service.SUCCEEDED]
+        ok &= _check(len(succeeded) == len(job_ids), f"{len(succeeded)}/{len(job_ids)} 个任务执行成功（{elapsed:.1f}秒）")
+        ok &= _check(all(job.attempts == 1 for job in jobs), "每个任务只执行一次")
+        pids = {job.result['pid'] for job in succeeded if job.result}
+        ok &= _check(len(pids) > 1 or args.processes == 1, f"由 {len(pids)} 个 worker 进程分担")
+
+        print("3. 失败处理")
+        fail_job = db.get(PBLBackgroundJob, fail_job.id)
+        ok &= _check(fail_job.status == job_service.FAILED, f"任务状态为 failed，原因：{fail_job.message}")
+        ok &= _check(
+            not (Path(storage_dir) / 'results' / fail_job.uuid / 'result.csv').exists(),
+            "失败任务没有留下结果文件"
+        )
+
+        print("4. 结果文件")
+        file_job = db.get(PBLBackgroundJob, file_job.id)
+        path = job_service.result_file_path(file_job)
+        ok &= _check(
+            path is not None and path.read_bytes() == b'name\nvalue\n' and file_job.result_filename == '结果.csv',
+            f"结果文件可下载：{file_job.result_path}"
+        )
+
+        print("5. 中断恢复")
+        stale_time = get_beijing_time_naive().replace(year=2000)
+        retry_job, _ = job_service.submit_job(db, 'check_sleep', creator)
+        dead_job, _ = job_service.submit_job(db, 'check_sleep', creator)
+        for job, attempts in ((retry_job, 1), (dead_job, 2)):
+            job.status = job_service.RUNNING
+            job.attempts = attempts
+            job.heartbeat_at = stale_time
+        db.commit()
+        recovered = job_service.recover_stale_jobs(db, timeout=60, max_attempts=2)
+        db.refresh(retry_job)
+        db.refresh(dead_job)
+        ok &= _check(
+            recovered == 2 and retry_job.status == job_service.PENDING and dead_job.status == job_service.FAILED,
+            "未达到最大次数的重新排队，达到的标记失败"
+        )
+
+        db.query(PBLBackgroundJob).filter(PBLBackgroundJob.creator_id == creator.id).delete()
+        db.commit()
+    finally:
+        db.close()
+        engine.dispose()
+
+    print()
+    print("✓ 全部校验通过" if ok else "❌ 存在校验失败")
+    return ok
+
+
+def main():
+    """主函数"""
+    args = parse_args()
+    try:
+        sys.exit(0 if run(args) else 1)
+    except ImportError as e:
+        print(f"❌ 导入错误: {str(e)}")
+        print()
+        print("请确保已安装所有依赖:")
+        print("  pip install -r requirements.txt")
+        sys.exit(1)
+    finally:
+        shutil.rmtree(os.environ['JOB_STORAGE_DIR'], ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,520 @@
+#!/usr/bin/env python3
+"""
+压测数据生成工具
+
+按可配置的规模生成一套“真实部署”形态的数据：
+  - N 所学校，每所学校若干教师、若干班级（PBLClass / PBLClassMember / PBLClassTeacher）
+  - 一个课程模板（单元 / 资源 / 任务），授权给所有学校后为每个班级实例化课程
+  - 学生作业提交（PBLTaskProgress）、视频播放会话（PBLVideoPlayProgress）和播放事件（PBLVideoPlayEvent）
+
+生成完成后会写出一份清单文件（默认 benchmarks/bench_manifest.json），
+记录登录账号、班级 UUID、视频资源 UUID 等信息，供 load_test.py 使用。
+
+所有压测数据的学校代码均以 BENCH 开头，可通过 --clean 一键清理。
+
+示例：
+  python benchmarks/generate_data.py --schools 2 --classes-per-school 5 --students-per-class 40
+  python benchmarks/generate_data.py --clean
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from datetime import timedelta
+from pathlib import Path
+
+# 添加项目路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+# 压测数据统一使用的学校代码前缀，便于识别和清理
+SCHOOL_CODE_PREFIX = 'BENCH'
+
+# 压测账号统一密码
+DEFAULT_PASSWORD = 'Bench@123456'
+
+# 默认清单文件位置
+DEFAULT_MANIFEST = Path(__file__).parent / 'bench_manifest.json'
+
+# 单次批量插入的行数
+BATCH_SIZE = 2000
+
+TASK_TYPES = ['analysis', 'coding', 'design', 'deployment']
+
+
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description='生成 PBL 压测数据')
+    parser.add_argument('--schools', type=int, default=2, help='学校数量')
+    parser.add_argument('--teachers-per-school', type=int, default=5, help='每所学校的教师数量')
+    parser.add_argument('--classes-per-school', type=int, default=5, help='每所学校的班级数量')
+    parser.add_argument('--students-per-class', type=int, default=40, help='每个班级的学生数量')
+    parser.add_argument('--units', type=int, default=6, help='课程模板的单元数量')
+    parser.add_argument('--resources-per-unit', type=int, default=3, help='每个单元的资源数量（约一半为视频）')
+    parser.add_argument('--tasks-per-unit', type=int, default=3, help='每个单元的任务数量')
+    parser.add_argument('--submission-ratio', type=float, default=0.7, help='学生提交作业的比例（0-1）')
+    parser.add_argument('--graded-ratio', type=float, default=0.5, help='已提交作业中已批改的比例（0-1）')
+    parser.add_argument('--video-sessions', type=int, default=3, help='每个学生的视频播放会话数')
+    parser.add_argument('--events-per-session', type=int, default=10, help='每个播放会话的事件数')
+    parser.add_argument('--seed', type=int, default=20251019, help='随机种子，保证多次生成的数据分布一致')
+    parser.add_argument('--manifest', type=str, default=str(DEFAULT_MANIFEST), help='清单文件输出路径')
+    parser.add_argument('--clean', action='store_true', help='清理所有压测数据后退出')
+    return parser.parse_args()
+
+
+def _bulk_insert(db, model, rows):
+    """分批批量插入"""
+    from sqlalchemy import insert
+
+    for start in range(0, len(rows), BATCH_SIZE):
+        chunk = rows[start:start + BATCH_SIZE]
+        if chunk:
+            db.execute(insert(model), chunk)
+
+
+def _create_template(db, args, run_tag):
+    """创建压测用课程模板"""
+    from app.models.pbl import (
+        PBLCourseTemplate, PBLUnitTemplate, PBLResourceTemplate, PBLTaskTemplate
+    )
+
+    template = PBLCourseTemplate(
+        template_code=f'{SCHOOL_CODE_PREFIX}-TPL-{run_tag}',
+        title=f'压测课程模板 {run_tag}',
+        description='由 benchmarks/generate_data.py 生成',
+        difficulty='beginner',
+        category='benchmark',
+        is_public=0
+    )
+    db.add(template)
+    db.flush()
+
+    for unit_index in range(args.units):
+        unit = PBLUnitTemplate(
+            template_code=f'U{unit_index + 1}',
+            course_template_id=template.id,
+            title=f'第{unit_index + 1}单元',
+            order=unit_index + 1
+        )
+        db.add(unit)
+        db.flush()
+
+        order = 1
+        for resource_index in range(args.resources_per_unit):
+            is_video = resource_index % 2 == 0
+            db.add(PBLResourceTemplate(
+                template_code=f'U{unit_index + 1}-R{resource_index + 1}',
+                unit_template_id=unit.id,
+                type='video' if is_video else 'document',
+                title=f'资源 {unit_index + 1}-{resource_index + 1}',
+                order=order,
+                video_id=f'bench-video-{unit_index + 1}-{resource_index + 1}' if is_video else None,
+                duration=random.randint(300, 1200) if is_video else None
+            ))
+            order += 1
+
+        for task_index in range(args.tasks_per_unit):
+            db.add(PBLTaskTemplate(
+                template_code=f'U{unit_index + 1}-T{task_index + 1}',
+                unit_template_id=unit.id,
+                title=f'任务 {unit_index + 1}-{task_index + 1}',
+                type=TASK_TYPES[task_index % len(TASK_TYPES)],
+                order=order
+            ))
+            order += 1
+
+    db.flush()
+    return template
+
+
+def _create_school(db, args, school_index, run_tag, password_hash, template):
+    """创建一所学校及其教师、学生、班级和课程，返回清单信息"""
+    from app.models.school import School
+    from app.models.admin import Admin
+    from app.models.pbl import (
+        PBLClass, PBLClassMember, PBLClassTeacher, PBLClassCourse,
+        PBLTemplateSchoolPermission
+    )
+    from app.services.template_service import copy_course_from_template
+
+    school_code = f'{SCHOOL_CODE_PREFIX}{run_tag}{school_index + 1:02d}'
+    total_students = args.classes_per_school * args.students_per_class
+    school = School(
+        school_code=school_code,
+        school_name=f'压测学校{school_index + 1}',
+        is_active=True,
+        max_teachers=args.teachers_per_school + 10,
+        max_students=total_students + 100,
+        current_teachers=args.teachers_per_school,
+        current_students=total_students
+    )
+    db.add(school)
+    db.flush()
+
+    # 教师（第一位教师为学校管理员）
+    teacher_rows = []
+    for teacher_index in range(args.teachers_per_school):
+        number = f'T{teacher_index + 1:04d}'
+        teacher_rows.append({
+            'username': f'{school_code.lower()}_{number.lower()}',
+            'password_hash': password_hash,
+            'name': f'教师{teacher_index + 1}',
+            'role': 'school_admin' if teacher_index == 0 else 'teacher',
+            'school_id': school.id,
+            'school_name': school.school_name,
+            'teacher_number': number,
+            'is_active': True
+        })
+    _bulk_insert(db, Admin, teacher_rows)
+
+    # 学生
+    student_rows = []
+    for student_index in range(total_students):
+        number = f'S{student_index + 1:06d}'
+        student_rows.append({
+            'username': f'{school_code.lower()}_{number.lower()}',
+            'password_hash': password_hash,
+            'name': f'学生{student_index + 1}',
+            'role': 'student',
+            'school_id': school.id,
+            'school_name': school.school_name,
+            'student_number': number,
+            'gender': random.choice(['male', 'female']),
+            'is_active': True
+        })
+    _bulk_insert(db, Admin, student_rows)
+
+    users = db.query(Admin.id, Admin.role, Admin.teacher_number, Admin.student_number).filter(
+        Admin.school_id == school.id
+    ).all()
+    teachers = sorted([u for u in users if u.role != 'student'], key=lambda u: u.teacher_number)
+    students = sorted([u for u in users if u.role == 'student'], key=lambda u: u.student_number)
+
+    school.admin_user_id = teachers[0].id
+    school.admin_username = teacher_rows[0]['username']
+
+    permission = PBLTemplateSchoolPermission(
+        template_id=template.id,
+        school_id=school.id,
+        is_active=1,
+        granted_by=teachers[0].id
+    )
+    db.add(permission)
+    db.flush()
+
+    classes_manifest = []
+    member_rows = []
+    for class_index in range(args.classes_per_school):
+        teacher = teachers[class_index % len(teachers)]
+        class_students = students[
+            class_index * args.students_per_class:(class_index + 1) * args.students_per_class
+        ]
+        pbl_class = PBLClass(
+            school_id=school.id,
+            name=f'压测班级{class_index + 1}',
+            class_type='club',
+            class_teacher_id=teacher.id,
+            max_students=args.students_per_class,
+            current_members=len(class_students)
+        )
+        db.add(pbl_class)
+        db.flush()
+
+        db.add(PBLClassTeacher(
+            class_id=pbl_class.id,
+            teacher_id=teacher.id,
+            role='main',
+            is_primary=1
+        ))
+
+        for student in class_students:
+            member_rows.append({'class_id': pbl_class.id, 'student_id': student.id, 'is_active': 1})
+
+        course = copy_course_from_template(
+            db=db,
+            template_id=template.id,
+            school_id=school.id,
+            creator_id=teacher.id,
+            class_id=pbl_class.id,
+            class_name=pbl_class.name,
+            permission_id=permission.id
+        )
+        db.add(PBLClassCourse(
+            class_id=pbl_class.id,
+            course_id=course.id,
+            assigned_by=teacher.id
+        ))
+        permission.current_instances = (permission.current_instances or 0) + 1
+
+        classes_manifest.append({
+            'class_id': pbl_class.id,
+            'class_uuid': pbl_class.uuid,
+            'course_id': course.id,
+            'teacher_id': teacher.id,
+            'teacher_number': teacher.teacher_number,
+            'student_ids': [s.id for s in class_students],
+            'student_numbers': [s.student_number for s in class_students]
+        })
+
+    _bulk_insert(db, PBLClassMember, member_rows)
+    db.flush()
+
+    return {
+        'school_id': school.id,
+        'school_code': school_code,
+        'teacher_numbers': [t.teacher_number for t in teachers],
+        'classes': classes_manifest
+    }
+
+
+def _create_activity(db, args, school_manifest):
+    """为学校的每个班级生成作业提交和视频播放数据"""
+    from app.models.pbl import (
+        PBLUnit, PBLTask, PBLResource, PBLTaskProgress,
+        PBLVideoPlayProgress, PBLVideoPlayEvent
+    )
+    from app.utils.timezone import get_beijing_time_naive
+
+    now = get_beijing_time_naive()
+    progress_count = 0
+    session_count = 0
+    event_count = 0
+
+    for class_info in school_manifest['classes']:
+        tasks = db.query(PBLTask.id, PBLTask.type).join(
+            PBLUnit, PBLTask.unit_id == PBLUnit.id
+        ).filter(PBLUnit.course_id == class_info['course_id']).all()
+        videos = db.query(PBLResource.id, PBLResource.uuid, PBLResource.duration).join(
+            PBLUnit, PBLResource.unit_id == PBLUnit.id
+        ).filter(
+            PBLUnit.course_id == class_info['course_id'],
+            PBLResource.type == 'video'
+        ).all()
+
+        class_info['task_ids'] = [t.id for t in tasks]
+        class_info['video_resource_uuids'] = [v.uuid for v in videos]
+        grader_id = class_info['teacher_id']
+
+        # 作业提交
+        progress_rows = []
+        for student_id in class_info['student_ids']:
+            for task in tasks:
+                if random.random() >= args.submission_ratio:
+                    continue
+                submitted_at = now - timedelta(days=random.randint(0, 29), minutes=random.randint(0, 1439))
+                graded = random.random() < args.graded_ratio
+                progress_rows.append({
+                    'task_id': task.id,
+                    'user_id': student_id,
+                    'status': 'completed' if graded else 'review',
+                    'progress': 100,
+                    'submission': {
+                        'content': f'压测提交内容 - 任务 {task.id}',
+                        'files': [],
+                        'submitted_at': submitted_at.isoformat()
+                    },
+                    'submitted_at': submitted_at,
+                    'score': random.randint(60, 100) if graded else None,
+                    'feedback': '完成得不错' if graded else None,
+                    'graded_by': grader_id if graded else None,
+                    'graded_at': submitted_at + timedelta(days=1) if graded else None,
+                    'created_at': submitted_at,
+                    'updated_at': submitted_at
+                })
+        _bulk_insert(db, PBLTaskProgress, progress_rows)
+        progress_count += len(progress_rows)
+
+        # 视频播放会话和事件
+        if not videos:
+            continue
+        session_rows = []
+        event_rows = []
+        for student_id in class_info['student_ids']:
+            for _ in range(args.video_sessions):
+                video = random.choice(videos)
+                duration = video.duration or 600
+                session_id = f'bench-{student_id}-{random.getrandbits(48):012x}'
+                started_at = now - timedelta(days=random.randint(0, 29), minutes=random.randint(0, 1439))
+                position = 0
+                for event_index in range(args.events_per_session):
+                    position = min(duration, position + random.randint(10, 60))
+                    event_rows.append({
+                        'session_id': session_id,
+                        'resource_id': video.id,
+                        'user_id': student_id,
+                        'event_type': 'progress' if event_index < args.events_per_session - 1 else 'pause',
+                        'position': position,
+                        'timestamp': started_at + timedelta(seconds=position)
+                    })
+                completion = round(position * 100.0 / duration, 2)
+                session_rows.append({
+                    'resource_id': video.id,
+                    'user_id': student_id,
+                    'session_id': session_id,
+                    'current_position': position,
+                    'duration': duration,
+                    'play_duration': position,
+                    'real_watch_duration': position,
+                    'status': 'paused',
+                    'last_event': 'pause',
+                    'last_event_time': started_at + timedelta(seconds=position),
+                    'completion_rate': completion,
+                    'is_completed': 1 if completion >= 90 else 0,
+                    'device_type': random.choice(['pc', 'mobile', 'tablet']),
+                    'start_time': started_at,
+                    'created_at': started_at,
+                    'updated_at': started_at + timedelta(seconds=position)
+                })
+        _bulk_insert(db, PBLVideoPlayProgress, session_rows)
+        _bulk_insert(db, PBLVideoPlayEvent, event_rows)
+        session_count += len(session_rows)
+        event_count += len(event_rows)
+
+    return progress_count, session_count, event_count
+
+
+def clean_bench_data():
+    """清理所有以 BENCH 开头的学校及其关联数据"""
+    from sqlalchemy import text, bindparam
+    from app.db.session import SessionLocal
+
+    db = SessionLocal()
+    try:
+        school_ids = [row[0] for row in db.execute(text(
+            "SELECT id FROM core_schools WHERE school_code LIKE :prefix"
+        ), {'prefix': f'{SCHOOL_CODE_PREFIX}%'}).all()]
+        if not school_ids:
+            print("✓ 没有需要清理的压测数据")
+            return True
+
+        params = {'school_ids': school_ids}
+        user_ids = "SELECT id FROM core_users WHERE school_id IN :school_ids"
+        class_ids = "SELECT id FROM pbl_classes WHERE school_id IN :school_ids"
+        course_ids = "SELECT id FROM pbl_courses WHERE school_id IN :school_ids"
+        unit_ids = f"SELECT id FROM pbl_units WHERE course_id IN ({course_ids})"
+
+        # 按外键依赖顺序删除
+        statements = [
+            f"DELETE FROM pbl_video_play_events WHERE user_id IN ({user_ids})",
+            f"DELETE FROM pbl_video_play_progress WHERE user_id IN ({user_ids})",
+            f"DELETE FROM pbl_task_progress WHERE user_id IN ({user_ids})",
+            f"DELETE FROM pbl_tasks WHERE unit_id IN ({unit_ids})",
+            f"DELETE FROM pbl_resources WHERE unit_id IN ({unit_ids})",
+            f"DELETE FROM pbl_units WHERE course_id IN ({course_ids})",
+            f"DELETE FROM pbl_class_courses WHERE class_id IN ({class_ids})",
+            "DELETE FROM pbl_courses WHERE school_id IN :school_ids",
+            f"DELETE FROM pbl_class_members WHERE class_id IN ({class_ids})",
+            f"DELETE FROM pbl_class_teachers WHERE class_id IN ({class_ids})",
+            "DELETE FROM pbl_classes WHERE school_id IN :school_ids",
+            "DELETE FROM pbl_template_school_permissions WHERE school_id IN :school_ids",
+            "DELETE FROM core_users WHERE school_id IN :school_ids",
+            "DELETE FROM core_schools WHERE id IN :school_ids",
+        ]
+        for statement in statements:
+            stmt = text(statement).bindparams(bindparam('school_ids', expanding=True))
+            result = db.execute(stmt, params)
+            print(f"  ✓ {statement.split(' WHERE')[0]}: {result.rowcount} 行")
+
+        # 压测模板（已没有学校使用）
+        template_ids = "SELECT id FROM pbl_course_templates WHERE template_code LIKE :prefix"
+        unit_template_ids = f"SELECT id FROM pbl_unit_templates WHERE course_template_id IN ({template_ids})"
+        for statement in [
+            f"DELETE FROM pbl_task_templates WHERE unit_template_id IN ({unit_template_ids})",
+            f"DELETE FROM pbl_resource_templates WHERE unit_template_id IN ({unit_template_ids})",
+            f"DELETE FROM pbl_unit_templates WHERE course_template_id IN ({template_ids})",
+            "DELETE FROM pbl_course_templates WHERE template_code LIKE :prefix",
+        ]:
+            db.execute(text(statement), {'prefix': f'{SCHOOL_CODE_PREFIX}-TPL-%'})
+
+        db.commit()
+        print(f"✓ 已清理 {len(school_ids)} 所压测学校的数据")
+        return True
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def generate(args):
+    """按参数生成压测数据并写出清单文件"""
+    from app.db.session import SessionLocal
+    from app.core.security import get_password_hash
+
+    random.seed(args.seed)
+    run_tag = time.strftime('%m%d%H%M')
+    # bcrypt 计算较慢，所有压测账号共用同一个密码哈希
+    password_hash = get_password_hash(DEFAULT_PASSWORD)
+
+    print("=" * 70)
+    print("PBL 压测数据生成")
+    print("=" * 70)
+    print(f"学校: {args.schools}  班级/校: {args.classes_per_school}  学生/班: {args.students_per_class}")
+    print(f"单元: {args.units}  资源/单元: {args.resources_per_unit}  任务/单元: {args.tasks_per_unit}")
+    print()
+
+    db = SessionLocal()
+    started = time.perf_counter()
+    try:
+        template = _create_template(db, args, run_tag)
+        # 会话关闭后 template 已过期且脱离会话，不能再读取属性，清单中的模板ID在提交前取出
+        template_id = template.id
+        db.commit()
+        print(f"✓ 课程模板已创建: {template.template_code}")
+
+        schools = []
+        for school_index in range(args.schools):
+            school_manifest = _create_school(db, args, school_index, run_tag, password_hash, template)
+            db.commit()
+            progress_count, session_count, event_count = _create_activity(db, args, school_manifest)
+            db.commit()
+            schools.append(school_manifest)
+            print(f"✓ {school_manifest['school_code']}: 班级 {len(school_manifest['classes'])}，"
+                  f"作业提交 {progress_count}，播放会话 {session_count}，播放事件 {event_count}")
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    manifest = {
+        'run_tag': run_tag,
+        'password': DEFAULT_PASSWORD,
+        'template_id': template_id,
+        'scale': vars(args),
+        'schools': schools
+    }
+    manifest_path = Path(args.manifest)
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    manifest_path.write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding='utf-8')
+
+    print()
+    print("=" * 70)
+    print(f"✓ 数据生成完成，耗时 {time.perf_counter() - started:.1f} 秒")
+    print(f"  清单文件: {manifest_path}")
+    print("=" * 70)
+    return True
+
+
+def main():
+    """主函数"""
+    args = parse_args()
+    try:
+        ok = clean_bench_data() if args.clean else generate(args)
+        sys.exit(0 if ok else 1)
+    except ImportError as e:
+        print(f"❌ 导入错误: {str(e)}")
+        print()
+        print("请确保已安装所有依赖:")
+        print("  pip install -r requirements.txt")
+        sys.exit(1)
+    except Exception as e:
+        print(f"❌ 生成过程中出现错误: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,479 @@
+#!/usr/bin/env python3
+"""
+PBL API 压测脚本
+
+基于 generate_data.py 生成的清单文件，按场景并发请求接口，
+统计每个接口的 p50 / p95 / p99 延迟以及每次请求执行的 SQL 条数。
+
+场景：
+  login      学生/教师登录风暴
+  video      视频播放心跳洪峰（创建会话 -> 大量进度上报 -> 播放结束）
+  dashboard  教师看板（class_analytics 统计 + club_classes 班级进度）
+  export     导出（班级进度、作业统计、作业提交）
+
+运行方式：
+  1. 进程内模式（默认）：在当前进程中用 uvicorn 启动 main:app，
+     并通过 SQLAlchemy 事件统计每个请求的 SQL 条数
+       python benchmarks/load_test.py --scenario all
+  2. 远程模式：对已运行的服务发起请求（无法统计 SQL 条数）
+       python benchmarks/load_test.py --base-url http://127.0.0.1:8000 --scenario dashboard
+
+  --output 可将结果保存为 JSON，便于优化前后对比。
+"""
+
+import argparse
+import json
+import math
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from pathlib import Path
+
+# 添加项目路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+DEFAULT_MANIFEST = Path(__file__).parent / 'bench_manifest.json'
+
+# 压测请求携带的标签头（用于把同一接口的不同 URL 归为一类）
+LABEL_HEADER = 'X-Bench-Label'
+
+# 进程内模式下返回 SQL 条数的响应头
+QUERY_COUNT_HEADER = 'x-bench-queries'
+
+SCENARIOS = ['login', 'video', 'dashboard', 'export']
+
+# 当前请求的 SQL 计数器（进程内模式）
+_query_counter: ContextVar = ContextVar('bench_query_counter', default=None)
+
+
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description='PBL API 压测')
+    parser.add_argument('--scenario', choices=SCENARIOS + ['all'], default='all', help='压测场景')
+    parser.add_argument('--manifest', type=str, default=str(DEFAULT_MANIFEST), help='generate_data.py 生成的清单文件')
+    parser.add_argument('--base-url', type=str, default=None, help='远程模式：已运行服务的地址')
+    parser.add_argument('--port', type=int, default=18000, help='进程内模式监听的端口')
+    parser.add_argument('--concurrency', type=int, default=20, help='并发线程数')
+    parser.add_argument('--requests', type=int, default=500, help='每个场景的请求数')
+    parser.add_argument('--heartbeats-per-session', type=int, default=20, help='视频场景每个会话的心跳次数')
+    parser.add_argument('--seed', type=int, default=20251019, help='随机种子')
+    parser.add_argument('--output', type=str, default=None, help='结果保存为 JSON 文件')
+    return parser.parse_args()
+
+
+# ========== 进程内服务 ==========
+
+class QueryCountingApp:
+    """包装 ASGI 应用：统计每个请求执行的 SQL 条数，并通过响应头返回"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        counter = [0]
+        _query_counter.set(counter)
+
+        async def send_with_count(message):
+            if message['type'] == 'http.response.start':
+                headers = list(message.get('headers', []))
+                headers.append((QUERY_COUNT_HEADER.encode(), str(counter[0]).encode()))
+                message = {**message, 'headers': headers}
+            await send(message)
+
+        await self.app(scope, receive, send_with_count)
+
+
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    """SQLAlchemy 事件：累加当前请求的 SQL 条数"""
+    counter = _query_counter.get()
+    if counter is not None:
+        counter[0] += 1
+
+
+def start_local_server(port):
+    """在后台线程中启动 uvicorn，返回服务地址"""
+    import logging
+    import uvicorn
+    from sqlalchemy import event
+    from main import app
+    from app.db.session import engine
+
+    # 压测时降低日志级别，避免日志输出本身成为瓶颈
+    logging.getLogger().setLevel(logging.WARNING)
+
+    event.listen(engine, 'before_cursor_execute', _count_query)
+
+    config = uvicorn.Config(
+        QueryCountingApp(app),
+        host='127.0.0.1',
+        port=port,
+        log_level='warning',
+        access_log=False
+    )
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+
+    deadline = time.time() + 30
+    while not server.started:
+        if time.time() > deadline:
+            raise RuntimeError('uvicorn 启动超时')
+        time.sleep(0.1)
+
+    return f'http://127.0.0.1:{port}', server, thread
+
+
+# ========== 统计 ==========
+
+def percentile(sorted_values, pct):
+    """最近秩法计算百分位"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100.0 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class Recorder:
+    """线程安全的请求结果记录器"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latencies = defaultdict(list)
+        self._queries = defaultdict(list)
+        self._errors = defaultdict(int)
+        self._status = defaultdict(lambda: defaultdict(int))
+
+    def record(self, label, elapsed_ms, status_code, query_count):
+        with self._lock:
+            self._latencies[label].append(elapsed_ms)
+            self._status[label][status_code] += 1
+            if status_code >= 400:
+                self._errors[label] += 1
+            if query_count is not None:
+                self._queries[label].append(query_count)
+
+    def summary(self):
+        """按接口汇总统计结果"""
+        result = {}
+        for label, latencies in self._latencies.items():
+            latencies = sorted(latencies)
+            queries = sorted(self._queries.get(label, []))
+            result[label] = {
+                'count': len(latencies),
+                'errors': self._errors.get(label, 0),
+                'status': dict(self._status[label]),
+                'mean_ms': round(sum(latencies) / len(latencies), 2),
+                'p50_ms': round(percentile(latencies, 50), 2),
+                'p95_ms': round(percentile(latencies, 95), 2),
+                'p99_ms': round(percentile(latencies, 99), 2),
+                'max_ms': round(latencies[-1], 2),
+                'queries_mean': round(sum(queries) / len(queries), 1) if queries else None,
+                'queries_p95': percentile(queries, 95) if queries else None,
+            }
+        return result
+
+
+def print_summary(summary, elapsed):
+    """打印统计表"""
+    print()
+    print("=" * 110)
+    print(f"{'接口':<44}{'请求':>7}{'错误':>6}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}{'SQL均值':>10}{'SQL p95':>9}")
+    print("-" * 110)
+    for label in sorted(summary):
+        item = summary[label]
+        queries_mean = '-' if item['queries_mean'] is None else item['queries_mean']
+        queries_p95 = '-' if item['queries_p95'] is None else item['queries_p95']
+        print(f"{label:<44}{item['count']:>7}{item['errors']:>6}{item['p50_ms']:>10}{item['p95_ms']:>10}"
+              f"{item['p99_ms']:>10}{queries_mean:>10}{queries_p95:>9}")
+    print("=" * 110)
+    print(f"总耗时: {elapsed:.1f} 秒")
+
+
+# ========== 请求 ==========
+
+class BenchClient:
+    """对 requests 的简单封装：每个线程一个 Session，记录延迟和 SQL 条数"""
+
+    def __init__(self, base_url, recorder):
+        self.base_url = base_url.rstrip('/')
+        self.recorder = recorder
+        self._local = threading.local()
+
+    def _session(self):
+        import requests
+
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            self._local.session = session
+        return session
+
+    def request(self, label, method, path, token=None, **kwargs):
+        headers = kwargs.pop('headers', {})
+        headers[LABEL_HEADER] = label
+        if token:
+            headers['Authorization'] = f'Bearer {token}'
+
+        started = time.perf_counter()
+        response = self._session().request(method, self.base_url + path, headers=headers, timeout=120, **kwargs)
+        # 读取完整响应体（导出接口需要计入下载时间）
+        _ = response.content
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        query_count = response.headers.get(QUERY_COUNT_HEADER)
+        self.recorder.record(label, elapsed_ms, response.status_code,
+                             int(query_count) if query_count is not None else None)
+        return response
+
+
+def _run_concurrently(jobs, concurrency):
+    """并发执行一组无参函数"""
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for future in [executor.submit(job) for job in jobs]:
+            future.result()
+
+
+def _login_student(client, school_code, number, password, label='POST /student/auth/login'):
+    response = client.request(label, 'POST', '/api/v1/student/auth/login', json={
+        'school_code': school_code, 'number': number, 'password': password
+    })
+    if response.status_code != 200:
+        return None
+    return response.json()['data']['access_token']
+
+
+def _login_teacher(client, school_code, number, password, label='POST /admin/auth/login'):
+    response = client.request(label, 'POST', '/api/v1/admin/auth/login', json={
+        'school_code': school_code, 'number': number, 'password': password
+    })
+    if response.status_code != 200:
+        return None
+    return response.json()['data']['access_token']
+
+
+def _all_classes(manifest):
+    return [(school, class_info) for school in manifest['schools'] for class_info in school['classes']]
+
+
+def _teacher_tokens(client, manifest):
+    """为每所学校的管理员账号登录（不计入统计），返回 {school_code: token}"""
+    tokens = {}
+    for school in manifest['schools']:
+        token = _login_teacher(client, school['school_code'], school['teacher_numbers'][0],
+                               manifest['password'], label='setup: teacher login')
+        if not token:
+            raise RuntimeError(f"教师登录失败: {school['school_code']}")
+        tokens[school['school_code']] = token
+    return tokens
+
+
+# ========== 场景 ==========
+
+def scenario_login(client, manifest, args):
+    """登录风暴：90% 学生登录，10% 教师登录"""
+    accounts = []
+    for school, class_info in _all_classes(manifest):
+        for number in class_info['student_numbers']:
+            accounts.append(('student', school['school_code'], number))
+    for school in manifest['schools']:
+        for number in school['teacher_numbers']:
+            accounts.append(('teacher', school['school_code'], number))
+    students = [a for a in accounts if a[0] == 'student']
+    teachers = [a for a in accounts if a[0] == 'teacher']
+
+    jobs = []
+    for _ in range(args.requests):
+        if teachers and random.random() < 0.1:
+            _, school_code, number = random.choice(teachers)
+            jobs.append(lambda s=school_code, n=number: _login_teacher(client, s, n, manifest['password']))
+        else:
+            _, school_code, number = random.choice(students)
+            jobs.append(lambda s=school_code, n=number: _login_student(client, s, n, manifest['password']))
+    _run_concurrently(jobs, args.concurrency)
+
+
+def scenario_video(client, manifest, args):
+    """视频心跳洪峰：每个会话创建后连续上报进度，最后上报播放结束"""
+    sessions_needed = max(1, args.requests // max(1, args.heartbeats_per_session))
+    candidates = []
+    for school, class_info in _all_classes(manifest):
+        if not class_info.get('video_resource_uuids'):
+            continue
+        for number in class_info['student_numbers']:
+            candidates.append((school['school_code'], number, class_info['video_resource_uuids']))
+    if not candidates:
+        print("⚠ 清单中没有视频资源，跳过 video 场景")
+        return
+
+    def run_session(school_code, number, video_uuids):
+        token = _login_student(client, school_code, number, manifest['password'], label='setup: student login')
+        if not token:
+            return
+        response = client.request('POST /video/progress/session/create', 'POST',
+                                  '/api/v1/video/progress/session/create', token=token,
+                                  json={'resource_uuid': random.choice(video_uuids), 'duration': 600,
+                                        'device_type': 'pc'})
+        if response.status_code != 200:
+            return
+        session_id = response.json()['data']['session_id']
+        position = 0
+        for _ in range(args.heartbeats_per_session):
+            position += 10
+            client.request('POST /video/progress/progress/update', 'POST',
+                           '/api/v1/video/progress/progress/update', token=token,
+                           json={'session_id': session_id, 'current_position': position})
+        client.request('POST /video/progress/event/ended', 'POST',
+                       '/api/v1/video/progress/event/ended', token=token,
+                       json={'session_id': session_id, 'position': position})
+
+    jobs = []
+    for _ in range(sessions_needed):
+        school_code, number, video_uuids = random.choice(candidates)
+        jobs.append(lambda s=school_code, n=number, v=video_uuids: run_session(s, n, v))
+    _run_concurrently(jobs, args.concurrency)
+
+
+# 教师看板接口：(标签, 路径模板)
+DASHBOARD_ENDPOINTS = [
+    ('GET /classes/{uuid}/analytics/overview', '/api/v1/admin/club/classes/{uuid}/analytics/overview'),
+    ('GET /classes/{uuid}/analytics/progress-distribution',
+     '/api/v1/admin/club/classes/{uuid}/analytics/progress-distribution'),
+    ('GET /classes/{uuid}/analytics/completion-trend', '/api/v1/admin/club/classes/{uuid}/analytics/completion-trend'),
+    ('GET /classes/{uuid}/analytics/score-distribution',
+     '/api/v1/admin/club/classes/{uuid}/analytics/score-distribution'),
+    ('GET /classes/{uuid}/analytics/student-activity-ranking',
+     '/api/v1/admin/club/classes/{uuid}/analytics/student-activity-ranking'),
+    ('GET /classes/{uuid}/progress/overview', '/api/v1/admin/club/classes/{uuid}/progress/overview'),
+    ('GET /classes/{uuid}/progress', '/api/v1/admin/club/classes/{uuid}/progress'),
+    ('GET /classes/{uuid}/homework', '/api/v1/admin/club/classes/{uuid}/homework'),
+]
+
+
+def scenario_dashboard(client, manifest, args):
+    """教师看板：随机班级 x 随机看板接口"""
+    tokens = _teacher_tokens(client, manifest)
+    classes = _all_classes(manifest)
+
+    jobs = []
+    for _ in range(args.requests):
+        school, class_info = random.choice(classes)
+        label, path = random.choice(DASHBOARD_ENDPOINTS)
+        token = tokens[school['school_code']]
+        jobs.append(lambda l=label, p=path.format(uuid=class_info['class_uuid']), t=token:
+                    client.request(l, 'GET', p, token=t))
+    _run_concurrently(jobs, args.concurrency)
+
+
+def scenario_export(client, manifest, args):
+    """导出：班级进度、作业统计、单个作业的提交记录"""
+    tokens = _teacher_tokens(client, manifest)
+    classes = _all_classes(manifest)
+    # 导出较重，请求数按十分之一计算
+    total = max(len(classes), args.requests // 10)
+
+    jobs = []
+    for _ in range(total):
+        school, class_info = random.choice(classes)
+        token = tokens[school['school_code']]
+        base = f"/api/v1/admin/club/classes/{class_info['class_uuid']}"
+        choices = [
+            ('GET /classes/{uuid}/progress/export', f'{base}/progress/export'),
+            ('GET /classes/{uuid}/homework/export', f'{base}/homework/export'),
+        ]
+        if class_info.get('task_ids'):
+            task_id = random.choice(class_info['task_ids'])
+            choices.append(('GET /classes/{uuid}/homework/{task_id}/submissions/export',
+                            f'{base}/homework/{task_id}/submissions/export'))
+        label, path = random.choice(choices)
+        jobs.append(lambda l=label, p=path, t=token: client.request(l, 'GET', p, token=t))
+    _run_concurrently(jobs, args.concurrency)
+
+
+SCENARIO_FUNCS = {
+    'login': scenario_login,
+    'video': scenario_video,
+    'dashboard': scenario_dashboard,
+    'export': scenario_export,
+}
+
+
+def run(args):
+    """执行压测"""
+    manifest_path = Path(args.manifest)
+    if not manifest_path.exists():
+        print(f"❌ 未找到清单文件: {manifest_path}")
+        print("   请先运行: python benchmarks/generate_data.py")
+        return False
+    manifest = json.loads(manifest_path.read_text(encoding='utf-8'))
+    random.seed(args.seed)
+
+    server = None
+    if args.base_url:
+        base_url = args.base_url
+        print(f"远程模式: {base_url}（不统计 SQL 条数）")
+    else:
+        base_url, server, _ = start_local_server(args.port)
+        print(f"进程内模式: {base_url}")
+
+    recorder = Recorder()
+    client = BenchClient(base_url, recorder)
+    scenarios = SCENARIOS if args.scenario == 'all' else [args.scenario]
+
+    started = time.perf_counter()
+    try:
+        for name in scenarios:
+            print(f"▶ 场景 {name} ...")
+            scenario_started = time.perf_counter()
+            SCENARIO_FUNCS[name](client, manifest, args)
+            print(f"  ✓ 完成，耗时 {time.perf_counter() - scenario_started:.1f} 秒")
+    finally:
+        if server is not None:
+            server.should_exit = True
+
+    elapsed = time.perf_counter() - started
+    summary = recorder.summary()
+    print_summary(summary, elapsed)
+
+    if args.output:
+        output_path = Path(args.output)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        output_path.write_text(json.dumps({
+            'scenarios': scenarios,
+            'concurrency': args.concurrency,
+            'requests': args.requests,
+            'elapsed_seconds': round(elapsed, 2),
+            'endpoints': summary
+        }, ensure_ascii=False, indent=2), encoding='utf-8')
+        print(f"结果已保存: {output_path}")
+
+    return True
+
+
+def main():
+    """主函数"""
+    args = parse_args()
+    try:
+        sys.exit(0 if run(args) else 1)
+    except ImportError as e:
+        print(f"❌ 导入错误: {str(e)}")
+        print()
+        print("请确保已安装所有依赖:")
+        print("  pip install -r requirements.txt")
+        sys.exit(1)
+    except Exception as e:
+        print(f"❌ 压测过程中出现错误: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
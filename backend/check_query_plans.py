@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+热点查询执行计划检查工具
+
+对 club_classes、class_analytics、student_tasks、video_progress_service 中的高频查询执行 EXPLAIN，
+如果进度表/遥测表出现全表扫描（type=ALL）则返回非零退出码。
+
+使用前请确保：
+  1. .env 指向一个本地 MySQL 数据库
+  2. 已执行 SQL/update/26_add_hot_query_indexes.sql、29_add_task_progress_user_status_index.sql
+  3. 数据库中已有一定量的数据（数据量过小时 MySQL 可能主动选择全表扫描，此时只给出警告）
+"""
+
+import sys
+from pathlib import Path
+
+# 添加项目路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+# 需要检查的热点表：这些表出现全表扫描即视为回退
+HOT_TABLES = {
+    'pbl_task_progress',
+    'pbl_video_play_progress',
+    'pbl_video_watch_records',
+    'pbl_learning_progress',
+    'pbl_class_members',
+}
+
+# 表行数低于该值时，全表扫描只给出警告（优化器对小表倾向于直接扫描）
+MIN_ROWS_FOR_FAILURE = 1000
+
+
+def _pick_sample_params(db):
+    """从数据库中挑选一组真实存在的参数，让执行计划更贴近线上"""
+    from app.models.pbl import (
+        PBLClass, PBLClassMember, PBLCourse, PBLTaskProgress, PBLVideoPlayProgress, PBLLearningProgress
+    )
+
+    params = {
+        'class_id': 0, 'course_ids': [0], 'student_ids': [0], 'student_id': 0,
+        'task_id': 0, 'session_id': '', 'resource_id': 0, 'video_user_id': 0,
+        'lp_user_id': 0, 'unit_id': 0, 'lp_resource_id': 0, 'lp_task_id': 0,
+        'school_id': 0,
+    }
+
+    member = db.query(PBLClassMember.class_id).filter(PBLClassMember.is_active == 1).first()
+    if member:
+        params['class_id'] = member.class_id
+        student_ids = [row[0] for row in db.query(PBLClassMember.student_id).filter(
+            PBLClassMember.class_id == member.class_id,
+            PBLClassMember.is_active == 1
+        ).all()]
+        params['student_ids'] = student_ids or [0]
+        params['student_id'] = params['student_ids'][0]
+        course_ids = [row[0] for row in db.query(PBLCourse.id).filter(
+            PBLCourse.class_id == member.class_id,
+            PBLCourse.status == 'published'
+        ).all()]
+        params['course_ids'] = course_ids or [0]
+        params['school_id'] = db.query(PBLClass.school_id).filter(
+            PBLClass.id == member.class_id
+        ).scalar() or 0
+
+    progress = db.query(PBLTaskProgress.task_id).first()
+    if progress:
+        params['task_id'] = progress.task_id
+
+    play = db.query(
+        PBLVideoPlayProgress.session_id,
+        PBLVideoPlayProgress.resource_id,
+        PBLVideoPlayProgress.user_id
+    ).first()
+    if play:
+        params['session_id'] = play.session_id
+        params['resource_id'] = play.resource_id
+        params['video_user_id'] = play.user_id
+
+    learning = db.query(
+        PBLLearningProgress.user_id,
+        PBLLearningProgress.unit_id,
+        PBLLearningProgress.resource_id,
+        PBLLearningProgress.task_id
+    ).filter(PBLLearningProgress.unit_id.isnot(None)).first()
+    if learning:
+        params['lp_user_id'] = learning.user_id
+        params['unit_id'] = learning.unit_id
+        params['lp_resource_id'] = learning.resource_id or 0
+        params['lp_task_id'] = learning.task_id or 0
+
+    return params
+
+
+def _build_hot_queries(db, p):
+    """构建热点查询（与各模块中的查询保持同样的形状）"""
+    from sqlalchemy import func, case, exists
+    from app.models.admin import User
+    from app.models.pbl import (
+        PBLClassMember, PBLUnit, PBLTask, PBLTaskProgress,
+        PBLVideoPlayProgress, PBLVideoWatchRecord, PBLLearningProgress
+    )
+
+    queries = {}
+
+    # ----- club_classes -----
+    queries['club_classes: 班级活跃成员'] = db.query(PBLClassMember.student_id).filter(
+        PBLClassMember.class_id == p['class_id'],
+        PBLClassMember.is_active == 1
+    )
+
+    queries['club_classes: 学生单元完成情况（get_class_progress）'] = db.query(
+        PBLTaskProgress.user_id,
+        PBLTask.unit_id,
+        func.count(PBLTaskProgress.id).label('total_progress'),
+        func.sum(case((PBLTaskProgress.status == 'completed', 1), else_=0)).label('completed_count')
+    ).join(
+        PBLTask, PBLTaskProgress.task_id == PBLTask.id
+    ).join(
+        PBLUnit, PBLTask.unit_id == PBLUnit.id
+    ).filter(
+        PBLUnit.course_id.in_(p['course_ids']),
+        PBLTaskProgress.user_id.in_(p['student_ids'])
+    ).group_by(PBLTaskProgress.user_id, PBLTask.unit_id)
+
+    queries['club_classes: 可添加学生（NOT EXISTS 排除班级成员）'] = db.query(User.id).filter(
+        User.school_id == p['school_id'],
+        User.role == 'student',
+        User.is_active == True,
+        User.deleted_at == None,
+        ~exists().where(
+            PBLClassMember.class_id == p['class_id'],
+            PBLClassMember.student_id == User.id,
+            PBLClassMember.is_active == 1
+        )
+    ).order_by(func.coalesce(User.student_number, ''), User.id).limit(51)
+
+    queries['schools: 学校进度报表（按学生、单元一次扫描）'] = db.query(
+        PBLTaskProgress.user_id,
+        PBLTask.unit_id,
+        func.count(func.distinct(case((PBLTaskProgress.status == 'completed', PBLTaskProgress.task_id)))),
+        func.sum(case((PBLTaskProgress.submission.isnot(None), 1), else_=0)),
+        func.count(PBLTaskProgress.score),
+        func.sum(PBLTaskProgress.score),
+        func.max(PBLTaskProgress.updated_at)
+    ).join(
+        PBLTask, PBLTask.id == PBLTaskProgress.task_id
+    ).filter(
+        PBLTask.unit_id.in_(db.query(PBLUnit.id).filter(PBLUnit.course_id.in_(p['course_ids']))),
+        PBLTaskProgress.user_id.in_(
+            db.query(PBLClassMember.student_id).filter(
+                PBLClassMember.class_id == p['class_id'],
+                PBLClassMember.is_active == 1
+            )
+        )
+    ).group_by(PBLTaskProgress.user_id, PBLTask.unit_id)
+
+    queries['club_classes: 作业提交数'] = db.query(func.count(PBLTaskProgress.id)).filter(
+        PBLTaskProgress.task_id == p['task_id'],
+        PBLTaskProgress.submission.isnot(None)
+    )
+
+    queries['club_classes: 作业待批改数'] = db.query(func.count(PBLTaskProgress.id)).filter(
+        PBLTaskProgress.task_id == p['task_id'],
+        PBLTaskProgress.status == 'review',
+        PBLTaskProgress.graded_at.is_(None)
+    )
+
+    queries['club_classes: 学生作业提交记录'] = db.query(PBLTaskProgress).filter(
+        PBLTaskProgress.task_id == p['task_id'],
+        PBLTaskProgress.user_id == p['student_id']
+    )
+
+    # ----- student_tasks -----
+    queries['student_tasks: 我提交的任务（get_my_tasks）'] = db.query(
+        PBLTaskProgress.id, PBLTaskProgress.updated_at, PBLTask.title, PBLUnit.title
+    ).join(
+        PBLTask, PBLTask.id == PBLTaskProgress.task_id
+    ).join(
+        PBLUnit, PBLUnit.id == PBLTask.unit_id
+    ).filter(
+        PBLTaskProgress.user_id == p['student_id'],
+        PBLTaskProgress.status.in_(['review', 'completed'])
+    ).order_by(PBLTaskProgress.updated_at.desc(), PBLTaskProgress.id.desc()).limit(21)
+
+    # ----- class_analytics -----
+    queries['class_analytics: 学生提交数'] = db.query(func.count(PBLTaskProgress.id)).join(
+        PBLTask, PBLTaskProgress.task_id == PBLTask.id
+    ).join(
+        PBLUnit, PBLTask.unit_id == PBLUnit.id
+    ).filter(
+        PBLUnit.course_id.in_(p['course_ids']),
+        PBLTaskProgress.user_id == p['student_id'],
+        PBLTaskProgress.submission.isnot(None)
+    )
+
+    queries['class_analytics: 学生平均分'] = db.query(func.avg(PBLTaskProgress.score)).join(
+        PBLTask, PBLTaskProgress.task_id == PBLTask.id
+    ).join(
+        PBLUnit, PBLTask.unit_id == PBLUnit.id
+    ).filter(
+        PBLUnit.course_id.in_(p['course_ids']),
+        PBLTaskProgress.user_id == p['student_id'],
+        PBLTaskProgress.score.isnot(None)
+    )
+
+    # ----- video_progress_service -----
+    queries['video_progress_service: 按会话定位'] = db.query(PBLVideoPlayProgress).filter(
+        PBLVideoPlayProgress.session_id == p['session_id']
+    )
+
+    queries['video_progress_service: 断点续看'] = db.query(PBLVideoPlayProgress).filter(
+        PBLVideoPlayProgress.resource_id == p['resource_id'],
+        PBLVideoPlayProgress.user_id == p['video_user_id']
+    ).order_by(PBLVideoPlayProgress.updated_at.desc()).limit(1)
+
+    queries['video_watch_service: 观看次数'] = db.query(func.count(PBLVideoWatchRecord.id)).filter(
+        PBLVideoWatchRecord.resource_id == p['resource_id'],
+        PBLVideoWatchRecord.user_id == p['video_user_id']
+    )
+
+    # ----- learning progress -----
+    queries['learning_progress: 单元资源完成'] = db.query(PBLLearningProgress).filter(
+        PBLLearningProgress.user_id == p['lp_user_id'],
+        PBLLearningProgress.unit_id == p['unit_id'],
+        PBLLearningProgress.resource_id == p['lp_resource_id'],
+        PBLLearningProgress.status == 'completed'
+    )
+
+    queries['learning_progress: 单元任务完成'] = db.query(PBLLearningProgress).filter(
+        PBLLearningProgress.user_id == p['lp_user_id'],
+        PBLLearningProgress.unit_id == p['unit_id'],
+        PBLLearningProgress.task_id == p['lp_task_id'],
+        PBLLearningProgress.status.in_(['completed', 'review'])
+    )
+
+    return queries
+
+
+def _table_rows(db, table_name):
+    """从 information_schema 获取表的估算行数"""
+    from sqlalchemy import text
+    row = db.execute(text(
+        "SELECT TABLE_ROWS FROM information_schema.TABLES "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :name"
+    ), {'name': table_name}).first()
+    return int(row[0] or 0) if row else 0
+
+
+def check_query_plans():
+    """对所有热点查询执行 EXPLAIN，返回是否全部通过"""
+    from sqlalchemy import text
+    from sqlalchemy.dialects import mysql
+    from app.db.session import SessionLocal
+
+    db = SessionLocal()
+    failures = []
+    warnings = []
+    try:
+        params = _pick_sample_params(db)
+        queries = _build_hot_queries(db, params)
+
+        print("=" * 70)
+        print("热点查询执行计划检查")
+        print("=" * 70)
+
+        for name, query in queries.items():
+            sql = str(query.statement.compile(
+                dialect=mysql.dialect(),
+                compile_kwargs={"literal_binds": True}
+            ))
+            plan = db.execute(text(f"EXPLAIN {sql}")).mappings().all()
+
+            full_scans = [row for row in plan if row['type'] == 'ALL' and row['table'] in HOT_TABLES]
+            if not full_scans:
+                keys = ', '.join(f"{row['table']}:{row['key']}" for row in plan if row['table'])
+                print(f"  ✓ {name}  [{keys}]")
+                continue
+
+            for row in full_scans:
+                rows = _table_rows(db, row['table'])
+                message = f"{name} - {row['table']} 全表扫描（估算 {rows} 行）"
+                if rows >= MIN_ROWS_FOR_FAILURE:
+                    failures.append(message)
+                    print(f"  ✗ {message}")
+                else:
+                    warnings.append(message)
+                    print(f"  ⚠ {message}，数据量过小，仅警告")
+    finally:
+        db.close()
+
+    print()
+    print("=" * 70)
+    if failures:
+        print(f"❌ {len(failures)} 个热点查询回退为全表扫描，请检查索引是否存在")
+        print("   参考: SQL/update/26_add_hot_query_indexes.sql")
+    else:
+        print(f"✓ 所有热点查询均使用索引（警告 {len(warnings)} 条）")
+    print("=" * 70)
+
+    return not failures
+
+
+def main():
+    """主函数"""
+    try:
+        sys.exit(0 if check_query_plans() else 1)
+    except ImportError as e:
+        print(f"❌ 导入错误: {str(e)}")
+        print()
+        print("请确保已安装所有依赖:")
+        print("  pip install -r requirements.txt")
+        sys.exit(1)
+    except Exception as e:
+        print(f"❌ 检查过程中出现错误: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
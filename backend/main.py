@@ -1,20 +1,26 @@
 from fastapi import FastAPI, Request
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
 from starlette import status
 from starlette.exceptions import HTTPException as StarletteHTTPException
-from starlette.middleware.base import BaseHTTPMiddleware
-import time
-
-from app.api.endpoints import projects, admin_auth, admin_courses, admin_units, admin_resources, student_courses, student_auth, admin_tasks, student_tasks, admin_users, classes_groups, learning_progress, assessments, assessment_templates, datasets, ethics, experts, social_activities, admin_outputs, portfolios, school_courses, schools, video_play, video_progress, club_classes, student_club, template_permissions, available_templates, class_analytics
-from app.core.response import error_response
-from app.core.logging_config import setup_logging, get_logger
+from starlette.responses import PlainTextResponse
+
+from app.api.endpoints import projects, admin_auth, admin_courses, admin_units, admin_resources, student_courses, student_auth, admin_tasks, student_tasks, admin_users, classes_groups, learning_progress, assessments, assessment_templates, datasets, ethics, experts, social_activities, admin_outputs, portfolios, school_courses, schools, video_play, video_progress, club_classes, student_club, template_permissions, available_templates, class_analytics, jobs
+from app.core.response import error_response, FastJSONResponse
+from app.core.config import settings
+from app.core.logging_config import setup_logging, get_logger, RequestLogSampler
+from app.core.metrics import MetricsMiddleware, metrics_registry
+from app.core.compression import CompressionMiddleware
+from app.core.server import configure_threadpool
 from app.db.session import engine
+from app.services.counter_service import counter_service
+from app.services.job_worker import job_worker_pool
+from app.services.class_event_service import close_broker
+from app.services.portfolio_service import portfolio_refresher
 from app.models import pbl, admin  # Import models to register them
 
 # 初始化日志系统
-setup_logging(level="DEBUG")
+setup_logging(level=settings.log_level, fmt=settings.log_format)
 logger = get_logger(__name__)
 
 logger.info("正在启动 CodeHubot PBL System API...")
@@ -28,32 +34,32 @@ logger.info("数据库表结构更新请使用 SQL/update/ 目录下的脚本")
 app = FastAPI(
     title="CodeHubot PBL System API",
     description="API for Project Based Learning System",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=FastJSONResponse
 )
 
 logger.info("FastAPI 应用初始化完成")
 
-# Request logging middleware
-class RequestLoggingMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        start_time = time.time()
-        
-        # 记录请求信息
-        logger.info(f"收到请求: {request.method} {request.url.path}")
-        logger.debug(f"请求头: {dict(request.headers)}")
-        
-        # 处理请求
-        response = await call_next(request)
-        
-        # 计算处理时间
-        process_time = time.time() - start_time
-        
-        # 记录响应信息
-        logger.info(f"响应: {request.method} {request.url.path} - 状态码: {response.status_code} - 耗时: {process_time:.3f}秒")
-        
-        return response
-
-app.add_middleware(RequestLoggingMiddleware)
+# 访问日志采样：视频心跳等高频接口按比例记录
+request_log_sampler = RequestLogSampler(
+    sampled_paths=settings.log_sample_paths.split(','),
+    sample_rate=settings.log_sample_rate,
+    slow_ms=settings.log_slow_request_ms
+)
+
+# 响应压缩（放在计时中间件内侧，压缩耗时计入请求耗时）
+if settings.compression_enabled:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.compression_min_size,
+        gzip_level=settings.compression_gzip_level,
+        brotli_quality=settings.compression_brotli_quality,
+        threadpool_min_size=settings.compression_threadpool_min_size
+    )
+
+# 请求计时、指标采集和访问日志（纯 ASGI 中间件）
+metrics_registry.bind_engine(engine)
+app.add_middleware(MetricsMiddleware, log_sampler=request_log_sampler)
 
 # CORS Configuration
 app.add_middleware(
@@ -92,6 +98,7 @@ app.include_router(template_permissions.router, prefix="/api/v1/admin", tags=["t
 app.include_router(available_templates.router, prefix="/api/v1/admin", tags=["available-templates"])
 # app.include_router(enrollments.router, prefix="/api/v1/admin/enrollments", tags=["admin-enrollments"])  # 已废弃：选课功能已移除
 app.include_router(learning_progress.router, prefix="/api/v1/admin/learning-progress", tags=["admin-learning-progress"])
+app.include_router(jobs.router, prefix="/api/v1/admin/jobs", tags=["admin-jobs"])
 
 # PBL routers
 app.include_router(projects.router, prefix="/api/v1/pbl", tags=["pbl-projects"])
@@ -109,16 +116,54 @@ app.include_router(video_progress.router, prefix="/api/v1/video/progress", tags=
 
 logger.info("所有路由注册完成")
 
+@app.on_event("startup")
+async def configure_server_threadpool():
+    # 同步接口线程池与数据库连接池上限一致（默认 40 个线程会在连接池中排队）
+    configure_threadpool()
+
+
+@app.on_event("startup")
+def start_background_workers():
+    # 浏览/点赞/下载计数的批量写入线程
+    counter_service.start()
+    # 成长档案汇总字段的批量刷新线程
+    portfolio_refresher.start()
+    # 后台任务 worker 进程（JOB_WORKER_PROCESSES 为 0 时不启动，需单独运行）
+    job_worker_pool.start()
+
+
+@app.on_event("shutdown")
+def stop_background_workers():
+    # 退出前写入尚未刷新的计数
+    counter_service.stop()
+    # 刷新尚未重新计算的成长档案
+    portfolio_refresher.stop()
+    # 等待 worker 执行完当前任务
+    job_worker_pool.stop()
+    # 结束仍未断开的看板 SSE 长连接
+    close_broker()
+
+
 @app.get("/")
 async def root():
     return {"message": "Welcome to CodeHubot PBL System API"}
 
 
+if settings.metrics_enabled:
+    @app.get("/metrics", include_in_schema=False)
+    def metrics():
+        """Prometheus 指标（按路由模板统计的延迟、状态码、SQL 条数和连接池状态）"""
+        return PlainTextResponse(
+            metrics_registry.render(),
+            media_type="text/plain; version=0.0.4; charset=utf-8"
+        )
+
+
 @app.exception_handler(StarletteHTTPException)
 async def http_exception_handler(request: Request, exc: StarletteHTTPException):
     # Standardize HTTP errors
     logger.warning(f"HTTP异常: {exc.status_code} - {exc.detail} - 路径: {request.url.path}")
-    return JSONResponse(
+    return FastJSONResponse(
         status_code=exc.status_code,
         content={"code": exc.status_code, "message": exc.detail or "error", "data": None},
     )
@@ -127,7 +172,7 @@ async def http_exception_handler(request: Request, exc: StarletteHTTPException):
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
     logger.warning(f"请求验证错误 - 路径: {request.url.path} - 错误: {exc.errors()}")
-    return JSONResponse(
+    return FastJSONResponse(
         status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
         content={
             "code": status.HTTP_422_UNPROCESSABLE_ENTITY,
@@ -148,16 +193,7 @@ async def unhandled_exception_handler(request: Request, exc: Exception):
 
 
 if __name__ == "__main__":
-    import uvicorn
-    
-    logger.info("正在启动 Uvicorn 服务器...")
-    logger.info("服务器地址: http://0.0.0.0:8000")
-    logger.info("API 文档地址: http://0.0.0.0:8000/docs")
+    # 按 SERVER_* 配置启动（worker 数、事件循环、请求数上限等），与 Dockerfile 相同
+    from app.core.server import main as run_server
     
-    uvicorn.run(
-        app,
-        host="0.0.0.0",
-        port=8000,
-        log_level="info",
-        access_log=True
-    )
+    run_server()
@@ -107,7 +107,7 @@ export const getAvailableStudentsForGroup = async (groupId, keyword = '') => {
       `/admin/classes-groups/groups/${groupId}/available-students`,
       { params }
     )
-    return response.data.data || response.data
+    return response.data.data?.items || []
   } catch (error) {
     throw new Error(handleApiError(error))
   }